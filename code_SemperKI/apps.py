@@ -7,12 +7,27 @@ Contains: AppConfig
 
 """
 
+import os, sys
 from django.apps import AppConfig
 
 #######################################################
 class SemperKIConfig(AppConfig):
     name = "code_SemperKI"
-    
+
     #######################################################
     def __init__(self,app_name, app_module):
         AppConfig.__init__(self,app_name, app_module)
+
+    #######################################################
+    def ready(self):
+        """
+        Start the dispatcher of the background tasks in every process that serves requests.
+        The task types are registered by then, main imports all modules before this app is ready.
+
+        """
+        if os.path.basename(sys.argv[0]) == "manage.py" and "runserver" not in sys.argv:
+            return # migrate, test and the other commands don't run background tasks
+        if "runserver" in sys.argv and os.environ.get("RUN_MAIN") != "true":
+            return # the autoreloader, the server runs in its child
+        from .tasks.taskExecutor import taskExecutor
+        taskExecutor.start()
@@ -223,6 +223,31 @@ class AbstractContentInterface(ABC):
         """
         pass
 
+    ##############################################
+    def updateProcessBatch(self, projectID:str, processID:str, changes:dict, updatedBy:str) -> dict[str,tuple[str,dict]]|Exception:
+        """
+        Apply several changes to one process, one after another if the backend can't do better
+
+        :param projectID: Project that this process belongs to
+        :type projectID: str
+        :param processID: unique processID to be edited
+        :type processID: str
+        :param changes: The content for every kind of update as in ProcessUpdates
+        :type changes: dict
+        :param updatedBy: ID of the person who updated the process (for history)
+        :type updatedBy: str
+        :return: Content that is relevant to an event per kind of update
+        :rtype: dict[str,tuple[str,dict]] | Exception
+
+        """
+        outDict = {}
+        for updateType in changes:
+            result = self.updateProcess(projectID, processID, updateType, changes[updateType], updatedBy)
+            if isinstance(result, Exception):
+                return result
+            outDict[updateType] = result
+        return outDict
+
     ##############################################
     @abstractmethod
     def deleteFromProcess(self, projectID:str, processID:str, updateType: ProcessUpdates, content:dict, deletedBy:str):
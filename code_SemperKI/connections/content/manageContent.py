@@ -10,7 +10,7 @@ from Generic_Backend.code_General.utilities.basics import manualCheckifLoggedIn,
 from Generic_Backend.code_General.definitions import SessionContent, GlobalDefaults
 from Generic_Backend.code_General.connections.postgresql import pgProfiles
 
-from code_SemperKI.utilities.basics import manualCheckIfUserMaySeeProcess, manualCheckIfUserMaySeeProject
+from code_SemperKI.utilities.basics import manualCheckIfUserMaySeeProcess, manualCheckIfUserMaySeeProcesses, manualCheckIfUserMaySeeProject
 from .session import ProcessManagementSession
 import code_SemperKI.connections.content.postgresql.pgProcesses as PPManagement
 
@@ -66,6 +66,22 @@ class ManageContent():
             return True
         
         return False
+
+    #######################################################
+    def checkRightsForProcesses(self, processIDs:list[str]) -> bool:
+        """
+        Check if user may see all of the processes, with one lookup for all of them
+
+        :param processIDs: The processIDs of the processes in question
+        :type processIDs: list[str]
+        :return: True if the user belongs to the rightful of every process, false if not
+        :rtype: Bool
+
+        """
+        currentUserID = self.getClient()
+        if currentUserID == GlobalDefaults.anonymous:
+            return True
+        return manualCheckIfUserMaySeeProcesses(self.currentSession, currentUserID, processIDs)
     
     #######################################################
     def checkRights(self, functionName) -> bool:
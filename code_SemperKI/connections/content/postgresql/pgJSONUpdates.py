@@ -0,0 +1,66 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Expressions that change single keys of a jsonb column inside the database
+"""
+
+from django.db import models
+from django.db.models import F, Func, Value
+from django.db.models.functions import Coalesce
+from django.db.models.fields.json import KeyTransform
+from django.contrib.postgres.fields import ArrayField
+
+####################################################################################
+class JSONBConcat(Func):
+    """
+    jsonb || jsonb, merges the keys of two objects or appends to an array
+
+    """
+    arg_joiner = " || "
+    template = "(%(expressions)s)"
+    output_field = models.JSONField()
+
+####################################################################################
+class JSONBSet(Func):
+    """
+    jsonb_set(target, path, value, create_if_missing)
+
+    """
+    function = "jsonb_set"
+    output_field = models.JSONField()
+
+####################################################################################
+def mergeKeys(fieldName:str, changes:dict) -> JSONBConcat:
+    """
+    Set some top level keys of a jsonb column, the other keys stay as they are in the database
+
+    :param fieldName: The column
+    :type fieldName: str
+    :param changes: The keys with their new values
+    :type changes: dict
+    :return: The expression for an update
+    :rtype: JSONBConcat
+
+    """
+    return JSONBConcat(Coalesce(F(fieldName), Value({}, output_field=models.JSONField())), Value(changes, output_field=models.JSONField()))
+
+####################################################################################
+def appendToList(fieldName:str, key:str, entry) -> JSONBSet:
+    """
+    Append an entry to the list under a top level key of a jsonb column, the list is created if there is none
+
+    :param fieldName: The column
+    :type fieldName: str
+    :param key: The key of the list
+    :type key: str
+    :param entry: What shall be appended
+    :type entry: dict|list|str|int|float
+    :return: The expression for an update
+    :rtype: JSONBSet
+
+    """
+    currentList = Coalesce(KeyTransform(key, fieldName), Value([], output_field=models.JSONField()))
+    return JSONBSet(F(fieldName), Value([key], output_field=ArrayField(models.TextField())),
+                    JSONBConcat(currentList, Value([entry], output_field=models.JSONField())), Value(True))
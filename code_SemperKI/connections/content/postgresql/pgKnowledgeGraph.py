@@ -12,8 +12,11 @@ Contains: The database backed knowledge graph
 
 import json, logging, copy, time
 from datetime import datetime
+import django.dispatch
 from difflib import SequenceMatcher
 from django.utils import timezone
+from django.db import transaction
+from django.db.models import Q, Count, Max
 from django.conf import settings
 
 from Generic_Backend.code_General.definitions import *
@@ -24,6 +27,7 @@ from Generic_Backend.code_General.connections.postgresql import pgProfiles
 from code_SemperKI.definitions import *
 from code_SemperKI.utilities.basics import *
 from code_SemperKI.modelFiles.nodesModel import *
+from code_SemperKI.utilities.similarity import PropertyFeatureTable, similarityEngine
 
 logger = logging.getLogger("logToFile")
 loggerConsole = logging.getLogger("django")
@@ -31,6 +35,12 @@ loggerError = logging.getLogger("errors")
 loggerPerformance = logging.getLogger("performance")
 #######################################################
 
+bulkBatchSize = 1000 # rows per INSERT statement for bulk operations, keeps the number of query parameters well below the limit of postgres
+graphStreamingThreshold = 1000 # graphs with more nodes than this are streamed to the client instead of being serialized as a whole
+graphStreamingChunkSize = 2000 # rows fetched per round trip while streaming the graph
+similarityVerificationLimit = 10 # how many of the best ranked nodes are checked exactly in the similarity check
+graphCopiedForNewOwner = django.dispatch.Signal() # sent with createdBy after copyGraphForNewOwner, the bulk inserts don't send post_save or m2m_changed
+
 #Class for basic access
 ##################################################
 class Basics():
@@ -64,6 +74,43 @@ class Basics():
             loggerError.error(f'could not get node: {str(error)}')
             return error
 
+    ##################################################
+    @staticmethod
+    def getVersionsOfNodes(nodeIDs:list[str]) -> dict[str,str]|Exception:
+        """
+        Get the time of the last update of many nodes with one query
+
+        :param nodeIDs: The ids of the nodes
+        :type nodeIDs: list[str]
+        :return: Dictionary with nodeID: updatedWhen, nodes that don't exist are missing
+        :rtype: dict[str,str]|Exception
+        """
+        try:
+            return {nodeID: str(updatedWhen) for nodeID, updatedWhen in Node.objects.filter(nodeID__in=nodeIDs).values_list("nodeID", "updatedWhen")}
+        except Exception as error:
+            loggerError.error(f'could not get versions of nodes: {str(error)}')
+            return error
+
+    ##################################################
+    @staticmethod
+    def updatePropertyIndex(nodes:list[Node], isNew:bool=False):
+        """
+        Rewrite the entries of the property index for the given nodes
+
+        :param nodes: The nodes whose properties changed
+        :type nodes: list[Node]
+        :param isNew: If the nodes were just created, there is nothing to delete
+        :type isNew: bool
+        :return: None
+        :rtype: None
+        """
+        if not isNew:
+            NodeProperty.objects.filter(node_id__in=[node.nodeID for node in nodes]).delete()
+        entries = []
+        for node in nodes:
+            entries.extend(NodeProperty.fromNode(node))
+        NodeProperty.objects.bulk_create(entries, batch_size=bulkBatchSize)
+
     ##################################################
     @staticmethod
     def createNode(information:dict, createdBy=defaultOwner, existingNodeID:str=""):
@@ -114,7 +161,9 @@ class Basics():
                     case _:
                         pass
 
-            createdNode, _ = Node.objects.update_or_create(nodeID=nodeID, defaults={"uniqueID": uniqueID, "nodeName": nodeName, "nodeType": nodeType, "context": context, "properties": properties, "createdBy": createdBy, "clonedFrom": clonedFrom, "active": active, "updatedWhen": updatedWhen})
+            with transaction.atomic():
+                createdNode, created = Node.objects.update_or_create(nodeID=nodeID, defaults={"uniqueID": uniqueID, "nodeName": nodeName, "nodeType": nodeType, "context": context, "properties": properties, "createdBy": createdBy, "clonedFrom": clonedFrom, "active": active, "updatedWhen": updatedWhen})
+                Basics.updatePropertyIndex([createdNode], isNew=created)
             
             
             # endPC = time.perf_counter_ns()
@@ -153,7 +202,9 @@ class Basics():
             clonedFrom = node.nodeID
             updatedWhen = timezone.now()
 
-            createdNode, _ = Node.objects.update_or_create(nodeID=nodeID, defaults={"uniqueID": uniqueID, "nodeName": nodeName, "nodeType": nodeType, "context": context, "properties": properties, "createdBy": createdBy, "clonedFrom": clonedFrom, "updatedWhen": updatedWhen})
+            with transaction.atomic():
+                createdNode, created = Node.objects.update_or_create(nodeID=nodeID, defaults={"uniqueID": uniqueID, "nodeName": nodeName, "nodeType": nodeType, "context": context, "properties": properties, "createdBy": createdBy, "clonedFrom": clonedFrom, "updatedWhen": updatedWhen})
+                Basics.updatePropertyIndex([createdNode], isNew=created)
             
             # endPC = time.perf_counter_ns()
             # endPT = time.process_time_ns()
@@ -168,7 +219,9 @@ class Basics():
     @staticmethod
     def copyGraphForNewOwner(createdBy:str=defaultOwner):
         """
-        Copy the whole graph for another owner
+        Copy the whole graph for another owner. 
+        Every copy is linked to the neighbors of the node it was cloned from.
+        The graph and the edge table are read once and all copies are written in bulk inside one transaction.
         
         :param createdBy: The new owner
         :type createdBy: str
@@ -179,16 +232,29 @@ class Basics():
             # startPC = time.perf_counter_ns()
             # startPT = time.process_time_ns()
             
-            nodes = Node.objects.all()
-            for node in nodes:
-                newNode = Basics.copyNode(node, createdBy)
-                if isinstance(newNode, Exception):
-                    raise newNode
-                edges = node.edges.all()
-                for edge in edges:
-                    result = Basics.createEdge(newNode.nodeID, edge.nodeID)
-                    if isinstance(result, Exception):
-                        raise result
+            EdgeTable = Node.edges.through
+            with transaction.atomic():
+                sourceNodes = list(Node.objects.all())
+                sourceEdges = list(EdgeTable.objects.values_list("from_node_id", "to_node_id"))
+
+                updatedWhen = timezone.now()
+                newNodeIDs = {}
+                newNodes = []
+                for node in sourceNodes:
+                    nodeID = generateURLFriendlyRandomString()
+                    newNodeIDs[node.nodeID] = nodeID
+                    newNodes.append(Node(nodeID=nodeID, uniqueID=node.uniqueID, nodeName=node.nodeName, nodeType=node.nodeType, context=node.context, properties=node.properties, createdBy=createdBy, clonedFrom=node.nodeID, updatedWhen=updatedWhen))
+                Node.objects.bulk_create(newNodes, batch_size=bulkBatchSize)
+                Basics.updatePropertyIndex(newNodes, isNew=True)
+
+                # the edge table contains both directions of a symmetrical edge, so every pair is handled once per direction
+                newEdges = []
+                for fromNodeID, toNodeID in sourceEdges:
+                    newNodeID = newNodeIDs[fromNodeID]
+                    newEdges.append(EdgeTable(from_node_id=newNodeID, to_node_id=toNodeID))
+                    newEdges.append(EdgeTable(from_node_id=toNodeID, to_node_id=newNodeID))
+                EdgeTable.objects.bulk_create(newEdges, batch_size=bulkBatchSize, ignore_conflicts=True)
+            graphCopiedForNewOwner.send(sender=Basics, createdBy=createdBy)
             
             # endPC = time.perf_counter_ns()
             # endPT = time.process_time_ns()
@@ -265,6 +331,7 @@ class Basics():
             # startPT = time.process_time_ns()
 
             node = Node.objects.get(nodeID=nodeID)
+            propertiesChanged = False
             for content in information:
                 match content:
                     case NodeDescription.nodeID:
@@ -282,10 +349,14 @@ class Basics():
                         node.properties = {}
                         for entry in information[NodeDescription.properties]:
                             node.properties[entry[NodePropertyDescription.key]] = entry
+                        propertiesChanged = True
                     case _:
                         pass
             node.updatedWhen = timezone.now()
-            node.save()
+            with transaction.atomic():
+                node.save()
+                if propertiesChanged:
+                    Basics.updatePropertyIndex([node])
             
             # endPC = time.perf_counter_ns()
             # endPT = time.process_time_ns()
@@ -513,13 +584,116 @@ class Basics():
             loggerError.error(f'could not get nodes by type: {str(error)}')
             return error
 
+    ##################################################
+    @staticmethod
+    def queryNodesByProperty(property:str, nodeType:str=""):
+        """
+        The query behind getNodesByProperty and getNodesByTypeAndProperty, the trigram index on the keys serves it
+
+        :param property: A specific property, every key that contains it (ignoring case) matches
+        :type property: str
+        :param nodeType: Only nodes of this type, empty for all types
+        :type nodeType: str
+        :return: The nodes, not yet evaluated
+        :rtype: QuerySet[Node]
+        
+        """
+        nodes = Node.objects.filter(propertyIndex__key__icontains=property)
+        if nodeType != "":
+            nodes = nodes.filter(nodeType=nodeType)
+        return nodes.distinct()
+
+    ##################################################
+    @staticmethod
+    def queryNodesByTypeAndPropertyAndValue(nodeType:str, nodeProperty:str, value:str):
+        """
+        The query behind getNodesByTypeAndPropertyAndValue, the trigram indices on keys and values serve it
+
+        :param nodeType: The node type
+        :type nodeType: str
+        :param nodeProperty: A specific property
+        :type nodeProperty: str
+        :param value: The value that is searched
+        :type value: str
+        :return: The nodes, not yet evaluated
+        :rtype: QuerySet[Node]
+        
+        """
+        return Node.objects.filter(nodeType=nodeType, propertyIndex__key__icontains=nodeProperty, propertyIndex__valueText__icontains=str(value)[:nodePropertyValueMaxLength]).distinct()
+
+    ##################################################
+    @staticmethod
+    def queryNodesByPropertyRange(nodeProperty:str, minimum:float|None=None, maximum:float|None=None, nodeType:str=""):
+        """
+        The query behind getNodesByPropertyRange
+
+        :param nodeProperty: The key of the property
+        :type nodeProperty: str
+        :param minimum: Lower bound (inclusive), None for no bound
+        :type minimum: float | None
+        :param maximum: Upper bound (inclusive), None for no bound
+        :type maximum: float | None
+        :param nodeType: Only nodes of this type, empty for all types
+        :type nodeType: str
+        :return: The nodes, not yet evaluated
+        :rtype: QuerySet[Node]
+        
+        """
+        entries = NodeProperty.objects.filter(key=nodeProperty, valueNum__isnull=False)
+        if minimum is not None:
+            entries = entries.filter(valueNum__gte=minimum)
+        if maximum is not None:
+            entries = entries.filter(valueNum__lte=maximum)
+        nodes = Node.objects.filter(nodeID__in=entries.values("node_id"))
+        if nodeType != "":
+            nodes = nodes.filter(nodeType=nodeType)
+        return nodes
+
+    ##################################################
+    @staticmethod
+    def queryNodesByPropertyPrefix(nodeProperty:str, prefix:str, nodeType:str=""):
+        """
+        The query behind getNodesByPropertyPrefix
+
+        :param nodeProperty: The key of the property
+        :type nodeProperty: str
+        :param prefix: The start of the value
+        :type prefix: str
+        :param nodeType: Only nodes of this type, empty for all types
+        :type nodeType: str
+        :return: The nodes, not yet evaluated
+        :rtype: QuerySet[Node]
+        
+        """
+        entries = NodeProperty.objects.filter(key=nodeProperty, valueText__startswith=prefix)
+        nodes = Node.objects.filter(nodeID__in=entries.values("node_id"))
+        if nodeType != "":
+            nodes = nodes.filter(nodeType=nodeType)
+        return nodes
+
+    ##################################################
+    @staticmethod
+    def queryNeighborsByProperty(node:Node, neighborProperty:str):
+        """
+        The query behind getSpecificNeighborsByProperty
+
+        :param node: The node to look for neighbors
+        :type node: Node
+        :param neighborProperty: Every key of a neighbor that contains it (ignoring case) matches
+        :type neighborProperty: str
+        :return: The neighbors, not yet evaluated
+        :rtype: QuerySet[Node]
+        
+        """
+        return node.edges.filter(propertyIndex__key__icontains=neighborProperty).distinct()
+
     ##################################################
     @staticmethod
     def getNodesByProperty(property:str) -> list[dict]:
         """
         Return all nodes with a given property
 
-        :param property: A specific property
+        :param property: A specific property, every key that contains it (ignoring case) matches
         :type property: str
         :return: List with all nodes and their info
         :rtype: list of dicts
@@ -529,7 +703,7 @@ class Basics():
             # startPC = time.perf_counter_ns()
             # startPT = time.process_time_ns()
 
-            nodes = Node.objects.filter(properties__icontains=property)
+            nodes = Basics.queryNodesByProperty(property)
             outList = list()
             for entry in nodes:
                 outList.append(entry.toDict())
@@ -551,7 +725,7 @@ class Basics():
 
         :param nodeType: The node type
         :type nodeType: str
-        :param nodeProperty: A specific property
+        :param nodeProperty: A specific property, every key that contains it (ignoring case) matches
         :type nodeProperty: str
         :return: List with all nodes and their info
         :rtype: list of dicts
@@ -561,7 +735,7 @@ class Basics():
             # startPC = time.perf_counter_ns()
             # startPT = time.process_time_ns()
 
-            nodes = Node.objects.filter(nodeType=nodeType).filter(properties__icontains=nodeProperty)
+            nodes = Basics.queryNodesByProperty(nodeProperty, nodeType)
             outList = list()
             for entry in nodes:
                 outList.append(entry.toDict())
@@ -580,6 +754,7 @@ class Basics():
     def getNodesByTypeAndPropertyAndValue(nodeType:str, nodeProperty:str, value:str):
         """
         Return all nodes of a given type with a certain property
+        Key and value of the same property must contain what is given, ignoring case, so "400" finds 400.0 and "400x400x400"
         UNUSED
 
         :param nodeType: The node type
@@ -596,7 +771,7 @@ class Basics():
             # startPC = time.perf_counter_ns()
             # startPT = time.process_time_ns()
 
-            nodes = Node.objects.filter(nodeType=nodeType).filter(properties__icontains=nodeProperty).filter(properties__icontains=value) #"name": "buildVolume", "value": "400x400x400",
+            nodes = Basics.queryNodesByTypeAndPropertyAndValue(nodeType, nodeProperty, value) #"name": "buildVolume", "value": "400x400x400",
             outList = list()
             for entry in nodes:
                 outList.append(entry.toDict())
@@ -610,6 +785,58 @@ class Basics():
             loggerError.error(f'could not get nodes of type {nodeType} by property {nodeProperty} and value {value}: {str(error)}')
             return error
 
+    ##################################################
+    @staticmethod
+    def getNodesByPropertyRange(nodeProperty:str, minimum:float|None=None, maximum:float|None=None, nodeType:str="") -> list[dict]|Exception:
+        """
+        Return all nodes whose numerical property lies within [minimum, maximum]
+
+        :param nodeProperty: The key of the property
+        :type nodeProperty: str
+        :param minimum: Lower bound (inclusive), None for no bound
+        :type minimum: float | None
+        :param maximum: Upper bound (inclusive), None for no bound
+        :type maximum: float | None
+        :param nodeType: Only nodes of this type, empty for all types
+        :type nodeType: str
+        :return: List with all nodes and their info
+        :rtype: list[dict] | Exception
+        
+        """
+        try:
+            outList = [entry.toDict() for entry in Basics.queryNodesByPropertyRange(nodeProperty, minimum, maximum, nodeType)]
+
+            loggerConsole.info(f"Gathered all nodes by range of property: {nodeProperty}")	
+            return outList
+        except (Exception) as error:
+            loggerError.error(f'could not get nodes by range of property {nodeProperty}: {str(error)}')
+            return error
+
+    ##################################################
+    @staticmethod
+    def getNodesByPropertyPrefix(nodeProperty:str, prefix:str, nodeType:str="") -> list[dict]|Exception:
+        """
+        Return all nodes where the value of the property starts with the prefix (case sensitive)
+
+        :param nodeProperty: The key of the property
+        :type nodeProperty: str
+        :param prefix: The start of the value
+        :type prefix: str
+        :param nodeType: Only nodes of this type, empty for all types
+        :type nodeType: str
+        :return: List with all nodes and their info
+        :rtype: list[dict] | Exception
+        
+        """
+        try:
+            outList = [entry.toDict() for entry in Basics.queryNodesByPropertyPrefix(nodeProperty, prefix, nodeType)]
+
+            loggerConsole.info(f"Gathered all nodes by prefix of property: {nodeProperty}")	
+            return outList
+        except (Exception) as error:
+            loggerError.error(f'could not get nodes by prefix of property {nodeProperty}: {str(error)}')
+            return error
+
     ##################################################
     @staticmethod
     def getSpecificNeighborsByType(nodeID:str, neighborNodeType:str) -> list[dict]|Exception:
@@ -660,7 +887,7 @@ class Basics():
             
             outList = []
             node = Node.objects.get(nodeID=nodeID)	
-            for neighbor in node.edges.filter(properties__icontains=neighborProperty):
+            for neighbor in Basics.queryNeighborsByProperty(node, neighborProperty):
                 outList.append(neighbor.toDict())
             
             # endPC = time.perf_counter_ns()
@@ -703,12 +930,58 @@ class Basics():
             return error
 
 
+    ##################################################
+    @staticmethod
+    def getGraphQuerySets(createdBy="", allowedNodeTypes:list[str]=[]):
+        """
+        Build the (lazy) queries for the nodes and the edges of the graph. 
+        If createdBy is given, only nodes of that owner or of the allowed types are part of the graph and only edges between those are returned.
+
+        :param createdBy: The owner of the nodes, empty for the whole graph
+        :type createdBy: str
+        :param allowedNodeTypes: Node types that are returned regardless of the owner
+        :type allowedNodeTypes: list[str]
+        :return: QuerySet of nodes and QuerySet of (nodeID, nodeID) tuples from the edge table
+        :rtype: tuple[QuerySet, QuerySet]
+        """
+        nodes = Node.objects.all()
+        edges = Node.edges.through.objects.all()
+        if createdBy != "":
+            nodes = nodes.filter(Q(createdBy=createdBy) | Q(nodeType__in=allowedNodeTypes))
+            nodeIDs = nodes.values("nodeID")
+            edges = edges.filter(from_node__in=nodeIDs, to_node__in=nodeIDs)
+        return nodes, edges.values_list("from_node_id", "to_node_id")
+
+    ##################################################
+    @staticmethod
+    def iterateUniqueEdges(edges):
+        """
+        The edge table contains both directions of a symmetrical edge, only let one of them through
+
+        :param edges: (nodeID, nodeID) tuples
+        :type edges: Iterable
+        :return: Generator of [nodeID, nodeID] lists
+        :rtype: Generator
+        """
+        alreadySeenEdges = set()
+        for fromNodeID, toNodeID in edges:
+            key = (fromNodeID, toNodeID) if fromNodeID <= toNodeID else (toNodeID, fromNodeID)
+            if key in alreadySeenEdges:
+                continue
+            alreadySeenEdges.add(key)
+            yield [fromNodeID, toNodeID]
+
     ##################################################
     @staticmethod
     def getGraph(createdBy="", allowedNodeTypes:list[str]=[]):
         """
-        Return the whole graph
+        Return the whole graph.
+        Needs two queries regardless of the size of the graph: one for the nodes and one for the edge table.
 
+        :param createdBy: The owner of the nodes, empty for the whole graph
+        :type createdBy: str
+        :param allowedNodeTypes: Node types that are returned regardless of the owner
+        :type allowedNodeTypes: list[str]
         :return: The graph as Dictionary of nodes and edges
         :rtype: Dict | Exception
         """
@@ -716,16 +989,8 @@ class Basics():
             # startPC = time.perf_counter_ns()
             # startPT = time.process_time_ns()
 
-            allNodes = Node.objects.all()
-            outDict = {"nodes": [], "edges": []}
-            for entry in allNodes:
-                if createdBy != "" and entry.createdBy != createdBy and entry.nodeType not in allowedNodeTypes:
-                    continue
-                outDict["nodes"].append(entry.toDict())
-                for neighbor in entry.edges.all():
-                    if createdBy != "" and neighbor.createdBy != createdBy and neighbor.nodeType not in allowedNodeTypes:
-                        continue
-                    outDict["edges"].append([entry.nodeID,neighbor.nodeID])
+            nodes, edges = Basics.getGraphQuerySets(createdBy, allowedNodeTypes)
+            outDict = {"nodes": [entry.toDict() for entry in nodes], "edges": list(Basics.iterateUniqueEdges(edges))}
             
             # endPC = time.perf_counter_ns()
             # endPT = time.process_time_ns()
@@ -736,6 +1001,64 @@ class Basics():
             loggerError.error(f'could not return graph: {str(error)}')
             return error
         
+    ##################################################
+    @staticmethod
+    def getNumberOfNodesInGraph(createdBy="", allowedNodeTypes:list[str]=[]) -> int|Exception:
+        """
+        Count the nodes that getGraph would return
+
+        :param createdBy: The owner of the nodes, empty for the whole graph
+        :type createdBy: str
+        :param allowedNodeTypes: Node types that are counted regardless of the owner
+        :type allowedNodeTypes: list[str]
+        :return: Number of nodes
+        :rtype: int | Exception
+        """
+        try:
+            nodes, _ = Basics.getGraphQuerySets(createdBy, allowedNodeTypes)
+            return nodes.count()
+        except (Exception) as error:
+            loggerError.error(f'could not count nodes of graph: {str(error)}')
+            return error
+
+    ##################################################
+    @staticmethod
+    def streamGraphAsJSON(createdBy="", allowedNodeTypes:list[str]=[], forFrontend:bool=False):
+        """
+        Write the graph as JSON piece by piece, so that large graphs never have to be held in memory as a whole.
+        Nodes and edges are fetched with server side cursors.
+
+        :param createdBy: The owner of the nodes, empty for the whole graph
+        :type createdBy: str
+        :param allowedNodeTypes: Node types that are returned regardless of the owner
+        :type allowedNodeTypes: list[str]
+        :param forFrontend: Use the format of the frontend ({"Nodes": [{id, name, type}], "Edges": [{source, target}]}) instead of the one from getGraph
+        :type forFrontend: bool
+        :return: Generator of JSON strings
+        :rtype: Generator
+        """
+        nodes, edges = Basics.getGraphQuerySets(createdBy, allowedNodeTypes)
+        yield '{"Nodes": [' if forFrontend else '{"nodes": ['
+        separator = ""
+        for entry in nodes.iterator(chunk_size=graphStreamingChunkSize):
+            if forFrontend:
+                outEntry = {"id": entry.nodeID, "name": entry.nodeName, "type": entry.nodeType}
+            else:
+                outEntry = entry.toDict()
+            yield separator + json.dumps(outEntry)
+            separator = ", "
+        yield '], "Edges": [' if forFrontend else '], "edges": ['
+        separator = ""
+        for fromNodeID, toNodeID in Basics.iterateUniqueEdges(edges.iterator(chunk_size=graphStreamingChunkSize)):
+            if forFrontend:
+                outEntry = {"source": fromNodeID, "target": toNodeID}
+            else:
+                outEntry = [fromNodeID, toNodeID]
+            yield separator + json.dumps(outEntry)
+            separator = ", "
+        yield "]}"
+        loggerConsole.info("Streamed the whole graph")
+
     ##################################################
     @staticmethod
     def createGraph(graph:list):
@@ -903,46 +1226,73 @@ class Logic():
         
     ##################################################
     @staticmethod
-    def similarityHelper(listOfNodes:list[dict], node:Node) -> bool|Exception:
+    def getSystemNeighbors(nodeIDs:list[str]) -> dict[str,set]:
         """
-        Helper function for the similarity check
+        Gather the IDs of all system nodes linked to the given nodes in one query
 
-        :param listOfNodes: List of nodes to check for similarity
-        :type listOfNodes: list[dict]
+        :param nodeIDs: The IDs of the nodes
+        :type nodeIDs: list[str]
+        :return: For every node ID, the set of IDs of linked system nodes
+        :rtype: dict[str,set]
+        
+        """
+        outDict = {nodeID: set() for nodeID in nodeIDs}
+        edges = Node.edges.through.objects.filter(from_node_id__in=nodeIDs, to_node__createdBy=defaultOwner).values_list("from_node_id", "to_node_id")
+        for fromNodeID, toNodeID in edges:
+            outDict[fromNodeID].add(toNodeID)
+        return outDict
+
+    ##################################################
+    @staticmethod
+    def getFeatureTableOfSystemNodes(nodeType:str) -> PropertyFeatureTable:
+        """
+        Get the feature table of all system nodes of a type. 
+        The table is cached and only rebuilt if the number of nodes or their last update changed.
+
+        :param nodeType: The type of the nodes
+        :type nodeType: str
+        :return: The feature table
+        :rtype: PropertyFeatureTable
+        
+        """
+        systemNodes = Node.objects.filter(nodeType=nodeType, createdBy=defaultOwner)
+        version = systemNodes.aggregate(count=Count("nodeID"), lastUpdate=Max("updatedWhen"))
+        return similarityEngine.getTable(nodeType, (version["count"], version["lastUpdate"]), lambda: list(systemNodes.values_list("nodeID", "properties")))
+
+    ##################################################
+    @staticmethod
+    def similarityHelper(table:PropertyFeatureTable, node:Node, systemEdgesOfNode:set) -> bool|Exception:
+        """
+        Helper function for the similarity check. 
+        Ranks all nodes of the table at once and verifies only the best ones with checkAndUpdateProperties.
+
+        :param table: Feature table of the system nodes to check for similarity
+        :type table: PropertyFeatureTable
         :param node: The node to which the similarity is checked
         :type node: Node
+        :param systemEdgesOfNode: IDs of the system nodes that are linked to the node
+        :type systemEdgesOfNode: set
         :return: If a similar node was found or not
         :rtype: bool | Exception
         
         """
         try:
+            ranking = [(index, score) for index, score in table.rank(node.properties) if table.nodeIDs[index] != node.nodeID]
+            if len(ranking) == 0:
+                return False
+            # check if other linked nodes are the same (categories and such)
+            if len(systemEdgesOfNode) != 0:
+                edgesOfCandidates = Logic.getSystemNeighbors([table.nodeIDs[index] for index, _ in ranking])
+                ranking = [(index, score) for index, score in ranking if systemEdgesOfNode <= edgesOfCandidates[table.nodeIDs[index]]]
+
+            # verify the best matches exactly
             similarityList = []
-            systemEdgesOfNode = Basics.getEdgesForNode(node.nodeID)
-            systemEdgesOfNode = {entry[NodeDescription.nodeID]: entry for entry in systemEdgesOfNode if entry[NodeDescription.createdBy] == defaultOwner}
-            # if there is, check if properties of the system node needs to be updated
-            for entry in listOfNodes:
-                if entry[NodeDescription.nodeID] == node.nodeID or entry[NodeDescription.createdBy] != defaultOwner:
-                    continue
-                # but first check if other linked nodes are the same (categories and such)
-                if len(systemEdgesOfNode) != 0:
-                    eligible = True
-                    edges = Basics.getEdgesForNode(entry[NodeDescription.nodeID])
-                    edges = {entry[NodeDescription.nodeID]: entry for entry in edges if entry[NodeDescription.createdBy] == defaultOwner}
-                    for edge in systemEdgesOfNode:
-                        if edge not in edges:
-                            eligible = False
-                            break
-                    if not eligible:
-                        continue
-
-                # get properties
-                entryProps = Basics.getNode(entry[NodeDescription.nodeID]).properties
-                # check if properties are the same
-                similar, f1Score, newProperties = Logic.checkAndUpdateProperties(node.properties, entryProps)
+            for index, _ in ranking[:similarityVerificationLimit]:
+                similar, f1Score, newProperties = Logic.checkAndUpdateProperties(node.properties, table.listOfProperties[index])
                 if isinstance(newProperties, Exception):
                     raise newProperties
                 if similar:
-                    similarityList.append((entry[NodeDescription.nodeID], f1Score, newProperties))
+                    similarityList.append((table.nodeIDs[index], f1Score, newProperties))
             if len(similarityList) == 0:
                 return False
             # get the best match
@@ -960,6 +1310,7 @@ class Logic():
             return True
         except Exception as error:
             return error
+        
     ##################################################
     @staticmethod
     def checkIfSimilarNodeExists(nodeID:str) -> Node|Exception:
@@ -973,18 +1324,19 @@ class Logic():
             done = False
             outNode = None
 
+            systemEdgesOfNode = Logic.getSystemNeighbors([node.nodeID])[node.nodeID]
+
             # check if there already is a system node within the uniqueIDs
-            nodesWithTheSameUniqueID = Basics.getAllNodesThatShareTheUniqueID(node.uniqueID)
-            if isinstance(nodesWithTheSameUniqueID, Exception):
-                raise nodesWithTheSameUniqueID
-            done = Logic.similarityHelper(nodesWithTheSameUniqueID, node)
+            nodesWithTheSameUniqueID = list(Node.objects.filter(uniqueID=node.uniqueID, createdBy=defaultOwner).values_list("nodeID", "properties"))
+            table = PropertyFeatureTable([entry[0] for entry in nodesWithTheSameUniqueID], [entry[1] for entry in nodesWithTheSameUniqueID])
+            done = Logic.similarityHelper(table, node, systemEdgesOfNode)
+            if isinstance(done, Exception):
+                raise done
             
             # if not, look for similar nodes in the system via checking the nodeType and properties
             if not done:
-                nodesWithTheSameType = Basics.getSystemNodesByType(node.nodeType)
-                if isinstance(nodesWithTheSameType, Exception):
-                    raise nodesWithTheSameType
-                done = Logic.similarityHelper(nodesWithTheSameType, node)
+                table = Logic.getFeatureTableOfSystemNodes(node.nodeType)
+                done = Logic.similarityHelper(table, node, systemEdgesOfNode)
                 if isinstance(done, Exception):
                     raise done
 
@@ -994,14 +1346,10 @@ class Logic():
                 if isinstance(outNode, Exception):
                     raise outNode
                 # create edges to other system nodes
-                edges = Basics.getEdgesForNode(nodeID)
-                if isinstance(edges, Exception):
-                    raise edges
-                for edge in edges:
-                    if edge[NodeDescription.createdBy] == defaultOwner:
-                        exc = Basics.createEdge(outNode.nodeID, edge[NodeDescription.nodeID])
-                        if isinstance(exc, Exception):
-                            raise exc
+                for systemNodeID in systemEdgesOfNode:
+                    exc = Basics.createEdge(outNode.nodeID, systemNodeID)
+                    if isinstance(exc, Exception):
+                        raise exc
                 done = True
             # return the node
             if done:
@@ -8,9 +8,10 @@ Contains: Services for database calls
 """
 import enum, logging
 
-from datetime import datetime
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from django.conf import settings
 
 from Generic_Backend.code_General.utilities import basics
@@ -26,16 +27,18 @@ from Generic_Backend.code_General.utilities.files import deleteFileHelper
 
 from code_SemperKI.connections.content.postgresql.pgProfilesSKI import gatherUserHashIDsAndNotificationPreference
 from ....modelFiles.projectModel import Project, ProjectInterface
-from ....modelFiles.processModel import Process, ProcessInterface
+from ....modelFiles.processModel import Process, ProcessInterface, withRelationsForOutput
 from ....modelFiles.dataModel import Data
 from ....definitions import *
 from ....serviceManager import serviceManager
 import code_SemperKI.states.stateDescriptions as StateDescriptions
 from ..abstractInterface import AbstractContentInterface
 from ..session import ProcessManagementSession
+from . import pgProjectSearch, pgJSONUpdates
 from ....tasks.processTasks import verificationOfProcess, sendProcessEMails, sendLocalFileToRemote
 from ....utilities.filePreview import deletePreviewFile
 from ....utilities.basics import kissLogo
+from ....utilities.processMembership import processMembership, getMembersOfClients
 
 logger = logging.getLogger("errors")
 
@@ -115,6 +118,61 @@ class ProcessManagementBase(AbstractContentInterface):
                 return False
         return False
 
+    ##############################################
+    @staticmethod
+    def getUserNamesViaHashes(hashedIDs) -> dict[str,str]:
+        """
+        Get the names of many users and organizations at once
+
+        :param hashedIDs: The hashed IDs of users and/or organizations
+        :type hashedIDs: Iterable[str]
+        :return: The name for every hashed ID
+        :rtype: dict[str,str]
+
+        """
+        hashedIDs = set(hashedIDs)
+        outDict = {}
+        try:
+            outDict.update(User.objects.filter(hashedID__in=hashedIDs).values_list("hashedID", "name"))
+            if len(hashedIDs - outDict.keys()) > 0:
+                outDict.update(Organization.objects.filter(hashedID__in=hashedIDs - outDict.keys()).values_list("hashedID", "name"))
+        except (Exception) as error:
+            logger.error(f'Generic error in getUserNamesViaHashes: {str(error)}')
+        # deleted accounts and the like, as seldom as they are
+        for hashedID in hashedIDs - outDict.keys():
+            outDict[hashedID] = ProfileManagementBase.getUserNameViaHash(hashedID)
+        return outDict
+
+    ##############################################
+    @staticmethod
+    def iterateData(processObj:Process, chunkSize:int=2000):
+        """
+        Go through the history of a process without loading it as a whole
+
+        :param processObj: The process
+        :type processObj: Process
+        :param chunkSize: How many entries are fetched from the database at once
+        :type chunkSize: int
+        :return: Generator of the entries in the order they were created, with the fields createdBy, createdWhen, type and data
+        :rtype: Generator[dict]
+
+        """
+        return Data.objects.filter(process=processObj).order_by(DataDescription.createdWhen).values(DataDescription.createdBy, DataDescription.createdWhen, DataDescription.type, DataDescription.data).iterator(chunk_size=chunkSize)
+
+    ##############################################
+    @staticmethod
+    def getCreatorsOfData(processObj:Process) -> set[str]:
+        """
+        Who wrote something into the history of a process
+
+        :param processObj: The process
+        :type processObj: Process
+        :return: The distinct hashed IDs
+        :rtype: set[str]
+
+        """
+        return set(Data.objects.filter(process=processObj).order_by().values_list(DataDescription.createdBy, flat=True).distinct())
+
     ##############################################
     @staticmethod
     def getData(processID, processObject=None):
@@ -242,8 +300,7 @@ class ProcessManagementBase(AbstractContentInterface):
         :rtype: None
         """
         try:
-            currentProcess = Process.objects.get(processID=processID)
-            createdDataEntry = Data.objects.create(dataID=dataID, process=currentProcess, type=typeOfData, data=data, details=details, createdBy=createdBy, contentID=IDofData, updatedWhen=timezone.now())
+            createdDataEntry = Data.objects.create(dataID=dataID, process_id=processID, type=typeOfData, data=data, details=details, createdBy=createdBy, contentID=IDofData, updatedWhen=timezone.now())
 
         except (Exception) as error:
             logger.error(f'could not create data entry: {str(error)}')
@@ -307,7 +364,7 @@ class ProcessManagementBase(AbstractContentInterface):
 
         """
         try:
-            currentProcess = Process.objects.get(processID=processID)
+            currentProcess = withRelationsForOutput(Process.objects.filter(processID=processID)).get()
             return currentProcess.toDict()
         except (ObjectDoesNotExist) as error:
             return ObjectDoesNotExist("Process not found!")
@@ -383,17 +440,11 @@ class ProcessManagementBase(AbstractContentInterface):
         """
         try:
             # TODO - remove stuff for frontend etc
-            # get project
-            projectObj = Project.objects.get(projectID=projectID)
+            # get project, its processes and their relations in a fixed number of queries
+            projectObj = Project.objects.defer("searchVector").prefetch_related(Prefetch("processes", queryset=withRelationsForOutput(Process.objects.all(), withProject=False))).get(projectID=projectID)
 
             output = projectObj.toDict()
-
-            processesOfThatProject = []
-            for entry in projectObj.processes.all():
-                processDetails = entry.toDict()
-                processesOfThatProject.append(processDetails)
-
-            output[SessionContentSemperKI.processes] = processesOfThatProject
+            output[SessionContentSemperKI.processes] = [entry.toDict() for entry in projectObj.processes.all()]
             
             return output
 
@@ -417,17 +468,12 @@ class ProcessManagementBase(AbstractContentInterface):
         """
         try:
             # TODO - remove stuff for frontend etc
-            # get project
-            projectObj = Project.objects.get(projectID=projectID)
+            # get project and the processes of the contractor in a fixed number of queries
+            processesOfContractor = withRelationsForOutput(Process.objects.filter(contractor__hashedID=contractorHashID), withProject=False)
+            projectObj = Project.objects.defer("searchVector").prefetch_related(Prefetch("processes", queryset=processesOfContractor)).get(projectID=projectID)
 
             output = projectObj.toDict()
-
-            processesOfThatProject = []
-            for entry in projectObj.processes.all():
-                if entry.contractor != None and entry.contractor.hashedID == contractorHashID:
-                    processesOfThatProject.append(entry.toDict())
-
-            output[SessionContentSemperKI.processes] = processesOfThatProject
+            output[SessionContentSemperKI.processes] = [entry.toDict() for entry in projectObj.processes.all()]
             
             return output
 
@@ -474,17 +520,9 @@ class ProcessManagementBase(AbstractContentInterface):
 
         """
         try:
-            currentProject = Project.objects.get(projectID=projectID)
-            users = set()
-            userObj, orgaOrUser = ProfileManagementBase.getUserViaHash(currentProject.client)
-            if userObj != None:
-                if orgaOrUser:
-                    # Is organization, add all people
-                    for user in userObj.users.all():
-                        users.update({user.hashedID})
-                users.update({userObj.hashedID})
-
-            return users
+            client = Project.objects.values_list("client", flat=True).get(projectID=projectID)
+            # the client itself and, if it is an organization, all people in it
+            return getMembersOfClients({client})[client]
         except (Exception) as error:
             logger.error(f'could not get all users of project: {str(error)}')
         return set()
@@ -502,21 +540,8 @@ class ProcessManagementBase(AbstractContentInterface):
 
         """
         try:
-            currentProcess = Process.objects.get(processID=processID)
-            users = set()
-            userObj, orgaOrUser = ProfileManagementBase.getUserViaHash(currentProcess.client)
-            if userObj != None:
-                if orgaOrUser:
-                    # Is organization, add all people
-                    for user in userObj.users.all():
-                        users.update({user.hashedID})
-                users.update({userObj.hashedID})
-            if currentProcess.contractor != None:
-                for user in currentProcess.contractor.users.all():
-                    users.update({user.hashedID})
-                users.update({currentProcess.contractor.hashedID})
-
-            return users
+            # client, contractor and the people of both, cached
+            return set(processMembership.getUsersOfProcesses([processID])[processID])
         except (Exception) as error:
             logger.error(f'could not get all users of process: {str(error)}')
         return set()
@@ -645,157 +670,330 @@ class ProcessManagementBase(AbstractContentInterface):
     
     ##############################################
     @staticmethod
-    def updateProcess(projectID, processID, updateType: ProcessUpdates, content, updatedBy) -> tuple[str,dict]|Exception:
+    def applyUpdateToProcess(currentProcess:Process, projectID, updateType: ProcessUpdates, content, updatedBy) -> tuple[str,dict,set[str]]:
         """
-        Change details of a process like its status, or save communication. 
+        Change the process in memory and write the history, saving is up to the caller
 
+        :param currentProcess: The process, should be locked
+        :type currentProcess: Process
         :param projectID: The project ID, not necessary here
         :type projectID: str
-        :param processID: unique processID to be edited
-        :type processID: str
         :param updateType: changed process details
         :type updateType: EnumUpdates
         :param content: changed process, can be many stuff
         :type content: json dict
-        :return: The relevant thing that got updated, for event queue
-        :rtype: tuple[str,dict]|Exception
-
-        """
-        updated = timezone.now()
-        try:
-            outContent = ""
-            outAdditionalInformation = {}
-            currentProcess = Process.objects.get(processID=processID)
-            currentProcess.updatedWhen = updated
-            dataID = crypto.generateURLFriendlyRandomString()
-
-            if updateType == ProcessUpdates.messages:
-                if MessageInterfaceFromFrontend.origin in content:
-                    origin = content[MessageInterfaceFromFrontend.origin]
-                    if origin in currentProcess.messages:
-                        currentProcess.messages[origin].append(content)
-                    else:
-                        currentProcess.messages[origin] = [content]
+        :param updatedBy: ID of the person who updated the process (for history)
+        :type updatedBy: str
+        :return: The relevant thing that got updated, for event queue, and the names of the changed fields
+        :rtype: tuple[str,dict,set[str]]
+
+        """
+        outContent = ""
+        outAdditionalInformation = {}
+        changedFields = set()
+        processID = currentProcess.processID
+        dataID = crypto.generateURLFriendlyRandomString()
+
+        if updateType == ProcessUpdates.messages:
+            if MessageInterfaceFromFrontend.origin in content:
+                origin = content[MessageInterfaceFromFrontend.origin]
+                if origin in currentProcess.messages:
+                    currentProcess.messages[origin].append(content)
                 else:
-                    if MessageInterfaceFromFrontend.messages in currentProcess.messages:
-                        currentProcess.messages[MessageInterfaceFromFrontend.messages].append(content)
-                    else:
-                        currentProcess.messages[MessageInterfaceFromFrontend.messages] = [content]
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.MESSAGE, updatedBy)
-                outContent = content[MessageInterfaceFromFrontend.text]
-                outAdditionalInformation[MessageInterfaceFromFrontend.origin] = content[MessageInterfaceFromFrontend.origin]
-                outAdditionalInformation[MessageInterfaceFromFrontend.createdBy] = content[MessageInterfaceFromFrontend.userName]
-
-            elif updateType == ProcessUpdates.files:
-                getAdditionalInformation = False
-                if len(content) == 1:
-                    outContent = "file"
-                    getAdditionalInformation = True
-                elif len(content) > 1:
-                    outContent = "files"
-                
-                # if this is the first file, remove the default image from the processDetails
-                if ProcessDetails.imagePath in currentProcess.processDetails:
-                    if currentProcess.processDetails[ProcessDetails.imagePath] == [serviceManager.getImgPath(currentProcess.serviceType)]:
-                        currentProcess.processDetails[ProcessDetails.imagePath] = []
+                    currentProcess.messages[origin] = [content]
+            else:
+                if MessageInterfaceFromFrontend.messages in currentProcess.messages:
+                    currentProcess.messages[MessageInterfaceFromFrontend.messages].append(content)
                 else:
+                    currentProcess.messages[MessageInterfaceFromFrontend.messages] = [content]
+            changedFields.add(ProcessDescription.messages)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.MESSAGE, updatedBy)
+            outContent = content[MessageInterfaceFromFrontend.text]
+            outAdditionalInformation[MessageInterfaceFromFrontend.origin] = content[MessageInterfaceFromFrontend.origin]
+            outAdditionalInformation[MessageInterfaceFromFrontend.createdBy] = content[MessageInterfaceFromFrontend.userName]
+
+        elif updateType == ProcessUpdates.files:
+            getAdditionalInformation = False
+            if len(content) == 1:
+                outContent = "file"
+                getAdditionalInformation = True
+            elif len(content) > 1:
+                outContent = "files"
+            
+            # if this is the first file, remove the default image from the processDetails
+            if ProcessDetails.imagePath in currentProcess.processDetails:
+                if currentProcess.processDetails[ProcessDetails.imagePath] == [serviceManager.getImgPath(currentProcess.serviceType)]:
                     currentProcess.processDetails[ProcessDetails.imagePath] = []
-
-                for entry in content:
-                    currentProcess.files[content[entry][FileObjectContent.id]] = content[entry]
-                    currentProcess.processDetails[ProcessDetails.imagePath].append(content[entry][FileObjectContent.imgPath])
-                    ProcessManagementBase.createDataEntry(content[entry], dataID, processID, DataType.FILE, updatedBy, {}, content[entry][FileObjectContent.id])
-                    if getAdditionalInformation:
-                        outAdditionalInformation[FileObjectContent.createdBy] = content[entry][FileObjectContent.createdBy]
-                        outAdditionalInformation[FileObjectContent.origin] = content[entry][FileObjectContent.origin]
-                    dataID = crypto.generateURLFriendlyRandomString()
-                
-            elif updateType == ProcessUpdates.processStatus:
-                currentProcess.processStatus = content
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.STATUS, updatedBy)
-                outContent = str(content)
-
-            elif updateType == ProcessUpdates.processDetails:
-                for entry in content:
-                    if entry == ProcessDetails.priorities:
-                        if ProcessDetails.priorities in currentProcess.processDetails:
-                            # update only one priority, the for loop is a shortcut to getting the key/priority
-                            for prio in content[entry]:
-                                currentProcess.processDetails[ProcessDetails.priorities][prio][PriorityTargetsSemperKI.value] = content[entry][prio][PriorityTargetsSemperKI.value]
-                        else:
-                            currentProcess.processDetails[ProcessDetails.priorities] = content[entry] # is set during creation and therefore complete
+            else:
+                currentProcess.processDetails[ProcessDetails.imagePath] = []
+
+            for entry in content:
+                currentProcess.files[content[entry][FileObjectContent.id]] = content[entry]
+                currentProcess.processDetails[ProcessDetails.imagePath].append(content[entry][FileObjectContent.imgPath])
+                ProcessManagementBase.createDataEntry(content[entry], dataID, processID, DataType.FILE, updatedBy, {}, content[entry][FileObjectContent.id])
+                if getAdditionalInformation:
+                    outAdditionalInformation[FileObjectContent.createdBy] = content[entry][FileObjectContent.createdBy]
+                    outAdditionalInformation[FileObjectContent.origin] = content[entry][FileObjectContent.origin]
+                dataID = crypto.generateURLFriendlyRandomString()
+            changedFields.update([ProcessDescription.files, ProcessDescription.processDetails])
+            
+        elif updateType == ProcessUpdates.processStatus:
+            currentProcess.processStatus = content
+            changedFields.add(ProcessDescription.processStatus)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.STATUS, updatedBy)
+            outContent = str(content)
+
+        elif updateType == ProcessUpdates.processDetails:
+            for entry in content:
+                if entry == ProcessDetails.priorities:
+                    if ProcessDetails.priorities in currentProcess.processDetails:
+                        # update only one priority, the for loop is a shortcut to getting the key/priority
+                        for prio in content[entry]:
+                            currentProcess.processDetails[ProcessDetails.priorities][prio][PriorityTargetsSemperKI.value] = content[entry][prio][PriorityTargetsSemperKI.value]
                     else:
-                        currentProcess.processDetails[entry] = content[entry]
+                        currentProcess.processDetails[ProcessDetails.priorities] = content[entry] # is set during creation and therefore complete
+                else:
+                    currentProcess.processDetails[entry] = content[entry]
+                outContent += entry + ","
+            changedFields.add(ProcessDescription.processDetails)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.DETAILS, updatedBy)
+            outContent = outContent.rstrip(",")
+
+        elif updateType == ProcessUpdates.serviceType:
+            currentProcess.serviceType = content
+            currentProcess.serviceDetails = serviceManager.getService(currentProcess.serviceType).initializeServiceDetails(currentProcess.serviceDetails)
+            currentProcess.processDetails[ProcessDetails.imagePath] = [serviceManager.getImgPath(currentProcess.serviceType)]
+            changedFields.update([ProcessDescription.serviceType, ProcessDescription.serviceDetails, ProcessDescription.processDetails])
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.SERVICE, updatedBy, {ProcessUpdates.serviceType: content})
+            outContent = content
+
+        elif updateType == ProcessUpdates.serviceStatus:
+            currentProcess.serviceStatus = content
+            changedFields.add(ProcessDescription.serviceStatus)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.SERVICE, updatedBy, {ProcessUpdates.serviceStatus: content})
+            outContent = str(content)
+
+        elif updateType == ProcessUpdates.serviceDetails:
+            serviceType = currentProcess.serviceType
+            if serviceType != serviceManager.getNone():
+                currentProcess.serviceDetails = serviceManager.getService(currentProcess.serviceType).updateServiceDetails(currentProcess.serviceDetails, content)
+                changedFields.add(ProcessDescription.serviceDetails)
+                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.SERVICE, updatedBy, {ProcessUpdates.serviceDetails: content})
+                for entry in content:
                     outContent += entry + ","
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.DETAILS, updatedBy)
                 outContent = outContent.rstrip(",")
+            else:
+                raise Exception("No Service chosen!")
+
+        elif updateType == ProcessUpdates.provisionalContractor:
+            currentProcess.processDetails[ProcessDetails.provisionalContractor] = content
+            if OrganizationDescription.hashedID in content and ProcessDetails.prices in currentProcess.processDetails:
+                currentProcess.processDetails[ProcessDetails.prices] = {content[OrganizationDescription.hashedID]: currentProcess.processDetails[ProcessDetails.prices][content[OrganizationDescription.hashedID]]} # delete prices of other contractors and reduce to this one
+            changedFields.add(ProcessDescription.processDetails)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.OTHER, updatedBy, {ProcessUpdates.provisionalContractor: content})
+            outContent = content
+
+        elif updateType == ProcessUpdates.dependenciesIn:
+            assert isinstance(content, list), "DependencyIn Content is not a list"
+            for contentProcessID in content:
+                connectedProcess = ProcessManagementBase.getProcessObj(projectID, contentProcessID)
+                currentProcess.dependenciesIn.add(connectedProcess)
+                connectedProcess.dependenciesOut.add(currentProcess)
+                connectedProcess.save(update_fields=[str(ProcessDescription.accessedWhen)]) # the rest of it may be changed by someone else
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.DEPENDENCY, updatedBy, {ProcessUpdates.dependenciesIn: content})
+            outContent = content
+
+        elif updateType == ProcessUpdates.dependenciesOut:
+            assert isinstance(content, list), "DependencyOut Content is not a list"
+            for contentProcessID in content:
+                connectedProcess = ProcessManagementBase.getProcessObj(projectID, contentProcessID)
+                currentProcess.dependenciesOut.add(connectedProcess)
+                connectedProcess.dependenciesIn.add(currentProcess)
+                connectedProcess.save(update_fields=[str(ProcessDescription.accessedWhen)])
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.DEPENDENCY, updatedBy, {ProcessUpdates.dependenciesOut: content})
+            outContent = content
+        
+        elif updateType == ProcessUpdates.verificationResults:
+            currentProcess.processDetails[ProcessDetails.verificationResults] = content
+            changedFields.add(ProcessDescription.processDetails)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.OTHER, updatedBy, {ProcessUpdates.verificationResults: content})
+            outContent = content
+        
+        elif updateType == ProcessUpdates.additionalInput:
+            currentProcess.processDetails[ProcessDetails.additionalInput] = content
+            changedFields.add(ProcessDescription.processDetails)
+            ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.OTHER, updatedBy, {ProcessUpdates.additionalInput: content})
+            outContent = content
 
-            elif updateType == ProcessUpdates.serviceType:
-                currentProcess.serviceType = content
-                currentProcess.serviceDetails = serviceManager.getService(currentProcess.serviceType).initializeServiceDetails(currentProcess.serviceDetails)
-                currentProcess.processDetails[ProcessDetails.imagePath] = [serviceManager.getImgPath(currentProcess.serviceType)]
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.SERVICE, updatedBy, {ProcessUpdates.serviceType: content})
-                outContent = content
+        return (outContent, outAdditionalInformation, changedFields)
 
-            elif updateType == ProcessUpdates.serviceStatus:
-                currentProcess.serviceStatus = content
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.SERVICE, updatedBy, {ProcessUpdates.serviceStatus: content})
-                outContent = str(content)
+    ##############################################
+    @staticmethod
+    def updateProcessPartially(processID, updateType: ProcessUpdates, content, updatedBy) -> tuple[str,dict]|None:
+        """
+        Change a status or some keys of a JSON field with a single UPDATE, without loading the process.
+        The database merges the change into what it holds at that moment, so concurrent changes of other keys are kept.
 
-            elif updateType == ProcessUpdates.serviceDetails:
-                serviceType = currentProcess.serviceType
-                if serviceType != serviceManager.getNone():
-                    currentProcess.serviceDetails = serviceManager.getService(currentProcess.serviceType).updateServiceDetails(currentProcess.serviceDetails, content)
-                    ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.SERVICE, updatedBy, {ProcessUpdates.serviceDetails: content})
-                    for entry in content:
-                        outContent += entry + ","
-                    outContent = outContent.rstrip(",")
-                else:
-                    raise Exception("No Service chosen!")
+        :param processID: unique processID to be edited
+        :type processID: str
+        :param updateType: changed process details
+        :type updateType: EnumUpdates
+        :param content: changed process, can be many stuff
+        :type content: json dict
+        :param updatedBy: ID of the person who updated the process (for history)
+        :type updatedBy: str
+        :return: The relevant thing that got updated, for event queue, None if the change needs the whole process
+        :rtype: tuple[str,dict]|None
+
+        """
+        outAdditionalInformation = {}
+        details = {}
+        if updateType == ProcessUpdates.processStatus:
+            changes = {ProcessDescription.processStatus: content}
+            typeOfData, outContent = DataType.STATUS, str(content)
+        elif updateType == ProcessUpdates.serviceStatus:
+            changes = {ProcessDescription.serviceStatus: content}
+            typeOfData, outContent, details = DataType.SERVICE, str(content), {ProcessUpdates.serviceStatus: content}
+        elif updateType == ProcessUpdates.messages:
+            origin = content[MessageInterfaceFromFrontend.origin] if MessageInterfaceFromFrontend.origin in content else MessageInterfaceFromFrontend.messages
+            changes = {ProcessDescription.messages: pgJSONUpdates.appendToList(ProcessDescription.messages, origin, content)}
+            typeOfData, outContent = DataType.MESSAGE, content[MessageInterfaceFromFrontend.text]
+            outAdditionalInformation[MessageInterfaceFromFrontend.origin] = content[MessageInterfaceFromFrontend.origin]
+            outAdditionalInformation[MessageInterfaceFromFrontend.createdBy] = content[MessageInterfaceFromFrontend.userName]
+        elif updateType == ProcessUpdates.processDetails and ProcessDetails.priorities not in content:
+            changes = {ProcessDescription.processDetails: pgJSONUpdates.mergeKeys(ProcessDescription.processDetails, content)}
+            typeOfData, outContent = DataType.DETAILS, ",".join(content)
+        elif updateType == ProcessUpdates.verificationResults or updateType == ProcessUpdates.additionalInput:
+            key = ProcessDetails.verificationResults if updateType == ProcessUpdates.verificationResults else ProcessDetails.additionalInput
+            changes = {ProcessDescription.processDetails: pgJSONUpdates.mergeKeys(ProcessDescription.processDetails, {key: content})}
+            typeOfData, outContent, details = DataType.OTHER, content, {updateType: content}
+        else:
+            return None
 
-            elif updateType == ProcessUpdates.provisionalContractor:
-                currentProcess.processDetails[ProcessDetails.provisionalContractor] = content
-                if OrganizationDescription.hashedID in content and ProcessDetails.prices in currentProcess.processDetails:
-                    currentProcess.processDetails[ProcessDetails.prices] = {content[OrganizationDescription.hashedID]: currentProcess.processDetails[ProcessDetails.prices][content[OrganizationDescription.hashedID]]} # delete prices of other contractors and reduce to this one
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.OTHER, updatedBy, {ProcessUpdates.provisionalContractor: content})
-                outContent = content
+        if Process.objects.filter(processID=processID).update(updatedWhen=timezone.now(), **changes) == 0:
+            raise ObjectDoesNotExist("Process not found!")
+        ProcessManagementBase.createDataEntry(content, crypto.generateURLFriendlyRandomString(), processID, typeOfData, updatedBy, details)
+        if ProcessDescription.processDetails in changes:
+            # update() sends no signal, the title may have changed
+            pgProjectSearch.updateSearchIndexOfProcess(Process.objects.only("project", *pgProjectSearch.searchableFields).get(processID=processID))
+        return (outContent, outAdditionalInformation)
 
-            elif updateType == ProcessUpdates.dependenciesIn:
-                assert isinstance(content, list), "DependencyIn Content is not a list"
-                for contentProcessID in content:
-                    connectedProcess = ProcessManagementBase.getProcessObj(projectID, contentProcessID)
-                    currentProcess.dependenciesIn.add(connectedProcess)
-                    connectedProcess.dependenciesOut.add(currentProcess)
-                    connectedProcess.save()
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.DEPENDENCY, updatedBy, {ProcessUpdates.dependenciesIn: content})
-                outContent = content
+    ##############################################
+    @staticmethod
+    def updateProcess(projectID, processID, updateType: ProcessUpdates, content, updatedBy) -> tuple[str,dict]|Exception:
+        """
+        Change details of a process like its status, or save communication. 
+        Single keys are changed in the database directly, everything else with the process locked and only the changed fields saved.
 
-            elif updateType == ProcessUpdates.dependenciesOut:
-                assert isinstance(content, list), "DependencyOut Content is not a list"
-                for contentProcessID in content:
-                    connectedProcess = ProcessManagementBase.getProcessObj(projectID, contentProcessID)
-                    currentProcess.dependenciesOut.add(connectedProcess)
-                    connectedProcess.dependenciesIn.add(currentProcess)
-                    connectedProcess.save()
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.DEPENDENCY, updatedBy, {ProcessUpdates.dependenciesOut: content})
-                outContent = content
-            
-            elif updateType == ProcessUpdates.verificationResults:
-                currentProcess.processDetails[ProcessDetails.verificationResults] = content
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.OTHER, updatedBy, {ProcessUpdates.verificationResults: content})
-                outContent = content
-            
-            elif updateType == ProcessUpdates.additionalInput:
-                currentProcess.processDetails[ProcessDetails.additionalInput] = content
-                ProcessManagementBase.createDataEntry(content, dataID, processID, DataType.OTHER, updatedBy, {ProcessUpdates.additionalInput: content})
-                outContent = content
+        :param projectID: The project ID, not necessary here
+        :type projectID: str
+        :param processID: unique processID to be edited
+        :type processID: str
+        :param updateType: changed process details
+        :type updateType: EnumUpdates
+        :param content: changed process, can be many stuff
+        :type content: json dict
+        :return: The relevant thing that got updated, for event queue
+        :rtype: tuple[str,dict]|Exception
 
-            currentProcess.save()
+        """
+        try:
+            with transaction.atomic():
+                result = ProcessManagementBase.updateProcessPartially(processID, updateType, content, updatedBy)
+                if result is not None:
+                    return result
+                currentProcess = Process.objects.select_for_update().get(processID=processID)
+                outContent, outAdditionalInformation, changedFields = ProcessManagementBase.applyUpdateToProcess(currentProcess, projectID, updateType, content, updatedBy)
+                currentProcess.updatedWhen = timezone.now()
+                currentProcess.save(update_fields=[str(field) for field in changedFields | {ProcessDescription.updatedWhen}])
             return (outContent, outAdditionalInformation)
         except (Exception) as error:
             logger.error(f'could not update process: {str(error)}')
             return error
 
+    ##############################################
+    @staticmethod
+    def updateProcessBatch(projectID, processID, changes:dict, updatedBy) -> dict[str,tuple[str,dict]]|Exception:
+        """
+        Apply several changes to one process in one transaction, the process is locked meanwhile and saved once.
+
+        :param projectID: The project ID, not necessary here
+        :type projectID: str
+        :param processID: unique processID to be edited
+        :type processID: str
+        :param changes: The content for every kind of update as in ProcessUpdates
+        :type changes: dict
+        :param updatedBy: ID of the person who updated the process (for history)
+        :type updatedBy: str
+        :return: The relevant thing that got updated per kind of update, for event queue
+        :rtype: dict[str,tuple[str,dict]]|Exception
+
+        """
+        try:
+            if len(changes) <= 1:
+                outDict = {}
+                for updateType in changes:
+                    result = ProcessManagementBase.updateProcess(projectID, processID, updateType, changes[updateType], updatedBy)
+                    if isinstance(result, Exception):
+                        raise result
+                    outDict[updateType] = result
+                return outDict
+
+            outDict = {}
+            allChangedFields = {ProcessDescription.updatedWhen}
+            with transaction.atomic():
+                currentProcess = Process.objects.select_for_update().get(processID=processID)
+                for updateType in changes:
+                    outContent, outAdditionalInformation, changedFields = ProcessManagementBase.applyUpdateToProcess(currentProcess, projectID, updateType, changes[updateType], updatedBy)
+                    outDict[updateType] = (outContent, outAdditionalInformation)
+                    allChangedFields |= changedFields
+                currentProcess.updatedWhen = timezone.now()
+                currentProcess.save(update_fields=[str(field) for field in allChangedFields])
+            return outDict
+        except (Exception) as error:
+            logger.error(f'could not update process: {str(error)}')
+            return error
+
+    ##############################################
+    @staticmethod
+    def updatePreviewOfFile(processID:str, fileID:str, imgPath:str, previewStatus:str) -> tuple[str,dict]|None|Exception:
+        """
+        Set the preview of a file once it has been rendered in the background.
+        Not part of the history since nobody changed the file.
+
+        :param processID: The process ID
+        :type processID: str
+        :param fileID: The ID of the file
+        :type fileID: str
+        :param imgPath: The URL of the preview
+        :type imgPath: str
+        :param previewStatus: The status as in PreviewStatus
+        :type previewStatus: str
+        :return: The relevant thing that got updated, for event queue, None if the file is gone
+        :rtype: tuple[str,dict]|None|Exception
+
+        """
+        try:
+            with transaction.atomic():
+                # the user may change the process at the same time
+                currentProcess = Process.objects.select_for_update().get(processID=processID)
+                if fileID not in currentProcess.files:
+                    return None
+                fileOfThisProcess = currentProcess.files[fileID]
+                previousImgPath = fileOfThisProcess[FileObjectContent.imgPath]
+                fileOfThisProcess[FileObjectContent.imgPath] = imgPath
+                fileOfThisProcess[FileContentsSemperKI.previewStatus] = previewStatus
+                if ProcessDetails.imagePath in currentProcess.processDetails and previousImgPath in currentProcess.processDetails[ProcessDetails.imagePath]:
+                    imagePaths = currentProcess.processDetails[ProcessDetails.imagePath]
+                    imagePaths[imagePaths.index(previousImgPath)] = imgPath
+                currentProcess.save()
+            return ("preview", {FileObjectContent.id: fileID, FileObjectContent.imgPath: imgPath, FileContentsSemperKI.previewStatus: previewStatus})
+        except (ObjectDoesNotExist) as error:
+            return None
+        except (Exception) as error:
+            logger.error(f'could not update preview of file: {str(error)}')
+            return error
+
     ##############################################
     @staticmethod
     def deleteFromProcess(projectID, processID, updateType: ProcessUpdates, content, deletedBy):
@@ -962,33 +1160,9 @@ class ProcessManagementBase(AbstractContentInterface):
         """
         # outputList for events
         dictForEventsAsOutput = {}
-        processObj = Process.objects.get(processID=processID)
-        clientID = processObj.client
-        dictOfUserIDsAndPreference = gatherUserHashIDsAndNotificationPreference(clientID, notification, UserNotificationTargets.event)
-        dictOfUsersThatBelongToContractor = {}
-        if processObj.contractor != None and clientOnly == False:
-            dictOfUsersThatBelongToContractor = gatherUserHashIDsAndNotificationPreference(processObj.contractor.hashedID, notification, UserNotificationTargets.event)
-        
-        for userHashID in dictOfUserIDsAndPreference:
-            if userHashID == creatorOfEvent:
-                continue
+        for userHashID, triggerEvent in ProcessManagementBase.getRecipientsOfProcessEvent(processID, notification, clientOnly, creatorOfEvent).items():
             dictForEventsAsOutput[userHashID] = {
-                EventsDescriptionGeneric.triggerEvent: dictOfUserIDsAndPreference[userHashID],
-                EventsDescriptionGeneric.eventType: "processEvent",
-                EventsDescriptionGeneric.eventData: {
-                    EventsDescriptionGeneric.primaryID: projectID,
-                    EventsDescriptionGeneric.secondaryID: processID,
-                    EventsDescriptionGeneric.reason: event,
-                    EventsDescriptionGeneric.content: eventContent[0],
-                    EventsDescriptionGeneric.additionalInformation: eventContent[1]
-                }
-            }
-
-        for userThatBelongsToContractorHashID in dictOfUsersThatBelongToContractor:
-            if userThatBelongsToContractorHashID == creatorOfEvent:
-                continue
-            dictForEventsAsOutput[userThatBelongsToContractorHashID] = {
-                EventsDescriptionGeneric.triggerEvent: dictOfUsersThatBelongToContractor[userThatBelongsToContractorHashID],
+                EventsDescriptionGeneric.triggerEvent: triggerEvent,
                 EventsDescriptionGeneric.eventType: "processEvent",
                 EventsDescriptionGeneric.eventData: {
                     EventsDescriptionGeneric.primaryID: projectID,
@@ -998,8 +1172,39 @@ class ProcessManagementBase(AbstractContentInterface):
                     EventsDescriptionGeneric.additionalInformation: eventContent[1]
                 }
             }
-    
         return dictForEventsAsOutput
+
+    ##############################################
+    @staticmethod
+    def getRecipientsOfProcessEvent(processID:str, notification:str, clientOnly:bool, creatorOfEvent:str) -> dict[str,bool]:
+        """
+        Who gets an event about a process: the client (or its members) and, if wanted, the members of the contractor
+
+        :param processID: The process ID affected
+        :type processID: str
+        :param notification: The notification that wants to be send
+        :type notification: str
+        :param clientOnly: Should the event go only to the client, not the contractor
+        :type clientOnly: bool
+        :param creatorOfEvent: The user that triggered the event, gets nothing
+        :type creatorOfEvent: str
+        :return: The hashed IDs of the users and whether they want to be notified
+        :rtype: dict[str,bool]
+
+        """
+        outDict = {}
+        processObj = Process.objects.select_related("contractor").get(processID=processID)
+        orgaOrUserIDs = [processObj.client]
+        if processObj.contractor != None and clientOnly == False:
+            orgaOrUserIDs.append(processObj.contractor.hashedID)
+        for orgaOrUserID in orgaOrUserIDs:
+            dictOfUserIDsAndPreference = gatherUserHashIDsAndNotificationPreference(orgaOrUserID, notification, UserNotificationTargets.event)
+            if isinstance(dictOfUserIDsAndPreference, Exception):
+                raise dictOfUserIDsAndPreference
+            for userHashID, triggerEvent in dictOfUserIDsAndPreference.items():
+                if userHashID != creatorOfEvent:
+                    outDict[userHashID] = triggerEvent
+        return outDict
     
     ##############################################
     @staticmethod
@@ -1011,13 +1216,11 @@ class ProcessManagementBase(AbstractContentInterface):
         :rtype: List of dicts
         """
         outList = []
-        allOCs = Project.objects.all()
+        allOCs = Project.objects.defer("searchVector").annotate(numberOfProcesses=Count("processes")).order_by("-createdWhen")
         for entry in allOCs:
             currentOC = entry.toDict()
-            currentOC["processesCount"] = len(entry.processes.all())
+            currentOC[ProjectOutput.processesCount] = entry.numberOfProcesses
             outList.append(currentOC)
-        outList.sort(key=lambda x: 
-                   timezone.make_aware(datetime.strptime(x[ProjectDescription.createdWhen], '%Y-%m-%d %H:%M:%S.%f+00:00')), reverse=True)
         return outList
     
     ##############################################
@@ -1031,11 +1234,8 @@ class ProcessManagementBase(AbstractContentInterface):
         :return: list of all processes of that OC
         :rtype: list
         """
-        outList = []
-        PObject = Project.objects.get(projectID=projectID)
-        for entry in PObject.processes.all():
-            outList.append(entry.toDict())
-        return outList
+        PObject = Project.objects.defer("searchVector").prefetch_related(Prefetch("processes", queryset=withRelationsForOutput(Process.objects.all(), withProject=False))).get(projectID=projectID)
+        return [entry.toDict() for entry in PObject.processes.all()]
     
     ##############################################
     @staticmethod
@@ -1218,42 +1418,33 @@ class ProcessManagementBase(AbstractContentInterface):
 
         """
         try:
-            # get associated projects
+            # get associated projects, their processes and the relations of those in a fixed number of queries
             currentClient = profileManagement[session[SessionContent.PG_PROFILE_CLASS]].getClientID(session)
-            projects = Project.objects.filter(client=currentClient)
-            
-            output = []
+            projects = Project.objects.filter(client=currentClient).defer("searchVector").prefetch_related(Prefetch("processes", queryset=withRelationsForOutput(Process.objects.all(), withProject=False)))
             
+            projectsWithCreation = []
             for project in projects:
                 currentProject = project.toDict()
-                processesOfThatProject = []
-                for entry in project.processes.all():
-                    currentProcess = entry.toDict()
-                    processesOfThatProject.append(currentProcess)
-                currentProject[SessionContentSemperKI.processes] = processesOfThatProject
-                output.append(currentProject)
+                currentProject[SessionContentSemperKI.processes] = [entry.toDict() for entry in project.processes.all()]
+                projectsWithCreation.append((project.createdWhen, currentProject))
 
             if ProfileManagementBase.checkIfUserIsInOrganization(session):
                 # Code specific for orgas
                 # Add projects where the organization is registered as contractor
-                organizationObj = ProfileManagementBase.getOrganizationObject(session)
-                if isinstance(organizationObj, Exception):
-                    raise organizationObj
                 receivedProjects = {}
-                for processAsContractor in organizationObj.asContractor.all():
+                for processAsContractor in withRelationsForOutput(Process.objects.filter(contractor__hashedID=ProfileManagementBase.getOrganizationHashID(session))):
                     project = processAsContractor.project
 
                     if project.projectID not in receivedProjects:
-                        receivedProjects[project.projectID] = project.toDict()
-                        receivedProjects[project.projectID][SessionContentSemperKI.processes] = []
+                        receivedProjects[project.projectID] = (project.createdWhen, project.toDict())
+                        receivedProjects[project.projectID][1][SessionContentSemperKI.processes] = []
 
-                    receivedProjects[project.projectID][SessionContentSemperKI.processes].append(processAsContractor.toDict())
+                    receivedProjects[project.projectID][1][SessionContentSemperKI.processes].append(processAsContractor.toDict())
                 
-                for project in receivedProjects:
-                    output.append(receivedProjects[project])
+                projectsWithCreation.extend(receivedProjects.values())
 
-            output = sorted(output, key=lambda x: 
-                   timezone.make_aware(datetime.strptime(x[ProjectDescription.createdWhen], '%Y-%m-%d %H:%M:%S.%f+00:00')), reverse=True)
+            projectsWithCreation.sort(key=lambda entry: entry[0], reverse=True)
+            output = [currentProject for _, currentProject in projectsWithCreation]
             return output
 
         except (Exception) as error:
@@ -1263,78 +1454,32 @@ class ProcessManagementBase(AbstractContentInterface):
     
     ##############################################
     @staticmethod
-    def getProjectsFlat(session):
+    def getProjectsFlat(session, searchTerm:str="", offset:int=0, limit:int|None=None):
         """
         Get all projects for that user but with limited detail.
 
         :param session: session of that user
         :type session: dict
-        :return: sorted list with projects
+        :param searchTerm: Only projects that match all words of this, uses the search index
+        :type searchTerm: str
+        :param offset: How many projects to skip
+        :type offset: int
+        :param limit: How many projects to return at most, all if None
+        :type limit: int|None
+        :return: list with projects, newest first
         :rtype: list
 
         """
         try:
             # get user
             currentClient = profileManagement[session[SessionContent.PG_PROFILE_CLASS]].getClientID(session)
-            projects = Project.objects.filter(client=currentClient)
-            # get associated projects
-            output = []
-            
-            for project in projects:
-                currentProject = project.toDict()
-                processes = project.processes.all()
-                
-                currentProject[ProjectOutput.processIDs] = processes.values_list("processID", flat=True)
-                currentProject[ProjectOutput.owner] = True
-                
-                # gather searchable data and count processes of the current client
-                processCount = 0
-                searchableData = []
-                for process in processes:
-                    if process.client == currentClient:
-                        processCount += 1
-
-                    # title
-                    if ProcessDetails.title in process.processDetails:
-                        searchableData.append(process.processDetails[ProcessDetails.title])
-
-                    # file names
-                    if process.files is not None and process.files != {}: 
-                        for file in process.files:
-                            searchableData.append(process.files[file][FileObjectContent.fileName])
-
-                    # contractor name
-                    if ProcessDetails.provisionalContractor in process.processDetails and process.processDetails[ProcessDetails.provisionalContractor] is not None and process.processDetails[ProcessDetails.provisionalContractor] != {}:
-                        if isinstance(process.processDetails[ProcessDetails.provisionalContractor], dict):
-                            searchableData.append(process.processDetails[ProcessDetails.provisionalContractor][OrganizationDescription.name])
-
-                    # service specific stuff
-                    if process.serviceType is not serviceManager.getNone():
-                        searchableData.extend(serviceManager.getService(process.serviceType).getSearchableDetails(process.serviceDetails))
-
-                currentProject[ProjectOutput.searchableData] = searchableData
-                currentProject[ProjectOutput.processesCount] = processCount
-                    
-                output.append(currentProject)
-            
+            orgaID = ""
             if ProfileManagementBase.checkIfUserIsInOrganization(session):
-                # Code specific for orgas
-                # Add projects where the organization is registered as contractor
-                organizationObj = Organization.objects.get(hashedID=ProfileManagementBase.getOrganizationHashID(session))
-                receivedProjects = {}
-                for processAsContractor in organizationObj.asContractor.all():
-                    project = processAsContractor.project
-
-                    if project.projectID not in receivedProjects:
-                        receivedProjects[project.projectID] = project.toDict()
-                        receivedProjects[project.projectID]["processesCount"] = 0
-
-                    receivedProjects[project.projectID]["processesCount"] += 1
-                
-                for project in receivedProjects:
-                    receivedProjects[project]["owner"] = False
-                    output.append(receivedProjects[project])
-            
+                # projects where the organization is registered as contractor are added
+                orgaID = ProfileManagementBase.getOrganizationHashID(session)
+            output = pgProjectSearch.getProjectsFlatOfClient(currentClient, orgaID, searchTerm, offset, limit)
+            if isinstance(output, Exception):
+                raise output
             return output
 
         except (Exception) as error:
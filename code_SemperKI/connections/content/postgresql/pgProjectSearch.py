@@ -0,0 +1,207 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Search index of the projects and the listing for the dashboard
+"""
+
+import logging, re
+
+from django.db.models import Q, Value, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchVector, SearchQuery
+
+from Generic_Backend.code_General.definitions import FileObjectContent, OrganizationDescription
+
+from ....modelFiles.projectModel import Project
+from ....modelFiles.processModel import Process, ProcessDescription
+from ....definitions import ProcessDetails, ProjectDetails, ProjectOutput
+from ....serviceManager import serviceManager
+
+logger = logging.getLogger("logToFile")
+loggerError = logging.getLogger("errors")
+
+searchConfig = "simple" # no stemming, titles and file names come in all languages
+searchTermPattern = re.compile(r"\w+")
+searchableFields = {ProcessDescription.processDetails, ProcessDescription.files, ProcessDescription.serviceType, ProcessDescription.serviceDetails} # a save of other fields leaves the index alone
+
+####################################################################################
+def getSearchableDataOfProcess(processDetails:dict, files:dict, serviceType:int, serviceDetails:dict) -> list[str]:
+    """
+    Titles, file names, the contractor and what the service deems searchable of one process
+
+    :param processDetails: The details of the process
+    :type processDetails: dict
+    :param files: The files of the process
+    :type files: dict
+    :param serviceType: The service of the process
+    :type serviceType: int
+    :param serviceDetails: The details of the service
+    :type serviceDetails: dict
+    :return: The searchable strings
+    :rtype: list[str]
+
+    """
+    searchableData = []
+    # title
+    if ProcessDetails.title in processDetails:
+        searchableData.append(processDetails[ProcessDetails.title])
+
+    # file names
+    if files is not None and files != {}:
+        for file in files:
+            searchableData.append(files[file][FileObjectContent.fileName])
+
+    # contractor name
+    if ProcessDetails.provisionalContractor in processDetails and isinstance(processDetails[ProcessDetails.provisionalContractor], dict) and processDetails[ProcessDetails.provisionalContractor] != {}:
+        searchableData.append(processDetails[ProcessDetails.provisionalContractor][OrganizationDescription.name])
+
+    # service specific stuff
+    if serviceType is not serviceManager.getNone():
+        searchableData.extend(serviceManager.getService(serviceType).getSearchableDetails(serviceDetails))
+    return searchableData
+
+####################################################################################
+def getSearchVector(projectDetails:dict, searchableData:list) -> SearchVector:
+    """
+    The expression that turns the title of a project and its searchable data into a tsvector
+
+    :param projectDetails: The details of the project
+    :type projectDetails: dict
+    :param searchableData: What getSearchableDataOfProcess returned for one or all processes of the project
+    :type searchableData: list
+    :return: The expression for an update
+    :rtype: SearchVector
+
+    """
+    title = projectDetails.get(ProjectDetails.title, "") if isinstance(projectDetails, dict) else ""
+    return SearchVector(Value(" ".join(str(entry) for entry in [title] + searchableData if entry is not None)), config=searchConfig)
+
+####################################################################################
+def updateSearchIndexOfProcess(processObj:Process) -> None|Exception:
+    """
+    Store the searchable data of a process if it changed, only then the vectors of the process and its project are built anew
+
+    :param processObj: The process as saved, with the fields in searchableFields loaded
+    :type processObj: Process
+    :return: None|Exception
+    :rtype: None|Exception
+
+    """
+    try:
+        searchableData = getSearchableDataOfProcess(processObj.processDetails, processObj.files, processObj.serviceType, processObj.serviceDetails)
+        # update() sends no signal and leaves updatedWhen alone
+        changed = Process.objects.filter(processID=processObj.processID).exclude(searchableData=searchableData, searchVector__isnull=False).update(searchableData=searchableData)
+        if changed > 0:
+            return rebuildSearchIndexOfProjects([processObj.project_id], processIDs=[processObj.processID])
+        return None
+    except Exception as error:
+        loggerError.error(f"Error in updateSearchIndexOfProcess: {str(error)}")
+        return error
+
+####################################################################################
+def rebuildSearchIndexOfProjects(projectIDs:list[str]|set[str], processIDs:list[str]|None=None) -> None|Exception:
+    """
+    Gather the stored searchable data of the processes of some projects and build the search vectors anew
+
+    :param projectIDs: The IDs of the projects
+    :type projectIDs: list[str]|set[str]
+    :param processIDs: The processes whose vectors are built anew as well, all of the projects if None, e.g. if the title changed
+    :type processIDs: list[str]|None
+    :return: None|Exception
+    :rtype: None|Exception
+
+    """
+    try:
+        detailsPerProject = dict(Project.objects.filter(projectID__in=set(projectIDs)).values_list("projectID", "projectDetails"))
+        if len(detailsPerProject) == 0:
+            return None # e.g. the processes of a deleted project
+        searchableDataPerProject = {projectID: [] for projectID in detailsPerProject}
+        processes = Process.objects.filter(project_id__in=list(detailsPerProject)).order_by("createdWhen").values_list("project_id", "processID", "searchableData")
+        for projectID, processID, searchableData in processes:
+            searchableDataPerProject[projectID].extend(searchableData)
+            if processIDs is None or processID in processIDs:
+                # the contractor searches in its processes only, together with the title of the project
+                Process.objects.filter(processID=processID).update(searchVector=getSearchVector(detailsPerProject[projectID], searchableData))
+        for projectID, searchableData in searchableDataPerProject.items():
+            Project.objects.filter(projectID=projectID).update(searchableData=searchableData, searchVector=getSearchVector(detailsPerProject[projectID], searchableData))
+        return None
+    except Exception as error:
+        loggerError.error(f"Error in rebuildSearchIndexOfProjects: {str(error)}")
+        return error
+
+####################################################################################
+def getSearchQuery(searchTerm:str) -> SearchQuery|None:
+    """
+    Every word of the term must be the start of a word in the project, as it is typed in the search field
+
+    :param searchTerm: What the user typed
+    :type searchTerm: str
+    :return: The query or None if there is nothing to search for
+    :rtype: SearchQuery|None
+
+    """
+    terms = searchTermPattern.findall(searchTerm)
+    if len(terms) == 0:
+        return None
+    return SearchQuery(" & ".join(term + ":*" for term in terms), search_type="raw", config=searchConfig)
+
+####################################################################################
+def getProjectsFlatOfClient(clientID:str, orgaID:str="", searchTerm:str="", offset:int=0, limit:int|None=None) -> list[dict]|Exception:
+    """
+    The projects of a client and those where the organization is contractor, newest first, in one query
+
+    :param clientID: The hashed ID of the client
+    :type clientID: str
+    :param orgaID: The hashed ID of the organization if the client is one, adds the projects where it's the contractor
+    :type orgaID: str
+    :param searchTerm: Only projects that match all words of this
+    :type searchTerm: str
+    :param offset: How many projects to skip
+    :type offset: int
+    :param limit: How many projects to return at most, all if None
+    :type limit: int|None
+    :return: The projects as in ProjectOutput
+    :rtype: list[dict]|Exception
+
+    """
+    try:
+        processesOfProject = Process.objects.filter(project=OuterRef("pk")).order_by()
+        filterOfProjects = Q(client=clientID)
+        projects = Project.objects.defer("searchVector").annotate(
+            processIDList=ArraySubquery(processesOfProject.values("processID")),
+            ownProcessesCount=Coalesce(Subquery(processesOfProject.filter(client=clientID).values("project").annotate(count=Count("processID")).values("count")), 0))
+        searchQuery = getSearchQuery(searchTerm)
+        if searchQuery is not None:
+            filterOfProjects &= Q(searchVector=searchQuery)
+        if orgaID != "":
+            # a contractor must not find a project by what other clients' processes in it contain
+            processesOfContractor = Process.objects.filter(contractor__hashedID=orgaID) if searchQuery is None else Process.objects.filter(contractor__hashedID=orgaID, searchVector=searchQuery)
+            filterOfProjects |= Q(projectID__in=processesOfContractor.values("project_id"))
+            projects = projects.annotate(contractorProcessesCount=Coalesce(Subquery(processesOfProject.filter(contractor__hashedID=orgaID).values("project").annotate(count=Count("processID")).values("count")), 0))
+        projects = projects.filter(filterOfProjects)
+
+        projects = projects.order_by("-createdWhen", "projectID")
+        if limit is not None:
+            projects = projects[offset:offset+limit]
+        elif offset > 0:
+            projects = projects[offset:]
+
+        output = []
+        for project in projects:
+            currentProject = project.toDict()
+            if project.client == clientID:
+                currentProject[ProjectOutput.processIDs] = project.processIDList
+                currentProject[ProjectOutput.owner] = True
+                currentProject[ProjectOutput.searchableData] = project.searchableData
+                currentProject[ProjectOutput.processesCount] = project.ownProcessesCount
+            else:
+                currentProject[ProjectOutput.owner] = False
+                currentProject[ProjectOutput.processesCount] = project.contractorProcessesCount
+            output.append(currentProject)
+        return output
+    except Exception as error:
+        loggerError.error(f"Error in getProjectsFlatOfClient: {str(error)}")
+        return error
@@ -118,6 +118,25 @@ class ProcessDetails(StrEnumExactlyAsDefined):
     verificationResults = enum.auto()
     additionalInput = enum.auto()
 
+####################################################################################
+# Enum for the file objects
+class FileContentsSemperKI(StrEnumExactlyAsDefined):
+    """
+    What does a file contain besides FileObjectContent?
+
+    """
+    previewStatus = enum.auto() # PreviewStatus
+
+####################################################################################
+class PreviewStatus(StrEnumExactlyAsDefined):
+    """
+    How far is the preview image of a file?
+
+    """
+    pending = enum.auto()
+    ready = enum.auto()
+    failed = enum.auto()
+
 ####################################################################################
 # Enum for the output of the process
 class ProcessOutput(StrEnumExactlyAsDefined):
@@ -354,6 +373,7 @@ class ValidationInformationForFrontend(StrEnumExactlyAsDefined):
     """
     isSuccessful = enum.auto()
     reason = enum.auto()
+    pending = enum.auto() # the service is still waiting for tasks it started, set until finishServiceSpecificTasks has their results
 
 ##################################################
 class ContractorParsingForFrontend(StrEnumExactlyAsDefined):
@@ -364,4 +384,16 @@ class ContractorParsingForFrontend(StrEnumExactlyAsDefined):
     contractors = enum.auto()
     errors = enum.auto()
     groupID = enum.auto()
-    error = enum.auto()
\ No newline at end of file
+    error = enum.auto()
+
+##################################################
+class TaskTypesSemperKI(StrEnumExactlyAsDefined):
+    """
+    The tasks that run in the task executor
+
+    """
+    verification = enum.auto()
+    finishVerification = enum.auto()
+    sendFileToRemote = enum.auto()
+    sendEMails = enum.auto()
+    renderPreviews = enum.auto()
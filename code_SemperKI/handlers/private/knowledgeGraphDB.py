@@ -8,7 +8,7 @@ Contains: Handlers for handling the database backed knowledge graph
 
 import json, logging, copy
 from datetime import datetime
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.conf import settings
@@ -762,6 +762,12 @@ def getGraph(request:Request):
 
     """
     try:
+        numberOfNodes = pgKnowledgeGraph.Basics.getNumberOfNodesInGraph()
+        if isinstance(numberOfNodes, Exception):
+            raise numberOfNodes
+        if numberOfNodes > pgKnowledgeGraph.graphStreamingThreshold:
+            return StreamingHttpResponse(pgKnowledgeGraph.Basics.streamGraphAsJSON(), content_type="application/json", status=status.HTTP_200_OK)
+        
         result = pgKnowledgeGraph.Basics.getGraph()
         if isinstance(result, Exception):
             raise result
@@ -820,6 +826,12 @@ def getGraphForFrontend(request:Request):
 
     """
     try:
+        numberOfNodes = pgKnowledgeGraph.Basics.getNumberOfNodesInGraph()
+        if isinstance(numberOfNodes, Exception):
+            raise numberOfNodes
+        if numberOfNodes > pgKnowledgeGraph.graphStreamingThreshold:
+            return StreamingHttpResponse(pgKnowledgeGraph.Basics.streamGraphAsJSON(forFrontend=True), content_type="application/json", status=status.HTTP_200_OK)
+
         result = pgKnowledgeGraph.Basics.getGraph()
         if isinstance(result, Exception):
             raise result
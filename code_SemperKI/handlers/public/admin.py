@@ -28,6 +28,7 @@ from code_SemperKI.utilities.serializer import ExceptionSerializer
 
 from ...connections.content.postgresql import pgProcesses
 from ...definitions import ProcessDescription
+from ...tasks.taskExecutor import taskExecutor
 
 logger = logging.getLogger("logToFile")
 
@@ -115,4 +116,43 @@ def getSpecificProjectAsAdmin(request:Request, projectID):
     logger.info(f"{Logging.Subject.ADMIN},{pgProfiles.ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.SYSTEM},project {projectID}," + str(datetime.datetime.now()))
     return JsonResponse(project)
 
-    
\ No newline at end of file
+# Background tasks #####################################################################################################
+
+#########################################################################
+# getBackgroundTasksAsAdmin
+#"getBackgroundTasksAsAdmin": ("public/admin/getBackgroundTasksAsAdmin/", admin.getBackgroundTasksAsAdmin)
+#########################################################################
+#TODO Add serializer for getBackgroundTasksAsAdmin
+#########################################################################
+# Handler  
+@extend_schema(
+    summary="Get the depth and latency of the queue of background tasks.",
+    description=" ",
+    tags=['FE - Admin'],
+    request=None,
+    responses={
+        200: None,
+        401: ExceptionSerializer,
+        500: ExceptionSerializer
+    }
+)
+@basics.checkIfUserIsLoggedIn(json=True)
+@basics.checkIfUserIsAdmin(json=True)
+@api_view(["GET"])
+@basics.checkVersion(0.3)
+def getBackgroundTasksAsAdmin(request:Request):
+    """
+    Get the number of queued, running, done and failed tasks per type, how long the oldest queued one waits and the average latency.
+
+    :param request: GET request
+    :type request: HTTP GET
+    :return: JSON response
+    :rtype: JSONResponse
+    """
+    try:
+        statistics = taskExecutor.statistics()
+    except Exception as error:
+        return Response({"error": str(error)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    logger.info(f"{Logging.Subject.ADMIN},{pgProfiles.ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.SYSTEM},background tasks," + str(datetime.datetime.now()))
+    return Response(statistics)
@@ -226,14 +226,11 @@ def downloadFilesAsZip(request:Request, projectID, processID):
     :param processID: process ID
     :type processID: Str
     :return: Saved content
-    :rtype: FileResponse
+    :rtype: StreamingHttpResponse
 
     """
-     # TODO solve with streaming
     try:
         fileResponse = logicForDownloadAsZip(request, projectID, processID, downloadFilesAsZip.cls.__name__)
-        #if isinstance(fileResponse, FileResponse):
-            #fileResponse["Content-Disposition"] = f'attachment; filename="{processID}.zip"'.format(f"{processID}.zip")
         return fileResponse
 
     except (Exception) as error:
@@ -401,6 +401,9 @@ def getProcessHistory(request:Request, processID):
 
         listOfData = interface.getData(processID, processObj)
 
+        if not isinstance(interface, ProcessManagementSession):
+            userNames = interface.getUserNamesViaHashes(entry[DataDescription.createdBy] for entry in listOfData)
+
         outData = []
         for entry in listOfData:
             outDatum = {
@@ -411,7 +414,7 @@ def getProcessHistory(request:Request, processID):
                 DataDescription.details: entry[DataDescription.details]
             }
             if not isinstance(interface, ProcessManagementSession):
-                outDatum[DataDescription.createdBy] = pgProfiles.ProfileManagementBase.getUserNameViaHash(entry[DataDescription.createdBy])
+                outDatum[DataDescription.createdBy] = userNames[entry[DataDescription.createdBy]]
             outData.append(outDatum)
 
         outObj = {"history": outData}
@@ -78,14 +78,32 @@ class SResGetFlatProjects(serializers.Serializer):
 #######################################################
 @extend_schema(
     summary="Get all projects flattened",
-    description=" ",
+    description="Newest first, optionally filtered by a search term and paginated",
     request=None,
     tags=['FE - Projects'],
     responses={
         200: SResGetFlatProjects,
+        400: ExceptionSerializer,
         401: ExceptionSerializer,
         500: ExceptionSerializer
     },
+    parameters=[OpenApiParameter(
+        name='search',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description="Every word must be the start of a word in the title, process titles, file names, contractors or service details"
+    ), OpenApiParameter(
+        name='offset',
+        type=int,
+        location=OpenApiParameter.QUERY,
+        required=False,
+    ), OpenApiParameter(
+        name='limit',
+        type=int,
+        location=OpenApiParameter.QUERY,
+        required=False,
+    )],
 )
 @api_view([HTTPMethod.GET])
 @checkVersion(0.3)
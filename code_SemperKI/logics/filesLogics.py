@@ -6,7 +6,7 @@ Silvio Weging 2025
 Contains: File upload handling logics
 """
 import base64
-import logging, zipfile
+import logging, zipfile, tempfile
 import os
 from logging import getLogger
 from io import BytesIO
@@ -19,7 +19,7 @@ from reportlab.pdfgen import canvas
 from reportlab.lib import pagesizes
 
 from django.utils import timezone
-from django.http import HttpResponse, FileResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from django.conf import settings
 
 from rest_framework import status
@@ -29,19 +29,19 @@ from rest_framework.response import Response
 from Generic_Backend.code_General.utilities import crypto
 from Generic_Backend.code_General.connections.postgresql import pgProfiles
 from Generic_Backend.code_General.utilities.crypto import EncryptionAdapter
-from Generic_Backend.code_General.utilities.files import createFileResponse
-from Generic_Backend.code_General.utilities.basics import manualCheckifAdmin
+from Generic_Backend.code_General.utilities.basics import manualCheckifAdmin, manualCheckifLoggedIn
 from Generic_Backend.code_General.definitions import FileObjectContent, Logging, FileTypes
 from Generic_Backend.code_General.connections import s3
 
 from code_SemperKI.logics.processLogics import updateProcessFunction
 import code_SemperKI.connections.content.manageContent as ManageC
 from ..connections.content.postgresql import pgProcesses
-from ..definitions import ProcessUpdates, DataType, ProcessDescription, DataDescription, dataTypeToString
+from ..definitions import ProcessUpdates, DataType, ProcessDescription, DataDescription, dataTypeToString, FileContentsSemperKI, PreviewStatus
 from ..utilities.basics import testPicture
 from django.http.request import HttpRequest
 from ..serviceManager import serviceManager
-from ..utilities.filePreview import createAndStorePreview
+from ..utilities.filePreview import createAndStorePreview, getPlaceholderPreview
+from ..tasks.previewTasks import submitPreviews, PreviewJob
 
 logger = logging.getLogger("logToFile")
 loggerError = logging.getLogger("errors")
@@ -88,6 +88,7 @@ def logicForUploadFiles(request, validatedInput:dict, functionName:str):
         assert userName != "", f"In {functionName}: non-empty userName expected"
         locale = pgProfiles.ProfileManagementBase.getUserLocale(request.session)
         changes = {"changes": {ProcessUpdates.files: {}}}
+        previews = []
 
         # check if duplicates exist
         existingFileNames = set()
@@ -126,16 +127,26 @@ def logicForUploadFiles(request, validatedInput:dict, functionName:str):
 
                 # generate preview
                 previewPath = ""
+                previewStatus = PreviewStatus.failed
                 if settings.S3_SECRET_ACCESS_KEY != "":
-                    previewPath = createAndStorePreview(file, nameOfFile, locale, filePath)
-                    if isinstance(previewPath, Exception):
-                        return previewPath, status.HTTP_500_INTERNAL_SERVER_ERROR
+                    if manualCheckifLoggedIn(request.session):
+                        # rendered in the background once the file is part of the process
+                        previews.append(PreviewJob(fileID, nameOfFile, fileID, locale))
+                        previewPath = getPlaceholderPreview(locale)
+                        previewStatus = PreviewStatus.pending
+                    else:
+                        # nothing outside of this request can change a process that only lives in the session
+                        previewPath = createAndStorePreview(file, nameOfFile, locale, filePath)
+                        if isinstance(previewPath, Exception):
+                            return previewPath, status.HTTP_500_INTERNAL_SERVER_ERROR
+                        previewStatus = PreviewStatus.failed if previewPath == getPlaceholderPreview(locale) else PreviewStatus.ready
 
                 changes["changes"][ProcessUpdates.files][fileID] = {}
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.id] = fileID
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.path] = filePath
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.fileName] = nameOfFile
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.imgPath] = previewPath
+                changes["changes"][ProcessUpdates.files][fileID][FileContentsSemperKI.previewStatus] = previewStatus
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.date] = str(timezone.now())
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.createdBy] = userName
                 changes["changes"][ProcessUpdates.files][fileID][FileObjectContent.createdByID] = content.getClient()
@@ -160,6 +171,8 @@ def logicForUploadFiles(request, validatedInput:dict, functionName:str):
         if isinstance(message, Exception):
             raise message
 
+        submitPreviews(projectID, processID, previews, request.session)
+
         logger.info(f"{Logging.Subject.USER},{userName},{Logging.Predicate.CREATED},uploaded,{Logging.Object.OBJECT},files,"+str(datetime.now()))
         return None, status.HTTP_200_OK
     except Exception as e:
@@ -322,28 +335,47 @@ def getFileReadableStream(session, projectID, processID, fileID, fromRepository:
             logger.warning(f"File {fileID} not found in process {processID}")
             return  (None, False)
 
-        if not "Body" in fileObj:
-            logger.warning(f"Error while accessing stream object in file {fileID} of process {processID}")
-            return (None, False)
+        return getReadableStreamOfFileObject(fileObj, isRemote, fileID, processID, fromRepository)
 
-        streamingBody = fileObj['Body']
-        if not isinstance(streamingBody, StreamingBody):
-            logger.warning(f"Error while accessing streaming body in file {fileID} of process {processID}")
-            return (None, False)
+    except (Exception) as error:
+        loggerError.error(f"Error while accessing and streaming file: {str(error)}")
+        return (None, False)
+
+#######################################################
+def getReadableStreamOfFileObject(fileObj, isRemote:bool, fileID:str, processID:str, fromRepository:bool=False) -> tuple[EncryptionAdapter, bool]:
+    """
+    Wrap the body of a file object from the storage so that it can be read in chunks (and is decrypted if necessary)
+
+    :param fileObj: The file object as returned by getFileObject
+    :type fileObj: dict
+    :param isRemote: Whether the file comes from the remote storage
+    :type isRemote: bool
+    :param fileID: file ID, for the logs
+    :type fileID: Str
+    :param processID: process ID, for the logs
+    :type processID: Str
+    :return: Saved content
+    :rtype: EncryptionAdapter
 
-        encryptionAdapter = EncryptionAdapter(streamingBody)
+    """
+    if not "Body" in fileObj:
+        logger.warning(f"Error while accessing stream object in file {fileID} of process {processID}")
+        return (None, False)
 
-        if isRemote is False or fromRepository is True:
-            # local files are not encrypted
-            return (encryptionAdapter, True)
+    streamingBody = fileObj['Body']
+    if not isinstance(streamingBody, StreamingBody):
+        logger.warning(f"Error while accessing streaming body in file {fileID} of process {processID}")
+        return (None, False)
 
-        encryptionAdapter.setupDecryptOnRead(base64.b64decode(s3.manageRemoteS3.aesEncryptionKey))
+    encryptionAdapter = EncryptionAdapter(streamingBody)
 
+    if isRemote is False or fromRepository is True:
+        # local files are not encrypted
         return (encryptionAdapter, True)
 
-    except (Exception) as error:
-        loggerError.error(f"Error while accessing and streaming file: {str(error)}")
-        return (None, False)
+    encryptionAdapter.setupDecryptOnRead(base64.b64decode(s3.manageRemoteS3.aesEncryptionKey))
+
+    return (encryptionAdapter, True)
 
 
 #######################################################
@@ -398,6 +430,150 @@ def moveFileToRemote(fileKeyLocal, fileKeyRemote, deleteLocal = True, printDebug
         loggerError.error(f"Error while moving file to remote: {str(error)}")
         return False
 
+#######################################################
+zipChunkSize = 1024 * 1024 # how much of a file is read, compressed and sent at once
+
+#######################################################
+class ZipStreamBuffer():
+    """
+    Write-only target for zipfile that hands out everything written so far,
+    so that the archive can be sent while it is being built
+
+    """
+    ###################################################
+    def __init__(self) -> None:
+        self._chunks = []
+
+    ###################################################
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    ###################################################
+    def flush(self) -> None:
+        pass
+
+    ###################################################
+    def pop(self) -> bytes:
+        """
+        Return and forget everything that has been written since the last call
+
+        :return: The bytes of the archive
+        :rtype: bytes
+        """
+        outBytes = b"".join(self._chunks)
+        self._chunks = []
+        return outBytes
+
+#######################################################
+def openFilesForZip(session, projectID:str, processID:str, files:list[dict]) -> tuple[list[tuple], bool]:
+    """
+    Open all files that go into a zip archive, so that a missing file is noticed before the first byte is sent
+
+    :param session: Session of the user
+    :type session: dict-like object
+    :param projectID: Project ID
+    :type projectID: str
+    :param processID: Process ID
+    :type processID: str
+    :param files: The entries of the files as saved in the process
+    :type files: list[dict]
+    :return: Name, readable stream and body of every file and True, or an empty list and False if one couldn't be opened (the others are closed again)
+    :rtype: tuple[list[tuple[str, EncryptionAdapter, StreamingBody]], bool]
+    
+    """
+    openedFiles = []
+    for fileEntry in files:
+        fileObj, flag, isRemote = getFileObject(session, projectID, processID, fileEntry[FileObjectContent.id])
+        readableStream = None
+        if flag is True:
+            readableStream, flag = getReadableStreamOfFileObject(fileObj, isRemote, fileEntry[FileObjectContent.id], processID)
+        if flag is False:
+            if fileObj is not None and isinstance(fileObj.get("Body", None), StreamingBody):
+                fileObj["Body"].close()
+            closeFilesForZip(openedFiles)
+            return ([], False)
+        openedFiles.append((fileEntry[FileObjectContent.fileName], readableStream, fileObj["Body"]))
+    return (openedFiles, True)
+
+#######################################################
+def closeFilesForZip(openedFiles:list[tuple]) -> None:
+    """
+    Close the connections to the storage of files opened by openFilesForZip
+
+    :param openedFiles: Name, readable stream and body of every file
+    :type openedFiles: list[tuple[str, EncryptionAdapter, StreamingBody]]
+    :return: Nothing
+    :rtype: None
+    
+    """
+    for _, _, streamingBody in openedFiles:
+        try:
+            streamingBody.close()
+        except Exception as error:
+            loggerError.error(f"Error while closing a file: {str(error)}")
+
+#######################################################
+def streamFilesAsZip(openedFiles:list[tuple]):
+    """
+    Build a zip archive of files chunk by chunk, only one chunk of one file is held in memory at once.
+    Every file is closed as soon as it's in the archive, the rest if the download is aborted.
+
+    :param openedFiles: Name, readable stream and body of every file as returned by openFilesForZip
+    :type openedFiles: list[tuple[str, EncryptionAdapter, StreamingBody]]
+    :return: Generator of the bytes of the archive
+    :rtype: Generator[bytes]
+    
+    """
+    buffer = ZipStreamBuffer()
+    try:
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for fileName, readableStream, streamingBody in openedFiles:
+                try:
+                    # the size is unknown beforehand when the file is decrypted on the fly
+                    with zf.open(fileName, mode="w", force_zip64=True) as zipEntry:
+                        while True:
+                            chunk = readableStream.read(zipChunkSize)
+                            if not chunk:
+                                break
+                            zipEntry.write(chunk)
+                            compressedChunk = buffer.pop()
+                            if len(compressedChunk) > 0:
+                                yield compressedChunk
+                finally:
+                    streamingBody.close()
+                yield buffer.pop()
+        # central directory
+        yield buffer.pop()
+    finally:
+        closeFilesForZip(openedFiles) # closing twice does no harm
+
+#######################################################
+class ZipStreamOfFiles():
+    """
+    What the response streams, closes the files even if the download is aborted before the first byte
+
+    """
+    ###################################################
+    def __init__(self, openedFiles:list[tuple]) -> None:
+        self._openedFiles = openedFiles
+        self._generator = streamFilesAsZip(openedFiles)
+
+    ###################################################
+    def __iter__(self):
+        return self._generator
+
+    ###################################################
+    def close(self) -> None:
+        """
+        Called by Django once the response is done
+
+        :return: Nothing
+        :rtype: None
+        """
+        self._generator.close()
+        closeFilesForZip(self._openedFiles)
+
 #######################################################
 def logicForDownloadAsZip(request:Request, projectID:str, processID:str, functionName:str):
     """
@@ -415,7 +591,6 @@ def logicForDownloadAsZip(request:Request, projectID:str, processID:str, functio
     :rtype: HttpResponse
     
     """
-     # TODO solve with streaming
     try:
         fileIDs = request.GET['fileIDs'].split(",")
         userIsAdmin = manualCheckifAdmin(request.session)
@@ -431,32 +606,82 @@ def logicForDownloadAsZip(request:Request, projectID:str, processID:str, functio
             return Exception(f"Rights not sufficient in {functionName}"), status.HTTP_401_UNAUTHORIZED
         currentProcess = interface.getProcessObj(projectID, processID)
         
-        # compress each file and put them in the same zip file, all in memory
-        zipFile = BytesIO()
-        with zipfile.ZipFile(zipFile, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        # get files, download them from aws, put them in an array together with their name
-            for elem in filesOfThisProcess:
-                currentEntry = filesOfThisProcess[elem]
-                if (not userIsAdmin) and (currentProcess.client != currentEntry[FileObjectContent.createdByID]) and (currentProcess.contractor is not None and currentProcess.contractor.hashedID != currentEntry[FileObjectContent.createdByID]):
-                    return Response("Not allowed to access file(s)!", status=401)
-                if FileObjectContent.id in currentEntry and currentEntry[FileObjectContent.id] in fileIDs:
-                    if FileObjectContent.isFile not in currentEntry or currentEntry[FileObjectContent.isFile]:
-                        if currentEntry[FileObjectContent.remote]:
-                            content, flag = s3.manageRemoteS3.downloadFile(currentEntry[FileObjectContent.path])
-                        else:
-                            content, flag = s3.manageLocalS3.downloadFile(currentEntry[FileObjectContent.path])
-                        if flag is False:
-                            return Response("Not found!", status=status.HTTP_404_NOT_FOUND)
-                        zf.writestr(currentEntry[FileObjectContent.fileName], content.read())
-                
-        zipFile.seek(0) # reset zip file
+        # check everything before the first byte is sent, the status can't be changed afterwards
+        filesForZip = []
+        for elem in filesOfThisProcess:
+            currentEntry = filesOfThisProcess[elem]
+            if (not userIsAdmin) and (currentProcess.client != currentEntry[FileObjectContent.createdByID]) and (currentProcess.contractor is not None and currentProcess.contractor.hashedID != currentEntry[FileObjectContent.createdByID]):
+                return Response("Not allowed to access file(s)!", status=401)
+            if FileObjectContent.id in currentEntry and currentEntry[FileObjectContent.id] in fileIDs:
+                if FileObjectContent.isFile not in currentEntry or currentEntry[FileObjectContent.isFile]:
+                    filesForZip.append(currentEntry)
+
+        openedFiles, flag = openFilesForZip(request.session, projectID, processID, filesForZip)
+        if flag is False:
+            return Response("Not found!", status=status.HTTP_404_NOT_FOUND)
 
         logger.info(f"{Logging.Subject.USER},{pgProfiles.ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},downloaded,{Logging.Object.OBJECT},files as zip," + str(datetime.now()))        
-        return createFileResponse(zipFile, filename=processID+".zip")
+        response = StreamingHttpResponse(ZipStreamOfFiles(openedFiles), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="{processID}.zip"'
+        return response
     except Exception as e:
         loggerError.error(f"Error in {functionName}: {str(e)}")
         return Response("Failed", status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+#######################################################
+historyChunkSize = 2000 # entries of the history fetched from the database at once
+
+#######################################################
+def writeProcessHistoryAsPDF(processObj, outFile) -> None:
+    """
+    Write the history of a process as PDF, page by page while going through the entries. 
+    The names of all users and organizations are fetched beforehand.
+
+    :param processObj: The process
+    :type processObj: Process
+    :param outFile: Where the PDF goes
+    :type outFile: file-like object opened for writing bytes
+    :return: Nothing
+    :rtype: None
+    
+    """
+    userNames = pgProcesses.ProcessManagementBase.getUserNamesViaHashes(pgProcesses.ProcessManagementBase.getCreatorsOfData(processObj))
+
+    fontsize = 12.0
+    maxEntriesPerPage = math.floor(pagesizes.A4[1]/fontsize) -1
+    # compressed pages are all that stays in memory until the file is written
+    outPDF = canvas.Canvas(outFile, pagesize=pagesizes.A4, bottomup=1, initialFontSize=fontsize, pageCompression=1)
+    
+    # make pretty
+    defaultY = pagesizes.A4[1]-fontsize
+    x = 0
+    y = defaultY
+    pageNumber = 1
+    # first line
+    outPDF.drawString(x,y,"Index,CreatedBy,CreatedWhen,Type,Content")
+    y -= fontsize
+    for idx, entry in enumerate(pgProcesses.ProcessManagementBase.iterateData(processObj, historyChunkSize)):
+        if idx >= maxEntriesPerPage*pageNumber:
+            # render pdf page
+            outPDF.showPage()
+            pageNumber += 1
+            y = defaultY
+            outPDF.drawString(x,y,"Index,CreatedBy,CreatedWhen,Type,Content")
+            y -= fontsize
+        createdBy = userNames[entry[DataDescription.createdBy]]
+        createdWhen = entry[DataDescription.createdWhen].strftime("%Y-%m-%d %H:%M:%S") # UTC as it comes from the database
+        typeOfData = dataTypeToString(entry[DataDescription.type])
+        dataContent = entry[DataDescription.data]
+        if entry[DataDescription.type] == DataType.FILE:
+            dataContent = entry[DataDescription.data][FileObjectContent.fileName]
+        outString = f"{idx},{createdBy},{createdWhen},{typeOfData},{dataContent}"
+        outPDF.drawString(x,y,outString)
+        y -= fontsize
+
+    # save pdf
+    outPDF.showPage()
+    outPDF.save()
+
 #######################################################
 def logicForDownloadProcessHistory(request:Request, processID:str, functionName:str):
     """
@@ -479,53 +704,19 @@ def logicForDownloadProcessHistory(request:Request, processID:str, functionName:
         if processObj == None:
             raise Exception("Process not found in DB!")
 
-        # gather interesting info
-        listOfData = pgProcesses.ProcessManagementBase.getData(processID, processObj)
-        
-        fontsize = 12.0
-        maxEntriesPerPage = math.floor(pagesizes.A4[1]/fontsize) -1
-        numberOfPages = math.ceil(len(listOfData)/(pagesizes.A4[1]/fontsize))
-
-        # create file like object
-        outPDFBuffer = BytesIO()
-        outPDF = canvas.Canvas(outPDFBuffer, pagesize=pagesizes.A4, bottomup=1, initialFontSize=fontsize)
-        
-        # make pretty
-        defaultY = pagesizes.A4[1]-fontsize
-        x = 0
-        y = defaultY
-        pageNumber = 1
-        # first line
-        outPDF.drawString(x,y,"Index,CreatedBy,CreatedWhen,Type,Content")
-        y -= fontsize
-        for idx, entry in enumerate(listOfData):
-            if idx >= maxEntriesPerPage*pageNumber:
-                # render pdf page
-                outPDF.showPage()
-                pageNumber += 1
-                y = defaultY
-                outPDF.drawString(x,y,"Index,CreatedBy,CreatedWhen,Type,Content")
-                y -= fontsize
-            createdBy = pgProfiles.ProfileManagementBase.getUserNameViaHash(entry[DataDescription.createdBy])
-            createdWhen = timezone.make_aware(datetime.strptime(entry[DataDescription.createdWhen], '%Y-%m-%d %H:%M:%S.%f+00:00')).strftime("%Y-%m-%d %H:%M:%S")
-            typeOfData = dataTypeToString(entry[DataDescription.type])
-            dataContent = entry[DataDescription.data]
-            if entry[DataDescription.type] == DataType.FILE:
-                dataContent = entry[DataDescription.data][FileObjectContent.fileName]
-            outString = f"{idx},{createdBy},{createdWhen},{typeOfData},{dataContent}"
-            outPDF.drawString(x,y,outString)
-            y -= fontsize
-
-
-        # save pdf
-        outPDF.showPage()
-        outPDF.save()
-        outPDFBuffer.seek(0)
+        # the PDF goes to disk, the response sends it in chunks and closes (and thereby deletes) the file afterwards
+        outPDFFile = tempfile.TemporaryFile()
+        try:
+            writeProcessHistoryAsPDF(processObj, outPDFFile)
+            outPDFFile.seek(0)
+        except Exception:
+            outPDFFile.close()
+            raise
 
         logger.info(f"{Logging.Subject.USER},{pgProfiles.ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},downloaded,{Logging.Object.OBJECT},history as pdf," + str(datetime.now()))
 
         # return file
-        return createFileResponse(outPDFBuffer, filename=processID+".pdf")
+        return FileResponse(outPDFFile, as_attachment=True, filename=processID+".pdf", content_type="application/pdf")
     except Exception as e:
         loggerError.error(f"Error in {functionName}: {str(e)}")
         return Response("Failed", status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -7,6 +7,7 @@ Akshay NS 2024
 Contains: Logic for the processes
 """
 import logging, numpy, copy, time
+from concurrent.futures import ThreadPoolExecutor
 
 from datetime import datetime
 
@@ -16,6 +17,7 @@ from rest_framework import status
 from django.http import HttpResponse
 from django.utils import timezone
 from django.conf import settings
+from django.db import connections
 
 from geopy.adapters import AioHTTPAdapter
 from geopy.geocoders import Nominatim
@@ -67,10 +69,29 @@ async def calculateGeodesicDistance(userCoords:tuple, orgaCoords:tuple) -> tuple
             return -1.0
         
 ####################################################################################
-def calculateAddInfoForEachContractor(contractor, processObj:Process|ProcessInterface, service:ServiceBase, savedCoords:tuple, transferObject:dict, idx:int):
+pricingWorkers = 8 # threads that calculate the prices of the contractors, 1 calculates them one after another
+
+####################################################################################
+def calculateAddInfoForEachContractor(contractor, processObj:Process|ProcessInterface, service:ServiceBase, savedCoords:tuple, transferObject:dict, idx:int, preloadedInputs:dict|None=None):
     """
     Parallelized for loop over every contractor
 
+    :param contractor: The contractor as given by the filter of the service
+    :type contractor: tuple|str
+    :param processObj: The process
+    :type processObj: Process|ProcessInterface
+    :param service: The service of the process
+    :type service: ServiceBase
+    :param savedCoords: Coordinates of the client
+    :type savedCoords: tuple
+    :param transferObject: Transfer object of the filter
+    :type transferObject: dict
+    :param idx: Index of the contractor
+    :type idx: int
+    :param preloadedInputs: Everything from the database for this contractor (see preloadInputsForPricing), None to fetch it here
+    :type preloadedInputs: dict | None
+    :return: The contractor with its prices or a dict with the error
+    :rtype: dict
     """
     try:
         # calculate price for service
@@ -79,8 +100,12 @@ def calculateAddInfoForEachContractor(contractor, processObj:Process|ProcessInte
         else:
             contractorID = contractor
 
-        priceOfContractor = service.calculatePriceForService(processObj, {"contractor": contractor}, transferObject) #await asyncio.to_thread(service.calculatePriceForService, processObj, {"orgaID": contractorID}, transferObject)
-        contractorContentFromDB = pgProfiles.ProfileManagementOrganization.getOrganization(hashedID=contractorID) #await asyncio.to_thread(pgProfiles.ProfileManagementOrganization.getOrganization, hashedID=contractorID)
+        if preloadedInputs is None:
+            priceOfContractor = service.calculatePriceForService(processObj, {"contractor": contractor}, transferObject) #await asyncio.to_thread(service.calculatePriceForService, processObj, {"orgaID": contractorID}, transferObject)
+            contractorContentFromDB = pgProfiles.ProfileManagementOrganization.getOrganization(hashedID=contractorID) #await asyncio.to_thread(pgProfiles.ProfileManagementOrganization.getOrganization, hashedID=contractorID)
+        else:
+            priceOfContractor = service.calculatePriceForService(processObj, {"contractor": contractor, "preloaded": preloadedInputs["service"]}, transferObject)
+            contractorContentFromDB = preloadedInputs["organization"]
         if isinstance(contractorContentFromDB, Exception):
             return {"error": contractorContentFromDB}
         
@@ -107,20 +132,75 @@ def calculateAddInfoForEachContractor(contractor, processObj:Process|ProcessInte
                                 "contractorCoordinates": coordsContractor,
                                 ProcessDetails.prices: priceOfContractor}
         # add service specific details
-        contractorToBeAdded = serviceManager.getService(processObj.serviceType).getServiceSpecificContractorDetails(contractorToBeAdded, contractor)
+        contractorToBeAdded = service.getServiceSpecificContractorDetails(contractorToBeAdded, contractor)
         return contractorToBeAdded
     except Exception as e: 
         return {"error": e}
 
 ####################################################################################
-def parallelLoop(dictOfFilteredContractors, processObj:Process|ProcessInterface, service:ServiceBase, savedCoords:tuple, transferObject:dict):
+def preloadInputsForPricing(listOfContractors:list, processObj:Process|ProcessInterface, service:ServiceBase, transferObject:dict) -> list[dict]|None:
     """
-    The main loop
-    
+    Fetch everything from the database that the pricing of the contractors needs, so that the workers don't have to touch it
+
+    :param listOfContractors: The contractors as given by the filter of the service
+    :type listOfContractors: list
+    :param processObj: The process
+    :type processObj: Process|ProcessInterface
+    :param service: The service of the process
+    :type service: ServiceBase
+    :param transferObject: Transfer object of the filter
+    :type transferObject: dict
+    :return: Organization and service specific inputs for every contractor in the same order, None if the service can't price without the database
+    :rtype: list[dict] | None
+    """
+    organizations = {}
+    for contractor in listOfContractors:
+        contractorID = contractor[0] if isinstance(contractor, tuple) else contractor
+        if contractorID not in organizations:
+            organizations[contractorID] = pgProfiles.ProfileManagementOrganization.getOrganization(hashedID=contractorID)
+    serviceInputs = service.preloadInputsForPricing(processObj, listOfContractors, organizations, transferObject)
+    if serviceInputs is None or isinstance(serviceInputs, Exception):
+        return None
+    outList = []
+    for contractor in listOfContractors:
+        contractorID = contractor[0] if isinstance(contractor, tuple) else contractor
+        outList.append({"organization": organizations[contractorID], "service": serviceInputs.get(contractorID, {})})
+    return outList
+
+####################################################################################
+def calculateAddInfoInWorker(*args) -> dict:
+    """
+    Run calculateAddInfoForEachContractor in a thread of the pool. 
+    Connections that might have been opened by accident are closed so that they don't stay open after the thread is gone.
+
+    :return: The contractor with its prices or a dict with the error
+    :rtype: dict
+    """
+    try:
+        return calculateAddInfoForEachContractor(*args)
+    finally:
+        connections.close_all()
+
+####################################################################################
+def parallelLoop(dictOfFilteredContractors, processObj:Process|ProcessInterface, service:ServiceBase, savedCoords:tuple, transferObject:dict, workers:int=pricingWorkers):
+    """
+    The main loop. If the service supports it, everything from the database is fetched first and the prices are calculated in a pool of threads.
+    The results are in the same order as the contractors, no matter which thread finishes first.
+
+    :param workers: Number of threads, 1 to calculate everything one after another
+    :type workers: int
+    :return: The contractors with their prices
+    :rtype: list[dict]
     """
     try:
         #return await asyncio.gather(*[calculateAddInfoForEachContractor(listOfFilteredContractors[i], processObj, service, savedCoords, transferObject, i) for i in range(len(listOfFilteredContractors))])
-        return [calculateAddInfoForEachContractor(dictOfFilteredContractors[i], processObj, service, savedCoords, transferObject, i) for i in range(len(dictOfFilteredContractors))]
+        numberOfContractors = len(dictOfFilteredContractors)
+        if workers > 1 and numberOfContractors > 1:
+            preloadedInputs = preloadInputsForPricing(dictOfFilteredContractors, processObj, service, transferObject)
+            if preloadedInputs is not None:
+                with ThreadPoolExecutor(max_workers=min(workers, numberOfContractors)) as executor:
+                    return list(executor.map(calculateAddInfoInWorker, dictOfFilteredContractors, [processObj]*numberOfContractors, [service]*numberOfContractors, [savedCoords]*numberOfContractors, [transferObject]*numberOfContractors, range(numberOfContractors), preloadedInputs))
+        return [calculateAddInfoForEachContractor(dictOfFilteredContractors[i], processObj, service, savedCoords, transferObject, i) for i in range(numberOfContractors)]
     except Exception as e:
         loggerError.error("Error in parallelLoop: %s" % e)
         return []
@@ -149,8 +229,7 @@ def logicForGetContractors(processObj:Process):
         if len(dictOfFilteredContractors[ContractorParsingForFrontend.contractors.value]) == 0:
             return {ContractorParsingForFrontend.contractors: [], ContractorParsingForFrontend.errors: dictOfFilteredContractors[ContractorParsingForFrontend.errors.value]}, 200
 
-        # Loop could be parallelized but tests fail if it is
-        # This is due to django not closing the database calls correctly. If there is some other solution to to_thread above then by all means...
+        # The database is only used before the threads are started, see parallelLoop
         listOfResultingContractors = parallelLoop(dictOfFilteredContractors[ContractorParsingForFrontend.contractors.value], processObj, service, coordsOfUser, transferObject) #asyncio.run(parallelLoop(listOfFilteredContractors, processObj, service, coordsOfUser, transferObject))
         
         #if settings.DEBUG:
@@ -381,12 +460,11 @@ def updateProcessFunction(request:Request, changes:dict, projectID:str, processI
         
         client = contentManager.getClient()
         trueIDOfCurrentUser = interface.getActualUserID()
+        if not contentManager.checkRightsForProcesses(processIDs):
+            loggerError.error("Rights not sufficient in updateProcess")
+            return ("", False)
         
         for processID in processIDs:
-            if not contentManager.checkRightsForProcess(processID):
-                loggerError.error("Rights not sufficient in updateProcess")
-                return ("", False)
-
             if "deletions" in changes:
                 for elem in changes["deletions"]:
                     # exclude people not having sufficient rights for that specific operation
@@ -406,13 +484,13 @@ def updateProcessFunction(request:Request, changes:dict, projectID:str, processI
                     if client != GlobalDefaults.anonymous and (elem == ProcessUpdates.messages or elem == ProcessUpdates.files) and not manualCheckIfRightsAreSufficientForSpecificOperation(request.session, "updateProcess", str(elem)):
                         loggerError.error("Rights not sufficient in updateProcess")
                         return ("", False)
-                    fireEvent = False
+                # all changes of this process at once
+                returnVals = interface.updateProcessBatch(projectID, processID, changes["changes"], client)
+                if isinstance(returnVals, Exception):
+                    raise returnVals
+                for elem, returnVal in returnVals.items():
                     # for websocket events
-                    if client != GlobalDefaults.anonymous and (elem == ProcessUpdates.messages or elem == ProcessUpdates.files or elem == ProcessUpdates.processStatus or elem == ProcessUpdates.serviceStatus):
-                        fireEvent = True
-                    returnVal = interface.updateProcess(projectID, processID, elem, changes["changes"][elem], client)
-                    if isinstance(returnVal, Exception):
-                        raise returnVal
+                    fireEvent = client != GlobalDefaults.anonymous and (elem == ProcessUpdates.messages or elem == ProcessUpdates.files or elem == ProcessUpdates.processStatus or elem == ProcessUpdates.serviceStatus)
                     if fireEvent:
                         if elem == ProcessUpdates.messages:
                             WebSocketEvents.fireWebsocketEventsForProcess(projectID, processID, request.session, elem, returnVal, NotificationSettingsUserSemperKI.newMessage, creatorOfEvent=trueIDOfCurrentUser)
@@ -19,7 +19,7 @@ from Generic_Backend.code_General.utilities import crypto
 from Generic_Backend.code_General.utilities.basics import manualCheckIfRightsAreSufficient, manualCheckifLoggedIn, manualCheckifAdmin
 
 from code_SemperKI.connections.content.manageContent import ManageContent
-from code_SemperKI.connections.content.postgresql import pgProcesses
+from code_SemperKI.connections.content.postgresql import pgProcesses, pgProjectSearch
 from code_SemperKI.serviceManager import serviceManager
 from code_SemperKI.definitions import *
 from code_SemperKI.states.stateDescriptions import ButtonLabels
@@ -30,31 +30,63 @@ logger = logging.getLogger("logToFile")
 loggerError = logging.getLogger("errors")
 ####################################################################################
 
+##################################################
+def matchesSearchTerm(project:dict, searchTerm:str) -> bool:
+    """
+    Same rule as the search index in the database: every word of the term must be the start of a word of the project
+
+    :param project: The flat project with its searchable data
+    :type project: dict
+    :param searchTerm: What the user typed
+    :type searchTerm: str
+    :return: True if it matches
+    :rtype: bool
+    """
+    terms = pgProjectSearch.searchTermPattern.findall(searchTerm.lower())
+    if len(terms) == 0:
+        return True
+    title = project[ProjectDescription.projectDetails].get(ProjectDetails.title, "") if isinstance(project.get(ProjectDescription.projectDetails), dict) else ""
+    words = pgProjectSearch.searchTermPattern.findall(" ".join(str(entry) for entry in [title] + project.get(ProjectOutput.searchableData, []) if entry is not None).lower())
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
 ##################################################
 def logicForGetFlatProjects(request) -> tuple[dict|Exception, int]:
     """
-    Get the projects for the dashboard
+    Get the projects for the dashboard, optionally filtered by the query parameter search and paginated by offset and limit
 
     :return: The projects or Exception and status code
     :rtype: dict|Exception, int
     """
     try:
+        searchTerm = request.GET.get("search", "")
+        try:
+            offset = int(request.GET.get("offset", 0))
+            limit = int(request.GET["limit"]) if "limit" in request.GET else None
+            if offset < 0 or (limit is not None and limit < 0):
+                raise ValueError("offset and limit must not be negative")
+        except ValueError as e:
+            return (e, 400)
+
         outDict = {"projects": []}
         contentManager = ManageContent(request.session)
 
         # Gather from session...
         if contentManager.sessionManagement.getIfContentIsInSession():
             sessionContent = contentManager.sessionManagement.getProjectsFlat(request.session)
-            outDict["projects"].extend(sessionContent)
+            outDict["projects"].extend([project for project in sessionContent if matchesSearchTerm(project, searchTerm)])
         
-        # ... and from database
-        if manualCheckifLoggedIn(request.session) and manualCheckIfRightsAreSufficient(request.session, "getFlatProjects"):           
-            objFromDB = contentManager.postgresManagement.getProjectsFlat(request.session)
+        # ... and from database, which filters and paginates by itself if there is nothing in the session
+        if manualCheckifLoggedIn(request.session) and manualCheckIfRightsAreSufficient(request.session, "getFlatProjects"):
+            if len(outDict["projects"]) == 0:
+                objFromDB = contentManager.postgresManagement.getProjectsFlat(request.session, searchTerm, offset, limit)
+                return ({"projects": objFromDB}, 200)
+            objFromDB = contentManager.postgresManagement.getProjectsFlat(request.session, searchTerm, 0, None if limit is None else offset+limit)
             if len(objFromDB) >= 1:
                 outDict["projects"].extend(objFromDB)
 
         outDict["projects"] = sorted(outDict["projects"], key=lambda x: 
                 timezone.make_aware(datetime.strptime(x[ProjectDescription.createdWhen], '%Y-%m-%d %H:%M:%S.%f+00:00')), reverse=True)
+        outDict["projects"] = outDict["projects"][offset:] if limit is None else outDict["projects"][offset:offset+limit]
         
         return (outDict, 200)
     except Exception as e:
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2025-06-02 10:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+def fillPropertyIndex(apps, schema_editor):
+    Node = apps.get_model("code_SemperKI", "Node")
+    NodeProperty = apps.get_model("code_SemperKI", "NodeProperty")
+    entries = []
+    for node in Node.objects.all().iterator(chunk_size=2000):
+        for propKey, prop in node.properties.items():
+            value = prop.get("value", "") if isinstance(prop, dict) else prop
+            valueNum = None
+            if isinstance(prop, dict) and prop.get("type") == "number":
+                try:
+                    valueNum = float(value)
+                except (TypeError, ValueError):
+                    valueNum = None
+            entries.append(NodeProperty(node_id=node.nodeID, key=str(propKey)[:513], valueText=str(value)[:512], valueNum=valueNum))
+    NodeProperty.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_SemperKI', '0009_verification'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.RemoveIndex(
+            model_name='node',
+            name='node_properties_idx',
+        ),
+        migrations.CreateModel(
+            name='NodeProperty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=513)),
+                ('valueText', models.CharField(max_length=512)),
+                ('valueNum', models.FloatField(null=True)),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='propertyIndex', to='code_SemperKI.node')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'valueText'], name='nodeProperty_text_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']), models.Index(fields=['key', 'valueNum'], name='nodeProperty_num_idx'), django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('key'), name='gin_trgm_ops'), name='nodeProperty_key_trgm_idx'), django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('valueText'), name='gin_trgm_ops'), name='nodeProperty_value_trgm_idx')],
+            },
+        ),
+        migrations.RunPython(fillPropertyIndex, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2025-06-16 09:30
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def fillCapabilityIndex(apps, schema_editor):
+    Node = apps.get_model("code_SemperKI", "Node")
+    Verification = apps.get_model("code_SemperKI", "Verification")
+    ContractorCapability = apps.get_model("code_SemperKI", "ContractorCapability")
+    EdgeTable = Node.edges.through
+
+    materials = list(Node.objects.filter(nodeType="material", active=True).exclude(createdBy="SYSTEM").values_list("nodeID", "uniqueID", "createdBy"))
+    ownerOfMaterial = {nodeID: createdBy for nodeID, _, createdBy in materials}
+    printersOfMaterial = {}
+    colorsOfMaterial = {}
+    for materialID, neighborID, neighborType, neighborUniqueID, neighborActive, neighborOwner in EdgeTable.objects.filter(from_node_id__in=list(ownerOfMaterial)).order_by("id").values_list("from_node_id", "to_node_id", "to_node__nodeType", "to_node__uniqueID", "to_node__active", "to_node__createdBy"):
+        if neighborType == "printer":
+            printersOfMaterial.setdefault(materialID, []).append(neighborID)
+        elif neighborType == "color" and neighborActive and neighborOwner == ownerOfMaterial[materialID]:
+            colorsOfMaterial.setdefault(materialID, set()).add(neighborUniqueID)
+    postProcessingsOfOrga = {}
+    for createdBy, uniqueID in Node.objects.filter(nodeType="additionalRequirement").exclude(createdBy="SYSTEM").values_list("createdBy", "uniqueID"):
+        postProcessingsOfOrga.setdefault(createdBy, set()).add(uniqueID)
+    verifiedMaterials = {}
+    for orgaID, printerID, materialID in Verification.objects.filter(status=3).values_list("organizationID", "printerID", "materialID"):
+        verifiedMaterials.setdefault((orgaID, printerID), set()).add(materialID)
+
+    entries = []
+    for materialID, uniqueID, orgaID in materials:
+        for printerID in printersOfMaterial.get(materialID, [""]):
+            entries.append(ContractorCapability(organizationID=orgaID, materialUniqueID=uniqueID, materialID=materialID, printerID=printerID,
+                                                colorUniqueIDs=sorted(colorsOfMaterial.get(materialID, set())), postProcessingUniqueIDs=sorted(postProcessingsOfOrga.get(orgaID, set())),
+                                                verifiedMaterialIDs=sorted(verifiedMaterials.get((orgaID, printerID), set()))))
+    ContractorCapability.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_SemperKI', '0010_nodeproperty'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractorCapability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organizationID', models.CharField(max_length=513)),
+                ('materialUniqueID', models.CharField(max_length=513)),
+                ('materialID', models.CharField(max_length=513)),
+                ('printerID', models.CharField(blank=True, default='', max_length=513)),
+                ('colorUniqueIDs', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=513), default=list, size=None)),
+                ('postProcessingUniqueIDs', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=513), default=list, size=None)),
+                ('verifiedMaterialIDs', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=512), default=list, size=None)),
+                ('updatedWhen', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['materialUniqueID'], name='capability_material_idx'), models.Index(fields=['organizationID'], name='capability_orga_idx'), models.Index(fields=['printerID'], name='capability_printer_idx'), django.contrib.postgres.indexes.GinIndex(fields=['postProcessingUniqueIDs'], name='capability_postproc_gin_idx')],
+            },
+        ),
+        migrations.RunPython(fillCapabilityIndex, migrations.RunPython.noop),
+    ]
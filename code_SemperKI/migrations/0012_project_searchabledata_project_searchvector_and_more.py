@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2025-06-23 11:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+from django.db.models import Value
+
+
+additiveManufacturing = 1 # the only service with searchable details at the time of this migration
+
+
+def getSearchableDataOfProcess(processDetails, files, serviceType, serviceDetails):
+    # frozen copy of what pgProjectSearch and the services deemed searchable, later changes of theirs must not change this migration
+    searchableData = []
+    if not isinstance(processDetails, dict):
+        processDetails = {}
+    if "title" in processDetails:
+        searchableData.append(processDetails["title"])
+    if isinstance(files, dict):
+        for file in files.values():
+            searchableData.append(file["fileName"])
+    contractor = processDetails.get("provisionalContractor")
+    if isinstance(contractor, dict) and contractor != {}:
+        searchableData.append(contractor["name"])
+    if serviceType == additiveManufacturing and isinstance(serviceDetails, dict):
+        for group in serviceDetails.get("groups", []):
+            for model in group.get("models", {}).values():
+                searchableData.append(model["fileName"])
+            material = group.get("material", {})
+            if isinstance(material, dict) and "title" in material:
+                searchableData.append(material["title"])
+            for postProcessing in group.get("postProcessings", {}).values():
+                if "title" in postProcessing:
+                    searchableData.append(postProcessing["title"])
+    return searchableData
+
+
+def fillSearchIndex(apps, schema_editor):
+    Project = apps.get_model("code_SemperKI", "Project")
+    Process = apps.get_model("code_SemperKI", "Process")
+    for project in Project.objects.all().only("projectID", "projectDetails").iterator(chunk_size=2000):
+        searchableData = []
+        for processDetails, files, serviceType, serviceDetails in Process.objects.filter(project_id=project.projectID).order_by("createdWhen").values_list("processDetails", "files", "serviceType", "serviceDetails"):
+            searchableData.extend(getSearchableDataOfProcess(processDetails, files, serviceType, serviceDetails))
+        title = project.projectDetails.get("title", "") if isinstance(project.projectDetails, dict) else ""
+        text = " ".join(str(entry) for entry in [title] + searchableData if entry is not None)
+        Project.objects.filter(projectID=project.projectID).update(searchableData=searchableData, searchVector=django.contrib.postgres.search.SearchVector(Value(text), config="simple"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_SemperKI', '0011_contractorcapability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='searchableData',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='searchVector',
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['searchVector'], name='project_search_gin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['client', '-createdWhen'], name='project_client_created_idx'),
+        ),
+        migrations.RunPython(fillSearchIndex, migrations.RunPython.noop),
+    ]
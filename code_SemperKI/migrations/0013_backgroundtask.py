@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2025-06-30 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_SemperKI', '0012_project_searchabledata_project_searchvector_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundTask',
+            fields=[
+                ('taskID', models.BigAutoField(primary_key=True, serialize=False)),
+                ('taskType', models.CharField(max_length=200)),
+                ('arguments', models.JSONField(default=dict)),
+                ('status', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('runAfter', models.DateTimeField()),
+                ('lastError', models.TextField(blank=True, default='')),
+                ('createdWhen', models.DateTimeField(auto_now_add=True)),
+                ('startedWhen', models.DateTimeField(blank=True, null=True)),
+                ('finishedWhen', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'runAfter'], name='task_due_idx'), models.Index(fields=['taskType', 'status'], name='task_type_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2025-07-07 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_SemperKI', '0013_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundtask',
+            name='result',
+            field=models.JSONField(default=dict),
+        ),
+    ]
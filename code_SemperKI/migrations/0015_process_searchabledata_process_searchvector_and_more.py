@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2025-07-10 14:12
+
+from importlib import import_module
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+from django.db.models import Value
+
+getSearchableDataOfProcess = import_module("code_SemperKI.migrations.0012_project_searchabledata_project_searchvector_and_more").getSearchableDataOfProcess
+
+
+def fillSearchIndexOfProcesses(apps, schema_editor):
+    Project = apps.get_model("code_SemperKI", "Project")
+    Process = apps.get_model("code_SemperKI", "Process")
+    for project in Project.objects.all().only("projectID", "projectDetails").iterator(chunk_size=2000):
+        title = project.projectDetails.get("title", "") if isinstance(project.projectDetails, dict) else ""
+        for processID, processDetails, files, serviceType, serviceDetails in Process.objects.filter(project_id=project.projectID).values_list("processID", "processDetails", "files", "serviceType", "serviceDetails"):
+            searchableData = getSearchableDataOfProcess(processDetails, files, serviceType, serviceDetails)
+            text = " ".join(str(entry) for entry in [title] + searchableData if entry is not None)
+            Process.objects.filter(processID=processID).update(searchableData=searchableData, searchVector=django.contrib.postgres.search.SearchVector(Value(text), config="simple"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_SemperKI', '0014_backgroundtask_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='process',
+            name='searchableData',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='process',
+            name='searchVector',
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='process',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['searchVector'], name='process_search_gin_idx'),
+        ),
+        migrations.RunPython(fillSearchIndexOfProcesses, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,8 @@ Contains: Model for database version of the Knowledge Graph
 import json, enum
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 
 from Generic_Backend.code_General.utilities.customStrEnum import StrEnumExactlyAsDefined
 
@@ -112,7 +114,6 @@ class Node(models.Model):
         indexes = [
             models.Index(fields=["nodeID"], name="nodeID_idx"),
             models.Index(fields=["nodeType"], name="node_type_idx"),
-            models.Index(fields=["properties"], name="node_properties_idx")
         ]
 
     ###################################################
@@ -138,4 +139,60 @@ class Node(models.Model):
             NodeDescription.createdWhen: str(self.createdWhen), 
             NodeDescription.updatedWhen: str(self.updatedWhen), 
             NodeDescription.accessedWhen: str(self.accessedWhen)
-        }
\ No newline at end of file
+        }
+
+##################################################
+nodePropertyValueMaxLength = 512 # longer values are truncated in the property index
+
+##################################################
+class NodeProperty(models.Model):
+    """
+    Normalized copy of the properties of a node, one row per property. 
+    Kept in sync with Node.properties by the knowledge graph functions so that searches by key, value, range and prefix can use an index.
+
+    :node: The node that has this property
+    :key: The key of the property
+    :valueText: The value as string (truncated to nodePropertyValueMaxLength)
+    :valueNum: The value as number if the property is of type number, else None
+    """
+    node = models.ForeignKey(Node, on_delete=models.CASCADE, related_name="propertyIndex")
+    key = models.CharField(max_length=513)
+    valueText = models.CharField(max_length=nodePropertyValueMaxLength)
+    valueNum = models.FloatField(null=True)
+
+    ###################################################
+    class Meta:
+        indexes = [
+            models.Index(fields=["key", "valueText"], name="nodeProperty_text_idx", opclasses=["varchar_pattern_ops", "varchar_pattern_ops"]),
+            models.Index(fields=["key", "valueNum"], name="nodeProperty_num_idx"),
+            # trigrams of the upper case text serve icontains, which Django turns into UPPER(...) LIKE UPPER('%...%')
+            GinIndex(OpClass(Upper("key"), name="gin_trgm_ops"), name="nodeProperty_key_trgm_idx"),
+            GinIndex(OpClass(Upper("valueText"), name="gin_trgm_ops"), name="nodeProperty_value_trgm_idx")
+        ]
+
+    ###################################################
+    def __str__(self):
+        return ""
+
+    ###################################################
+    @staticmethod
+    def fromNode(node:Node) -> list:
+        """
+        Create the (unsaved) index entries for all properties of a node
+
+        :param node: The node
+        :type node: Node
+        :return: List of index entries
+        :rtype: list[NodeProperty]
+        """
+        outList = []
+        for propKey, prop in node.properties.items():
+            value = prop.get(NodePropertyDescription.value, "") if isinstance(prop, dict) else prop
+            valueNum = None
+            if isinstance(prop, dict) and prop.get(NodePropertyDescription.type) == NodePropertiesTypesOfEntries.number:
+                try:
+                    valueNum = float(value)
+                except (TypeError, ValueError):
+                    valueNum = None
+            outList.append(NodeProperty(node_id=node.nodeID, key=str(propKey)[:513], valueText=str(value)[:nodePropertyValueMaxLength], valueNum=valueNum))
+        return outList
@@ -9,6 +9,8 @@ Contains: Model for processes
 import json, enum, copy
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from Generic_Backend.code_General.modelFiles.organizationModel import Organization, OrganizationDescription
 from Generic_Backend.code_General.utilities.customStrEnum import StrEnumExactlyAsDefined
@@ -44,6 +46,9 @@ class ProcessDescription(StrEnumExactlyAsDefined):
     updatedWhen = enum.auto()
     accessedWhen = enum.auto()
 
+    searchableData = enum.auto()
+    searchVector = enum.auto()
+
 
 ###################################################
 class Process(models.Model):
@@ -66,6 +71,8 @@ class Process(models.Model):
     :createdWhen: Automatically assigned date and time(UTC+0) when the entry is created
     :updatedWhen: Date and time at which the entry was updated
     :accessedWhen: Last date and time the entry was fetched from the database, automatically set
+    :searchableData: Title, file names, contractor and service details of this process, kept up to date by signals
+    :searchVector: The searchable data and the title of the project, for the search of the contractor
     """
     ###################################################
     processID = models.CharField(primary_key=True,max_length=513)
@@ -91,10 +98,14 @@ class Process(models.Model):
     updatedWhen = models.DateTimeField()
     accessedWhen = models.DateTimeField(auto_now=True)
 
+    searchableData = models.JSONField(default=list)
+    searchVector = SearchVectorField(null=True)
+
     ###################################################
     class Meta:
         indexes = [
             models.Index(fields=["processID"], name="processIDs_idx"),
+            GinIndex(fields=["searchVector"], name="process_search_gin_idx"),
         ]
 
     ###################################################
@@ -117,6 +128,21 @@ class Process(models.Model):
                 ProcessDescription.messages: self.messages,
                 ProcessDescription.createdWhen: str(self.createdWhen), ProcessDescription.updatedWhen: str(self.updatedWhen), ProcessDescription.accessedWhen: str(self.accessedWhen)}
     
+###################################################
+def withRelationsForOutput(processes:models.QuerySet, withProject:bool=True) -> models.QuerySet:
+    """
+    Fetch everything Process.toDict needs along with the processes, so that the number of queries doesn't depend on the number of processes
+
+    :param processes: The processes
+    :type processes: QuerySet
+    :param withProject: Join the project, not needed if the processes are prefetched from their project
+    :type withProject: bool
+    :return: The same processes with their relations
+    :rtype: QuerySet
+    """
+    processes = processes.select_related("project", "contractor").defer("searchVector", "project__searchVector") if withProject else processes.select_related("contractor").defer("searchVector")
+    return processes.prefetch_related("dependenciesIn", "dependenciesOut").order_by("createdWhen")
+
 ###################################################
 class ManyToManySimulation():
     """
@@ -166,6 +192,8 @@ class ProcessInterface():
     :createdWhen: Automatically assigned date and time(UTC+0) when the entry is created
     :updatedWhen: Date and time at which the entry was updated
     :accessedWhen: Last date and time the entry was fetched from the database, automatically set
+    :searchableData: Title, file names, contractor and service details of this process, kept up to date by signals
+    :searchVector: The searchable data and the title of the project, for the search of the contractor
     """
     ###################################################
     processID = ""
@@ -8,6 +8,8 @@ Contains: Model for projects
 import json, enum
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from Generic_Backend.code_General.utilities.customStrEnum import StrEnumExactlyAsDefined
 
@@ -38,6 +40,8 @@ class Project(models.Model):
     :createdWhen: Automatically assigned date and time(UTC+0) when the entry is created
     :updatedWhen: Date and time at which the entry was updated
     :accessedWhen: Last date and time the data was fetched from the database, automatically set
+    :searchableData: Titles, file names, contractors and service details of the processes, kept up to date by signals
+    :searchVector: The searchable data and the title of the project for the full text search
     """
     projectID = models.CharField(primary_key=True,max_length=513)
     projectStatus = models.IntegerField()
@@ -46,6 +50,15 @@ class Project(models.Model):
     createdWhen = models.DateTimeField(auto_now_add=True)
     updatedWhen = models.DateTimeField()
     accessedWhen = models.DateTimeField(auto_now=True)
+    searchableData = models.JSONField(default=list)
+    searchVector = SearchVectorField(null=True)
+
+    ###################################################
+    class Meta:
+        indexes = [
+            GinIndex(fields=["searchVector"], name="project_search_gin_idx"),
+            models.Index(fields=["client", "-createdWhen"], name="project_client_created_idx"),
+        ]
 
     def toDict(self):
         return {
@@ -0,0 +1,102 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Model for the queue of background tasks
+"""
+
+import enum
+from django.db import models
+
+from Generic_Backend.code_General.utilities.customStrEnum import StrEnumExactlyAsDefined
+
+##################################################
+class BackgroundTaskDescription(StrEnumExactlyAsDefined):
+    """
+    What does a background task consists of?
+
+    """
+    taskID = enum.auto()
+    taskType = enum.auto()
+    arguments = enum.auto()
+    status = enum.auto()
+    attempts = enum.auto()
+    runAfter = enum.auto()
+    lastError = enum.auto()
+    result = enum.auto()
+    createdWhen = enum.auto()
+    startedWhen = enum.auto()
+    finishedWhen = enum.auto()
+
+##################################################
+class BackgroundTaskStatus(enum.IntEnum):
+    """
+    Where a task is in its life
+
+    """
+    queued = 0
+    running = 1
+    done = 2
+    failed = 3 # gave up after the last attempt
+    cancelled = 4
+
+##################################################
+class BackgroundTask(models.Model):
+    """
+    A task that runs in the background. The table is the queue, so nothing is lost if the server restarts.
+
+    :taskID: Primary key, ascending in the order of submission
+    :taskType: Name under which the function is registered
+    :arguments: Keyword arguments of the function, must be JSON
+    :status: See BackgroundTaskStatus
+    :attempts: How often it has been started
+    :runAfter: Earliest time for the next attempt
+    :lastError: What went wrong the last time
+    :result: What the function returned, if it was a dict
+    :createdWhen: Automatically assigned date and time(UTC+0) when the task is submitted
+    :startedWhen: When the last attempt started
+    :finishedWhen: When it was done or given up
+    """
+    taskID = models.BigAutoField(primary_key=True)
+    taskType = models.CharField(max_length=200)
+    arguments = models.JSONField(default=dict)
+    status = models.IntegerField(default=BackgroundTaskStatus.queued.value)
+    attempts = models.IntegerField(default=0)
+    runAfter = models.DateTimeField()
+    lastError = models.TextField(blank=True, default="")
+    result = models.JSONField(default=dict)
+    createdWhen = models.DateTimeField(auto_now_add=True)
+    startedWhen = models.DateTimeField(null=True, blank=True)
+    finishedWhen = models.DateTimeField(null=True, blank=True)
+
+    ###################################################
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "runAfter"], name="task_due_idx"),
+            models.Index(fields=["taskType", "status"], name="task_type_status_idx")
+        ]
+
+    ###################################################
+    def __str__(self):
+        return f"{self.taskID},{self.taskType},{self.status},{self.attempts}"
+
+    ###################################################
+    def toDict(self):
+        """
+        Dict representation of the task
+
+        """
+        return {
+            BackgroundTaskDescription.taskID: self.taskID,
+            BackgroundTaskDescription.taskType: self.taskType,
+            BackgroundTaskDescription.arguments: self.arguments,
+            BackgroundTaskDescription.status: self.status,
+            BackgroundTaskDescription.attempts: self.attempts,
+            BackgroundTaskDescription.runAfter: str(self.runAfter),
+            BackgroundTaskDescription.lastError: self.lastError,
+            BackgroundTaskDescription.result: self.result,
+            BackgroundTaskDescription.createdWhen: str(self.createdWhen),
+            BackgroundTaskDescription.startedWhen: str(self.startedWhen),
+            BackgroundTaskDescription.finishedWhen: str(self.finishedWhen)
+        }
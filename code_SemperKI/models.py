@@ -15,6 +15,7 @@ from .modelFiles.processModel import *
 from .modelFiles.projectModel import *
 from .modelFiles.dataModel import *
 from .modelFiles.nodesModel import *
+from .modelFiles.taskModel import *
 
 #class BaseModel(models.Model):
 
@@ -113,6 +113,25 @@ class ServiceBase(ABC):
         :rtype: dict
         """
 
+    ##################################################
+    def preloadInputsForPricing(self, process, contractors:list, organizations:dict, transferObject:object) -> dict|None:
+        """
+        Fetch everything from the database that calculatePriceForService needs for these contractors.
+        The result is handed to calculatePriceForService as additionalArguments["preloaded"] from a thread that must not use the database.
+
+        :param process: The process with all its details
+        :type process: ProcessInterface|Process
+        :param contractors: The contractors as returned by getFilteredContractors
+        :type contractors: list
+        :param organizations: The profiles of the contractors, already fetched, for every contractor ID
+        :type organizations: dict
+        :param transferObject: Object to transfer data
+        :type transferObject: object
+        :return: Inputs for every contractor ID, None if the prices can only be calculated one after another
+        :rtype: dict | None
+        """
+        return None
+
     ###################################################
     @abstractmethod
     def getFilteredContractors(self, processObj) -> tuple[dict, object]:
@@ -137,6 +156,23 @@ class ServiceBase(ABC):
 
         """
 
+    ###################################################
+    def finishServiceSpecificTasks(self, session, processObj, validationResults:dict) -> dict|Exception:
+        """
+        Fill in the results of the tasks that serviceSpecificTasks started and marked as pending.
+        Runs in finishVerification, which the service triggers via processTasks.continueVerification whenever one of its tasks is done.
+
+        :param session: The session of the user who started the verification
+        :type session: Django Session Object
+        :param processObj: The process with all its details
+        :type processObj: Process
+        :param validationResults: The results so far, entries that are done must no longer be pending
+        :type validationResults: dict
+        :return: The results or an error
+        :rtype: dict|Exception
+        """
+        return validationResults
+
     ###################################################
     @abstractmethod
     def getSearchableDetails(self, existingContent) -> list:
@@ -12,7 +12,8 @@ from code_SemperKI.modelFiles.nodesModel import NodeDescription, NodePropertyDes
 from code_SemperKI.modelFiles.processModel import Process, ProcessInterface
 from code_SemperKI.definitions import ContractorParsingForFrontend
 
-from ..connections.postgresql import pgKG, pgVerification
+from ..connections.postgresql import pgKG, pgCapabilities
+from ..modelFiles.capabilityModel import ContractorCapabilityDescription
 from ..definitions import *
 from ..utilities.sparqlQueries import *
 
@@ -57,42 +58,38 @@ class FilterAM():
             setOfManufacturerIDs = set()
             setOfVerifiedManufacturerIDs = set()
             material = pgKnowledgeGraph.Basics.getNode(chosenMaterial[MaterialDetails.id])
-            nodesWithTheSameUID = pgKnowledgeGraph.Basics.getAllNodesThatShareTheUniqueID(material.uniqueID)
+            if isinstance(material, Exception):
+                raise material
+            # one row per printer of every active copy of the material owned by an organization
+            capabilities = pgCapabilities.getCapabilitiesForMaterial(material.uniqueID)
+            if isinstance(capabilities, Exception):
+                raise capabilities
             colorNotAvailable = False
-            # filter for those of orgas and retrieve the orgaID
-            for entry in nodesWithTheSameUID:
-                if NodeDescription.active in entry and entry[NodeDescription.active]:
-                    if entry[NodeDescription.createdBy] != pgKnowledgeGraph.defaultOwner:
-                        addPrinter = False
-                        # filter for color
-                        if chosenColor != {}:
-                            nodesWithTheSameUIDColor = pgKnowledgeGraph.Basics.getAllNodesThatShareTheUniqueID(chosenColor[NodeDescription.uniqueID])
-                            for entryColor in nodesWithTheSameUIDColor:
-                                if entryColor[NodeDescription.active] and entryColor[NodeDescription.createdBy] == entry[NodeDescription.createdBy] and pgKnowledgeGraph.Basics.getIfEdgeExists(entry[NodeDescription.nodeID], entryColor[NodeDescription.nodeID]):
-                                    setOfManufacturerIDs.add(entry[NodeDescription.createdBy])
-                                    addPrinter = True
-                        else:
-                            setOfManufacturerIDs.add(entry[NodeDescription.createdBy])
-                            addPrinter = True
+            printerIDsOfManufacturers = {}
+            for entry in capabilities:
+                manufacturerID = entry[ContractorCapabilityDescription.organizationID]
+                # filter for color
+                if chosenColor != {} and chosenColor[NodeDescription.uniqueID] not in entry[ContractorCapabilityDescription.colorUniqueIDs]:
+                    colorNotAvailable = True
+                    continue
+                setOfManufacturerIDs.add(manufacturerID)
+                printerIDsOfManufacturers.setdefault(manufacturerID, [])
+                if entry[ContractorCapabilityDescription.printerID] != "":
+                    printerIDsOfManufacturers[manufacturerID].append(entry[ContractorCapabilityDescription.printerID])
+                    # check if the printer and the material are verified for this organization
+                    if chosenMaterial[MaterialDetails.id] in entry[ContractorCapabilityDescription.verifiedMaterialIDs]:
+                        setOfVerifiedManufacturerIDs.add(manufacturerID)
 
-                        if addPrinter:
-                            # Save found printers that can print the selected material
-                            printersThatSupportThisMaterial = pgKG.Basics.getSpecificNeighborsByType(entry[NodeDescription.nodeID], NodeTypesAM.printer)
-                            if entry[NodeDescription.createdBy] in self.printerGroups[groupIdx]:
-                                self.printerGroups[groupIdx][entry[NodeDescription.createdBy]].extend(printersThatSupportThisMaterial)
-                            else:
-                                self.printerGroups[groupIdx][entry[NodeDescription.createdBy]] = printersThatSupportThisMaterial
-                            
-                            # check if the printer and the material are verified for this organization
-                            for printer in printersThatSupportThisMaterial:
-                                verification = pgVerification.getVerificationObject(entry[NodeDescription.createdBy], printer[NodeDescription.nodeID], chosenMaterial[MaterialDetails.id])
-                                if not isinstance(verification, Exception):
-                                    if verification.status == pgVerification.VerificationStatus.verified:
-                                        setOfVerifiedManufacturerIDs.add(entry[NodeDescription.createdBy])
-                                        break
-                        else:
-                            if chosenColor != {}:
-                                colorNotAvailable = True
+            # Save found printers that can print the selected material
+            printers = pgCapabilities.getPrinters([printerID for printerIDs in printerIDsOfManufacturers.values() for printerID in printerIDs])
+            if isinstance(printers, Exception):
+                raise printers
+            for manufacturerID, printerIDs in printerIDsOfManufacturers.items():
+                printersThatSupportThisMaterial = [printers[printerID] for printerID in printerIDs if printerID in printers]
+                if manufacturerID in self.printerGroups[groupIdx]:
+                    self.printerGroups[groupIdx][manufacturerID].extend(printersThatSupportThisMaterial)
+                else:
+                    self.printerGroups[groupIdx][manufacturerID] = printersThatSupportThisMaterial
             if colorNotAvailable and len(setOfManufacturerIDs) == 0:
                 if self.errors[groupIdx] == {}:
                     self.errors[groupIdx] = {ContractorParsingForFrontend.groupID: groupIdx, ContractorParsingForFrontend.error: FilterErrors.color.value}
@@ -142,16 +139,14 @@ class FilterAM():
         try:
             listOfSetsForManufacturers:list[set] = [] 
 
+            postProcessingUniqueIDs = pgCapabilities.getUniqueIDsOfNodes(list(chosenPostProcessings))
+            if isinstance(postProcessingUniqueIDs, Exception):
+                raise postProcessingUniqueIDs
+            manufacturersPerPostProcessing = pgCapabilities.getOrganizationsWithPostProcessings(list(postProcessingUniqueIDs.values()))
+            if isinstance(manufacturersPerPostProcessing, Exception):
+                raise manufacturersPerPostProcessing
             for postProcessingID in chosenPostProcessings:
-                setOfManufacturerIDs = set()
-                postProcessing = pgKnowledgeGraph.Basics.getNode(postProcessingID)
-                nodesWithTheSameUID = pgKnowledgeGraph.Basics.getAllNodesThatShareTheUniqueID(postProcessing.uniqueID)
-                # filter for those of orgas and retrieve the orgaID
-                for entry in nodesWithTheSameUID:
-                    if entry[NodeDescription.createdBy] != pgKnowledgeGraph.defaultOwner:
-                        setOfManufacturerIDs.add(entry[NodeDescription.createdBy])
-                
-                listOfSetsForManufacturers.append(setOfManufacturerIDs)
+                listOfSetsForManufacturers.append(manufacturersPerPostProcessing[postProcessingUniqueIDs[postProcessingID]])
             
             if len(listOfSetsForManufacturers) > 0:
                 manufacturersWhoCanDoItAll = listOfSetsForManufacturers[0].intersection(*listOfSetsForManufacturers[1:])
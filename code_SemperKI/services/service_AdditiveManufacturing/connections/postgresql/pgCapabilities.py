@@ -0,0 +1,203 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Access for the materialized capabilities of the contractors
+"""
+
+import logging
+
+from django.db import transaction
+
+from code_SemperKI.modelFiles.nodesModel import Node, NodeDescription, defaultOwner
+from code_SemperKI.connections.content.postgresql.pgKnowledgeGraph import bulkBatchSize
+
+from ...definitions import NodeTypesAM
+from ...modelFiles.capabilityModel import *
+from ...modelFiles.verificationModel import Verification, VerificationStatus
+
+logger = logging.getLogger("logToFile")
+loggerError = logging.getLogger("errors")
+####################################################################################
+def buildCapabilities(orgaIDs:list[str]) -> list[ContractorCapability]:
+    """
+    Derive the (unsaved) capability rows of organizations from the knowledge graph and the verifications with a constant number of queries
+
+    :param orgaIDs: The hashed IDs of the organizations
+    :type orgaIDs: list[str]
+    :return: The rows
+    :rtype: list[ContractorCapability]
+
+    """
+    materials = list(Node.objects.filter(createdBy__in=orgaIDs, nodeType=NodeTypesAM.material, active=True).values_list("nodeID", "uniqueID", "createdBy"))
+
+    printersOfMaterial = {}
+    colorsOfMaterial = {}
+    ownerOfMaterial = {nodeID: createdBy for nodeID, _, createdBy in materials}
+    edges = Node.edges.through.objects.filter(from_node_id__in=list(ownerOfMaterial)).order_by("id").values_list("from_node_id", "to_node_id", "to_node__nodeType", "to_node__uniqueID", "to_node__active", "to_node__createdBy")
+    for materialID, neighborID, neighborType, neighborUniqueID, neighborActive, neighborOwner in edges:
+        if neighborType == NodeTypesAM.printer:
+            printersOfMaterial.setdefault(materialID, []).append(neighborID)
+        elif neighborType == NodeTypesAM.color and neighborActive and neighborOwner == ownerOfMaterial[materialID]:
+            colorsOfMaterial.setdefault(materialID, set()).add(neighborUniqueID)
+
+    postProcessingsOfOrga = {}
+    for createdBy, uniqueID in Node.objects.filter(createdBy__in=orgaIDs, nodeType=NodeTypesAM.additionalRequirement).values_list("createdBy", "uniqueID"):
+        postProcessingsOfOrga.setdefault(createdBy, set()).add(uniqueID)
+
+    verifiedMaterials = {}
+    for orgaID, printerID, materialID in Verification.objects.filter(organizationID__in=orgaIDs, status=VerificationStatus.verified).values_list("organizationID", "printerID", "materialID"):
+        verifiedMaterials.setdefault((orgaID, printerID), set()).add(materialID)
+
+    outList = []
+    for materialID, uniqueID, orgaID in materials:
+        colors = sorted(colorsOfMaterial.get(materialID, set()))
+        postProcessings = sorted(postProcessingsOfOrga.get(orgaID, set()))
+        for printerID in printersOfMaterial.get(materialID, [""]):
+            outList.append(ContractorCapability(organizationID=orgaID, materialUniqueID=uniqueID, materialID=materialID, printerID=printerID,
+                                                colorUniqueIDs=colors, postProcessingUniqueIDs=postProcessings, verifiedMaterialIDs=sorted(verifiedMaterials.get((orgaID, printerID), set()))))
+    return outList
+
+####################################################################################
+def rebuildCapabilitiesOfOrganizations(orgaIDs:list[str]|set[str]) -> None|Exception:
+    """
+    Replace the capability rows of some organizations
+
+    :param orgaIDs: The hashed IDs of the organizations
+    :type orgaIDs: list[str]|set[str]
+    :return: None|Exception
+    :rtype: None|Exception
+
+    """
+    try:
+        orgaIDs = [orgaID for orgaID in set(orgaIDs) if orgaID != defaultOwner]
+        if len(orgaIDs) == 0:
+            return None
+        with transaction.atomic():
+            ContractorCapability.objects.filter(organizationID__in=orgaIDs).delete()
+            ContractorCapability.objects.bulk_create(buildCapabilities(orgaIDs), batch_size=bulkBatchSize)
+        return None
+    except Exception as e:
+        loggerError.error(f"Error in rebuildCapabilitiesOfOrganizations: {str(e)}")
+        return e
+
+####################################################################################
+def rebuildAllCapabilities() -> None|Exception:
+    """
+    Replace the capability rows of every organization
+
+    :return: None|Exception
+    :rtype: None|Exception
+
+    """
+    try:
+        orgaIDs = list(Node.objects.exclude(createdBy=defaultOwner).values_list("createdBy", flat=True).distinct())
+        with transaction.atomic():
+            ContractorCapability.objects.all().delete()
+            ContractorCapability.objects.bulk_create(buildCapabilities(orgaIDs), batch_size=bulkBatchSize)
+        return None
+    except Exception as e:
+        loggerError.error(f"Error in rebuildAllCapabilities: {str(e)}")
+        return e
+
+####################################################################################
+def getAffectedOrganizations(nodeIDs:list[str], owners:list[str]=[]) -> set[str]|Exception:
+    """
+    Which organizations have capabilities that depend on these nodes?
+
+    :param nodeIDs: The IDs of nodes that changed
+    :type nodeIDs: list[str]
+    :param owners: Owners that are already known, e.g. of a deleted node
+    :type owners: list[str]
+    :return: The hashed IDs of the organizations
+    :rtype: set[str]|Exception
+
+    """
+    try:
+        outSet = set(owners)
+        outSet.update(Node.objects.filter(nodeID__in=nodeIDs).values_list("createdBy", flat=True))
+        outSet.update(ContractorCapability.objects.filter(printerID__in=nodeIDs).values_list("organizationID", flat=True))
+        outSet.discard(defaultOwner)
+        return outSet
+    except Exception as e:
+        loggerError.error(f"Error in getAffectedOrganizations: {str(e)}")
+        return e
+
+####################################################################################
+def getCapabilitiesForMaterial(materialUniqueID:str) -> list[dict]|Exception:
+    """
+    Retrieve all rows of organizations that own a copy of the material
+
+    :param materialUniqueID: The unique ID of the material
+    :type materialUniqueID: str
+    :return: The rows, keys as in ContractorCapabilityDescription
+    :rtype: list[dict]|Exception
+
+    """
+    try:
+        return list(ContractorCapability.objects.filter(materialUniqueID=materialUniqueID).order_by("id").values(ContractorCapabilityDescription.organizationID, ContractorCapabilityDescription.printerID, ContractorCapabilityDescription.colorUniqueIDs, ContractorCapabilityDescription.verifiedMaterialIDs))
+    except Exception as e:
+        loggerError.error(f"Error in getCapabilitiesForMaterial: {str(e)}")
+        return e
+
+####################################################################################
+def getOrganizationsWithPostProcessings(postProcessingUniqueIDs:list[str]) -> dict[str,set]|Exception:
+    """
+    For every post-processing, which organizations offer it?
+
+    :param postProcessingUniqueIDs: The unique IDs of the post-processings
+    :type postProcessingUniqueIDs: list[str]
+    :return: Set of hashed organization IDs for every unique ID
+    :rtype: dict[str,set]|Exception
+
+    """
+    try:
+        outDict = {uniqueID: set() for uniqueID in postProcessingUniqueIDs}
+        rows = ContractorCapability.objects.filter(postProcessingUniqueIDs__overlap=postProcessingUniqueIDs).values_list("organizationID", "postProcessingUniqueIDs").distinct()
+        for orgaID, uniqueIDs in rows:
+            for uniqueID in uniqueIDs:
+                if uniqueID in outDict:
+                    outDict[uniqueID].add(orgaID)
+        return outDict
+    except Exception as e:
+        loggerError.error(f"Error in getOrganizationsWithPostProcessings: {str(e)}")
+        return e
+
+####################################################################################
+def getUniqueIDsOfNodes(nodeIDs:list[str]) -> dict[str,str]|Exception:
+    """
+    Get the unique IDs of many nodes with one query
+
+    :param nodeIDs: The IDs of the nodes
+    :type nodeIDs: list[str]
+    :return: Unique ID for every node ID, raises if one of the nodes doesn't exist
+    :rtype: dict[str,str]|Exception
+
+    """
+    try:
+        outDict = dict(Node.objects.filter(nodeID__in=nodeIDs).values_list("nodeID", "uniqueID"))
+        for nodeID in nodeIDs:
+            if nodeID not in outDict:
+                raise Node.DoesNotExist(f"Node {nodeID} does not exist")
+        return outDict
+    except Exception as e:
+        loggerError.error(f"Error in getUniqueIDsOfNodes: {str(e)}")
+        return e
+
+####################################################################################
+def getPrinters(printerIDs:list[str]) -> dict[str,dict]|Exception:
+    """
+    Get many printers with one query
+
+    :param printerIDs: The IDs of the printers
+    :type printerIDs: list[str]
+    :return: The printer in dict format for every ID
+    :rtype: dict[str,dict]|Exception
+
+    """
+    try:
+        return {printer.nodeID: printer.toDict() for printer in Node.objects.filter(nodeID__in=printerIDs)}
+    except Exception as e:
+        loggerError.error(f"Error in getPrinters: {str(e)}")
+        return e
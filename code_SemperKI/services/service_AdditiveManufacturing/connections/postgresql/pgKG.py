@@ -8,7 +8,7 @@ Contains: AM-service specific database knowledge graph stuff
 
 #from code_SemperKI.connections.content.postgresql.pgKnowledgeGraph import 
 
-from code_SemperKI.modelFiles.nodesModel import NodeDescription, NodePropertiesTypesOfEntries, NodePropertyDescription
+from code_SemperKI.modelFiles.nodesModel import Node, NodeDescription, NodePropertiesTypesOfEntries, NodePropertyDescription
 from code_SemperKI.connections.content.postgresql.pgKnowledgeGraph import Logic, Basics
 from code_SemperKI.utilities.locales import manageTranslations
 
@@ -346,6 +346,28 @@ class LogicAM(Logic):
                        
         return listOfViablePrinters
 
+    ##################################################
+    @staticmethod
+    def getTechnologiesOfPrinters(printerIDs:list[str]) -> dict[str,str]|Exception:
+        """
+        Get the name of the (first) technology of many printers with one query
+
+        :param printerIDs: The IDs of the printers
+        :type printerIDs: list[str]
+        :return: Name of the technology for every printer that has one
+        :rtype: dict[str,str]|Exception
+
+        """
+        try:
+            outDict = {}
+            edges = Node.edges.through.objects.filter(from_node_id__in=printerIDs, to_node__nodeType=NodeTypesAM.technology).order_by("id").values_list("from_node_id", "to_node__nodeName")
+            for printerID, technology in edges:
+                if printerID not in outDict:
+                    outDict[printerID] = technology
+            return outDict
+        except Exception as e:
+            return e
+
     ##################################################
     @staticmethod
     def getManufacturersWithViablePrinters(calculatedValues:list[float], prefilteredDictOfNodes:dict) -> set:
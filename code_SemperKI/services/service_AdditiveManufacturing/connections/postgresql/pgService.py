@@ -6,10 +6,13 @@ Silvio Weging 2023
 Contains: Functions specific for 3D printing service that access the database directly
 """
 
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+
 from Generic_Backend.code_General.definitions import FileObjectContent
 from code_SemperKI.modelFiles.processModel import Process, ProcessInterface
 
-from ...definitions import ServiceDetails, MaterialDetails, PostProcessDetails
+from ...definitions import ServiceDetails, MaterialDetails, PostProcessDetails, FileContentsAM
 import logging
 logger = logging.getLogger("errors")
 
@@ -303,4 +306,38 @@ def getSearchableDetails(existingContent:dict) -> list:
                     outList.append(group[ServiceDetails.postProcessings][postProcessing][PostProcessDetails.title])
 
     return outList
-    
\ No newline at end of file
+    
+
+####################################################################################
+def updateFEMJobOfModel(processID:str, groupID:int, modelID:str, femJob:dict) -> tuple[str,dict]|None|Exception:
+    """
+    Write the state of a FEM job into the model it belongs to.
+    Not part of the history since nobody changed the model.
+
+    :param processID: The process ID
+    :type processID: str
+    :param groupID: The index of the group that contains the model
+    :type groupID: int
+    :param modelID: The ID of the model
+    :type modelID: str
+    :param femJob: The job as given by FEMJobDetails
+    :type femJob: dict
+    :return: The relevant thing that got updated, for event queue, None if the model is gone
+    :rtype: tuple[str,dict]|None|Exception
+
+    """
+    try:
+        with transaction.atomic():
+            # the user may change the process at the same time
+            currentProcess = Process.objects.select_for_update().get(processID=processID)
+            groups = currentProcess.serviceDetails[ServiceDetails.groups] if ServiceDetails.groups in currentProcess.serviceDetails else []
+            if groupID >= len(groups) or ServiceDetails.models not in groups[groupID] or modelID not in groups[groupID][ServiceDetails.models]:
+                return None
+            groups[groupID][ServiceDetails.models][modelID][FileContentsAM.femJob] = femJob
+            currentProcess.save()
+        return (FileContentsAM.femJob, femJob)
+    except (ObjectDoesNotExist) as error:
+        return None
+    except (Exception) as error:
+        logger.error(f'could not update FEM job of model: {str(error)}')
+        return error
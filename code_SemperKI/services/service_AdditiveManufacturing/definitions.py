@@ -46,6 +46,42 @@ class FileContentsAM(StrEnumExactlyAsDefined):
     femRequested = enum.auto() # bool
     testType = enum.auto() # str, elongation or compression
     pressure = enum.auto() # int in MPa
+    femJob = enum.auto() # dict, FEMJobDetails of the latest analysis
+
+##################################################
+# FEM analyses that run in the background
+class FEMJobDetails(StrEnumExactlyAsDefined):
+    """
+    What does a FEM job contain?
+
+    """
+    jobID = enum.auto()
+    groupID = enum.auto()
+    modelID = enum.auto()
+    fileName = enum.auto()
+    status = enum.auto() # FEMJobStatus
+    result = enum.auto() # dict, empty if the model holds
+
+##################################################
+class FEMJobStatus(StrEnumExactlyAsDefined):
+    """
+    How far is a FEM job?
+
+    """
+    queued = enum.auto()
+    running = enum.auto()
+    finished = enum.auto()
+    failed = enum.auto()
+    cancelled = enum.auto()
+
+##################################################
+class TaskTypesAM(StrEnumExactlyAsDefined):
+    """
+    The tasks of this service that run in the task executor
+
+    """
+    femAnalysis = enum.auto()
+    rebuildCapabilities = enum.auto()
 
 ##################################################
 # How do the calculations look like?
@@ -0,0 +1,214 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Handling of FEM analyses that run in the background
+"""
+
+import logging
+from django.views.decorators.http import require_http_methods
+
+from rest_framework import status, serializers
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+from rest_framework.request import Request
+from drf_spectacular.utils import extend_schema
+
+from Generic_Backend.code_General.utilities.basics import checkVersion
+
+from code_SemperKI.utilities.serializer import ExceptionSerializer
+
+from ...logics.femAnalysisLogic import logicForStartFEMJobs, logicForGetFEMJob, logicForCancelFEMJob
+
+logger = logging.getLogger("logToFile")
+loggerError = logging.getLogger("errors")
+
+#######################################################
+class SResFEMJob(serializers.Serializer):
+    jobID = serializers.CharField()
+    groupID = serializers.IntegerField()
+    modelID = serializers.CharField()
+    fileName = serializers.CharField()
+    status = serializers.CharField()
+    result = serializers.DictField()
+
+#######################################################
+class SResFEMProblemsOfGroup(serializers.Serializer):
+    groupID = serializers.IntegerField()
+    models = serializers.ListField(child=serializers.DictField())
+
+#######################################################
+class SResStartFEMJobs(serializers.Serializer):
+    jobs = serializers.ListField(child=SResFEMJob())
+    groups = serializers.ListField(child=SResFEMProblemsOfGroup())
+
+#######################################################
+@extend_schema(
+    summary="Start the FEM analysis of all models of a process that requested it",
+    description="Returns at once, the jobs report their progress via websocket and can be polled",
+    tags=['FE - AM FEM'],
+    request=None,
+    responses={
+        200: SResStartFEMJobs,
+        401: ExceptionSerializer,
+        404: ExceptionSerializer,
+        500: ExceptionSerializer
+    }
+)
+@require_http_methods(["POST"])
+@api_view(["POST"])
+@checkVersion(0.3)
+def startFEMJobs(request:Request, projectID:str, processID:str):
+    """
+    Start the FEM analysis of all models of a process that requested it
+
+    :param request: POST Request
+    :type request: HTTP POST
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :return: The jobs and the models that couldn't be analysed
+    :rtype: JSON Response
+
+    """
+    try:
+        result, statusCode = logicForStartFEMJobs(request, startFEMJobs.cls.__name__, projectID, processID)
+        if isinstance(result, Exception):
+            message = f"Error in {startFEMJobs.cls.__name__}: {str(result)}"
+            exception = str(result)
+            loggerError.error(message)
+            exceptionSerializer = ExceptionSerializer(data={"message": message, "exception": exception})
+            if exceptionSerializer.is_valid():
+                return Response(exceptionSerializer.data, status=statusCode)
+            else:
+                return Response(message, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        outputSerializer = SResStartFEMJobs(data=result)
+        if outputSerializer.is_valid():
+            return Response(outputSerializer.data, status=status.HTTP_200_OK)
+        else:
+            raise Exception("Validation failed " + str(outputSerializer.errors))
+    except (Exception) as error:
+        message = f"Error in {startFEMJobs.cls.__name__}: {str(error)}"
+        exception = str(error)
+        loggerError.error(message)
+        exceptionSerializer = ExceptionSerializer(data={"message": message, "exception": exception})
+        if exceptionSerializer.is_valid():
+            return Response(exceptionSerializer.data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        else:
+            return Response(message, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+#######################################################
+@extend_schema(
+    summary="Get the state and the result of a FEM job",
+    description=" ",
+    tags=['FE - AM FEM'],
+    request=None,
+    responses={
+        200: SResFEMJob,
+        401: ExceptionSerializer,
+        404: ExceptionSerializer,
+        500: ExceptionSerializer
+    }
+)
+@require_http_methods(["GET"])
+@api_view(["GET"])
+@checkVersion(0.3)
+def getFEMJob(request:Request, projectID:str, processID:str, jobID:str):
+    """
+    Get the state and the result of a FEM job
+
+    :param request: GET Request
+    :type request: HTTP GET
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param jobID: The ID of the job
+    :type jobID: str
+    :return: The job
+    :rtype: JSON Response
+
+    """
+    try:
+        result, statusCode = logicForGetFEMJob(request, getFEMJob.cls.__name__, projectID, processID, jobID)
+        if isinstance(result, Exception):
+            message = f"Error in {getFEMJob.cls.__name__}: {str(result)}"
+            exception = str(result)
+            loggerError.error(message)
+            exceptionSerializer = ExceptionSerializer(data={"message": message, "exception": exception})
+            if exceptionSerializer.is_valid():
+                return Response(exceptionSerializer.data, status=statusCode)
+            else:
+                return Response(message, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        outputSerializer = SResFEMJob(data=result)
+        if outputSerializer.is_valid():
+            return Response(outputSerializer.data, status=status.HTTP_200_OK)
+        else:
+            raise Exception("Validation failed " + str(outputSerializer.errors))
+    except (Exception) as error:
+        message = f"Error in {getFEMJob.cls.__name__}: {str(error)}"
+        exception = str(error)
+        loggerError.error(message)
+        exceptionSerializer = ExceptionSerializer(data={"message": message, "exception": exception})
+        if exceptionSerializer.is_valid():
+            return Response(exceptionSerializer.data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        else:
+            return Response(message, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+#######################################################
+@extend_schema(
+    summary="Cancel a FEM job",
+    description="A running analysis is killed",
+    tags=['FE - AM FEM'],
+    request=None,
+    responses={
+        200: None,
+        401: ExceptionSerializer,
+        404: ExceptionSerializer,
+        409: ExceptionSerializer,
+        500: ExceptionSerializer
+    }
+)
+@require_http_methods(["DELETE"])
+@api_view(["DELETE"])
+@checkVersion(0.3)
+def cancelFEMJob(request:Request, projectID:str, processID:str, jobID:str):
+    """
+    Cancel a FEM job
+
+    :param request: DELETE Request
+    :type request: HTTP DELETE
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param jobID: The ID of the job
+    :type jobID: str
+    :return: Successful or not
+    :rtype: Response
+
+    """
+    try:
+        result, statusCode = logicForCancelFEMJob(request, cancelFEMJob.cls.__name__, projectID, processID, jobID)
+        if result is not None:
+            message = str(result)
+            loggerError.error(message)
+            exceptionSerializer = ExceptionSerializer(data={"message": message, "exception": message})
+            if exceptionSerializer.is_valid():
+                return Response(exceptionSerializer.data, status=statusCode)
+            else:
+                return Response(message, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response("Success", status=status.HTTP_200_OK)
+    except (Exception) as error:
+        message = f"Error in {cancelFEMJob.cls.__name__}: {str(error)}"
+        exception = str(error)
+        loggerError.error(message)
+        exceptionSerializer = ExceptionSerializer(data={"message": message, "exception": exception})
+        if exceptionSerializer.is_valid():
+            return Response(exceptionSerializer.data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        else:
+            return Response(message, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
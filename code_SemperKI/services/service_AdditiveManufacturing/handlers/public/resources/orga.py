@@ -8,7 +8,7 @@ Contains: Calls to ontology for adding and retrieving data
 
 import json, logging, copy
 from datetime import datetime
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.conf import settings
@@ -76,7 +76,15 @@ def orga_getGraph(request:Request):
     try:
         orgaID = ProfileManagementOrganization.getOrganizationHashID(request.session)
 
-        result = pgKnowledgeGraph.Basics.getGraph(orgaID, [NodeTypesAM.technology.value, NodeTypesAM.materialCategory.value])
+        allowedNodeTypes = [NodeTypesAM.technology.value, NodeTypesAM.materialCategory.value]
+        numberOfNodes = pgKnowledgeGraph.Basics.getNumberOfNodesInGraph(orgaID, allowedNodeTypes)
+        if isinstance(numberOfNodes, Exception):
+            raise numberOfNodes
+        if numberOfNodes > pgKnowledgeGraph.graphStreamingThreshold:
+            logger.info(f"{Logging.Subject.USER},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},graph of orga {orgaID}," + str(datetime.now()))
+            return StreamingHttpResponse(pgKnowledgeGraph.Basics.streamGraphAsJSON(orgaID, allowedNodeTypes, forFrontend=True), content_type="application/json", status=status.HTTP_200_OK)
+
+        result = pgKnowledgeGraph.Basics.getGraph(orgaID, allowedNodeTypes)
         if isinstance(result, Exception):
             raise result
         outDict = {"Nodes": [], "Edges": []}
@@ -211,9 +219,8 @@ def orga_getNodes(request:Request, resourceType:str):
         # remove nodes not belonging to the system or the orga
         filteredOutput = [entry for entry in result if entry[pgKnowledgeGraph.NodeDescription.createdBy] == orgaID or entry[pgKnowledgeGraph.NodeDescription.createdBy] == pgKnowledgeGraph.defaultOwner]
         locale = ProfileManagementOrganization.getUserLocale(request.session)
-        for elemIdx, elem in enumerate(filteredOutput):
-            for propIdx, prop in enumerate(elem[pgKnowledgeGraph.NodeDescription.properties]):
-                filteredOutput[elemIdx][pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        for elem in filteredOutput:
+            manageTranslations.translateProperties(locale, elem[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
 
         logger.info(f"{Logging.Subject.USER},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},nodes of type {resourceType} of orga {orgaID}," + str(datetime.now()))
@@ -282,8 +289,7 @@ def orga_getNodeViaID(request:Request, nodeID:str):
         
         locale = ProfileManagementOrganization.getUserLocale(request.session)
         nodeDict = nodeInfo.toDict()
-        for propIdx, prop in enumerate(nodeDict[pgKnowledgeGraph.NodeDescription.properties]):
-            nodeDict[pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        manageTranslations.translateProperties(locale, nodeDict[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
         logger.info(f"{Logging.Subject.USER},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},node {nodeID} of orga {orgaID}," + str(datetime.now()))
 
@@ -341,9 +347,8 @@ def orga_getAssociatedResources(request:Request, nodeID:str, resourceType:str):
         # remove nodes not belonging to the system or the orga
         filteredOutput = [entry for entry in result if entry[pgKnowledgeGraph.NodeDescription.createdBy] == orgaID or entry[pgKnowledgeGraph.NodeDescription.createdBy] == pgKnowledgeGraph.defaultOwner]
         locale = ProfileManagementOrganization.getUserLocale(request.session)
-        for elemIdx, elem in enumerate(filteredOutput):
-            for propIdx, prop in enumerate(elem[pgKnowledgeGraph.NodeDescription.properties]):
-                filteredOutput[elemIdx][pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        for elem in filteredOutput:
+            manageTranslations.translateProperties(locale, elem[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
 
         logger.info(f"{Logging.Subject.USER},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},connected nodes of type {resourceType} from node {nodeID} of orga {orgaID}," + str(datetime.now()))
@@ -403,9 +408,8 @@ def orga_getNeighbors(request:Request, nodeID:str):
         # remove nodes not belonging to the system or the orga
         filteredOutput = [entry for entry in result if entry[pgKnowledgeGraph.NodeDescription.createdBy] == orgaID or entry[pgKnowledgeGraph.NodeDescription.createdBy] == pgKnowledgeGraph.defaultOwner]
         locale = ProfileManagementOrganization.getUserLocale(request.session)
-        for elemIdx, elem in enumerate(filteredOutput):
-            for propIdx, prop in enumerate(elem[pgKnowledgeGraph.NodeDescription.properties]):
-                filteredOutput[elemIdx][pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        for elem in filteredOutput:
+            manageTranslations.translateProperties(locale, elem[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
 
         logger.info(f"{Logging.Subject.USER},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},neighboring nodes of node {nodeID} of orga {orgaID}," + str(datetime.now()))
@@ -5,7 +5,7 @@ Silvio Weging 2024
 
 Contains: Cost calculations for this service
 """
-import math, logging, numpy, sys
+import math, logging, numpy, sys, copy
 
 from django.conf import settings
 
@@ -20,6 +20,7 @@ from code_SemperKI.definitions import *
 from ..definitions import *
 from ..connections.postgresql import pgKG
 from ..connections.filterViaSparql import FilterAM
+from ..utilities.costsCache import costsCache, getCostsCacheKey, getNodesOfCostsCacheKey
 
 
 logger = logging.getLogger("logToFile")
@@ -50,7 +51,9 @@ class Costs():
 
         # From Organization (do only once)
         organization = {}
-        if apiGivenContent == {}:
+        if apiGivenContent == {} and "preloaded" in self.additionalArguments:
+            organization = self.additionalArguments["preloaded"]["organization"]
+        elif apiGivenContent == {}:
             organization = pgProfiles.ProfileManagementOrganization.getOrganization(hashedID=self.additionalArguments["contractor"][0])
         else:
             organization = apiGivenContent["organization"]
@@ -204,7 +207,9 @@ class Costs():
                 valuesForThisPrinter = {}
                 # get technology
                 technology = "Material Extrusion"
-                if apiGivenContent == {}:
+                if apiGivenContent == {} and "preloaded" in self.additionalArguments:
+                    technology = self.additionalArguments["preloaded"]["technologies"].get(printer[pgKG.NodeDescription.nodeID], "Material Extrusion")
+                elif apiGivenContent == {}:
                     technologies = pgKG.Basics.getSpecificNeighborsByType(printer[pgKG.NodeDescription.nodeID], pgKG.NodeTypesAM.technology)
                     technology = technologies[0][pgKG.NodeDescription.nodeName] if technologies is not None and len(technologies) > 0 else "Material Extrusion"
                 else:
@@ -707,16 +712,478 @@ class Costs():
         except Exception as e:
             loggerError.error("Error in calculateCostsForPostProcessings: " + str(e))
             return e
-    
+
     ####################################################################################################
-    def calculateCosts(self, apiGivenValues:dict={}) -> list[tuple[float,float]]|Exception:
+    # Vectorized calculation
+    ##################################################
+    def getPrinterColumn(self, key:str) -> numpy.ndarray:
+        """
+        Get one value of every printer as an array
+
+        :param key: The printer value
+        :type key: str
+        :return: Array with one entry per printer
+        :rtype: numpy.ndarray
+        """
+        return numpy.array([float(printer[key]) for printer in self.listOfValuesForEveryPrinter], dtype=float)
+
+    ##################################################
+    @staticmethod
+    def checkDivisor(name:str, divisor:numpy.ndarray) -> None:
+        """
+        Raise the same error as the scalar calculation would if any divisor is zero
+
+        :param name: Name of the divisor for the error message
+        :type name: str
+        :param divisor: The divisors
+        :type divisor: numpy.ndarray
+        :return: Nothing
+        :rtype: None
+        """
+        if numpy.any(divisor == 0):
+            raise ZeroDivisionError("Division by zero in " + name)
+
+    ##################################################
+    def storeForEveryPrinter(self, groupID, modelIDs:list, key:str, values:numpy.ndarray, printerMask:numpy.ndarray|None=None) -> None:
+        """
+        Save an intermediate result for every model and printer in the detailed calculations
+
+        :param groupID: The group
+        :type groupID: int
+        :param modelIDs: The keys of the models in the detailed calculations
+        :type modelIDs: list
+        :param key: The name of the result
+        :type key: str
+        :param values: The results, broadcastable to models x printers
+        :type values: numpy.ndarray
+        :param printerMask: Only save it for printers where this is True
+        :type printerMask: numpy.ndarray | None
+        :return: Nothing
+        :rtype: None
+        """
+        valuesAsList = numpy.broadcast_to(values, (len(modelIDs), len(self.listOfValuesForEveryPrinter))).tolist()
+        costsPerModel = self.detailedCalculations[ServiceDetails.groups.value][groupID]["costsPerModel"]
+        for modelIdx, modelID in enumerate(modelIDs):
+            costsForEveryPrinter = costsPerModel[modelID]["costsForEveryPrinter"]
+            for printerIdx, value in enumerate(valuesAsList[modelIdx]):
+                if printerMask is None or printerMask[printerIdx]:
+                    costsForEveryPrinter[printerIdx][key] = value
+
+    ##################################################
+    def calculateCostTensor(self, groupID, group) -> tuple[list, numpy.ndarray]|Exception:
+        """
+        Calculate the costs for every combination of model, printer and material at once.
+        Does the same as calculateCostsForPrinter, calculateCostsForBatches and calculateCostsForMaterial
+        but with arrays of the shape models x printers x materials instead of loops.
+
+        :param groupID: The group
+        :type groupID: int
+        :param group: The content of the group
+        :type group: dict
+        :return: The file ID of every model and the costs (part, quantity, batch) as array of shape models x printers x materials x 3
+        :rtype: tuple[list, numpy.ndarray] | Exception
+        """
+        try:
+            costsPerModel = {}
+            self.detailedCalculations[ServiceDetails.groups.value][groupID]["costsPerModel"] = costsPerModel
+            numberOfPrinters = len(self.listOfValuesForEveryPrinter)
+
+            # Models, parsed the same way as in calculateCostsForPrinter
+            modelIDs, fileIDs, levelsOfDetail = [], [], []
+            partHeights, partLengths, partWidths, partVolumes, partQuantities, productComplexities = [], [], [], [], [], []
+            costsPersonalEngineering, costsEquipment = [], []
+            for modelID, model in group[ServiceDetails.models].items():
+                costsPerModel[modelID] = {}
+                levelOfDetail = model.get(FileObjectContent.levelOfDetail, 1)
+                if FileObjectContent.isFile in model and model[FileObjectContent.isFile] is False:
+                    partQuantity = model[FileObjectContent.quantity] if model[FileObjectContent.quantity] >= 1 else 1
+                    productComplexity = model[FileContentsAM.complexity] if model[FileContentsAM.complexity] >= 0 else 0
+                    partHeight = model[FileContentsAM.height] if model[FileContentsAM.height] >= 0 else 0
+                    partLength = model[FileContentsAM.length] if model[FileContentsAM.length] >= 0 else 0
+                    partWidth = model[FileContentsAM.width] if model[FileContentsAM.width] >= 0 else 0
+                    if FileContentsAM.volume not in model or model[FileContentsAM.volume] == 0:
+                        partVolume = partHeight * partLength * partWidth / 1000. # to cm³
+                    else:
+                        partVolume = model[FileContentsAM.volume] / 1000. # to cm³
+                else:
+                    modelID = model[FileObjectContent.id]
+                    partQuantity = model.get(FileObjectContent.quantity, 1)
+                    partVolume = 0.
+                    productComplexity = 1
+                    if ServiceDetails.calculations in group:
+                        measurements = group[ServiceDetails.calculations][modelID][Calculations.measurements]
+                        partHeight = measurements[Measurements.mbbDimensions][MbbDimensions._3]
+                        partLength = measurements[Measurements.mbbDimensions][MbbDimensions._2]
+                        partWidth = measurements[Measurements.mbbDimensions][MbbDimensions._1]
+                        volumeOfModel = measurements[Measurements.volume]
+                        boundingBoxVolume = measurements[Measurements.mbbVolume]
+                        machineEpsilon = 7./3 - 4./3 - 1
+                        productComplexity = round( (1. - volumeOfModel / (boundingBoxVolume + machineEpsilon)) * 4.) # scale to [0,4], then assign nearest integer
+                        partVolume = volumeOfModel / 1000. # to cm³
+                    else:
+                        loggerError.error("No calculations available for model")
+                costsPerModel[modelID]["levelOfDetail"] = levelOfDetail
+                costsPerModel[modelID]["partVolume"] = partVolume
+                costsPerModel[modelID]["partQuantity"] = partQuantity
+                costsPerModel[modelID]["productComplexity"] = productComplexity
+                costsPerModel[modelID]["partHeight"] = partHeight
+                costsPerModel[modelID]["partLength"] = partLength
+                costsPerModel[modelID]["partWidth"] = partWidth
+
+                # C60, C62, C64, C71 only depend on the model
+                personalEngineeringHours = productComplexity if productComplexity < 3 else 4
+                costsPerModel[modelID]["personalEngineeringHours"] = personalEngineeringHours
+                costPersonalEngineering = personalEngineeringHours * self.costRatePersonnelEngineering
+                costsPerModel[modelID]["costPersonalEngineering"] = costPersonalEngineering
+                costEquipmentEngineering = self.costRateEquipmentEngineering * personalEngineeringHours + self.fixedCostsEquipmentEngineering
+                costsPerModel[modelID]["costEquipmentEngineering"] = costEquipmentEngineering
+                costEquipment = costEquipmentEngineering
+                costsPerModel[modelID]["costEquipment"] = costEquipment
+                costsPerModel[modelID]["costsForEveryPrinter"] = [{} for _ in range(numberOfPrinters)]
+
+                modelIDs.append(modelID)
+                fileIDs.append(model[FileObjectContent.id])
+                levelsOfDetail.append(levelOfDetail)
+                partHeights.append(partHeight)
+                partLengths.append(partLength)
+                partWidths.append(partWidth)
+                partVolumes.append(partVolume)
+                partQuantities.append(partQuantity)
+                productComplexities.append(productComplexity)
+                costsPersonalEngineering.append(costPersonalEngineering)
+                costsEquipment.append(costEquipment)
+
+            # models along axis 0, printers along axis 1
+            levelsOfDetail = numpy.array(levelsOfDetail)
+            partHeight = numpy.array(partHeights, dtype=float)[:, None]
+            partLength = numpy.array(partLengths, dtype=float)[:, None]
+            partWidth = numpy.array(partWidths, dtype=float)[:, None]
+            partVolume = numpy.array(partVolumes, dtype=float)[:, None]
+            partQuantity = numpy.array(partQuantities)[:, None] # stays integer if all quantities are
+            productComplexity = numpy.array(productComplexities, dtype=float)[:, None]
+            costPersonalEngineering = numpy.array(costsPersonalEngineering, dtype=float)[:, None]
+            costEquipment = numpy.array(costsEquipment, dtype=float)[:, None]
+
+            # Printers
+            printers = self.listOfValuesForEveryPrinter
+            isExtrusion = numpy.array([printer[self.PrinterValues.technology] == "Material Extrusion" for printer in printers], dtype=bool)
+            isPowderBedFusion = numpy.array([printer[self.PrinterValues.technology] == "Powder Bed Fusion" for printer in printers], dtype=bool)
+            hasBuildRate = numpy.array([self.PrinterValues.buildRate in printer for printer in printers], dtype=bool)
+            givenBuildRate = numpy.array([float(printer.get(self.PrinterValues.buildRate, 0.)) for printer in printers], dtype=float)
+            chamberBuildHeight = self.getPrinterColumn(self.PrinterValues.chamberBuildHeight)
+            chamberBuildLength = self.getPrinterColumn(self.PrinterValues.chamberBuildLength)
+            chamberBuildWidth = self.getPrinterColumn(self.PrinterValues.chamberBuildWidth)
+            machineBatchDistance = self.getPrinterColumn(self.PrinterValues.machineBatchDistance)
+            lossOfMaterial = self.getPrinterColumn(self.PrinterValues.lossOfMaterial)
+            machineSurfaceArea = self.getPrinterColumn(self.PrinterValues.machineSurfaceArea)
+            averagePowerConsumption = self.getPrinterColumn(self.PrinterValues.averagePowerConsumption)
+            machineHourlyRate = self.getPrinterColumn(self.PrinterValues.machineHourlyRate)
+            coatingTime = self.getPrinterColumn(self.PrinterValues.coatingTime)
+            fillRate = self.getPrinterColumn(self.PrinterValues.fillRate)
+            nozzleDiameter = self.getPrinterColumn(self.PrinterValues.nozzleDiameter)
+            maxPrintingSpeed = self.getPrinterColumn(self.PrinterValues.maxPrintingSpeed)
+            costRatePersonalMachine = self.getPrinterColumn(self.PrinterValues.costRatePersonalMachine)
+            machineSetUp = self.getPrinterColumn(self.PrinterValues.simpleMachineSetUp) + self.getPrinterColumn(self.PrinterValues.complexMachineSetUp)
+
+            # layer thickness corresponding to the levelOfDetail, per model and printer
+            layerThicknesses = [printer[self.PrinterValues.layerThickness] for printer in printers]
+            layerThickness = numpy.full((len(modelIDs), numberOfPrinters), 75.) # default value
+            for level, thicknessOfEveryPrinter in ((0, [entry[0] for entry in layerThicknesses]),
+                                                   (1, [entry[int(math.ceil(len(entry) / 2)) - 1] for entry in layerThicknesses]),
+                                                   (2, [entry[len(entry) - 1] for entry in layerThicknesses])):
+                layerThickness[levelsOfDetail == level] = numpy.array(thicknessOfEveryPrinter, dtype=float)
+            self.checkDivisor("layerThickness", layerThickness)
+
+            printingSpeedForMaterialAndPrinter = numpy.minimum(self.minimalPrintingSpeed, maxPrintingSpeed)
+            self.storeForEveryPrinter(groupID, modelIDs, "printingSpeedForMaterialAndPrinter", printingSpeedForMaterialAndPrinter)
+
+            buildRateForThisPrinter = numpy.where(isExtrusion, numpy.where(hasBuildRate, givenBuildRate, (nozzleDiameter / 10. ) * (layerThickness / 10000.) * printingSpeedForMaterialAndPrinter), 0.)
+            self.storeForEveryPrinter(groupID, modelIDs, "buildRateForThisPrinter", buildRateForThisPrinter)
+
+            # C81
+            layersPart = numpy.ceil((partHeight * 1000) / layerThickness).astype(numpy.int64)
+            self.storeForEveryPrinter(groupID, modelIDs, "layersPart", layersPart)
+
+            # C89
+            machineAreaUsage = numpy.ceil(machineSurfaceArea * 1.25).astype(numpy.int64)
+            self.storeForEveryPrinter(groupID, modelIDs, "machineAreaUsage", machineAreaUsage)
+
+            # C91
+            areaUsageCosts = machineAreaUsage * self.roomCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "areaUsageCosts", areaUsageCosts)
+
+            # C92
+            hourlyRateForAreaUsage = (areaUsageCosts / 30.) / 24.
+            self.storeForEveryPrinter(groupID, modelIDs, "hourlyRateForAreaUsage", hourlyRateForAreaUsage)
+
+            # C96
+            electricityCostPerHour = averagePowerConsumption * self.powerCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "electricityCostPerHour", electricityCostPerHour)
+
+            # C68
+            costPersonalMachine = costRatePersonalMachine * machineSetUp
+            self.storeForEveryPrinter(groupID, modelIDs, "costPersonalMachine", costPersonalMachine)
+
+            # C70
+            costPersonalPreProcess = costPersonalEngineering + costPersonalMachine
+            self.storeForEveryPrinter(groupID, modelIDs, "costPersonalPreProcess", costPersonalPreProcess)
+
+            # C72
+            costPreProcessTotal = costPersonalPreProcess + costEquipment
+            self.storeForEveryPrinter(groupID, modelIDs, "costPreProcessTotal", costPreProcessTotal)
+
+            # C97
+            amortizationRate = machineHourlyRate
+            self.storeForEveryPrinter(groupID, modelIDs, "amortizationRate", amortizationRate)
+
+            # C98
+            repair = amortizationRate * self.repairCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "repair", repair)
+
+            # C100
+            area = hourlyRateForAreaUsage
+            self.storeForEveryPrinter(groupID, modelIDs, "area", area)
+
+            # C104
+            coatingDurationPart = (layersPart * coatingTime) / 3600.
+            self.storeForEveryPrinter(groupID, modelIDs, "coatingDurationPart", coatingDurationPart)
+
+            # C107
+            exposureTimeSinglePart = (coatingTime * layersPart) / 3600.
+            self.storeForEveryPrinter(groupID, modelIDs, "exposureTimeSinglePart", exposureTimeSinglePart)
+
+            # Batches, see calculateCostsForBatches
+            # C09
+            self.checkDivisor("partHeight + machineBatchDistance", partHeight + machineBatchDistance)
+            theoMaxBatchSizeHeight = numpy.floor_divide(chamberBuildHeight + machineBatchDistance, partHeight + machineBatchDistance).astype(numpy.int64)
+            self.storeForEveryPrinter(groupID, modelIDs, "theoMaxBatchSizeHeight", theoMaxBatchSizeHeight)
+
+            # C10
+            self.checkDivisor("partLength + machineBatchDistance", partLength + machineBatchDistance)
+            theoMaxBatchSizeLength = numpy.floor_divide(chamberBuildLength, partLength + machineBatchDistance).astype(numpy.int64)
+            self.storeForEveryPrinter(groupID, modelIDs, "theoMaxBatchSizeLength", theoMaxBatchSizeLength)
+
+            # C11
+            self.checkDivisor("partWidth + machineBatchDistance", partWidth + machineBatchDistance)
+            theoMaxBatchSizeWidth = numpy.floor_divide(chamberBuildWidth, partWidth + machineBatchDistance).astype(numpy.int64)
+            self.storeForEveryPrinter(groupID, modelIDs, "theoMaxBatchSizeWidth", theoMaxBatchSizeWidth)
+
+            # C12
+            theoMaxBatchSizeXY = theoMaxBatchSizeLength * theoMaxBatchSizeWidth
+            self.storeForEveryPrinter(groupID, modelIDs, "theoMaxBatchSizexy", theoMaxBatchSizeXY)
+
+            # C13
+            theoMaxPartsPerBatch = theoMaxBatchSizeXY * theoMaxBatchSizeHeight
+            self.storeForEveryPrinter(groupID, modelIDs, "theoMaxPartsPerBatch", theoMaxPartsPerBatch)
+            self.checkDivisor("theoMaxPartsPerBatch", theoMaxPartsPerBatch)
+
+            # C22
+            minBatchQuantity = numpy.ceil(partQuantity / theoMaxPartsPerBatch).astype(numpy.int64)
+            self.storeForEveryPrinter(groupID, modelIDs, "minBatchQuantity", minBatchQuantity)
+
+            # C23
+            allUnusedBatch = minBatchQuantity * theoMaxPartsPerBatch - partQuantity
+            self.storeForEveryPrinter(groupID, modelIDs, "allUnusedBatch", allUnusedBatch)
+
+            # C24
+            unusedBatchSizeHeight = allUnusedBatch // theoMaxBatchSizeXY
+            self.storeForEveryPrinter(groupID, modelIDs, "unusedBatchSizeHeight", unusedBatchSizeHeight)
+
+            # C25
+            usedBatchSizeHeight = theoMaxBatchSizeHeight - unusedBatchSizeHeight
+            self.storeForEveryPrinter(groupID, modelIDs, "usedBatchSizeHeight", usedBatchSizeHeight)
+
+            # C27
+            usedBatchSizeXZ = numpy.where(partQuantity % theoMaxBatchSizeXY == 0, theoMaxBatchSizeLength * theoMaxBatchSizeWidth, partQuantity % theoMaxBatchSizeXY)
+            self.storeForEveryPrinter(groupID, modelIDs, "usedBatchSizeXZ", usedBatchSizeXZ)
+
+            # C26
+            unusedBatchSizeXZ = theoMaxBatchSizeXY - usedBatchSizeXZ
+            self.storeForEveryPrinter(groupID, modelIDs, "unusedBatchSizeXZ", unusedBatchSizeXZ)
+
+            # C28
+            if not numpy.all(partQuantity == minBatchQuantity * theoMaxBatchSizeHeight * theoMaxBatchSizeXY - unusedBatchSizeHeight * theoMaxBatchSizeXY - unusedBatchSizeXZ):
+                raise ValueError("Quantity check failed")
+
+            # C30
+            heightOffsetFirstBatchN1 = ((chamberBuildHeight + machineBatchDistance) - (partHeight + machineBatchDistance) * theoMaxBatchSizeHeight) * (minBatchQuantity - 1)
+            self.storeForEveryPrinter(groupID, modelIDs, "heightOffsetFirstBatchN1", heightOffsetFirstBatchN1)
+
+            # C31
+            heightOffsetLastBatchN = (chamberBuildHeight + machineBatchDistance) - (partHeight + machineBatchDistance) * usedBatchSizeHeight
+            self.storeForEveryPrinter(groupID, modelIDs, "heightOffsetLastBatchN", heightOffsetLastBatchN)
+
+            # C108
+            exposureTimeBatch = exposureTimeSinglePart * theoMaxPartsPerBatch
+            self.storeForEveryPrinter(groupID, modelIDs, "exposureTimeBatch", exposureTimeBatch)
+
+            # C105
+            coatingTimeBatch = (numpy.ceil((chamberBuildHeight * 1000.) / layerThickness) * coatingTime) / 3600.
+            self.storeForEveryPrinter(groupID, modelIDs, "coatingTimeBatch", coatingTimeBatch)
+
+            # C106
+            coatingTimeQuantity = (numpy.ceil(((((chamberBuildHeight - heightOffsetFirstBatchN1) * (minBatchQuantity - 1)) + (chamberBuildHeight - heightOffsetLastBatchN)) * 1000.) / layerThickness) * coatingTime) / 3600.
+            self.storeForEveryPrinter(groupID, modelIDs, "coatingTimeQuantity", coatingTimeQuantity)
+
+            # C79
+            printDurationBatch = coatingTimeBatch + exposureTimeBatch
+            self.storeForEveryPrinter(groupID, modelIDs, "printDurationBatch", printDurationBatch)
+
+            # Materials along axis 2, see calculateCostsForMaterial
+            densityOfSpecificMaterial = numpy.array([material[self.MaterialValues.densityOfSpecificMaterial] for material in self.listOfValuesForEveryMaterial], dtype=float)
+            priceOfSpecificMaterial = numpy.array([material[self.MaterialValues.priceOfSpecificMaterial] for material in self.listOfValuesForEveryMaterial], dtype=float)
+            amountOfMaterial = ( (partVolume[..., None] * fillRate[:, None] * densityOfSpecificMaterial) / 1000.)
+            # C41
+            materialCostPrintingPart = amountOfMaterial * priceOfSpecificMaterial
+            # C43
+            materialCostPrintingQuantity = materialCostPrintingPart * partQuantity[..., None]
+            # C44
+            costMachineMaterialLossPart = materialCostPrintingPart * (lossOfMaterial[:, None] / 100)
+            # C46
+            costMachineMaterialLossQuantity = costMachineMaterialLossPart * partQuantity[..., None]
+            # C59
+            supportStructuresPartRate = productComplexity[..., None] * 10.
+            # C48
+            costSupportStructuresPart = materialCostPrintingPart * supportStructuresPartRate / 100.
+            # C50
+            costSupportStructuresQuantity = costSupportStructuresPart * partQuantity[..., None]
+            # C49
+            costSupportStructuresBatch = costSupportStructuresPart * theoMaxPartsPerBatch[..., None]
+            # C42
+            materialCostPrintingBatch = materialCostPrintingPart * theoMaxPartsPerBatch[..., None]
+            # C45
+            costMachineMaterialLossBatch = costMachineMaterialLossPart * theoMaxPartsPerBatch[..., None]
+            # C53
+            totalMaterialCostBatch = materialCostPrintingBatch + costMachineMaterialLossBatch + costSupportStructuresBatch
+            # C52
+            totalMaterialCostPart = materialCostPrintingPart + costMachineMaterialLossPart + costSupportStructuresPart
+            totalMaterialCostQuantity = materialCostPrintingQuantity + costMachineMaterialLossQuantity + costSupportStructuresQuantity
+            if len(self.listOfValuesForEveryMaterial) > 0:
+                # the detailed calculations contain the values of the last material, just like calculateCostsForMaterial
+                for key, values in (("amountOfMaterial", amountOfMaterial), ("materialCostPrintingPart", materialCostPrintingPart), ("materialCostPrintingQuantity", materialCostPrintingQuantity),
+                                    ("costMachineMaterialLossPart", costMachineMaterialLossPart), ("costMachineMaterialLossQuantity", costMachineMaterialLossQuantity),
+                                    ("costSupportStructuresPart", costSupportStructuresPart), ("costSupportStructuresQuantity", costSupportStructuresQuantity), ("costSupportStructuresBatch", costSupportStructuresBatch),
+                                    ("materialCostPrintingBatch", materialCostPrintingBatch), ("costMachineMaterialLossBatch", costMachineMaterialLossBatch),
+                                    ("totalMaterialCostBatch", totalMaterialCostBatch), ("totalMaterialCostPart", totalMaterialCostPart), ("totalMaterialCostQuantity", totalMaterialCostQuantity)):
+                    self.storeForEveryPrinter(groupID, modelIDs, key, numpy.broadcast_to(values, (len(modelIDs), numberOfPrinters, len(self.listOfValuesForEveryMaterial)))[..., -1])
+
+            # C109
+            exposureTimeQuantity = ((coatingTime * layersPart) / 3600.) * partQuantity
+            self.storeForEveryPrinter(groupID, modelIDs, "exposureTimeQuantity", exposureTimeQuantity)
+
+            # C78 and C80, Powder Bed Fusion and every other technology
+            printDurationPart = coatingDurationPart + exposureTimeSinglePart
+            printDurationQuantity = coatingTimeQuantity + exposureTimeQuantity
+            # C78 and C80, Material Extrusion
+            self.checkDivisor("buildRateForThisPrinter", buildRateForThisPrinter[:, isExtrusion])
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                printDurationPartExtrusion = 2.5 * partVolume * fillRate / buildRateForThisPrinter # the 2.5 is an empirical value
+            printDurationPart = numpy.where(isExtrusion, printDurationPartExtrusion, printDurationPart)
+            printDurationQuantity = numpy.where(isExtrusion, printDurationPartExtrusion * partQuantity, printDurationQuantity)
+            self.storeForEveryPrinter(groupID, modelIDs, "printDurationPart", printDurationPart, isPowderBedFusion | isExtrusion)
+            self.storeForEveryPrinter(groupID, modelIDs, "printDurationQuantity", printDurationQuantity, isPowderBedFusion | isExtrusion)
+
+            # C99
+            safetyGas = self.safetyGasPerHour
+            self.storeForEveryPrinter(groupID, modelIDs, "safetyGas", numpy.array(safetyGas))
+
+            # C102
+            totalMachineHourlyRate = electricityCostPerHour + amortizationRate + repair + safetyGas + area
+            self.storeForEveryPrinter(groupID, modelIDs, "totalMachineHourlyRate", totalMachineHourlyRate)
+
+            # C112
+            machineCostsPrintProcessBatch = printDurationBatch * totalMachineHourlyRate
+            self.storeForEveryPrinter(groupID, modelIDs, "machineCostsPrintProcessBatch", machineCostsPrintProcessBatch)
+
+            # C111
+            machineCostsPrintProcessPart = printDurationPart * totalMachineHourlyRate
+            self.storeForEveryPrinter(groupID, modelIDs, "machineCostsPrintProcessPart", machineCostsPrintProcessPart)
+
+            # C113
+            machineCostsPrintProcessQuantity = printDurationQuantity * totalMachineHourlyRate
+            self.storeForEveryPrinter(groupID, modelIDs, "machineCostsPrintProcessQuantity", machineCostsPrintProcessQuantity)
+
+            # C114
+            personalkostenPrintProcess = (minBatchQuantity - 1) * costPersonalMachine + self.personnelCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "personalkostenPrintProcess", personalkostenPrintProcess)
+
+            costsTotalForPrinterPart = machineCostsPrintProcessPart + personalkostenPrintProcess + costPreProcessTotal + self.additionalFixedCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "costsTotalForPrinterPart", costsTotalForPrinterPart)
+            costsTotalForPrinterQuantity = machineCostsPrintProcessQuantity + personalkostenPrintProcess + costPreProcessTotal + self.additionalFixedCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "costsTotalForPrinterQuantity", costsTotalForPrinterQuantity)
+            costsTotalForPrinterBatch = machineCostsPrintProcessBatch + personalkostenPrintProcess + costPreProcessTotal + self.additionalFixedCosts
+            self.storeForEveryPrinter(groupID, modelIDs, "costsTotalForPrinterBatch", costsTotalForPrinterBatch)
+
+            costTensor = numpy.stack((costsTotalForPrinterPart[..., None] + totalMaterialCostPart,
+                                      costsTotalForPrinterQuantity[..., None] + totalMaterialCostQuantity,
+                                      costsTotalForPrinterBatch[..., None] + totalMaterialCostBatch), axis=-1)
+            return fileIDs, costTensor
+        except Exception as e:
+            loggerError.error("Error in calculateCostTensor: " + str(e))
+            return e
+
+    ##################################################
+    def getMinimumAndMaximumCosts(self, groupID, fileIDs:list, costTensor:numpy.ndarray) -> tuple[list[float], list[float]]:
+        """
+        Find the cheapest and most expensive combination of printer and material for every file and overall
+
+        :param groupID: The group
+        :type groupID: int
+        :param fileIDs: The file ID of every model
+        :type fileIDs: list
+        :param costTensor: The total costs (part, quantity, batch) of every model, printer and material
+        :type costTensor: numpy.ndarray
+        :return: Minimum and maximum costs (part, quantity, batch)
+        :rtype: tuple[list[float], list[float]]
+        """
+        costsPerModel = costTensor.reshape(costTensor.shape[0], costTensor.shape[1] * costTensor.shape[2], 3)
+        # NaN never wins a comparison in the scalar version, so it's ignored here as well
+        isNaN = numpy.isnan(costsPerModel)
+        maximumCostsPerModel = numpy.max(numpy.where(isNaN, -numpy.inf, costsPerModel), axis=1, initial=0.)
+        minimumCostsPerModel = numpy.min(numpy.where(isNaN, numpy.inf, costsPerModel), axis=1, initial=sys.float_info.max)
+
+        modelIdxPerFile = {}
+        for modelIdx, fileID in enumerate(fileIDs):
+            modelIdxPerFile[fileID] = modelIdx # same file twice: the last one counts
+        for fileID, modelIdx in modelIdxPerFile.items():
+            self.detailedCalculations[ServiceDetails.groups.value][groupID][fileID] = {}
+            self.detailedCalculations[ServiceDetails.groups.value][groupID][fileID]["maximumCostsThisFile"] = maximumCostsPerModel[modelIdx].tolist()
+            self.detailedCalculations[ServiceDetails.groups.value][groupID][fileID]["minimumCostsThisFile"] = minimumCostsPerModel[modelIdx].tolist()
+
+        relevantModels = list(modelIdxPerFile.values())
+        maximumCosts = numpy.max(maximumCostsPerModel[relevantModels], axis=0, initial=0.).tolist()
+        minimumCosts = numpy.min(minimumCostsPerModel[relevantModels], axis=0, initial=sys.float_info.max).tolist()
+        return minimumCosts, maximumCosts
+
+    ####################################################################################################
+    def calculateCosts(self, apiGivenValues:dict={}, vectorized:bool=True) -> list[tuple[float,float]]|Exception:
         """
         Calculate all costs
-        
+
+        :param apiGivenValues: the values given by the api
+        :type apiGivenValues: dict
+        :param vectorized: Calculate all combinations at once with calculateCostTensor instead of the loops in calculateCostsForPrinter
+        :type vectorized: bool
+        :return: the costs for the quantity of every group
+        :rtype: list[tuple[float,float]] | Exception
         """
         try: 
             costsPerGroup = []
             content = self.processObj.serviceDetails[ServiceDetails.groups.value] if apiGivenValues == {} else apiGivenValues[ServiceDetails.groups.value] 
+
+            # same inputs, same result: look into the cache first
+            cacheKey = ""
+            if apiGivenValues == {}:
+                if "preloaded" in self.additionalArguments:
+                    cacheKey = self.additionalArguments["preloaded"]["cacheKey"]
+                else:
+                    cacheKey = self.getCacheKey(content)
+                if cacheKey != "":
+                    cachedResult, exists = costsCache.retrieve(cacheKey)
+                    if exists:
+                        self.detailedCalculations = copy.deepcopy(cachedResult["detailedCalculations"])
+                        return [tuple(costs) for costs in cachedResult["costs"]]
+
             self.detailedCalculations[ServiceDetails.groups.value] = [{} for _ in range(len(content))]
             for groupIdx, group in enumerate(content):
                 if apiGivenValues == {} and "contractor" in self.additionalArguments and groupIdx not in self.additionalArguments["contractor"][2]:
@@ -725,9 +1192,15 @@ class Costs():
                 retVal = self.fetchInformation(groupIdx, group, apiGivenContent=apiGivenValues)
                 if retVal is not None:
                     raise retVal
-                printerCostDict = self.calculateCostsForPrinter(groupIdx, group)
-                if isinstance(printerCostDict, Exception):
-                    raise printerCostDict
+                if vectorized:
+                    retVal = self.calculateCostTensor(groupIdx, group)
+                    if isinstance(retVal, Exception):
+                        raise retVal
+                    fileIDs, costTensor = retVal
+                else:
+                    printerCostDict = self.calculateCostsForPrinter(groupIdx, group)
+                    if isinstance(printerCostDict, Exception):
+                        raise printerCostDict
                 postProcessingCostList = self.calculateCostsForPostProcessings(groupIdx, group)
                 if isinstance(postProcessingCostList, Exception):
                     raise postProcessingCostList
@@ -739,43 +1212,45 @@ class Costs():
                 marginPlattform = 1. + PLATFORM_MARGIN/100.
                 self.detailedCalculations[ServiceDetails.groups.value][groupIdx]["marginPlattform"] = marginPlattform
 
-                maximumCosts = [0., 0., 0.] # part, quantity, batch
-                minimumCosts = [sys.float_info.max, sys.float_info.max, sys.float_info.max]
-                maximumCostsPerFile = {}
-                minimumCostsPerFile = {}
-                for fileID , printerCostList in printerCostDict.items():
-                    maximumCostsThisFile = [0., 0., 0.] # part, quantity, batch
-                    minimumCostsThisFile = [sys.float_info.max, sys.float_info.max, sys.float_info.max]
-                    for costsTotalForPrinterPart, costsTotalForPrinterQuantity, costsTotalForPrinterBatch, listOfCostsForMaterial in printerCostList:
-                        for total_material_cost_part, total_material_cost_quantity, total_material_cost_batch in listOfCostsForMaterial:
-                            costsTotal = costsTotalForPrinterPart + total_material_cost_part + postProcessingsCosts
-                            if costsTotal > maximumCostsThisFile[0]:
-                                maximumCostsThisFile[0] = costsTotal
-                            if costsTotal < minimumCostsThisFile[0]:
-                                minimumCostsThisFile[0] = costsTotal
-                            costsTotal = costsTotalForPrinterQuantity + total_material_cost_quantity + postProcessingsCosts
-                            if costsTotal > maximumCostsThisFile[1]:
-                                maximumCostsThisFile[1] = costsTotal
-                            if costsTotal < minimumCostsThisFile[1]:
-                                minimumCostsThisFile[1] = costsTotal
-                            costsTotal = costsTotalForPrinterBatch + total_material_cost_batch + postProcessingsCosts
-                            if costsTotal > maximumCostsThisFile[2]:
-                                maximumCostsThisFile[2] = costsTotal
-                            if costsTotal < minimumCostsThisFile[2]:
-                                minimumCostsThisFile[2] = costsTotal
-                    maximumCostsPerFile[fileID] = maximumCostsThisFile
-                    minimumCostsPerFile[fileID] = minimumCostsThisFile
-
-                    for i in range(3):
-                        if maximumCostsThisFile[i] > maximumCosts[i]:
-                            maximumCosts[i] = maximumCostsThisFile[i]
-                        if minimumCostsThisFile[i] < minimumCosts[i]:
-                            minimumCosts[i] = minimumCostsThisFile[i]
-
-                    self.detailedCalculations[ServiceDetails.groups.value][groupIdx][fileID] = {}
-                    self.detailedCalculations[ServiceDetails.groups.value][groupIdx][fileID]["maximumCostsThisFile"] = maximumCostsThisFile
-                    self.detailedCalculations[ServiceDetails.groups.value][groupIdx][fileID]["minimumCostsThisFile"] = minimumCostsThisFile
-                    
+                if vectorized:
+                    minimumCosts, maximumCosts = self.getMinimumAndMaximumCosts(groupIdx, fileIDs, costTensor + postProcessingsCosts)
+                else:
+                    maximumCosts = [0., 0., 0.] # part, quantity, batch
+                    minimumCosts = [sys.float_info.max, sys.float_info.max, sys.float_info.max]
+                    maximumCostsPerFile = {}
+                    minimumCostsPerFile = {}
+                    for fileID , printerCostList in printerCostDict.items():
+                        maximumCostsThisFile = [0., 0., 0.] # part, quantity, batch
+                        minimumCostsThisFile = [sys.float_info.max, sys.float_info.max, sys.float_info.max]
+                        for costsTotalForPrinterPart, costsTotalForPrinterQuantity, costsTotalForPrinterBatch, listOfCostsForMaterial in printerCostList:
+                            for total_material_cost_part, total_material_cost_quantity, total_material_cost_batch in listOfCostsForMaterial:
+                                costsTotal = costsTotalForPrinterPart + total_material_cost_part + postProcessingsCosts
+                                if costsTotal > maximumCostsThisFile[0]:
+                                    maximumCostsThisFile[0] = costsTotal
+                                if costsTotal < minimumCostsThisFile[0]:
+                                    minimumCostsThisFile[0] = costsTotal
+                                costsTotal = costsTotalForPrinterQuantity + total_material_cost_quantity + postProcessingsCosts
+                                if costsTotal > maximumCostsThisFile[1]:
+                                    maximumCostsThisFile[1] = costsTotal
+                                if costsTotal < minimumCostsThisFile[1]:
+                                    minimumCostsThisFile[1] = costsTotal
+                                costsTotal = costsTotalForPrinterBatch + total_material_cost_batch + postProcessingsCosts
+                                if costsTotal > maximumCostsThisFile[2]:
+                                    maximumCostsThisFile[2] = costsTotal
+                                if costsTotal < minimumCostsThisFile[2]:
+                                    minimumCostsThisFile[2] = costsTotal
+                        maximumCostsPerFile[fileID] = maximumCostsThisFile
+                        minimumCostsPerFile[fileID] = minimumCostsThisFile
+
+                        for i in range(3):
+                            if maximumCostsThisFile[i] > maximumCosts[i]:
+                                maximumCosts[i] = maximumCostsThisFile[i]
+                            if minimumCostsThisFile[i] < minimumCosts[i]:
+                                minimumCosts[i] = minimumCostsThisFile[i]
+
+                        self.detailedCalculations[ServiceDetails.groups.value][groupIdx][fileID] = {}
+                        self.detailedCalculations[ServiceDetails.groups.value][groupIdx][fileID]["maximumCostsThisFile"] = maximumCostsThisFile
+                        self.detailedCalculations[ServiceDetails.groups.value][groupIdx][fileID]["minimumCostsThisFile"] = minimumCostsThisFile
 
                 totalCosts = [(minimumCosts[0]*marginOrganization*marginPlattform, maximumCosts[0]*marginOrganization*marginPlattform), (minimumCosts[1]*marginOrganization*marginPlattform, maximumCosts[1]*marginOrganization*marginPlattform), (minimumCosts[2]*marginOrganization*marginPlattform, maximumCosts[2]*marginOrganization*marginPlattform)]
                 for i in range(len(totalCosts)):
@@ -787,12 +1262,33 @@ class Costs():
                     totalCosts[i] = (left, right)
                 self.detailedCalculations[ServiceDetails.groups.value][groupIdx]["totalCosts"] = totalCosts
                 costsPerGroup.append(totalCosts[1]) # return the costs for quantity
-                
+
+            if cacheKey != "":
+                costsCache.store(cacheKey, {"costs": costsPerGroup, "detailedCalculations": self.detailedCalculations})
             return costsPerGroup
         except Exception as e:
             loggerError.error("Error in calculateCosts: " + str(e))
             return e
         
+    ####################################################################################################
+    def getCacheKey(self, content:list, versionsOfNodes:dict|None=None) -> str:
+        """
+        Key of the cached result for the contractor, uses the database if the versions of the nodes aren't given
+
+        :param content: The groups of the service details
+        :type content: list
+        :param versionsOfNodes: The versions of the printers and materials, as given by getVersionsOfNodes
+        :type versionsOfNodes: dict|None
+        :return: The key, empty if there is none
+        :rtype: str
+        """
+        contractorID = self.additionalArguments["contractor"][0]
+        relevantGroups = [groupIdx for groupIdx in range(len(content)) if groupIdx in self.additionalArguments["contractor"][2]]
+        organizationParameters = {key: value for key, value in self.detailedCalculations.items() if key != ServiceDetails.groups.value}
+        printersPerGroup = {groupIdx: self.filterObject.getPrintersOfAContractor(contractorID, groupIdx) for groupIdx in relevantGroups}
+        cacheKey = getCostsCacheKey(content, contractorID, relevantGroups, organizationParameters, printersPerGroup, versionsOfNodes)
+        return "" if isinstance(cacheKey, Exception) else cacheKey
+
     ####################################################################################################
     def getEncryptedCostOverview(self) -> str:
         """
@@ -804,6 +1300,50 @@ class Costs():
         return encryptObjectWithAES(settings.AES_ENCRYPTION_KEY,self.detailedCalculations)
     
 
+##################################################
+def preloadInputsForCosts(process:ProcessInterface|Process, contractors:list, organizations:dict, filterObject:FilterAM) -> dict|Exception:
+    """
+    Fetch everything from the database that Costs needs, so that the costs of many contractors can be calculated in parallel
+
+    :param process: The process
+    :type process: ProcessInterface|Process
+    :param contractors: The contractors as returned by FilterAM.getFilteredContractors
+    :type contractors: list
+    :param organizations: The profiles of the contractors for every contractor ID
+    :type organizations: dict
+    :param filterObject: The filter that found the contractors
+    :type filterObject: FilterAM
+    :return: Inputs for every contractor ID, to be given to Costs as additionalArguments["preloaded"]
+    :rtype: dict|Exception
+    """
+    try:
+        printerIDs = set()
+        for printersOfGroup in filterObject.printerGroups:
+            for printers in printersOfGroup.values():
+                printerIDs.update(printer[pgKG.NodeDescription.nodeID] for printer in printers)
+        technologies = pgKG.LogicAM.getTechnologiesOfPrinters(list(printerIDs))
+        if isinstance(technologies, Exception):
+            raise technologies
+        # the cache keys of all contractors need the versions of these printers and the materials, one query for all
+        groups = process.serviceDetails[ServiceDetails.groups.value]
+        versionsOfNodes = pgKG.Basics.getVersionsOfNodes(list(printerIDs | getNodesOfCostsCacheKey(groups, range(len(groups)), {})))
+        if isinstance(versionsOfNodes, Exception):
+            raise versionsOfNodes
+
+        outDict = {}
+        for contractor in contractors:
+            organization = organizations[contractor[0]]
+            if isinstance(organization, Exception):
+                continue # fails again in the worker
+            preloaded = {"organization": organization, "technologies": technologies}
+            costsObject = Costs(process, {"contractor": contractor, "preloaded": preloaded}, filterObject)
+            preloaded["cacheKey"] = costsObject.getCacheKey(groups, versionsOfNodes)
+            outDict[contractor[0]] = preloaded
+        return outDict
+    except Exception as e:
+        loggerError.error("Error in preloadInputsForCosts: " + str(e))
+        return e
+
 ##################################################
 def logicForCosts(apiGivenValues:dict={}) -> dict|Exception:
     """
@@ -6,93 +6,268 @@ Silvio Weging 2025
 Contains: Logic for FEM analysis
 """
 import logging
-from multiprocessing import Process as MPProcess, Queue as MPQueue
 
 from Generic_Backend.code_General.definitions import FileObjectContent
 from Generic_Backend.code_General.utilities.basics import checkIfNestedKeyExists
 
-from code_SemperKI.logics.filesLogics import getFileReadableStream
+from code_SemperKI.connections.content.manageContent import ManageContent
 from code_SemperKI.modelFiles.nodesModel import NodeDescription, NodePropertiesTypesOfEntries, NodePropertyDescription
-from code_SemperKI.modelFiles.processModel import Process
+from code_SemperKI.modelFiles.processModel import Process, ProcessInterface
 from code_SemperKI.definitions import ProcessDetails
 
-from ..tasks.femSimulationTask import run_FEM_test
+from code_SemperKI.modelFiles.taskModel import BackgroundTask
+
+from ..tasks.femJobs import submitFEMJob, getFEMJobTask, cancelFEMJob, femJobOfTask
 from ..definitions import *
 
 loggerError = logging.getLogger("errors")
+
+##################################################
+def getMaterialForFEM(group:dict) -> dict|None:
+    """
+    Collect the properties of the material of a group that the simulation needs
+
+    :param group: The group of the service details
+    :type group: dict
+    :return: The material as needed by run_FEM_test, None if something is missing
+    :rtype: dict|None
+    """
+    poissonRatio = -1
+    youngsModulus = -1
+    yieldingStress = -1
+    elongationAtBreak = -1
+    if MaterialDetails.propList in group[ServiceDetails.material]:
+        for prop in group[ServiceDetails.material][MaterialDetails.propList]:
+            if prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.poissonRatio:
+                poissonRatio = float(prop[NodePropertyDescription.value])
+            elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.tensileModulus:
+                youngsModulus = float(prop[NodePropertyDescription.value]) * 1000000000 # Convert to Pa from GPa
+            elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.ultimateTensileStrength:
+                yieldingStress = float(prop[NodePropertyDescription.value]) * 1000000 # Convert to Pa from MPa
+            elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.elongationAtBreak:
+                elongationAtBreak = float(prop[NodePropertyDescription.value])
+    if poissonRatio == -1 or youngsModulus == -1 or yieldingStress == -1 or elongationAtBreak == -1:
+        return None
+    return {"Youngs Modulus": youngsModulus, "Poisson Ratio": poissonRatio, "Yielding Stress": yieldingStress, "Elon_at_break": elongationAtBreak}
+
+##################################################
+def submitFEMAnalysis(session, projectID:str, processObj:Process|ProcessInterface) -> tuple[list[dict], dict]:
+    """
+    Put the FEM Analysis of all eligable models in the queue, the models are fetched when the jobs run
+
+    :param session: The session of the user
+    :type session: Django session object
+    :param projectID: The project the process belongs to
+    :type projectID: str
+    :param processObj: The process
+    :type processObj: Process|ProcessInterface
+    :return: The jobs as given by FEMJobDetails and the models that couldn't be analysed, ordered by group
+    :rtype: tuple[list[dict], dict]
+    """
+    jobs = []
+    resultDict = {ServiceDetails.groups: []}
+    for groupIdx, group in enumerate(processObj.serviceDetails[ServiceDetails.groups]):
+        groupResult = {"groupID": groupIdx, "models": []}
+        # if material has all specifications, the simulation can start for each model
+        material = getMaterialForFEM(group)
+        for modelID in group[ServiceDetails.models]:
+            model = group[ServiceDetails.models][modelID]
+            if FileContentsAM.femRequested not in model or not model[FileContentsAM.femRequested]:
+                continue
+            if material is None:
+                groupResult["models"].append({"name": model[FileObjectContent.fileName], "type": "MATERIAL"})
+                continue
+            testType = model[FileContentsAM.testType] if FileContentsAM.testType in model else "elongation"
+            pressure = model[FileContentsAM.pressure] * 1000000 if FileContentsAM.pressure in model else 0 # convert to Pa
+            fromRepo = FileObjectContent.deleteFromStorage in model and model[FileObjectContent.deleteFromStorage] is False
+            femJob = submitFEMJob(projectID, processObj.processID, groupIdx, modelID, model[FileObjectContent.fileName], fromRepo, material, pressure, testType, session)
+            if isinstance(femJob, Exception):
+                raise femJob
+            jobs.append(femJob)
+        if groupResult["models"] != []:
+            resultDict[ServiceDetails.groups].append(groupResult)
+    return jobs, resultDict
+
+##################################################
+def getStateOfFEMJob(processObj:Process, jobID:str) -> dict|None:
+    """
+    The job as written into its model if it's over there, else as given by its task, e.g. if the model shows another job by now
+
+    :param processObj: The process, freshly loaded
+    :type processObj: Process
+    :param jobID: The ID of the job
+    :type jobID: str
+    :return: The job as given by FEMJobDetails, None if neither is there anymore
+    :rtype: dict|None
+    """
+    femJobOfModel = None
+    for group in processObj.serviceDetails.get(ServiceDetails.groups, []):
+        for model in group.get(ServiceDetails.models, {}).values():
+            femJob = model.get(FileContentsAM.femJob, {})
+            if femJob.get(FEMJobDetails.jobID) == jobID:
+                femJobOfModel = femJob
+    if femJobOfModel is not None and femJobOfModel[FEMJobDetails.status] not in (FEMJobStatus.queued, FEMJobStatus.running):
+        return femJobOfModel
+    task = BackgroundTask.objects.filter(taskID=int(jobID)).first()
+    return femJobOfTask(task) if task is not None else femJobOfModel
+
+##################################################
+def collectFEMResults(processObj:Process, jobIDs:list[str], groups:list[dict]) -> list[dict]|None:
+    """
+    Add the results of the analyses started by submitFEMAnalysis to those of the models that couldn't be analysed.
+    The model is written before the task calls continueVerification, so a job that is over can be seen there first.
+
+    :param processObj: The process, freshly loaded
+    :type processObj: Process
+    :param jobIDs: The IDs of the jobs
+    :type jobIDs: list[str]
+    :param groups: The models that couldn't be analysed, as returned by submitFEMAnalysis
+    :type groups: list[dict]
+    :return: The failed models ordered by group, None as long as a job is queued or running
+    :rtype: list[dict]|None
+    """
+    groups = [{"groupID": entry["groupID"], "models": list(entry["models"])} for entry in groups]
+    for jobID in jobIDs:
+        femJob = getStateOfFEMJob(processObj, jobID)
+        if femJob is None:
+            continue # the model and the task are gone
+        if femJob[FEMJobDetails.status] in (FEMJobStatus.queued, FEMJobStatus.running):
+            return None
+        if femJob[FEMJobDetails.result] == {}:
+            continue
+        groupResult = None
+        for entry in groups:
+            if entry["groupID"] == femJob[FEMJobDetails.groupID]:
+                groupResult = entry
+                break
+        if groupResult is None:
+            groupResult = {"groupID": femJob[FEMJobDetails.groupID], "models": []}
+            groups.append(groupResult)
+        groupResult["models"].append(femJob[FEMJobDetails.result])
+    groups.sort(key=lambda entry: entry["groupID"])
+    return groups
+
+##################################################
+def getProcessForFEMJobs(request, functionName:str, projectID:str, processID:str) -> tuple[Process|ProcessInterface|Exception, int]:
+    """
+    Look up a process if the user may call the function and see the process
+
+    :param request: The request
+    :type request: HTTP Request
+    :param functionName: The name of the function
+    :type functionName: str
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :return: The process or an exception, and status code
+    :rtype: tuple[Process|ProcessInterface|Exception, int]
+
+    """
+    contentManager = ManageContent(request.session)
+    interface = contentManager.getCorrectInterface(functionName)
+    if interface == None:
+        return (Exception(f"Rights not sufficient in {functionName}"), 401)
+    if not contentManager.checkRightsForProcess(processID):
+        return (Exception(f"Not allowed to see process in {functionName}"), 401)
+    process = interface.getProcessObj(projectID, processID)
+    if isinstance(process, Exception) or process is None:
+        return (Exception(f"process not found in {functionName}"), 404)
+    return (process, 200)
+
+##################################################
+def logicForStartFEMJobs(request, functionName:str, projectID:str, processID:str) -> tuple[dict|Exception, int]:
+    """
+    Start the FEM analysis of all models of a process that asked for it, without waiting for it
+
+    :param request: POST Request
+    :type request: HTTP POST
+    :param functionName: The name of the function
+    :type functionName: str
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :return: The jobs and the models that couldn't be analysed or an exception, and status code
+    :rtype: tuple[dict|Exception, int]
+
+    """
+    try:
+        process, statusCode = getProcessForFEMJobs(request, functionName, projectID, processID)
+        if isinstance(process, Exception):
+            return (process, statusCode)
+
+        jobs, resultDict = submitFEMAnalysis(request.session, projectID, process)
+        return ({"jobs": jobs, ServiceDetails.groups.value: resultDict[ServiceDetails.groups]}, 200)
+    except Exception as e:
+        return (e, 500)
+
+##################################################
+def getFEMJobOfProcess(request, functionName:str, projectID:str, processID:str, jobID:str) -> tuple[BackgroundTask|Exception, int]:
+    """
+    Look up the task of a job if the user may see the process it belongs to
+
+    """
+    process, statusCode = getProcessForFEMJobs(request, functionName, projectID, processID)
+    if isinstance(process, Exception):
+        return (process, statusCode)
+    task = getFEMJobTask(jobID, processID)
+    if task is None:
+        return (Exception(f"job not found in {functionName}"), 404)
+    return (task, 200)
+
 ##################################################
-def startFEMAnalysis(session, processObj:Process) -> dict|Exception: 
+def logicForGetFEMJob(request, functionName:str, projectID:str, processID:str, jobID:str) -> tuple[dict|Exception, int]:
     """
-    Start the FEM Analysis on eligable models and materials
-    
+    Get the state of a FEM job
+
+    :param request: GET Request
+    :type request: HTTP GET
+    :param functionName: The name of the function
+    :type functionName: str
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param jobID: The ID of the job
+    :type jobID: str
+    :return: The job as given by FEMJobDetails or an exception, and status code
+    :rtype: tuple[dict|Exception, int]
+
+    """
+    try:
+        task, statusCode = getFEMJobOfProcess(request, functionName, projectID, processID, jobID)
+        if isinstance(task, Exception):
+            return (task, statusCode)
+        return (femJobOfTask(task), 200)
+    except Exception as e:
+        return (e, 500)
+
+##################################################
+def logicForCancelFEMJob(request, functionName:str, projectID:str, processID:str, jobID:str) -> tuple[Exception|None, int]:
+    """
+    Cancel a FEM job, a running analysis is killed by the server it runs on
+
+    :param request: DELETE Request
+    :type request: HTTP DELETE
+    :param functionName: The name of the function
+    :type functionName: str
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param jobID: The ID of the job
+    :type jobID: str
+    :return: None or an exception, and status code
+    :rtype: tuple[Exception|None, int]
+
     """
     try:
-        resultDict = {ServiceDetails.groups: []}
-        for groupIdx, group in enumerate(processObj.serviceDetails[ServiceDetails.groups]):
-            groupResult = {"groupID": groupIdx, "models": []}
-            # if material has all specifications, the simulation can start for each model
-            materialOfProcess = group[ServiceDetails.material]
-            poissonRatio = -1
-            youngsModulus = -1
-            yieldingStress = -1
-            elongationAtBreak = -1
-            for prop in materialOfProcess[MaterialDetails.propList]:
-                if prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.poissonRatio:
-                    poissonRatio = float(prop[NodePropertyDescription.value])
-                elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.tensileModulus:
-                    youngsModulus = float(prop[NodePropertyDescription.value]) * 1000000000 # Convert to Pa from GPa
-                elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.ultimateTensileStrength:
-                    yieldingStress = float(prop[NodePropertyDescription.value]) * 1000000 # Convert to Pa from MPa
-                elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.elongationAtBreak:
-                    elongationAtBreak = float(prop[NodePropertyDescription.value])
-            material = {"Youngs Modulus": youngsModulus, "Poisson Ratio": poissonRatio, "Yielding Stress": yieldingStress, "Elon_at_break": elongationAtBreak}
-            for modelID in group[ServiceDetails.models]:
-                modelResult = {}
-                if FileContentsAM.femRequested not in group[ServiceDetails.models][modelID] or not group[ServiceDetails.models][modelID][FileContentsAM.femRequested]:
-                    continue
-                if poissonRatio == -1 or youngsModulus == -1 or yieldingStress == -1 or elongationAtBreak == -1:
-                    modelResult = {"name": group[ServiceDetails.models][modelID][FileObjectContent.fileName], "type": "MATERIAL"}
-                else:
-                    if FileContentsAM.testType in group[ServiceDetails.models][modelID]:
-                        testType = group[ServiceDetails.models][modelID][FileContentsAM.testType]
-                    else:
-                        testType = "elongation"
-                    if FileContentsAM.pressure in group[ServiceDetails.models][modelID]:
-                        pressure = group[ServiceDetails.models][modelID][FileContentsAM.pressure] * 1000000 # convert to Pa
-                    else:
-                        pressure = 0
-                    fromRepo = False
-                    if FileObjectContent.deleteFromStorage in group[ServiceDetails.models][modelID]:
-                        if group[ServiceDetails.models][modelID][FileObjectContent.deleteFromStorage] is False:
-                            fromRepo = True
-                    stlFile, successfulFetch = getFileReadableStream(session, "", processObj.processID, modelID, fromRepo)
-                    if successfulFetch:
-                        fileContent = stlFile.read(group[ServiceDetails.models][modelID][FileObjectContent.size])
-                        resultQueue = MPQueue()
-                        femProcess = MPProcess(target=run_FEM_test, args=(material, pressure, fileContent, processObj.processID + group[ServiceDetails.models][modelID][FileObjectContent.fileName], testType, resultQueue))
-                        femProcess.start()
-                        femProcess.join(7200)
-                        exitCode = femProcess.exitcode
-                        result = {}
-                        if not resultQueue.empty():
-                            result = resultQueue.get()
-                        femProcess.close()
-                        #result = run_FEM_test(material, pressure, fileContent, processObj.processID + group[ServiceDetails.models][modelID][FileObjectContent.fileName], testType, result)
-                        if exitCode != 0:
-                            modelResult = {"name": group[ServiceDetails.models][modelID][FileObjectContent.fileName], "type": "ERROR", "ssi": "Process terminated with exit code " + str(exitCode)}
-                        else:
-                            if "Error" in result:
-                                modelResult = {"name": group[ServiceDetails.models][modelID][FileObjectContent.fileName], "type": "ERROR", "ssi": result["Error"]}
-                            if "Plastische Verschiebung?" in result and result["Plastische Verschiebung?"]:
-                                modelResult = {"name": group[ServiceDetails.models][modelID][FileObjectContent.fileName], "type": "BREAKS"}
-                    else:
-                        modelResult = {"name": group[ServiceDetails.models][modelID][FileObjectContent.fileName], "type": "MODEL"}
-                if modelResult != {}:
-                    groupResult["models"].append(modelResult)
-            if groupResult["models"] != []:
-                resultDict[ServiceDetails.groups].append(groupResult)
-        return resultDict
+        task, statusCode = getFEMJobOfProcess(request, functionName, projectID, processID, jobID)
+        if isinstance(task, Exception):
+            return (task, statusCode)
+        if not cancelFEMJob(task, request.session):
+            return (Exception(f"job is already over in {functionName}"), 409)
+        return (None, 200)
     except Exception as e:
-        loggerError.error("Error in startFEMAnalysis: " + str(e))
-        return resultDict
-    
\ No newline at end of file
+        return (e, 500)
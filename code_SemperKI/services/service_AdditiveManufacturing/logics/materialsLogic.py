@@ -5,14 +5,11 @@ Silvio Weging 2024
 
 Contains: Logic for the materials
 """
-import logging, numpy
+import logging
 from datetime import datetime
 
-from django.utils import timezone
-
 from Generic_Backend.code_General.definitions import *
 from Generic_Backend.code_General.connections.postgresql import pgProfiles
-from Generic_Backend.code_General.connections.redis import RedisConnection
 
 from code_SemperKI.connections.content.manageContent import ManageContent
 from code_SemperKI.definitions import ProcessUpdates
@@ -21,94 +18,24 @@ from code_SemperKI.modelFiles.processModel import ProcessDescription
 from code_SemperKI.modelFiles.projectModel import ProjectDescription
 from code_SemperKI.connections.content.postgresql import pgKnowledgeGraph
 from code_SemperKI.services.service_AdditiveManufacturing.utilities import mocks
-from code_SemperKI.utilities.locales import manageTranslations
 
 from ..definitions import *
+from ..utilities.materialCatalogue import materialCatalogue, CatalogueEntry
 
 logger = logging.getLogger("logToFile")
 loggerError = logging.getLogger("errors")
 ####################################################################################
-def appendHelper(materialEntry:dict, materialsWithSameUID:list[dict], locale:str, materialPrices:dict, output:list):
-    """
-    Helper function to determine if an entry should be appended to the output list
-
-    :return: True if the entry should be appended, False otherwise
-    :rtype: bool
-    """
-    # prepare properties
-    imgPath = mocks.testPicture
-    for propIdx, prop in enumerate(materialEntry[pgKnowledgeGraph.NodeDescription.properties]):
-        if prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMMaterial.imgPath:
-            imgPath = prop[pgKnowledgeGraph.NodePropertyDescription.value]
-            del materialEntry[pgKnowledgeGraph.NodeDescription.properties][propIdx]
-        elif prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMMaterial.acquisitionCosts:
-            del materialEntry[pgKnowledgeGraph.NodeDescription.properties][propIdx] # info that the user doesn't need to know
-        elif prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMMaterial.printingSpeed:
-            del materialEntry[pgKnowledgeGraph.NodeDescription.properties][propIdx]
-        else:
-            # translate properties
-            materialEntry[pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,materialEntry[pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.key]])
-
-    # fetch colors of that material from organisations
-    colorsOfMaterial = []
-    setOfRALOrHex = set()
-    for mat in materialsWithSameUID:
-        if mat[pgKnowledgeGraph.NodeDescription.createdBy] != pgKnowledgeGraph.defaultOwner:
-            colorsOfMat = pgKnowledgeGraph.Basics.getSpecificNeighborsByType(mat[pgKnowledgeGraph.NodeDescription.nodeID], NodeTypesAM.color)
-            if isinstance(colorsOfMat, Exception):
-                raise colorsOfMat
-            for color in colorsOfMat:
-                if color[pgKnowledgeGraph.NodeDescription.active] is True:
-                    add = False
-                    for prop in color[pgKnowledgeGraph.NodeDescription.properties]:
-                        if prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMColor.colorRAL:
-                            if prop[pgKnowledgeGraph.NodePropertyDescription.value] not in setOfRALOrHex:
-                                setOfRALOrHex.add(prop[pgKnowledgeGraph.NodePropertyDescription.value])
-                                add = True
-                            else:
-                                add = False
-                        elif prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMColor.colorHEX:
-                            colorArray = prop[pgKnowledgeGraph.NodePropertyDescription.value].split(",")
-                            colorArray.sort() # sort to have always the same order
-                            colorString = ",".join(colorArray)
-                            if colorString not in setOfRALOrHex:
-                                setOfRALOrHex.add(colorString)
-                                add = True
-                            else:
-                                add = False
-                    if add:
-                        colorsOfMaterial.append(color)
-            
-    #colorsOfMaterial = pgKnowledgeGraph.Basics.getSpecificNeighborsByType(materialEntry[pgKnowledgeGraph.NodeDescription.nodeID], NodeTypesAM.color)
-    # maybe parse the content of the colorNodeArray
-    # sort out all inactive nodes
-    colors = []
-    for color in colorsOfMaterial:
-        if color[pgKnowledgeGraph.NodeDescription.active] is True:
-            for propIdx, prop in enumerate(color[pgKnowledgeGraph.NodeDescription.properties]):
-                if prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMMaterial.imgPath:
-                    del color[pgKnowledgeGraph.NodeDescription.properties][propIdx]
-                else:
-                    color[pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,color[pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.key]])
-            colors.append(color)
-
-    output["materials"].append({MaterialDetails.id: materialEntry[pgKnowledgeGraph.NodeDescription.nodeID], MaterialDetails.title: materialEntry[pgKnowledgeGraph.NodeDescription.nodeName], MaterialDetails.propList: materialEntry[pgKnowledgeGraph.NodeDescription.properties], MaterialDetails.imgPath: imgPath, MaterialDetails.medianPrice: materialPrices[materialEntry[pgKnowledgeGraph.NodeDescription.uniqueID]] if materialEntry[pgKnowledgeGraph.NodeDescription.uniqueID] in materialPrices else 0., MaterialDetails.colors: colors})
-    # TODO use translation here for nodeName
-    return None
-
-##################################################
-def filterHelper(filterEntry:dict, nodeEntry:dict, nodeProperty:str) -> bool:
+def filterHelper(filterEntry:dict, propertiesOfEntry:list[dict], nodeProperty:str) -> bool:
     """
     Helper function to filter the materials by a property
 
-    :return: None
-    :rtype: None
+    :return: False if the filter is about this property and the value is out of range, True otherwise
+    :rtype: bool
     """
     appendViaThisFilter = True
     if filterEntry["question"]["title"] == nodeProperty:
         if filterEntry["answer"] is not None:
             answerRange = [filterEntry["answer"]["value"]["min"], filterEntry["answer"]["value"]["max"]]
-            propertiesOfEntry = nodeEntry[pgKnowledgeGraph.NodeDescription.properties]
             for prop in propertiesOfEntry:
                 if prop[pgKnowledgeGraph.NodePropertyDescription.key] == nodeProperty:
                     if float(prop[pgKnowledgeGraph.NodePropertyDescription.value]) >= answerRange[0] and float(prop[pgKnowledgeGraph.NodePropertyDescription.value]) <= answerRange[1]:
@@ -142,132 +69,60 @@ def logicForRetrieveMaterialWithFilter(filters, locale:str) -> tuple[dict|Except
         
         # TODO filter by selection of post-processing
 
-        # calculate median price if not found in redis or date is too old
-        redisConn = RedisConnection()
-        redisContentMedianMaterialPrices = redisConn.retrieveContentJSON("medianMaterialPrices")
-        redisContentMedianMaterialPricesDate = redisConn.retrieveContent("medianMaterialPricesDate")
-        if redisContentMedianMaterialPrices[1] is False or redisContentMedianMaterialPricesDate[1] is False or (timezone.now() - datetime.fromisoformat(redisContentMedianMaterialPricesDate[0])).days > 1:
-            materialPrices = {}
-            listOfAllMaterialNodes = pgKnowledgeGraph.Basics.getNodesByType(NodeTypesAM.material)
-            for materialNode in listOfAllMaterialNodes:
-                if materialNode[pgKnowledgeGraph.NodeDescription.createdBy] != pgKnowledgeGraph.defaultOwner:
-                    for propertyValue in materialNode[pgKnowledgeGraph.NodeDescription.properties]:
-                        if NodePropertiesAMMaterial.acquisitionCosts == propertyValue[pgKnowledgeGraph.NodePropertyDescription.key]:
-                            if materialNode[pgKnowledgeGraph.NodeDescription.uniqueID] in materialPrices:
-                                materialPrices[materialNode[pgKnowledgeGraph.NodeDescription.uniqueID]].append(float(propertyValue[pgKnowledgeGraph.NodePropertyDescription.value]))
-                            else:
-                                materialPrices[materialNode[pgKnowledgeGraph.NodeDescription.uniqueID]] = [float(propertyValue[pgKnowledgeGraph.NodePropertyDescription.value])]
-                
-            for key in materialPrices:
-                materialPrices[key] = numpy.median(materialPrices[key])
-            redisConn.addContentJSON("medianMaterialPrices", materialPrices)
-            redisConn.addContent("medianMaterialPricesDate", timezone.now().isoformat())
-        # else: take value from redis
-        else:
-            materialPrices = redisContentMedianMaterialPrices[0]
+        # all materials in use with colors and median prices, already sorted by price
+        catalogue = materialCatalogue.getCatalogue(locale)
+        if isinstance(catalogue, Exception):
+            raise catalogue
 
         # look for generic filters before filtering the materials for properties
-        materialList = []
-        typesAreFiltered = -1
-        categoriesAreFiltered = -1
-        for filterIdx, filterEntry in enumerate(filters["filters"]):
+        requiredNeighbors = []
+        for filterEntry in filters["filters"]:
             # see if filter is selected
-            if filterEntry["isChecked"] is True:
-                # filter for material type
-                if filterEntry["question"]["title"] == FilterCategories.materialType.value:
-                    if filterEntry["answer"] is not None:
-                        typesAreFiltered = filterIdx
-                        
-                # filter for material category
-                if filterEntry["question"]["title"] == FilterCategories.materialCategory.value:
-                    if filterEntry["answer"] is not None:
-                        categoriesAreFiltered = filterIdx
-        
-        # apply generic filters
-        if typesAreFiltered != -1:
-            # materialType is the strictest filter, apply this first
-            typeID = filters["filters"][typesAreFiltered]["answer"]["value"] # contains the id of the chosen type node
-            typesOfEntry = pgKnowledgeGraph.Basics.getSpecificNeighborsByType(typeID, NodeTypesAM.material) # get materials
-            if isinstance(typesOfEntry, Exception):
-                raise typesOfEntry
-            if categoriesAreFiltered != -1:
-                # if the category is also filtered, apply this filter as well
-                categoryID = filters["filters"][categoriesAreFiltered]["answer"]["value"] # contains the id of the chosen category node
-                for materialNode in typesOfEntry:
-                    result = pgKnowledgeGraph.Basics.getIfEdgeExists(materialNode[pgKnowledgeGraph.NodeDescription.nodeID], categoryID)
-                    if isinstance(result, Exception):
-                        raise result
-                    if result:
-                        materialList.append(materialNode)
-            else:
-                materialList = typesOfEntry
-        elif categoriesAreFiltered != -1:
-            # if only the category is filtered, apply this filter
-            categoryID = filters["filters"][categoriesAreFiltered]["answer"]["value"]
-            materialList = pgKnowledgeGraph.Basics.getSpecificNeighborsByType(categoryID, NodeTypesAM.material)
-        else:
-            materialList = pgKnowledgeGraph.Basics.getNodesByType(NodeTypesAM.material)
+            if filterEntry["isChecked"] is True and filterEntry["answer"] is not None:
+                # filter for material type and category, contain the id of the chosen node
+                if filterEntry["question"]["title"] == FilterCategories.materialType.value or filterEntry["question"]["title"] == FilterCategories.materialCategory.value:
+                    requiredNeighbors.append(filterEntry["answer"]["value"])
         
-        for entry in materialList:
-            # use only entries from system
-            if entry[pgKnowledgeGraph.NodeDescription.createdBy] == pgKnowledgeGraph.defaultOwner and entry[pgKnowledgeGraph.NodeDescription.active] is True:
-                # sort out those that have no active organisation clones
-                materialsWithSameUID = pgKnowledgeGraph.Basics.getAllNodesThatShareTheUniqueID(entry[pgKnowledgeGraph.NodeDescription.uniqueID])
-                if isinstance(materialsWithSameUID, Exception):
-                    raise materialsWithSameUID
-                # sort out those that have no connection to an organization (and are therefore not in use)
-                if len(materialsWithSameUID) == 1:
-                    continue
-                active = False
-                for mat in materialsWithSameUID:
-                    if mat[pgKnowledgeGraph.NodeDescription.active] is True:
-                        active = True
-                        break
-                if not active:
+        for entry in catalogue:
+            # apply generic filters
+            if any(neighborID not in entry[CatalogueEntry.neighbors] for neighborID in requiredNeighbors):
+                continue
+            material = entry[CatalogueEntry.material]
+            
+            # adhere to the filters:
+            append = True
+            for filterEntry in filters["filters"]:
+                # skip the category and type filters
+                if filterEntry["question"]["title"] == FilterCategories.materialType.value or filterEntry["question"]["title"] == FilterCategories.materialCategory.value:
                     continue
                 
-                # adhere to the filters:
-                append = True
-                for filterEntry in filters["filters"]:
-                    # skip the category and type filters
-                    if filterEntry["question"]["title"] == FilterCategories.materialType.value or filterEntry["question"]["title"] == FilterCategories.materialCategory.value:
-                        continue
+                # see if filter is selected and the value has not been ruled out somewhere
+                if filterEntry["isChecked"] is True and append is True:
                     
-                    # see if filter is selected and the value has not been ruled out somewhere
-                    if filterEntry["isChecked"] is True and append is True:
-                        
-                        # filter for material tensile strenght
-                        append = filterHelper(filterEntry, entry, NodePropertiesAMMaterial.ultimateTensileStrength)
-                        
-                        # filter for material density
-                        append = filterHelper(filterEntry, entry, NodePropertiesAMMaterial.density)
-                        
-                        # filter for material elongation at break
-                        append = filterHelper(filterEntry, entry, NodePropertiesAMMaterial.elongationAtBreak)
-                        
-                        # filter for material certificates
-                        if filterEntry["question"]["title"] == FilterCategories.certificates.value:
-                            appendViaThisFilter = False
-                            if filterEntry["answer"] is not None:
-                                certificates = filterEntry["answer"]["value"]
-                                propertiesOfEntry = entry[pgKnowledgeGraph.NodeDescription.properties]
-                                for prop in propertiesOfEntry:
-                                    if prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMMaterial.certificates:
-                                        propValues = prop[pgKnowledgeGraph.NodePropertyDescription.value].split(",")
-                                        for cert in certificates:
-                                            if cert in propValues:
-                                                appendViaThisFilter = True
-                                            else:
-                                                appendViaThisFilter = False
-                                                break
-                                        break
-
-                                append = appendViaThisFilter
-
-                if append:
-                    appendHelper(entry, materialsWithSameUID, locale, materialPrices, output)
-        # sort by price
-        output["materials"] = sorted(output["materials"], key=lambda x: x["medianPrice"])
+                    # filter for material tensile strenght, density and elongation at break
+                    for nodeProperty in [NodePropertiesAMMaterial.ultimateTensileStrength, NodePropertiesAMMaterial.density, NodePropertiesAMMaterial.elongationAtBreak]:
+                        append = append and filterHelper(filterEntry, material[MaterialDetails.propList], nodeProperty)
+                    
+                    # filter for material certificates
+                    if filterEntry["question"]["title"] == FilterCategories.certificates.value:
+                        appendViaThisFilter = False
+                        if filterEntry["answer"] is not None:
+                            certificates = filterEntry["answer"]["value"]
+                            for prop in material[MaterialDetails.propList]:
+                                if prop[pgKnowledgeGraph.NodePropertyDescription.key] == NodePropertiesAMMaterial.certificates:
+                                    propValues = prop[pgKnowledgeGraph.NodePropertyDescription.value].split(",")
+                                    for cert in certificates:
+                                        if cert in propValues:
+                                            appendViaThisFilter = True
+                                        else:
+                                            appendViaThisFilter = False
+                                            break
+                                    break
+
+                        append = appendViaThisFilter
+
+            if append:
+                output["materials"].append(material)
 
         # mockup here:
         #mock = copy.deepcopy(mocks.materialMock)
@@ -8,8 +8,6 @@ Contains: Logics for model handling
 """
 
 import logging, json, os, requests
-import numpy as np
-from stl import mesh
 from io import BytesIO
 
 from datetime import datetime
@@ -24,6 +22,7 @@ from Generic_Backend.code_General.definitions import *
 from Generic_Backend.code_General.utilities import crypto
 from Generic_Backend.code_General.connections import s3
 from Generic_Backend.code_General.utilities.crypto import EncryptionAdapter
+from Generic_Backend.code_General.utilities.basics import manualCheckifLoggedIn
 from Generic_Backend.code_General.connections.redis import RedisConnection
 
 from code_SemperKI.connections.content.manageContent import ManageContent
@@ -32,10 +31,12 @@ from code_SemperKI.logics.processLogics import updateProcessFunction
 from code_SemperKI.utilities.basics import previewNotAvailable, previewNotAvailableGER
 from code_SemperKI.logics.filesLogics import logicForDeleteFile, getFileReadableStream, getFileViaPath
 from code_SemperKI.logics.processLogics import updateProcessFunction
-from code_SemperKI.utilities.filePreview import createAndStorePreview
+from code_SemperKI.utilities.filePreview import createAndStorePreview, getPlaceholderPreview
+from code_SemperKI.tasks.previewTasks import submitPreviews, PreviewJob
 
 from ..definitions import *
 from ..utilities.stpToStl import transformSTPtoSTL
+from ..utilities.stlAnalysis import analyzeSTL
 
 logger = logging.getLogger("logToFile")
 loggerError = logging.getLogger("errors")
@@ -57,6 +58,7 @@ def createModel(model:dict, content:dict) -> None:
     model[FileObjectContent.path] = content[FileObjectContent.path]
     model[FileObjectContent.fileName] = content[FileObjectContent.fileName]
     model[FileObjectContent.imgPath] = content[FileObjectContent.imgPath]
+    model[FileContentsSemperKI.previewStatus] = content[FileContentsSemperKI.previewStatus] if FileContentsSemperKI.previewStatus in content else PreviewStatus.failed
     model[FileObjectContent.tags] = content[FileObjectContent.tags]
     model[FileObjectContent.licenses] = content[FileObjectContent.licenses]
     model[FileObjectContent.certificates] = content[FileObjectContent.certificates]
@@ -204,6 +206,7 @@ def logicForUploadModel(validatedInput:dict, request) -> tuple[Exception, int]:
 
         modelsToBeSaved = {}
         calculationsToBeSaved = {}
+        previews = []
         for fileName in modelNames:
             # rename duplicates
             counterForFileName = 1
@@ -252,10 +255,21 @@ def logicForUploadModel(validatedInput:dict, request) -> tuple[Exception, int]:
 
                 # create preview
                 previewPath = ""
+                previewStatus = PreviewStatus.failed
+                previewPending = False
                 if settings.S3_SECRET_ACCESS_KEY != "":
-                    previewPath = createAndStorePreview(model, nameOfFile, locale, filePath)
-                    if isinstance(previewPath, Exception):
-                        return (previewPath, 500)
+                    if manualCheckifLoggedIn(request.session):
+                        # rendered in the background once the model is part of the process
+                        previewPending = True
+                        previews.append(PreviewJob(fileID, nameOfFile, fileID, locale))
+                        previewPath = getPlaceholderPreview(locale)
+                        previewStatus = PreviewStatus.pending
+                    else:
+                        # nothing outside of this request can change a process that only lives in the session
+                        previewPath = createAndStorePreview(model, nameOfFile, locale, filePath)
+                        if isinstance(previewPath, Exception):
+                            return (previewPath, 500)
+                        previewStatus = PreviewStatus.failed if previewPath == getPlaceholderPreview(locale) else PreviewStatus.ready
                 
                 modelsToBeSaved[fileID] = {}
                 createModel(modelsToBeSaved[fileID], {
@@ -263,6 +277,7 @@ def logicForUploadModel(validatedInput:dict, request) -> tuple[Exception, int]:
                     FileObjectContent.path: filePath,
                     FileObjectContent.fileName: nameOfFile,
                     FileObjectContent.imgPath: previewPath,
+                    FileContentsSemperKI.previewStatus: previewStatus,
                     FileObjectContent.tags: details["tags"],
                     FileObjectContent.licenses: details["licenses"],
                     FileObjectContent.certificates: details["certificates"],
@@ -311,12 +326,17 @@ def logicForUploadModel(validatedInput:dict, request) -> tuple[Exception, int]:
                     stpFileID = crypto.generateURLFriendlyRandomString()
                     filePathSTPFile = projectID+"/"+processID+"/"+stpFileID
                     
+                    if previewPending:
+                        # rendered from the model, so it's rendered only once
+                        previews.append(PreviewJob(stpFileID, nameOfFile, fileID, locale))
+
                     stpFile = {}
                     createModel(stpFile, {
                         FileObjectContent.id: stpFileID,
                         FileObjectContent.path: filePathSTPFile,
                         FileObjectContent.fileName: originalName,
                         FileObjectContent.imgPath: previewPath,
+                        FileContentsSemperKI.previewStatus: previewStatus,
                         FileObjectContent.tags: details["tags"],
                         FileObjectContent.licenses: details["licenses"],
                         FileObjectContent.certificates: details["certificates"],
@@ -371,6 +391,8 @@ def logicForUploadModel(validatedInput:dict, request) -> tuple[Exception, int]:
             return (Exception("Rights not sufficient for uploadModels"), 401)
         if isinstance(message, Exception):
             return (message, 500)
+
+        submitPreviews(projectID, processID, previews, request.session)
         
         logger.info(f"{Logging.Subject.USER},{userName},{Logging.Predicate.CREATED},uploaded,{Logging.Object.OBJECT},models,"+str(datetime.now()))
         return None, 200
@@ -794,7 +816,7 @@ def getBoundaryData(readableObject, fileName:str = "ein-dateiname.stl") -> dict:
 ##################################################
 def calculateBoundaryData(readableObject:EncryptionAdapter, fileName:str, fileSize:int, scalingFactor:float) -> dict:
     """
-    Calculate some of the stuff ourselves
+    Calculate some of the stuff ourselves, the file is read chunk by chunk and never held completely
 
     :param readableObject: The model to be sent to the service with a .read() method
     :type readableObject: EncryptionAdapter
@@ -807,18 +829,12 @@ def calculateBoundaryData(readableObject:EncryptionAdapter, fileName:str, fileSi
     
     """
     try:
-        completeFile = readableObject.read(fileSize)
-        fileAsBytesObject = BytesIO(completeFile)
-        your_mesh = mesh.Mesh.from_file(fileName, fh=fileAsBytesObject)
-        volume, _, _ = your_mesh.get_mass_properties()
-    
-        # Calculate the surface area by summing up the area of all triangles
-        surface_area = np.sum(your_mesh.areas)
-        
-        # Calculate the bounding box
-        min_bound = np.min(your_mesh.points.reshape(-1, 3), axis=0)
-        max_bound = np.max(your_mesh.points.reshape(-1, 3), axis=0)
-        bounding_box = max_bound - min_bound
+        geometry = analyzeSTL(readableObject, fileSize)
+        if isinstance(geometry, Exception):
+            raise geometry
+        volume = geometry.volume
+        surface_area = geometry.surfaceArea
+        bounding_box = geometry.boundingBox
         volumeBB = bounding_box[0]*bounding_box[1]*bounding_box[2]
         scalingFactorTimesThree = scalingFactor*scalingFactor*scalingFactor
 
@@ -65,9 +65,8 @@ def logicForGetResources(request:Request, resourceType:str) -> tuple[list[dict]|
             raise result
         
         locale = ProfileManagementOrganization.getUserLocale(request.session)
-        for elemIdx, elem in enumerate(result):
-            for propIdx, prop in enumerate(elem[pgKnowledgeGraph.NodeDescription.properties]):
-                result[elemIdx][pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        for elem in result:
+            manageTranslations.translateProperties(locale, elem[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
         logger.info(f"{Logging.Subject.ADMIN},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},nodes of type {resourceType}," + str(datetime.now()))
         return result, 200
@@ -88,8 +87,7 @@ def logicForGetNodeViaID(request:Request, nodeID:str) -> tuple[dict|Exception, i
 
         locale = ProfileManagementOrganization.getUserLocale(request.session)
         nodeDict = nodeInfo.toDict()
-        for propIdx, prop in enumerate(nodeDict[pgKnowledgeGraph.NodeDescription.properties]):
-            nodeDict[pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        manageTranslations.translateProperties(locale, nodeDict[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
         logger.info(f"{Logging.Subject.ADMIN},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},node {nodeID}," + str(datetime.now()))
         return nodeDict, 200
@@ -129,9 +127,8 @@ def logicForGetAssociatedResources(request:Request, nodeID:str, resourceType:str
             raise result
         
         locale = ProfileManagementOrganization.getUserLocale(request.session)
-        for elemIdx, elem in enumerate(result):
-            for propIdx, prop in enumerate(elem[pgKnowledgeGraph.NodeDescription.properties]):
-                result[elemIdx][pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        for elem in result:
+            manageTranslations.translateProperties(locale, elem[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
         
         logger.info(f"{Logging.Subject.ADMIN},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},neighbor nodes of {nodeID} of type {resourceType}," + str(datetime.now()))
@@ -154,9 +151,8 @@ def logicForGetNeighbors(request:Request, nodeID:str):
         # remove nodes not belonging to the system
         filteredOutput = [entry for entry in result if entry[pgKnowledgeGraph.NodeDescription.createdBy] == pgKnowledgeGraph.defaultOwner]
         locale = ProfileManagementOrganization.getUserLocale(request.session)
-        for elemIdx, elem in enumerate(filteredOutput):
-            for propIdx, prop in enumerate(elem[pgKnowledgeGraph.NodeDescription.properties]):
-                filteredOutput[elemIdx][pgKnowledgeGraph.NodeDescription.properties][propIdx][pgKnowledgeGraph.NodePropertyDescription.name] = manageTranslations.getTranslation(locale, ["service",SERVICE_NAME,prop[pgKnowledgeGraph.NodePropertyDescription.key]])
+        for elem in filteredOutput:
+            manageTranslations.translateProperties(locale, elem[pgKnowledgeGraph.NodeDescription.properties], ["service",SERVICE_NAME])
 
         logger.info(f"{Logging.Subject.ADMIN},{ProfileManagementBase.getUserName(request.session)},{Logging.Predicate.FETCHED},fetched,{Logging.Object.OBJECT},neighboring nodes of node {nodeID}," + str(datetime.now()))
         return filteredOutput, 200
@@ -0,0 +1,84 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Model for the materialized capabilities of the contractors
+"""
+
+import enum
+from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+
+from Generic_Backend.code_General.utilities.customStrEnum import StrEnumExactlyAsDefined
+
+##################################################
+class ContractorCapabilityDescription(StrEnumExactlyAsDefined):
+    """
+    What does the capability table consists of?
+
+    """
+    organizationID = enum.auto()
+    materialUniqueID = enum.auto()
+    materialID = enum.auto()
+    printerID = enum.auto()
+    colorUniqueIDs = enum.auto()
+    postProcessingUniqueIDs = enum.auto()
+    verifiedMaterialIDs = enum.auto()
+    updatedWhen = enum.auto()
+
+##################################################
+class ContractorCapability(models.Model):
+    """
+    What an organization can do with one of its materials, one row per printer that is linked to the material.
+    Derived from the knowledge graph and the verifications and rebuilt for an organization whenever one of them changes,
+    so that the filter for contractors doesn't have to walk the graph.
+
+    :organizationID: The organization that owns the material
+    :materialUniqueID: The unique ID of the material, shared with the node it was cloned from
+    :materialID: The node ID of the material of the organization
+    :printerID: A printer linked to the material, empty if there is none
+    :colorUniqueIDs: Unique IDs of the active colors of the organization that are linked to the material
+    :postProcessingUniqueIDs: Unique IDs of all post-processings of the organization
+    :verifiedMaterialIDs: Material IDs for which the combination of organization and printer is verified
+    :updatedWhen: When the row was built
+    """
+    organizationID = models.CharField(max_length=513)
+    materialUniqueID = models.CharField(max_length=513)
+    materialID = models.CharField(max_length=513)
+    printerID = models.CharField(max_length=513, blank=True, default="")
+    colorUniqueIDs = ArrayField(models.CharField(max_length=513), default=list)
+    postProcessingUniqueIDs = ArrayField(models.CharField(max_length=513), default=list)
+    verifiedMaterialIDs = ArrayField(models.CharField(max_length=512), default=list)
+    updatedWhen = models.DateTimeField(auto_now=True)
+
+    ###################################################
+    class Meta:
+        indexes = [
+            models.Index(fields=["materialUniqueID"], name="capability_material_idx"),
+            models.Index(fields=["organizationID"], name="capability_orga_idx"),
+            models.Index(fields=["printerID"], name="capability_printer_idx"),
+            GinIndex(fields=["postProcessingUniqueIDs"], name="capability_postproc_gin_idx")
+        ]
+
+    ###################################################
+    def __str__(self):
+        return self.organizationID + " - " + self.materialUniqueID + " - " + self.materialID + " - " + self.printerID
+
+    ###################################################
+    def toDict(self):
+        """
+        Dict representation of the capability
+
+        """
+        return {
+            ContractorCapabilityDescription.organizationID: self.organizationID,
+            ContractorCapabilityDescription.materialUniqueID: self.materialUniqueID,
+            ContractorCapabilityDescription.materialID: self.materialID,
+            ContractorCapabilityDescription.printerID: self.printerID,
+            ContractorCapabilityDescription.colorUniqueIDs: self.colorUniqueIDs,
+            ContractorCapabilityDescription.postProcessingUniqueIDs: self.postProcessingUniqueIDs,
+            ContractorCapabilityDescription.verifiedMaterialIDs: self.verifiedMaterialIDs,
+            ContractorCapabilityDescription.updatedWhen: str(self.updatedWhen)
+        }
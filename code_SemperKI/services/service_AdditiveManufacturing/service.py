@@ -15,9 +15,9 @@ from code_SemperKI.utilities.basics import staticMediaContentForSemperKI
 from .connections.postgresql.pgService import initializeService as AM_initializeService, parseServiceDetails as AM_parseServiceDetails, updateServiceDetails as AM_updateServiceDetails, deleteServiceDetails as AM_deleteServiceDetails, isFileRelevantForService as AM_isFileRelevantForService, serviceReady as AM_serviceIsReady, cloneServiceDetails as AM_cloneServiceDetails, getSearchableDetails as AM_getSearchableDetails
 from .logics.checkServiceLogic import checkIfSelectionIsAvailable as AM_checkIfSelectionIsAvailable
 from .connections.filterViaSparql import *
-from .definitions import SERVICE_NAME, SERVICE_NUMBER, ServiceSpecificDetailsForContractors
-from .logics.costsLogic import Costs
-from .logics.femAnalysisLogic import startFEMAnalysis
+from .definitions import SERVICE_NAME, SERVICE_NUMBER, ServiceSpecificDetailsForContractors, FEMJobDetails
+from .logics.costsLogic import Costs, preloadInputsForCosts
+from .logics.femAnalysisLogic import submitFEMAnalysis, collectFEMResults
 
 ###################################################
 class AdditiveManufacturing(Semper.ServiceBase):
@@ -130,6 +130,26 @@ class AdditiveManufacturing(Semper.ServiceBase):
         outDict[PricesDetails.details] = costsObject.getEncryptedCostOverview()
         return outDict
 
+    ###################################################
+    def preloadInputsForPricing(self, process:ProcessInterface|Process, contractors:list, organizations:dict, transferObject:object) -> dict|None:
+        """
+        Fetch the technologies of the printers and the cache keys of the costs, so that calculatePriceForService doesn't need the database
+
+        :param process: The process with all its details
+        :type process: ProcessInterface|Process
+        :param contractors: The contractors as returned by getFilteredContractors
+        :type contractors: list
+        :param organizations: The profiles of the contractors for every contractor ID
+        :type organizations: dict
+        :param transferObject: Transfer object with additional information
+        :type transferObject: Filter
+        :return: Inputs for every contractor ID or None
+        :rtype: dict | None
+
+        """
+        result = preloadInputsForCosts(process, contractors, organizations, transferObject)
+        return None if isinstance(result, Exception) else result
+
     ###################################################
     def getFilteredContractors(self, processObj:ProcessInterface|Process) -> tuple[dict, object]:
         """
@@ -164,16 +184,43 @@ class AdditiveManufacturing(Semper.ServiceBase):
     ###################################################
     def serviceSpecificTasks(self, session, processObj, validationResults:dict) -> dict|Exception:
         """
-        Do service specific tasks
+        Do service specific tasks, the FEM analyses are only put in the queue, the last one to finish continues the verification
 
         """
-        resultDict = startFEMAnalysis(session, processObj)
-        if resultDict[ServiceDetails.groups] == []:
+        try:
+            jobs, resultDict = submitFEMAnalysis(session, processObj.project.projectID, processObj)
+        except Exception as e:
+            return e
+        if jobs != []:
+            validationResults[ValidationSteps.serviceSpecificTasks]["FEM"] = {ValidationInformationForFrontend.isSuccessful.value: None, ValidationInformationForFrontend.pending.value: True,
+                                                                              "jobs": [job[FEMJobDetails.jobID] for job in jobs], "groups": resultDict[ServiceDetails.groups]}
+        elif resultDict[ServiceDetails.groups] == []:
             validationResults[ValidationSteps.serviceSpecificTasks]["FEM"] = {ValidationInformationForFrontend.isSuccessful.value: True}
         else:
             validationResults[ValidationSteps.serviceSpecificTasks]["FEM"] = {ValidationInformationForFrontend.isSuccessful.value: False, "groups": resultDict[ServiceDetails.groups]}
         return validationResults
     
+    ###################################################
+    def finishServiceSpecificTasks(self, session, processObj, validationResults:dict) -> dict|Exception:
+        """
+        Fill in the results of the FEM analyses once all of them are over
+
+        """
+        femResult = validationResults[ValidationSteps.serviceSpecificTasks].get("FEM", {})
+        if femResult.get(ValidationInformationForFrontend.pending.value, False) is not True:
+            return validationResults
+        try:
+            groups = collectFEMResults(processObj, femResult["jobs"], femResult["groups"])
+        except Exception as e:
+            return e
+        if groups is None:
+            return validationResults # still running
+        if groups == []:
+            validationResults[ValidationSteps.serviceSpecificTasks]["FEM"] = {ValidationInformationForFrontend.isSuccessful.value: True}
+        else:
+            validationResults[ValidationSteps.serviceSpecificTasks]["FEM"] = {ValidationInformationForFrontend.isSuccessful.value: False, "groups": groups}
+        return validationResults
+    
     ###################################################
     def getSearchableDetails(self, existingContent) -> list:
         """
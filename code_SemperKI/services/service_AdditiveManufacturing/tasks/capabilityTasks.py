@@ -0,0 +1,53 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Rebuilding the capabilities of organizations as a task of the task executor
+"""
+import logging
+
+from code_SemperKI.modelFiles.nodesModel import defaultOwner
+from code_SemperKI.tasks.taskExecutor import taskExecutor
+
+from ..connections.postgresql import pgCapabilities
+from ..definitions import TaskTypesAM
+
+loggerError = logging.getLogger("errors")
+
+####################################################################
+def rebuildCapabilitiesLater(orgaIDs:list[str]|set[str]) -> None:
+    """
+    Queue the rebuild of the capabilities, it runs once the change that caused it has been committed
+
+    :param orgaIDs: The hashed IDs of the organizations
+    :type orgaIDs: list[str]|set[str]
+    :return: Nothing
+    :rtype: None
+
+    """
+    orgaIDs = sorted(orgaID for orgaID in set(orgaIDs) if orgaID != defaultOwner)
+    if len(orgaIDs) == 0:
+        return
+    retVal = taskExecutor.submit(TaskTypesAM.rebuildCapabilities, orgaIDs=orgaIDs)
+    if isinstance(retVal, Exception):
+        loggerError.error(f"Error while queueing the rebuild of capabilities: {str(retVal)}")
+
+####################################################################
+def rebuildCapabilitiesOfBurst(argumentsOfTasks:list[dict]) -> None|Exception:
+    """
+    Rebuild the capabilities of all organizations that were changed in the meantime at once, runs in the task executor
+
+    :param argumentsOfTasks: The arguments of every queued rebuild
+    :type argumentsOfTasks: list[dict]
+    :return: Nothing or the error, so that it is tried again
+    :rtype: None|Exception
+
+    """
+    orgaIDs = set()
+    for arguments in argumentsOfTasks:
+        orgaIDs.update(arguments["orgaIDs"])
+    return pgCapabilities.rebuildCapabilitiesOfOrganizations(orgaIDs)
+
+####################################################################
+taskExecutor.register(TaskTypesAM.rebuildCapabilities, rebuildCapabilitiesOfBurst, maxConcurrent=1, batched=True) # one rebuild at a time, a burst of changes is handled together
@@ -0,0 +1,232 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: FEM analyses as cancellable tasks of the task executor
+"""
+import logging, datetime
+from importlib import import_module
+from multiprocessing import Process as MPProcess, Queue as MPQueue
+
+from django.conf import settings
+from django.db import transaction
+
+from Generic_Backend.code_General.definitions import FileObjectContent
+
+import code_SemperKI.connections.content.postgresql.pgProcesses as DBProcessesAccess
+import code_SemperKI.tasks.processTasks as ProcessTasks
+from code_SemperKI.logics.filesLogics import getFileViaPath
+from code_SemperKI.modelFiles.taskModel import BackgroundTask, BackgroundTaskStatus
+from code_SemperKI.tasks.taskExecutor import taskExecutor
+import code_SemperKI.utilities.websocket as websocket
+
+from ..connections.postgresql import pgService
+from ..definitions import FileContentsAM, FEMJobDetails, FEMJobStatus, TaskTypesAM
+from .femSimulationTask import run_FEM_test
+
+SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+loggerError = logging.getLogger("errors")
+
+femWorkers = 2 # every analysis is a process that takes one core and a lot of memory, can be set via FEM_MAX_PARALLEL_JOBS
+femTimeout = 7200 # seconds until an analysis is killed
+femPollInterval = 1. # seconds between looks at a running analysis
+femSimulation = run_FEM_test # runs in a process of its own
+
+statusOfTasks = {BackgroundTaskStatus.queued: FEMJobStatus.queued, BackgroundTaskStatus.running: FEMJobStatus.running,
+                 BackgroundTaskStatus.failed: FEMJobStatus.failed, BackgroundTaskStatus.cancelled: FEMJobStatus.cancelled}
+
+####################################################################
+def femJobOfTask(task:BackgroundTask) -> dict:
+    """
+    What the frontend and the model get to see of an analysis
+
+    :param task: The task of the analysis
+    :type task: BackgroundTask
+    :return: The job as given by FEMJobDetails
+    :rtype: dict
+    """
+    if task.status == BackgroundTaskStatus.done:
+        status, result = task.result.get(FEMJobDetails.status, FEMJobStatus.finished), task.result.get(FEMJobDetails.result, {})
+    else:
+        status = statusOfTasks[task.status]
+        result = {"name": task.arguments[FEMJobDetails.fileName], "type": "ERROR", "ssi": task.lastError} if task.status == BackgroundTaskStatus.failed else {}
+    return {FEMJobDetails.jobID: str(task.taskID), FEMJobDetails.groupID: task.arguments[FEMJobDetails.groupID], FEMJobDetails.modelID: task.arguments[FEMJobDetails.modelID],
+            FEMJobDetails.fileName: task.arguments[FEMJobDetails.fileName], FEMJobDetails.status: status, FEMJobDetails.result: result}
+
+####################################################################
+def publishFEMJob(projectID:str, processID:str, femJob:dict, session) -> None:
+    """
+    Write the state of a job into its model and tell everyone who listens
+
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param femJob: The job as given by FEMJobDetails
+    :type femJob: dict
+    :param session: The session of the user who started the analysis
+    :type session: Django Session Object
+    :return: Nothing
+    :rtype: None
+    """
+    try:
+        retVal = pgService.updateFEMJobOfModel(processID, femJob[FEMJobDetails.groupID], femJob[FEMJobDetails.modelID], femJob)
+        if isinstance(retVal, Exception):
+            raise retVal
+        if retVal is not None:
+            websocket.fireWebsocketEventsForProcess(projectID, processID, session, FileContentsAM.femJob, retVal)
+    except Exception as error:
+        loggerError.error(f"Error while publishing FEM job {femJob[FEMJobDetails.jobID]}: {str(error)}")
+
+####################################################################
+def submitFEMJob(projectID:str, processID:str, groupID:int, modelID:str, fileName:str, fromRepo:bool, material:dict, pressure:float, testType:str, session) -> dict|Exception:
+    """
+    Put an analysis in the queue, it is a task in the database and can be looked at and cancelled from every server
+
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param groupID: The group of the model
+    :type groupID: int
+    :param modelID: The file ID of the model
+    :type modelID: str
+    :param fileName: The name of the model
+    :type fileName: str
+    :param fromRepo: Whether the model comes from the repository and is not encrypted
+    :type fromRepo: bool
+    :param material: The material as needed by run_FEM_test
+    :type material: dict
+    :param pressure: In Pa
+    :type pressure: float
+    :param testType: elongation or compression
+    :type testType: str
+    :param session: The session of the user
+    :type session: Django Session Object
+    :return: The job as given by FEMJobDetails or an error
+    :rtype: dict|Exception
+    """
+    sessionKey = getattr(session, "session_key", None)
+    with transaction.atomic(): # the job is in the model before it can start
+        taskID = taskExecutor.submit(TaskTypesAM.femAnalysis, projectID=projectID, processID=processID, groupID=groupID, modelID=modelID, fileName=fileName,
+                                     fromRepo=fromRepo, material=material, pressure=pressure, testType=testType, sessionKey=sessionKey if sessionKey is not None else "")
+        if isinstance(taskID, Exception):
+            return taskID
+        femJob = {FEMJobDetails.jobID: str(taskID), FEMJobDetails.groupID: groupID, FEMJobDetails.modelID: modelID, FEMJobDetails.fileName: fileName, FEMJobDetails.status: FEMJobStatus.queued, FEMJobDetails.result: {}}
+        publishFEMJob(projectID, processID, femJob, session)
+    return femJob
+
+####################################################################
+def getFEMJobTask(jobID:str, processID:str) -> BackgroundTask|None:
+    """
+    Look up the task of an analysis
+
+    :param jobID: The ID of the job
+    :type jobID: str
+    :param processID: The process the job must belong to
+    :type processID: str
+    :return: The task or None if there's no such job in that process
+    :rtype: BackgroundTask|None
+    """
+    if not jobID.isdigit():
+        return None
+    task = BackgroundTask.objects.filter(taskID=int(jobID), taskType=TaskTypesAM.femAnalysis).first()
+    if task is None or task.arguments.get("processID") != processID:
+        return None
+    return task
+
+####################################################################
+def cancelFEMJob(task:BackgroundTask, session) -> bool:
+    """
+    Cancel an analysis, a running one is killed by the server it runs on
+
+    :param task: The task of the analysis
+    :type task: BackgroundTask
+    :param session: The session of the user
+    :type session: Django Session Object
+    :return: True if the job was cancelled, False if it's already over
+    :rtype: bool
+    """
+    if not taskExecutor.cancel(task.taskID):
+        return False
+    task.refresh_from_db()
+    if task.startedWhen is None: # never ran, so nobody else tells the model and a verification that waits for it
+        publishFEMJob(task.arguments["projectID"], task.arguments["processID"], femJobOfTask(task), session)
+        ProcessTasks.continueVerification(task.arguments["processID"], task.arguments["sessionKey"])
+    return True
+
+####################################################################
+def runFEMAnalysis(taskID:int, projectID:str, processID:str, groupID:int, modelID:str, fileName:str, fromRepo:bool, material:dict, pressure:float, testType:str, sessionKey:str) -> dict|None:
+    """
+    Run the simulation in its own process and watch it, runs in the task executor.
+    The arguments are the ones of submitFEMJob, plus the ID of the task to see whether it was cancelled.
+
+    :param taskID: The ID of the task
+    :type taskID: int
+    :param sessionKey: The key of the session of the user who started the analysis
+    :type sessionKey: str
+    :return: Status and result as given by FEMJobDetails, None if cancelled
+    :rtype: dict|None
+    """
+    session = SessionStore(session_key=sessionKey if sessionKey != "" else None)
+    femJob = {FEMJobDetails.jobID: str(taskID), FEMJobDetails.groupID: groupID, FEMJobDetails.modelID: modelID, FEMJobDetails.fileName: fileName, FEMJobDetails.status: FEMJobStatus.running, FEMJobDetails.result: {}}
+    publishFEMJob(projectID, processID, femJob, session)
+    status, jobResult = FEMJobStatus.finished, {}
+    try:
+        # the rights were checked when the job was submitted, the session may be gone by now
+        processObj = DBProcessesAccess.ProcessManagementBase.getProcessObj(projectID, processID)
+        fileOfProcess = processObj.files.get(modelID) if processObj is not None else None
+        stlFile = getFileViaPath(fileOfProcess[FileObjectContent.path], fileOfProcess.get(FileObjectContent.remote, False), not fromRepo) if fileOfProcess is not None else None
+        if stlFile is None:
+            status, jobResult = FEMJobStatus.failed, {"name": fileName, "type": "MODEL"}
+        else:
+            resultQueue = MPQueue()
+            # a process of its own, the meshing may crash and uses a lot of memory
+            femProcess = MPProcess(target=femSimulation, args=(material, pressure, stlFile.read(), processID + fileName, testType, resultQueue))
+            femProcess.start()
+
+            result = {}
+            waited = 0.
+            cancelled = False
+            while femProcess.is_alive() and waited < femTimeout:
+                if not resultQueue.empty():
+                    # the process can only finish once the queue has been emptied
+                    result = resultQueue.get()
+                femProcess.join(femPollInterval)
+                waited += femPollInterval
+                if taskExecutor.isCancelled(taskID):
+                    cancelled = True
+                    break
+            if femProcess.is_alive():
+                femProcess.terminate()
+                femProcess.join()
+            if result == {} and not resultQueue.empty():
+                result = resultQueue.get()
+            exitCode = femProcess.exitcode
+            femProcess.close()
+
+            if cancelled:
+                femJob[FEMJobDetails.status] = FEMJobStatus.cancelled
+                publishFEMJob(projectID, processID, femJob, session)
+                ProcessTasks.continueVerification(processID, sessionKey)
+                return None
+            elif exitCode != 0:
+                status, jobResult = FEMJobStatus.failed, {"name": fileName, "type": "ERROR", "ssi": "Process terminated with exit code " + str(exitCode)}
+            elif "Error" in result:
+                status, jobResult = FEMJobStatus.failed, {"name": fileName, "type": "ERROR", "ssi": result["Error"]}
+            elif "Plastische Verschiebung?" in result and result["Plastische Verschiebung?"]:
+                jobResult = {"name": fileName, "type": "BREAKS"}
+    except Exception as error:
+        loggerError.error(f"Error while running FEM job {taskID}: {str(error)}")
+        status, jobResult = FEMJobStatus.failed, {"name": fileName, "type": "ERROR", "ssi": str(error)}
+    femJob[FEMJobDetails.status], femJob[FEMJobDetails.result] = status, jobResult
+    publishFEMJob(projectID, processID, femJob, session)
+    # the model shows the result by now, so the verification sees it if this was the last job it waits for
+    ProcessTasks.continueVerification(processID, sessionKey)
+    return {FEMJobDetails.status: status, FEMJobDetails.result: jobResult}
+
+####################################################################
+taskExecutor.register(TaskTypesAM.femAnalysis, runFEMAnalysis, maxConcurrent=int(getattr(settings, "FEM_MAX_PARALLEL_JOBS", femWorkers)), maxAttempts=1,
+                      cancellable=True, staleAfter=datetime.timedelta(seconds=2*femTimeout))
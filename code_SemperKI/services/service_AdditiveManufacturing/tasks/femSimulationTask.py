@@ -7,8 +7,9 @@ Silvio Weging 2025
 Contains: FEM simulation
 """
 
-import sys, time, io, pytetwild, meshio, tempfile
+import sys, os, io, hashlib, pytetwild, meshio, tempfile
 import numpy as np
+from scipy.sparse.linalg import splu
 
 from skfem import *
 from skfem.models.elasticity import linear_elasticity, lame_parameters, linear_stress
@@ -39,27 +40,12 @@ def calculate_surface_area(mesh_data):
     Calculates the total surface area of an STL file by summing up the triangle areas.
     """
     
-    vertices = mesh_data.points
-    triangles = mesh_data.cells_dict["triangle"]
-    
-    total_area = 0.0
-    for triangle in triangles:
-        # Hole die drei Punkte des Dreiecks
-        v1 = vertices[triangle[0]]
-        v2 = vertices[triangle[1]]
-        v3 = vertices[triangle[2]]
-        
-        # Berechne zwei Vektoren des Dreiecks
-        vector1 = v2 - v1
-        vector2 = v3 - v1
-        
-        # Berechne die Fläche mit dem Kreuzprodukt
-        cross_product = np.cross(vector1, vector2)
-        area = 0.5 * np.linalg.norm(cross_product)
-        
-        total_area += area
+    # Eckpunkte aller Dreiecke, Form (Dreiecke, 3, 3)
+    corners = mesh_data.points[mesh_data.cells_dict["triangle"]]
     
-    return total_area
+    # Fläche jedes Dreiecks über das Kreuzprodukt zweier Kantenvektoren
+    cross_products = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    return 0.5 * np.sum(np.linalg.norm(cross_products, axis=1))
 
 ##################################################
 def calculate_bbox_volume_ratio(mesh_data):
@@ -194,9 +180,6 @@ def determine_ELF(mesh_data):
                 edge_length_fac = successful_runs[-1][0] * 0.8
             else:
                 edge_length_fac = max(0.01, edge_length_fac * 0.8)
-        
-        sys.stdout.flush()
-        time.sleep(0.5)
     
  
     if best_run:
@@ -216,6 +199,64 @@ def read_and_tetrahedralize(mesh_data, elf):
     p, t = np.array(vertices.T, dtype=np.float64), np.array(tetrahedras, dtype=np.float64).T
     return MeshTet(p, t)
 
+##################################################
+default_mesh_cache_dir = os.path.join(tempfile.gettempdir(), "semper-ki-fem-meshes")
+
+##################################################
+class MeshCache():
+    """Content-addressed cache for the edge length factor and the tetrahedral meshes of a model,
+    so that repeated analyses of the same model skip meshing entirely.
+
+    directory: Where the compressed npz files are stored.
+    """
+
+    ##################################################
+    def __init__(self, directory=default_mesh_cache_dir):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    ##################################################
+    @staticmethod
+    def get_key(stl_file, target_elements):
+        """Key for a model and the amount of tetrahedra that its meshes should have.
+
+        stl_file: The content of the STL file.
+        target_elements: The optimal amount of tetrahedra.
+        returns: The key as string.
+        """
+        return f"{hashlib.sha256(stl_file).hexdigest()}_{int(round(target_elements))}"
+
+    ##################################################
+    def load(self, key):
+        """Loads the edge length factor and the meshes.
+
+        key: The key from get_key.
+        returns: Tuple of the edge length factor and the list of MeshTet objects, None if nothing has been stored.
+        """
+        path = os.path.join(self.directory, key + ".npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as stored:
+            meshes = [MeshTet(stored[f"p_{i}"], stored[f"t_{i}"]) for i in range(int(stored["num_meshes"]))]
+            return float(stored["elf"]), meshes
+
+    ##################################################
+    def store(self, key, elf, meshes):
+        """Stores the edge length factor and the meshes.
+
+        key: The key from get_key.
+        elf: The converged edge length factor.
+        meshes: The list of MeshTet objects.
+        """
+        arrays = {"elf": np.array(elf), "num_meshes": np.array(len(meshes))}
+        for i, mesh in enumerate(meshes):
+            arrays[f"p_{i}"] = mesh.p
+            arrays[f"t_{i}"] = mesh.t
+        # written under another name first so that no other analysis reads half a file
+        temporary_path = os.path.join(self.directory, f"{key}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(temporary_path, **arrays)
+        os.replace(temporary_path, os.path.join(self.directory, key + ".npz"))
+
 ##################################################
 def define_dofs(ib):
     """Defines the degrees of freedom for the simulation.
@@ -259,9 +300,42 @@ def yield_stress(array, threshold):
     """
     max_stress = np.max(array)
     stress_percentage = (max_stress / threshold) * 100
-    plastic_elements = [i for i in range(len(array)) if array[i] > threshold]
+    plastic_elements = np.flatnonzero(array > threshold).tolist()
     return {'stress percentage': stress_percentage, 'plastic': plastic_elements}
 
+##################################################
+class ReducedSystem():
+    """The stiffness matrix with some dofs prescribed, factorized once and solved for any number of load cases.
+
+    K: The assembled stiffness matrix in CSR format.
+    fixed_dofs: The dofs whose displacement is prescribed.
+    """
+
+    ##################################################
+    def __init__(self, K, fixed_dofs):
+        self.size = K.shape[0]
+        self.fixed_dofs = np.unique(fixed_dofs)
+        self.free_dofs = np.setdiff1d(np.arange(self.size), self.fixed_dofs)
+        free_rows = K[self.free_dofs]
+        self.K_free_fixed = free_rows[:, self.fixed_dofs]
+        self.lu = splu(free_rows[:, self.free_dofs].tocsc())
+
+    ##################################################
+    def solve(self, F, u_fixed=None):
+        """Solves K u = F for the free dofs.
+
+        F: The load vector for all dofs.
+        u_fixed: The prescribed displacement of the fixed dofs, zero if None.
+        returns: The displacement of all dofs.
+        """
+        u = np.zeros(self.size)
+        rhs = F[self.free_dofs]
+        if u_fixed is not None:
+            u[self.fixed_dofs] = u_fixed
+            rhs = rhs - self.K_free_fixed @ u_fixed
+        u[self.free_dofs] = self.lu.solve(rhs)
+        return u
+
 ##################################################
 def calculate_displacements_and_stresses(mesh, lame_params, poisson_ratio, ib, K, dofs, displacements, bbox_length, material):
     """Calculates the displacements and stresses for the given mesh and material properties.
@@ -278,25 +352,29 @@ def calculate_displacements_and_stresses(mesh, lame_params, poisson_ratio, ib, K
     
     returns: A dictionary containing the results of the simulation.
     """
+    K = K.tocsr()
+    # every reduced system is factorized only once, opposite directions share the one with both sides fixed
+    reduced_systems = {}
+    def get_reduced_system(fixed_sides):
+        if fixed_sides not in reduced_systems:
+            reduced_systems[fixed_sides] = ReducedSystem(K, np.concatenate([dofs[side].all() for side in sorted(fixed_sides)]))
+        return reduced_systems[fixed_sides]
+
     results = {}
     for direction, (opposite, component, press_value, bbox_side) in displacements.items():
-        u, F = ib.zeros(), np.zeros(ib.zeros().shape)
+        F = np.zeros(K.shape[0])
         direction_dofs = dofs[direction].nodal[component].astype(int).flatten()
         F[direction_dofs] = press_value
-        fixed_dofs = np.hstack([dofs[opposite].all()])
-        u[fixed_dofs] = 0
-        free_dofs = np.setdiff1d(np.arange(K.shape[0]), fixed_dofs)
-        u[free_dofs] = solve(K[free_dofs][:, free_dofs], F[free_dofs])
-        initial_shift = u[direction_dofs]
-        u = solve(*condense(K, x=u, I=ib.complement_dofs(np.concatenate([dofs[direction], dofs[opposite]]))))
-        sf = 1
-        m_shifted = mesh.translated(sf * u[ib.nodal_dofs])
+        # opposite side clamped, load on this side
+        u = get_reduced_system(frozenset([opposite])).solve(F)
+        # both sides held at the resulting displacement
+        both_sides = get_reduced_system(frozenset([direction, opposite]))
+        u = both_sides.solve(np.zeros(K.shape[0]), u[both_sides.fixed_dofs])
         
         ## calculate total Nodal displacement
-        abs_value_Nodal_shift = np.sqrt(u[ib.nodal_dofs][0]**2 + u[ib.nodal_dofs][1]**2 + u[ib.nodal_dofs][2]**2)
-        elongation = [abs_value_Nodal_shift[i] / bbox_length[bbox_side] for i in range(len(abs_value_Nodal_shift))]
-        broke_at_elongation = [elongation[i] > material["Elon_at_break"] for i in range(len(elongation))]
-        num_plastic_points = sum(broke_at_elongation)
+        abs_value_Nodal_shift = np.linalg.norm(u[ib.nodal_dofs], axis=0)
+        elongation = abs_value_Nodal_shift / bbox_length[bbox_side]
+        num_plastic_points = int(np.count_nonzero(elongation > material["Elon_at_break"]))
         
         s, dgb = {}, ib.with_element(ElementTetP0())
         up = ib.interpolate(u) 
@@ -316,6 +394,23 @@ def calculate_displacements_and_stresses(mesh, lame_params, poisson_ratio, ib, K
         results[direction] = result_info
     return results
 
+##################################################
+def simulate_mesh(mesh, material, lame_params, displacements):
+    """Assembles the stiffness matrix of one mesh once and calculates all load cases with it.
+
+    mesh: The MeshTet object.
+    material: The material properties for the simulation.
+    lame_params: The parameters for the linear elasticity model.
+    displacements: The displacements for the simulation.
+    returns: A dictionary containing the results of the simulation.
+    """
+    bbox_length = calculate_bounding_box(mesh)
+    e1, e = ElementTetP1(), ElementVector(ElementTetP1())
+    ib = Basis(mesh, e, MappingIsoparametric(mesh, e1), 3)
+    K = asm(linear_elasticity(*lame_params), ib)
+    dofs = define_dofs(ib)
+    return calculate_displacements_and_stresses(mesh, lame_params, material["Poisson Ratio"], ib, K, dofs, displacements, bbox_length, material)
+
 ##################################################
 def calculate_average_results(results_list):
     """ Calculates the average results for a list of simulation results."""
@@ -337,44 +432,54 @@ def calculate_average_results(results_list):
     return avg_results
 
 ##################################################
-def run_FEM_test(material, pressure, stl_file, stl_fileName, test_type, resultQueue):
+def run_FEM_test(material, pressure, stl_file, stl_fileName, test_type, resultQueue, mesh_cache_dir=default_mesh_cache_dir):
     """ Runs a FEM simulation for a given STL file and material properties.
     
     :material: The material properties for the simulation.
     :pressure: The pressure applied to the model.
     :stl_file: The STL file to be simulated.
     :test_type: The type of test to be performed ('compression' or 'tension').
+    :mesh_cache_dir: Where meshes of earlier analyses are cached, None to always mesh anew.
     :returns: A dictionary containing the results of the simulation.
     """
     
     try:
         output_data = {}
         with tempfile.TemporaryDirectory() as tempDir: # because meshio.read does not accept BytesIO, we have to use this bs
-            temporaryFileName = tempDir+"\\"+stl_fileName
+            temporaryFileName = os.path.join(tempDir, os.path.basename(stl_fileName))
             temporaryFile = open(temporaryFileName, 'wb')
             temporaryFile.write(stl_file)
             temporaryFile.close()
 
             mesh_data = meshio.read(temporaryFileName, file_format="stl")
 
-            elf = round(determine_ELF(mesh_data), 4)    
-            #print(f"edge_length_factor: {elf}")
             num_simulations = 5
+            mesh_cache = MeshCache(mesh_cache_dir) if mesh_cache_dir is not None else None
+            cache_key = MeshCache.get_key(stl_file, determine_opt_amount_Tets(mesh_data)[0])
+            cached = mesh_cache.load(cache_key) if mesh_cache is not None else None
+            if cached is not None:
+                elf, meshes = cached
+            else:
+                elf = round(determine_ELF(mesh_data), 4)    
+                #print(f"edge_length_factor: {elf}")
+                meshes = []
+                for i in range(num_simulations):
+                    try:
+                        meshes.append(read_and_tetrahedralize(mesh_data, elf))
+                    except Exception as e:
+                        continue
+                if mesh_cache is not None and meshes:
+                    mesh_cache.store(cache_key, elf, meshes)
+
             all_results = []
+            young_modulus, poisson_ratio = material["Youngs Modulus"], material["Poisson Ratio"]
+            lame_params = lame_parameters(young_modulus, poisson_ratio)
+            displacements = define_displacements(pressure, test_type)
             
-            for i in range(num_simulations):
+            for i, mesh in enumerate(meshes):
                 #print(f"\nSimulation {i+1}/{num_simulations}")
                 try:
-                    mesh = read_and_tetrahedralize(mesh_data, elf)
-                    bbox_length = calculate_bounding_box(mesh)
-                    e1, e = ElementTetP1(), ElementVector(ElementTetP1())
-                    ib = Basis(mesh, e, MappingIsoparametric(mesh, e1), 3)
-                    young_modulus, poisson_ratio = material["Youngs Modulus"], material["Poisson Ratio"]
-                    lame_params = lame_parameters(young_modulus, poisson_ratio)
-                    K = asm(linear_elasticity(*lame_params), ib)
-                    dofs = define_dofs(ib)
-                    displacements = define_displacements(pressure, test_type)
-                    results = calculate_displacements_and_stresses(mesh, lame_params, poisson_ratio, ib, K, dofs, displacements, bbox_length, material)
+                    results = simulate_mesh(mesh, material, lame_params, displacements)
                     all_results.append(results)
                     #print(f"Simulation {i+1} erfolgreich")
                 except Exception as e:
@@ -11,15 +11,57 @@ Contains: Tests for various functions and services
 from django.test import TestCase, Client
 import datetime
 from copy import deepcopy
-import json, io
+import json, io, os, tempfile, queue, time, tracemalloc
+from unittest import mock
+import numpy as np
+import meshio, skfem
+from stl import mesh as stlMesh
 from .urls import paths
 
 from Generic_Backend.code_General.definitions import SessionContent, UserDescription, OrganizationDescription, ProfileClasses, FileObjectContent
-from code_SemperKI.definitions import ProjectDescription, ProcessDescription, SessionContentSemperKI, ProcessUpdates
+from code_SemperKI.modelFiles.processModel import Process
+from code_SemperKI.modelFiles.taskModel import BackgroundTask
+from code_SemperKI.tasks.taskExecutor import taskExecutor
+from code_SemperKI.definitions import ProjectDescription, ProcessDescription, SessionContentSemperKI, ProcessUpdates, ContractorParsingForFrontend, ProcessDetails, TaskTypesSemperKI
+from code_SemperKI.states.stateDescriptions import ProcessStatusAsString, processStatusAsInt
 from .definitions import *
+from .logics.costsLogic import Costs
+from .utilities.costsCache import CostsCache, costsCache, getCostsCacheKey
+from .utilities.materialCatalogue import MaterialCatalogue
+from .logics.materialsLogic import logicForRetrieveMaterialWithFilter
+from .connections.postgresql import pgKG, pgCapabilities, pgVerification
+from .connections.filterViaSparql import FilterAM
+from .tasks import femSimulationTask, femJobs
+from .utilities import stlAnalysis
+from .logics.modelLogic import calculateBoundaryData
 
 # Create your tests here.
 
+#######################################################
+def breakingSimulation(material, pressure, stl_file, stl_fileName, test_type, resultQueue):
+    resultQueue.put({"Plastische Verschiebung?": True})
+
+#######################################################
+def endlessSimulation(material, pressure, stl_file, stl_fileName, test_type, resultQueue):
+    time.sleep(600)
+    resultQueue.put({})
+
+#######################################################
+def triangulatedCube(subdivisions:int, side:float) -> np.ndarray:
+    grid = np.linspace(0., side, subdivisions+1)
+    i, j = [index.ravel() for index in np.meshgrid(np.arange(subdivisions), np.arange(subdivisions), indexing="ij")]
+    corners = [np.stack([grid[i+di], grid[j+dj]], axis=1) for di, dj in ((0,0), (1,0), (1,1), (0,1))]
+    squares = np.concatenate([np.stack([corners[0], corners[1], corners[2]], axis=1), np.stack([corners[0], corners[2], corners[3]], axis=1)])
+    faces = []
+    for axis in range(3):
+        for value in (0., side):
+            triangles = np.empty((len(squares), 3, 3))
+            triangles[:, :, axis] = value
+            triangles[:, :, (axis+1) % 3] = squares[:, :, 0]
+            triangles[:, :, (axis+2) % 3] = squares[:, :, 1]
+            faces.append(triangles if value == side else triangles[:, ::-1]) # normals point outwards
+    return np.concatenate(faces)
+
 #######################################################
 class TestAdditiveManufacturing(TestCase):
     testFile = io.BytesIO(b'binary stl file                                                                \x00\x0c\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80?\x00\x00\x0c\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\\\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\x0c\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80?\x00\x00\x0c\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\\\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\\\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80\xbf\x00\x00\x0c\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80\x00\x00\x00\x00\x00\x00\x80\xbf\x00\x00\x0c\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80\xbf\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\\\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\x00\x00\x00\x00\x00\x00\x80\xbf\x00\x00\x00\x80\x00\x00\x0c\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\\\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x00\x00\x80\xbf\x00\x00\x00\x80\x00\x00\x00\x80\x00\x00\\\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\\\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\x00\x00\x80\xbf\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\\\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80?\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\x0c\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\x00\x00\x00\x00\x00\x00\x80?\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\x0c\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\\\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00\x00\x00\x80?\x00\x00\x00\x80\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00 B\x00\x00\xa0A\x00\x00\x0c\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\x00\x00\x80?\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00pB\x00\x00\xa0A\x00\x00\x0c\xc2\x00\x00 B\x00\x00\x00\x00\x00\x00\x0c\xc2\x00\x00pB\x00\x00\x00\x00\x00\x00')
@@ -194,3 +236,429 @@ class TestAdditiveManufacturing(TestCase):
         response = json.loads(client.get("/"+contractorsPath).content)
         # Check return value for length of contractors
         self.assertIs(len(response)>=1, True, f'{response}')
+
+    ##################################################
+    def test_costsVectorized(self):
+        # golden test: the vectorized cost engine must give the same results as the loops
+        printers = []
+        for idx, technology in enumerate(["Material Extrusion", "Powder Bed Fusion", "Material Extrusion", "Vat Photopolymerization"]):
+            properties = [
+                {"key": "chamberBuildHeight", "value": 250. + 50.*idx},
+                {"key": "chamberBuildLength", "value": 300. - 20.*idx},
+                {"key": "chamberBuildWidth", "value": 200. + 35.*idx},
+                {"key": "machineBatchDistance", "value": 5. + idx},
+                {"key": "possibleLayerHeights", "value": ",".join(str(50*(idx+layer+1)) for layer in range(idx+1))},
+                {"key": "coatingTime", "value": 4.5 + idx},
+                {"key": "fillRate", "value": 20. * (idx+1)},
+            ]
+            if idx == 2:
+                properties.append({"key": "buildRate", "value": 12.5})
+            printers.append({"technology": technology, "properties": properties})
+        models = {}
+        for idx in range(5):
+            models[f"model{idx}"] = {"id": f"model{idx}", "isFile": False, "quantity": 1 + 37*idx, "levelOfDetail": idx % 3, "complexity": idx % 4,
+                                     "height": 10.5 + 7.*idx, "length": 20. + 3.3*idx, "width": 15. + 11.*idx, "volume": 0 if idx % 2 == 0 else 1500.*(idx+1)}
+        group = {
+            ServiceDetails.material: {"propList": [{"key": "density", "value": 1.24}, {"key": "printingSpeed", "value": 45.}, {"key": "acquisitionCosts", "value": 30.}]},
+            ServiceDetails.postProcessings: {"pp": {"fixedCosts": 12., "treatmentCosts": 3.5}},
+            ServiceDetails.models: models
+        }
+        inputDict = {"organization": {}, "groups": [group], "printers": printers}
+
+        loopCosts = Costs({}, {}, {}, inputDict)
+        loopResult = loopCosts.calculateCosts(inputDict, vectorized=False)
+        vectorizedCosts = Costs({}, {}, {}, inputDict)
+        vectorizedResult = vectorizedCosts.calculateCosts(inputDict, vectorized=True)
+        self.assertNotIsInstance(loopResult, Exception)
+        self.assertNotIsInstance(vectorizedResult, Exception)
+        for (loopMin, loopMax), (vectorizedMin, vectorizedMax) in zip(loopResult, vectorizedResult):
+            self.assertAlmostEqual(loopMin, vectorizedMin)
+            self.assertAlmostEqual(loopMax, vectorizedMax)
+
+        loopDetails = loopCosts.detailedCalculations[ServiceDetails.groups][0]
+        vectorizedDetails = vectorizedCosts.detailedCalculations[ServiceDetails.groups][0]
+        self.assertEqual(loopDetails["totalCosts"], vectorizedDetails["totalCosts"])
+        for modelID in models:
+            self.assertEqual(loopDetails[modelID]["minimumCostsThisFile"], vectorizedDetails[modelID]["minimumCostsThisFile"])
+            self.assertEqual(loopDetails[modelID]["maximumCostsThisFile"], vectorizedDetails[modelID]["maximumCostsThisFile"])
+            for printerIdx, loopPrinterDetails in enumerate(loopDetails["costsPerModel"][modelID]["costsForEveryPrinter"]):
+                vectorizedPrinterDetails = vectorizedDetails["costsPerModel"][modelID]["costsForEveryPrinter"][printerIdx]
+                self.assertEqual(list(loopPrinterDetails.keys()), list(vectorizedPrinterDetails.keys()))
+                for key, value in loopPrinterDetails.items():
+                    self.assertAlmostEqual(value, vectorizedPrinterDetails[key], msg=f"{modelID}, printer {printerIdx}: {key}")
+
+    ##################################################
+    def test_costsCache(self):
+        printer = pgKG.Basics.createNode({pgKG.NodeDescription.nodeName: "cachePrinter", pgKG.NodeDescription.nodeType: NodeTypesAM.printer}, createdBy="cacheTestOrga")
+        technology = pgKG.Basics.createNode({pgKG.NodeDescription.nodeName: "cacheTechnology", pgKG.NodeDescription.nodeType: NodeTypesAM.technology}, createdBy="cacheTestOrga")
+        groups = [{ServiceDetails.material: {MaterialDetails.id: "unknownMaterial"}, ServiceDetails.models: {"model": {"id": "model", "quantity": 2}}}]
+        organizationParameters = {OrganizationDetailsAM.margin.value: 10}
+
+        # miss, then hit
+        key = getCostsCacheKey(groups, "cacheTestOrga", [0], organizationParameters, {0: [printer.toDict()]})
+        self.assertIs(costsCache.retrieve(key)[1], False)
+        costsCache.store(key, {"costs": [(1., 2.)], "detailedCalculations": {}})
+        cachedResult, exists = costsCache.retrieve(key)
+        self.assertIs(exists, True)
+        self.assertEqual(cachedResult["costs"], [[1., 2.]])
+        self.assertEqual(key, getCostsCacheKey(groups, "cacheTestOrga", [0], organizationParameters, {0: [printer.toDict()]}))
+
+        # the versions fetched once for all contractors give the same key without a query
+        versionsOfNodes = pgKG.Basics.getVersionsOfNodes([printer.nodeID, technology.nodeID, "unknownMaterial"])
+        with self.assertNumQueries(0):
+            self.assertEqual(key, getCostsCacheKey(groups, "cacheTestOrga", [0], organizationParameters, {0: [printer.toDict()]}, versionsOfNodes))
+
+        # other inputs, other key
+        self.assertNotEqual(key, getCostsCacheKey(groups, "cacheTestOrga", [0], {OrganizationDetailsAM.margin.value: 20}, {0: [printer.toDict()]}))
+        self.assertNotEqual(key, getCostsCacheKey(groups, "otherOrga", [0], organizationParameters, {0: [printer.toDict()]}))
+
+        # stale after the printer was updated
+        pgKG.Basics.updateNode(printer.nodeID, {pgKG.NodeDescription.nodeName: "renamedCachePrinter"})
+        keyAfterUpdate = getCostsCacheKey(groups, "cacheTestOrga", [0], organizationParameters, {0: [printer.toDict()]})
+        self.assertNotEqual(key, keyAfterUpdate)
+        self.assertIs(costsCache.retrieve(keyAfterUpdate)[1], False)
+
+        # a new edge doesn't touch the printer but invalidates the cache anyway
+        costsCache.store(keyAfterUpdate, {"costs": [(1., 2.)], "detailedCalculations": {}})
+        self.assertIs(costsCache.retrieve(keyAfterUpdate)[1], True)
+        pgKG.Basics.createEdge(technology.nodeID, printer.nodeID)
+        keyAfterEdge = getCostsCacheKey(groups, "cacheTestOrga", [0], organizationParameters, {0: [printer.toDict()]})
+        self.assertNotEqual(keyAfterUpdate, keyAfterEdge)
+        self.assertIs(costsCache.retrieve(keyAfterEdge)[1], False)
+
+        # the in-process part only keeps the most recently used entries
+        smallCache = CostsCache(maxEntries=2)
+        for idx in range(3):
+            smallCache.storeLocally(f"entry{idx}", {"costs": [], "detailedCalculations": {}})
+        self.assertEqual(list(smallCache.entries.keys()), ["entry1", "entry2"])
+
+    ##################################################
+    def test_capabilityIndex(self):
+        NodeDescription = pgKG.NodeDescription
+        material = pgKG.Basics.createNode({NodeDescription.nodeName: "capMaterial", NodeDescription.nodeType: NodeTypesAM.material})
+        color = pgKG.Basics.createNode({NodeDescription.nodeName: "capColor", NodeDescription.nodeType: NodeTypesAM.color})
+        postProcessing = pgKG.Basics.createNode({NodeDescription.nodeName: "capPostProcessing", NodeDescription.nodeType: NodeTypesAM.additionalRequirement})
+        # orga A has the material in the color and the post-processing, orga B only has the material
+        materialA = pgKG.Basics.createNode({NodeDescription.nodeID: material.nodeID, NodeDescription.nodeType: NodeTypesAM.material}, createdBy="capOrgaA")
+        printerA = pgKG.Basics.createNode({NodeDescription.nodeName: "capPrinterA", NodeDescription.nodeType: NodeTypesAM.printer}, createdBy="capOrgaA")
+        colorA = pgKG.Basics.createNode({NodeDescription.nodeID: color.nodeID, NodeDescription.nodeType: NodeTypesAM.color}, createdBy="capOrgaA")
+        pgKG.Basics.createNode({NodeDescription.nodeID: postProcessing.nodeID, NodeDescription.nodeType: NodeTypesAM.additionalRequirement}, createdBy="capOrgaA")
+        pgKG.Basics.createEdge(materialA.nodeID, printerA.nodeID)
+        pgKG.Basics.createEdge(materialA.nodeID, colorA.nodeID)
+        materialB = pgKG.Basics.createNode({NodeDescription.nodeID: material.nodeID, NodeDescription.nodeType: NodeTypesAM.material}, createdBy="capOrgaB")
+        printerB = pgKG.Basics.createNode({NodeDescription.nodeName: "capPrinterB", NodeDescription.nodeType: NodeTypesAM.printer}, createdBy="capOrgaB")
+        pgKG.Basics.createEdge(materialB.nodeID, printerB.nodeID)
+
+        def filterMaterial(chosenColor:dict) -> FilterAM:
+            taskExecutor.runPending([TaskTypesAM.rebuildCapabilities]) # the rebuild is queued by the signals
+            filterObj = FilterAM()
+            filterObj.resultGroups, filterObj.printerGroups, filterObj.errors = [{}], [{}], [{}]
+            self.assertIsNone(filterObj.filterByMaterialAndColor({MaterialDetails.id: material.nodeID}, chosenColor, 0))
+            return filterObj
+
+        # the index follows the edges
+        filterObj = filterMaterial({})
+        self.assertEqual(filterObj.resultGroups[0], {"capOrgaA": ("capOrgaA", False), "capOrgaB": ("capOrgaB", False)})
+        self.assertEqual([printer[NodeDescription.nodeID] for printer in filterObj.printerGroups[0]["capOrgaA"]], [printerA.nodeID])
+        filterObj = filterMaterial({NodeDescription.uniqueID: color.nodeID})
+        self.assertEqual(list(filterObj.resultGroups[0].keys()), ["capOrgaA"])
+        self.assertEqual(filterObj.errors[0], {})
+        pgKG.Basics.deleteEdge(materialA.nodeID, colorA.nodeID)
+        self.assertTrue(BackgroundTask.objects.filter(taskType=TaskTypesAM.rebuildCapabilities, finishedWhen__isnull=True).exists())
+        filterObj = filterMaterial({NodeDescription.uniqueID: color.nodeID})
+        self.assertEqual(filterObj.resultGroups[0], {})
+        self.assertEqual(filterObj.errors[0][ContractorParsingForFrontend.error], FilterErrors.color.value)
+        pgKG.Basics.createEdge(materialA.nodeID, colorA.nodeID)
+
+        # and the verifications
+        pgVerification.createVerification("capOrgaA", printerA.nodeID, material.nodeID, pgVerification.VerificationStatus.verified)
+        self.assertEqual(filterMaterial({}).resultGroups[0]["capOrgaA"], ("capOrgaA", True))
+        pgVerification.deleteVerification("capOrgaA", printerA.nodeID, material.nodeID)
+        self.assertEqual(filterMaterial({}).resultGroups[0]["capOrgaA"], ("capOrgaA", False))
+
+        # post-processings are intersected with the result of the material
+        filterObj = filterMaterial({})
+        self.assertIsNone(filterObj.filterByPostProcessings({postProcessing.nodeID: {}}, 0))
+        self.assertEqual(list(filterObj.resultGroups[0].keys()), ["capOrgaA"])
+
+        # inactive or deleted materials are gone
+        pgKG.Basics.updateNode(materialA.nodeID, {NodeDescription.active: False})
+        pgKG.Basics.deleteNode(materialB.nodeID)
+        self.assertEqual(filterMaterial({}).resultGroups[0], {})
+
+        # a full rebuild gives the same rows as the incremental updates
+        pgKG.Basics.updateNode(materialA.nodeID, {NodeDescription.active: True})
+        taskExecutor.runPending([TaskTypesAM.rebuildCapabilities])
+        incrementalRows = sorted((row.organizationID, row.materialID, row.printerID, tuple(row.colorUniqueIDs)) for row in pgCapabilities.ContractorCapability.objects.all())
+        self.assertIsNone(pgCapabilities.rebuildAllCapabilities())
+        rebuiltRows = sorted((row.organizationID, row.materialID, row.printerID, tuple(row.colorUniqueIDs)) for row in pgCapabilities.ContractorCapability.objects.all())
+        self.assertEqual(incrementalRows, rebuiltRows)
+        self.assertEqual(incrementalRows, [("capOrgaA", materialA.nodeID, printerA.nodeID, (color.nodeID,))])
+
+    ##################################################
+    def test_materialCatalogue(self):
+        NodeDescription = pgKG.NodeDescription
+        def properties(**values) -> list[dict]:
+            return [{"name": key, "key": key, "value": value, "unit": "", "type": "number"} for key, value in values.items()]
+        category = pgKG.Basics.createNode({NodeDescription.nodeName: "catCategory", NodeDescription.nodeType: NodeTypesAM.materialCategory})
+        light = pgKG.Basics.createNode({NodeDescription.nodeName: "catLight", NodeDescription.nodeType: NodeTypesAM.material, NodeDescription.properties: properties(density=1.2)})
+        heavy = pgKG.Basics.createNode({NodeDescription.nodeName: "catHeavy", NodeDescription.nodeType: NodeTypesAM.material, NodeDescription.properties: properties(density=7.8)})
+        pgKG.Basics.createNode({NodeDescription.nodeName: "catUnused", NodeDescription.nodeType: NodeTypesAM.material})
+        pgKG.Basics.createEdge(light.nodeID, category.nodeID)
+        # two organizations offer the light material in the same color, one the heavy material
+        for orgaID, price in [("catOrgaA", 10.), ("catOrgaB", 30.)]:
+            lightCopy = pgKG.Basics.createNode({NodeDescription.nodeID: light.nodeID, NodeDescription.nodeType: NodeTypesAM.material, NodeDescription.properties: properties(density=1.2, acquisitionCosts=price)}, createdBy=orgaID)
+            color = pgKG.Basics.createNode({NodeDescription.nodeName: "black", NodeDescription.nodeType: NodeTypesAM.color, NodeDescription.properties: [{"name": "", "key": NodePropertiesAMColor.colorRAL, "value": "RAL 9005", "unit": "", "type": "text"}]}, createdBy=orgaID)
+            pgKG.Basics.createEdge(lightCopy.nodeID, color.nodeID)
+        pgKG.Basics.createNode({NodeDescription.nodeID: heavy.nodeID, NodeDescription.nodeType: NodeTypesAM.material, NodeDescription.properties: properties(density=7.8, acquisitionCosts=5.)}, createdBy="catOrgaA")
+
+        def retrieve(filters:list[dict]) -> list[dict]:
+            result, statusCode = logicForRetrieveMaterialWithFilter({"filters": filters}, "de-DE")
+            self.assertEqual(statusCode, 200, result)
+            return result["materials"]
+
+        # sorted by median price, without the unused material, the costs and duplicate colors
+        materials = retrieve([])
+        self.assertEqual([material[MaterialDetails.id] for material in materials], [heavy.nodeID, light.nodeID])
+        self.assertEqual(materials[1][MaterialDetails.medianPrice], 20.)
+        self.assertEqual(len(materials[1][MaterialDetails.colors]), 1)
+        self.assertEqual([prop["key"] for prop in materials[1][MaterialDetails.propList]], [NodePropertiesAMMaterial.density])
+        categoryFilter = {"isChecked": True, "question": {"title": FilterCategories.materialCategory.value}, "answer": {"value": category.nodeID}}
+        self.assertEqual([material[MaterialDetails.id] for material in retrieve([categoryFilter])], [light.nodeID])
+        densityFilter = {"isChecked": True, "question": {"title": FilterCategories.density.value}, "answer": {"value": {"min": 5., "max": 10.}}}
+        self.assertEqual([material[MaterialDetails.id] for material in retrieve([densityFilter])], [heavy.nodeID])
+        self.assertEqual(retrieve([categoryFilter, densityFilter]), [])
+
+        # the number of queries doesn't depend on the number of materials, and there are none once it's cached
+        with self.assertNumQueries(4):
+            MaterialCatalogue.build("de-DE")
+        with self.assertNumQueries(0):
+            retrieve([])
+
+        # changes of the knowledge graph are visible right away
+        pgKG.Basics.updateNode(heavy.nodeID, {NodeDescription.active: False})
+        self.assertEqual([material[MaterialDetails.id] for material in retrieve([])], [light.nodeID])
+
+    #######################################################
+    def test_femSparseSolver(self):
+        # the implementation before the sparse solver, with a dense slice and a fresh solve for every load case
+        def referenceResults(mesh, lame_params, poisson_ratio, ib, K, dofs, displacements, bbox_length, material):
+            results = {}
+            for direction, (opposite, component, press_value, bbox_side) in displacements.items():
+                u, F = ib.zeros(), np.zeros(ib.zeros().shape)
+                direction_dofs = dofs[direction].nodal[component].astype(int).flatten()
+                F[direction_dofs] = press_value
+                fixed_dofs = np.hstack([dofs[opposite].all()])
+                free_dofs = np.setdiff1d(np.arange(K.shape[0]), fixed_dofs)
+                u[free_dofs] = skfem.solve(K[free_dofs][:, free_dofs], F[free_dofs])
+                u = skfem.solve(*skfem.condense(K, x=u, I=ib.complement_dofs(np.concatenate([dofs[direction], dofs[opposite]]))))
+                abs_value_Nodal_shift = np.sqrt(u[ib.nodal_dofs][0]**2 + u[ib.nodal_dofs][1]**2 + u[ib.nodal_dofs][2]**2)
+                elongation = [abs_value_Nodal_shift[i] / bbox_length[bbox_side] for i in range(len(abs_value_Nodal_shift))]
+                num_plastic_points = sum([elongation[i] > material["Elon_at_break"] for i in range(len(elongation))])
+                s, dgb = {}, ib.with_element(skfem.ElementTetP0())
+                up = ib.interpolate(u)
+                C = femSimulationTask.linear_stress(*lame_params)
+                for i in [0, 1]:
+                    for j in [0, 1]:
+                        s[i, j] = dgb.project(C(femSimulationTask.sym_grad(up))[i, j])
+                s[2, 2] = poisson_ratio * (s[0, 0] + s[1, 1])
+                vonmises = np.sqrt(.5 * ((s[0, 0] - s[1, 1]) ** 2 + (s[1, 1] - s[2, 2]) ** 2 + (s[2, 2] - s[0, 0]) ** 2 + 6. * s[0, 1] ** 2))
+                yield_results = femSimulationTask.yield_stress(vonmises, material['Yielding Stress'])
+                results[direction] = {
+                    'Anz. zerstörter Elemente': len(yield_results['plastic']),
+                    'max. Spannungsverhältnis': f"{yield_results['stress percentage']:.4f}%",
+                    'Anz. überdehnter Knoten': num_plastic_points,
+                    'max. Dehnung': f"{np.max(elongation):.4f}",
+                }
+            return results
+
+        # small reference STL, tetrahedralized once so that both implementations see the same mesh
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, "reference.stl")
+            with open(fileName, "wb") as stlFile:
+                stlFile.write(deepcopy(self.testFile).read())
+            meshData = meshio.read(fileName, file_format="stl")
+        loopArea = sum(0.5 * np.linalg.norm(np.cross(meshData.points[t[1]] - meshData.points[t[0]], meshData.points[t[2]] - meshData.points[t[0]])) for t in meshData.cells_dict["triangle"])
+        self.assertAlmostEqual(femSimulationTask.calculate_surface_area(meshData), loopArea, places=6)
+
+        mesh = femSimulationTask.read_and_tetrahedralize(meshData, 0.1)
+        material = femSimulationTask.mockMaterials["PLA"]
+        lame_params = femSimulationTask.lame_parameters(material["Youngs Modulus"], material["Poisson Ratio"])
+        for test_type, pressure in [("compression", 5e6), ("tension", 5e7)]:
+            displacements = femSimulationTask.define_displacements(pressure, test_type)
+            newResults = femSimulationTask.simulate_mesh(mesh, material, lame_params, displacements)
+            bbox_length = femSimulationTask.calculate_bounding_box(mesh)
+            e1, e = skfem.ElementTetP1(), skfem.ElementVector(skfem.ElementTetP1())
+            ib = skfem.Basis(mesh, e, skfem.MappingIsoparametric(mesh, e1), 3)
+            K = skfem.asm(femSimulationTask.linear_elasticity(*lame_params), ib)
+            oldResults = referenceResults(mesh, lame_params, material["Poisson Ratio"], ib, K, femSimulationTask.define_dofs(ib), displacements, bbox_length, material)
+            self.assertEqual(newResults.keys(), oldResults.keys())
+            for direction in oldResults:
+                self.assertEqual(newResults[direction]['Anz. zerstörter Elemente'], oldResults[direction]['Anz. zerstörter Elemente'])
+                self.assertEqual(newResults[direction]['Anz. überdehnter Knoten'], oldResults[direction]['Anz. überdehnter Knoten'])
+                self.assertAlmostEqual(float(newResults[direction]['max. Spannungsverhältnis'].strip('%')), float(oldResults[direction]['max. Spannungsverhältnis'].strip('%')), places=3)
+                self.assertAlmostEqual(float(newResults[direction]['max. Dehnung']), float(oldResults[direction]['max. Dehnung']), places=3)
+
+    #######################################################
+    def test_femMeshCache(self):
+        stlContent = deepcopy(self.testFile).read()
+        material = femSimulationTask.mockMaterials["PLA"]
+        with tempfile.TemporaryDirectory() as cacheDir:
+            meshCache = femSimulationTask.MeshCache(cacheDir)
+            # content addressed
+            self.assertEqual(femSimulationTask.MeshCache.get_key(stlContent, 1000.2), femSimulationTask.MeshCache.get_key(stlContent, 1000))
+            self.assertNotEqual(femSimulationTask.MeshCache.get_key(stlContent, 1000), femSimulationTask.MeshCache.get_key(stlContent + b"\x00", 1000))
+            self.assertNotEqual(femSimulationTask.MeshCache.get_key(stlContent, 1000), femSimulationTask.MeshCache.get_key(stlContent, 2000))
+            self.assertIsNone(meshCache.load("unknown"))
+
+            firstQueue, secondQueue = queue.Queue(), queue.Queue()
+            femSimulationTask.run_FEM_test(material, 5e6, stlContent, "cube.stl", "compression", firstQueue, cacheDir)
+            firstResult = firstQueue.get()
+            self.assertNotIn("Error", firstResult, f"{firstResult}")
+            storedFiles = [fileName for fileName in os.listdir(cacheDir) if fileName.endswith(".npz")]
+            self.assertEqual(len(storedFiles), 1)
+            elf, meshes = meshCache.load(storedFiles[0][:-len(".npz")])
+            self.assertGreater(elf, 0)
+            self.assertGreater(len(meshes), 0)
+
+            # the second analysis uses the same meshes and therefore gets the same results
+            femSimulationTask.run_FEM_test(material, 5e6, stlContent, "cube.stl", "compression", secondQueue, cacheDir)
+            self.assertEqual(secondQueue.get(), firstResult)
+            self.assertEqual(len(os.listdir(cacheDir)), 1)
+
+    #######################################################
+    def test_femJobs(self):
+        client = self.orgaClient
+        projectObj, processObj = self.createProjectAndProcess(client)
+        projectID, processID = projectObj[ProjectDescription.projectID], processObj[ProcessDescription.processID]
+        changes = {"projectID": projectID, "processIDs": [processID], "changes": { "serviceType": 1}, "deletions":{} }
+        client.patch("/"+paths["updateProcess"][0], data=json.dumps(changes), content_type="application/json")
+        details = '[{"details":{"date": "' + str(datetime.datetime.now()) + '", "certificates": "","licenses": "", "tags": ""}, "fileName": "cube.stl", "femRequested": true}]'
+        uploadBody = {ProjectDescription.projectID: projectID, ProcessDescription.processID: processID, "groupID": 0, "details": details, "cube.stl": deepcopy(self.testFile), "origin": "test_origin"}
+        response = client.post("/"+paths["uploadModel"][0], uploadBody)
+        self.assertEqual(response.status_code, 200)
+        processRow = Process.objects.get(processID=processID)
+        processRow.serviceDetails[ServiceDetails.groups][0][ServiceDetails.material] = {MaterialDetails.propList: [
+            {"key": NodePropertiesAMMaterial.poissonRatio, "value": 0.35}, {"key": NodePropertiesAMMaterial.tensileModulus, "value": 3.5},
+            {"key": NodePropertiesAMMaterial.ultimateTensileStrength, "value": 50.}, {"key": NodePropertiesAMMaterial.elongationAtBreak, "value": 6.}]}
+        processRow.save()
+        getProcPathSplit = paths["getProcess"][0].split("/")
+        getProcPath = "/".join(getProcPathSplit[:3]) + "/" + projectID + "/" + processID + "/"
+        def pathOf(name:str, jobID:str="") -> str:
+            return "/" + paths[name][0].replace("<str:projectID>", projectID).replace("<str:processID>", processID).replace("<str:jobID>", jobID)
+
+        # somebody else may neither start, see nor cancel the jobs of the process
+        foreignClient = Client()
+        self.createUser(foreignClient)
+        self.assertEqual(foreignClient.post(pathOf("startFEMJobs")).status_code, 401)
+        self.assertEqual(BackgroundTask.objects.filter(taskType=TaskTypesAM.femAnalysis).count(), 0)
+
+        response = client.post(pathOf("startFEMJobs"))
+        self.assertEqual(response.status_code, 200)
+        jobs = json.loads(response.content)["jobs"]
+        self.assertEqual(len(jobs), 1)
+        jobID = jobs[0][FEMJobDetails.jobID]
+        self.assertEqual(jobs[0][FEMJobDetails.status], FEMJobStatus.queued)
+        self.assertEqual(foreignClient.get(pathOf("getFEMJob", jobID)).status_code, 401)
+        self.assertEqual(foreignClient.delete(pathOf("cancelFEMJob", jobID)).status_code, 401)
+        self.assertEqual(client.get(pathOf("getFEMJob", "123456789")).status_code, 404)
+
+        # the result ends up in the job and in the model, then it can't be cancelled anymore
+        with mock.patch.object(femJobs, "femSimulation", breakingSimulation):
+            self.assertEqual(taskExecutor.runPending([TaskTypesAM.femAnalysis]), 1)
+        femJob = json.loads(client.get(pathOf("getFEMJob", jobID)).content)
+        self.assertEqual(femJob[FEMJobDetails.status], FEMJobStatus.finished)
+        self.assertEqual(femJob[FEMJobDetails.result], {"name": "cube.stl", "type": "BREAKS"})
+        self.assertEqual(client.delete(pathOf("cancelFEMJob", jobID)).status_code, 409)
+        models = json.loads(client.get("/"+getProcPath).content)[ProcessDescription.serviceDetails][ServiceDetails.groups][0][ServiceDetails.models]
+        self.assertEqual(models[0][FileContentsAM.femJob][FEMJobDetails.jobID], jobID)
+        self.assertEqual(models[0][FileContentsAM.femJob][FEMJobDetails.status], FEMJobStatus.finished)
+        self.assertEqual(models[0][FileContentsAM.femJob][FEMJobDetails.result]["type"], "BREAKS")
+
+        # a queued job never runs once it's cancelled
+        waitingJobID = json.loads(client.post(pathOf("startFEMJobs")).content)["jobs"][0][FEMJobDetails.jobID]
+        self.assertEqual(client.delete(pathOf("cancelFEMJob", waitingJobID)).status_code, 200)
+        self.assertEqual(json.loads(client.get(pathOf("getFEMJob", waitingJobID)).content)[FEMJobDetails.status], FEMJobStatus.cancelled)
+        self.assertEqual(taskExecutor.runPending([TaskTypesAM.femAnalysis]), 0)
+        models = json.loads(client.get("/"+getProcPath).content)[ProcessDescription.serviceDetails][ServiceDetails.groups][0][ServiceDetails.models]
+        self.assertEqual(models[0][FileContentsAM.femJob][FEMJobDetails.status], FEMJobStatus.cancelled)
+
+        # a running analysis is killed once its job is cancelled, from whichever server
+        runningJobID = json.loads(client.post(pathOf("startFEMJobs")).content)["jobs"][0][FEMJobDetails.jobID]
+        task = BackgroundTask.objects.get(taskID=int(runningJobID))
+        self.assertTrue(taskExecutor.cancel(task.taskID))
+        started = time.monotonic()
+        with mock.patch.object(femJobs, "femSimulation", endlessSimulation):
+            self.assertIsNone(femJobs.runFEMAnalysis(task.taskID, **task.arguments))
+        self.assertLess(time.monotonic() - started, 30)
+        models = json.loads(client.get("/"+getProcPath).content)[ProcessDescription.serviceDetails][ServiceDetails.groups][0][ServiceDetails.models]
+        self.assertEqual(models[0][FileContentsAM.femJob][FEMJobDetails.jobID], runningJobID)
+        self.assertEqual(models[0][FileContentsAM.femJob][FEMJobDetails.status], FEMJobStatus.cancelled)
+
+        # the verification doesn't wait for the analyses, the last one to finish completes it
+        taskExecutor.runPending([TaskTypesSemperKI.finishVerification]) # left by the jobs above, there's nothing to finish
+        Process.objects.filter(processID=processID).update(processStatus=processStatusAsInt(ProcessStatusAsString.VERIFYING))
+        taskExecutor.submit(TaskTypesSemperKI.verification, processID=processID, sessionKey=client.session.session_key)
+        self.assertEqual(taskExecutor.runPending([TaskTypesSemperKI.verification]), 1)
+        verifyingProcess = Process.objects.get(processID=processID)
+        self.assertEqual(verifyingProcess.processStatus, processStatusAsInt(ProcessStatusAsString.VERIFYING))
+        femResult = verifyingProcess.processDetails[ProcessDetails.verificationResults]["serviceSpecificTasks"]["FEM"]
+        self.assertIs(femResult["pending"], True)
+        self.assertEqual(BackgroundTask.objects.filter(taskType=TaskTypesSemperKI.verification, finishedWhen__isnull=True).count(), 0, "no worker is kept busy")
+        self.assertEqual(taskExecutor.runPending([TaskTypesSemperKI.finishVerification]), 0)
+        with mock.patch.object(femJobs, "femSimulation", breakingSimulation):
+            self.assertEqual(taskExecutor.runPending([TaskTypesAM.femAnalysis, TaskTypesSemperKI.finishVerification]), 2)
+        verifiedProcess = Process.objects.get(processID=processID)
+        self.assertEqual(verifiedProcess.processStatus, processStatusAsInt(ProcessStatusAsString.VERIFICATION_FAILED))
+        femResult = verifiedProcess.processDetails[ProcessDetails.verificationResults]["serviceSpecificTasks"]["FEM"]
+        self.assertEqual((femResult["isSuccessful"], femResult["groups"]), (False, [{"groupID": 0, "models": [{"name": "cube.stl", "type": "BREAKS"}]}]))
+
+    #######################################################
+    def test_streamingSTLAnalysis(self):
+        # same values as numpy-stl for binary and ASCII files, no matter how the file is cut
+        cube = stlMesh.Mesh(np.zeros(6*2*2*2, dtype=stlMesh.Mesh.dtype))
+        cube.vectors = triangulatedCube(2, 10.) + np.array([1., 2., 3.])
+        for mode in (stlMesh.stl.Mode.BINARY, stlMesh.stl.Mode.ASCII):
+            stlFile = io.BytesIO()
+            cube.save("cube.stl", fh=stlFile, mode=mode)
+            stlContent = stlFile.getvalue()
+            reference = stlMesh.Mesh.from_file("cube.stl", fh=io.BytesIO(stlContent))
+            volume, centroid, _ = reference.get_mass_properties()
+            for chunkSize in (97, 1024, len(stlContent)):
+                geometry = stlAnalysis.analyzeSTL(io.BytesIO(stlContent), len(stlContent), chunkSize)
+                self.assertNotIsInstance(geometry, Exception)
+                self.assertEqual(geometry.numberOfTriangles, len(reference.vectors))
+                self.assertAlmostEqual(geometry.volume, float(volume), places=3)
+                self.assertAlmostEqual(geometry.surfaceArea, float(np.sum(reference.areas)), places=3)
+                np.testing.assert_allclose(geometry.centroid, centroid, rtol=1e-5)
+                np.testing.assert_allclose(geometry.boundingBox, np.ptp(reference.points.reshape(-1, 3), axis=0), rtol=1e-6)
+            result = calculateBoundaryData(io.BytesIO(stlContent), "cube.stl", len(stlContent), 0.5)
+            self.assertEqual(result[Calculations.status_code], 200)
+            self.assertAlmostEqual(result[Calculations.measurements][Measurements.volume], 125., places=3)
+            self.assertAlmostEqual(result[Calculations.measurements][Measurements.mbbDimensions][MbbDimensions._1], 5., places=5)
+        self.assertNotEqual(calculateBoundaryData(io.BytesIO(b"solid nothing\nendsolid nothing\n"), "empty.stl", 32, 1.)["status_code"], 200)
+
+        # a binary file with 2M triangles is never held in memory
+        triangles = triangulatedCube(408, 10.)
+        records = np.zeros(len(triangles), dtype=stlAnalysis.binaryTriangle)
+        records["vertices"] = triangles
+        with tempfile.TemporaryDirectory() as tempDir:
+            stlPath = os.path.join(tempDir, "large.stl")
+            with open(stlPath, "wb") as stlFile:
+                stlFile.write(bytes(80) + np.uint32(len(records)).tobytes())
+                records.tofile(stlFile)
+            del triangles, records
+            fileSize = os.path.getsize(stlPath)
+            self.assertEqual(fileSize, stlAnalysis.binaryHeaderSize + stlAnalysis.binaryTriangle.itemsize*6*2*408*408)
+            tracemalloc.start()
+            with open(stlPath, "rb") as stlFile:
+                geometry = stlAnalysis.analyzeSTL(stlFile, fileSize)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.assertNotIsInstance(geometry, Exception)
+        self.assertLess(peak, 16*stlAnalysis.stlChunkSize)
+        self.assertEqual(geometry.numberOfTriangles, 6*2*408*408)
+        self.assertAlmostEqual(geometry.volume, 1000., places=6)
+        self.assertAlmostEqual(geometry.surfaceArea, 600., places=6)
+        np.testing.assert_allclose(geometry.centroid, [5., 5., 5.], rtol=1e-9)
+        np.testing.assert_allclose(geometry.boundingBox, [10., 10., 10.], rtol=1e-6)
@@ -23,7 +23,7 @@ Including another URLconf
 from django.urls import path
 
 from .handlers.public.resources import orga, onto, kgDBAM, pdfPipeline, verification, colors
-from .handlers.public import materials, checkService, filter, model, postProcessings, costs
+from .handlers.public import materials, checkService, filter, model, postProcessings, costs, fem
 
 from code_SemperKI.urls import paths, urlpatterns
 
@@ -51,6 +51,10 @@ newPaths = {
     "getModelRepository": ("public/service/additive-manufacturing/model/repository/get/", model.getModelRepository),
     "uploadFromRepository": ("public/service/additive-manufacturing/model/repository/post/", model.uploadFromRepository),
 
+    "startFEMJobs": ("public/service/additive-manufacturing/fem/start/<str:projectID>/<str:processID>/", fem.startFEMJobs),
+    "getFEMJob": ("public/service/additive-manufacturing/fem/get/<str:projectID>/<str:processID>/<str:jobID>/", fem.getFEMJob),
+    "cancelFEMJob": ("public/service/additive-manufacturing/fem/cancel/<str:projectID>/<str:processID>/<str:jobID>/", fem.cancelFEMJob),
+
     #"checkPrintability": ("public/checkPrintability/",checkService.),
     #"checkPrices": ("public/checkPrices/",checkService.checkPrice),
     #"checkLogistics": ("public/checkLogistics/",checkService.checkLogistics),
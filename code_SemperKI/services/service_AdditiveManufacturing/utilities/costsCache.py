@@ -0,0 +1,207 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Cache for the results of the cost calculation, addressed by a hash of everything that goes into the calculation
+"""
+
+import hashlib, json, logging, threading
+from collections import OrderedDict
+
+from Generic_Backend.code_General.connections.redis import RedisConnection
+
+from code_SemperKI.connections.content.postgresql.pgKnowledgeGraph import Basics
+from code_SemperKI.modelFiles.nodesModel import NodeDescription
+from code_SemperKI.utilities.redisCaching import GenerationToken, asReturnedByRedis
+
+from ..definitions import ServiceDetails, MaterialDetails
+
+logger = logging.getLogger("logToFile")
+loggerError = logging.getLogger("errors")
+
+##################################################
+costsCacheGenerationKey = "costsCacheGeneration" # redis key of the token that is part of every cache key, changed to invalidate everything
+costsCacheKeyPrefix = "costsCache_"
+costsCacheLocalSize = 256 # entries in the in-process LRU
+
+##################################################
+class CostsCache():
+    """
+    Results of Costs.calculateCosts. Entries live in redis, the most recently used ones are additionally kept in-process.
+
+    """
+
+    ##################################################
+    def __init__(self, maxEntries:int=costsCacheLocalSize) -> None:
+        """
+        Empty cache
+
+        :param maxEntries: Size of the in-process LRU
+        :type maxEntries: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = GenerationToken(costsCacheGenerationKey)
+
+    ##################################################
+    def getKey(self, inputs:dict) -> str:
+        """
+        Hash everything that goes into the calculation together with the current generation
+
+        :param inputs: JSON serializable inputs of the calculation
+        :type inputs: dict
+        :return: The key, empty if nothing shall be cached since redis is not reachable
+        :rtype: str
+        """
+        generation = self.generation.get()
+        if generation == "":
+            return ""
+        serialized = json.dumps({"generation": generation, "inputs": inputs}, sort_keys=True, default=str)
+        return costsCacheKeyPrefix + hashlib.sha256(serialized.encode()).hexdigest()
+
+    ##################################################
+    def retrieve(self, key:str) -> tuple[dict|None, bool]:
+        """
+        Look in-process first, then in redis
+
+        :param key: Key from getKey
+        :type key: str
+        :return: The cached result and whether it was found
+        :rtype: tuple[dict|None, bool]
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key], True
+        try:
+            content, exists = RedisConnection().retrieveContentJSON(key)
+            if exists is True and isinstance(content, dict):
+                self.storeLocally(key, content)
+                return content, True
+        except Exception as e:
+            loggerError.error("Error in CostsCache.retrieve: " + str(e))
+        return None, False
+
+    ##################################################
+    def storeLocally(self, key:str, content:dict) -> None:
+        """
+        Put an entry into the in-process LRU and drop the least recently used one if it is full
+
+        :param key: Key from getKey
+        :type key: str
+        :param content: The result
+        :type content: dict
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            self.entries[key] = content
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+    ##################################################
+    def store(self, key:str, content:dict) -> None:
+        """
+        Save a result in-process and in redis
+
+        :param key: Key from getKey
+        :type key: str
+        :param content: The result, must be JSON serializable
+        :type content: dict
+        :return: Nothing
+        :rtype: None
+        """
+        try:
+            content = asReturnedByRedis(content)
+        except Exception as e:
+            loggerError.error("Error in CostsCache.store: " + str(e))
+            return
+        self.storeLocally(key, content)
+        try:
+            RedisConnection().addContentJSON(key, content, True)
+        except Exception as e:
+            loggerError.error("Error in CostsCache.store: " + str(e))
+
+    ##################################################
+    def invalidate(self) -> None:
+        """
+        Make every cached result unreachable by changing the generation token
+
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            self.entries = OrderedDict()
+        self.generation.change()
+
+costsCache = CostsCache()
+
+##################################################
+def getNodesOfCostsCacheKey(groups:list, relevantGroups:list, printersPerGroup:dict) -> set[str]:
+    """
+    The nodes whose versions are part of the cache key: the printers and the materials of the relevant groups
+
+    :param groups: The groups of the service details of the process
+    :type groups: list
+    :param relevantGroups: Indices of the groups that are calculated
+    :type relevantGroups: list
+    :param printersPerGroup: The printers of the contractor for every relevant group
+    :type printersPerGroup: dict
+    :return: The IDs of the nodes
+    :rtype: set[str]
+    """
+    nodeIDs = set()
+    for printers in printersPerGroup.values():
+        for printer in printers:
+            nodeIDs.add(printer[NodeDescription.nodeID])
+    for groupIdx in relevantGroups:
+        material = groups[groupIdx].get(ServiceDetails.material, {})
+        if isinstance(material, dict) and MaterialDetails.id in material:
+            nodeIDs.add(material[MaterialDetails.id])
+    return nodeIDs
+
+##################################################
+def getCostsCacheKey(groups:list, contractorID:str, relevantGroups:list, organizationParameters:dict, printersPerGroup:dict, versionsOfNodes:dict|None=None) -> str|Exception:
+    """
+    Build the cache key for the costs of one contractor
+
+    :param groups: The groups of the service details of the process
+    :type groups: list
+    :param contractorID: The hashed ID of the contractor
+    :type contractorID: str
+    :param relevantGroups: Indices of the groups that are calculated for this contractor
+    :type relevantGroups: list
+    :param organizationParameters: The cost parameters of the contractor
+    :type organizationParameters: dict
+    :param printersPerGroup: The printers of the contractor for every relevant group
+    :type printersPerGroup: dict
+    :param versionsOfNodes: The versions of at least the nodes of this key as given by getVersionsOfNodes, fetched if None
+    :type versionsOfNodes: dict|None
+    :return: The key, empty if nothing shall be cached
+    :rtype: str|Exception
+    """
+    try:
+        nodeIDs = getNodesOfCostsCacheKey(groups, relevantGroups, printersPerGroup)
+        if versionsOfNodes is None:
+            versions = Basics.getVersionsOfNodes(list(nodeIDs))
+            if isinstance(versions, Exception):
+                raise versions
+        else:
+            versions = {nodeID: versionsOfNodes[nodeID] for nodeID in nodeIDs if nodeID in versionsOfNodes}
+
+        inputs = {
+            "contractor": contractorID,
+            "groups": {str(groupIdx): groups[groupIdx] for groupIdx in relevantGroups if groupIdx < len(groups)},
+            "organization": organizationParameters,
+            "printers": {str(groupIdx): [printer[NodeDescription.nodeID] for printer in printers] for groupIdx, printers in printersPerGroup.items()},
+            "versions": versions
+        }
+        return costsCache.getKey(inputs)
+    except Exception as e:
+        loggerError.error("Error in getCostsCacheKey: " + str(e))
+        return e
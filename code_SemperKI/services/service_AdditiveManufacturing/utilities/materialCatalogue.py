@@ -0,0 +1,238 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Catalogue of all materials that organizations offer, built with a few queries and cached per locale
+"""
+
+import logging, threading, numpy
+
+from django.db import connection, transaction
+
+from Generic_Backend.code_General.connections.redis import RedisConnection
+
+from code_SemperKI.modelFiles.nodesModel import Node, NodeDescription, NodePropertyDescription, defaultOwner
+from code_SemperKI.utilities.locales import manageTranslations
+from code_SemperKI.utilities.redisCaching import GenerationToken, asReturnedByRedis
+
+from ..definitions import SERVICE_NAME, NodeTypesAM, NodePropertiesAMMaterial, NodePropertiesAMColor, MaterialDetails
+from . import mocks
+
+logger = logging.getLogger("logToFile")
+loggerError = logging.getLogger("errors")
+
+##################################################
+materialCatalogueGenerationKey = "materialCatalogueGeneration" # redis key of the token that is part of every catalogue key, changed whenever the knowledge graph changes
+materialCatalogueKeyPrefix = "materialCatalogue_"
+
+##################################################
+class CatalogueEntry():
+    """
+    What every entry of the catalogue contains
+
+    """
+    material = "material" # as the frontend gets it, see MaterialDetails
+    neighbors = "neighbors" # IDs of the material types and categories the material is linked to
+
+##################################################
+class MaterialCatalogue():
+    """
+    All active system materials that at least one organization has copied, with their colors and median prices.
+    The catalogue of a locale lives in redis, the one of the current generation is additionally kept in-process.
+
+    """
+
+    ##################################################
+    def __init__(self) -> None:
+        """
+        Empty cache
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.lock = threading.Lock()
+        self.generationToken = GenerationToken(materialCatalogueGenerationKey)
+        self.generation = ""
+        self.entries = {} # locale -> catalogue of self.generation
+
+    ##################################################
+    def getCatalogue(self, locale:str) -> list[dict]|Exception:
+        """
+        Get the catalogue from the process, from redis or build it
+
+        :param locale: The locale the properties are translated into
+        :type locale: str
+        :return: The entries as given by CatalogueEntry, sorted by median price. They are shared and must not be changed.
+        :rtype: list[dict]|Exception
+        """
+        try:
+            generation = self.generationToken.get()
+            with self.lock:
+                if generation != "" and generation == self.generation and locale in self.entries:
+                    return self.entries[locale]
+
+            key = materialCatalogueKeyPrefix + generation + "_" + locale
+            if generation != "":
+                content, exists = RedisConnection().retrieveContentJSON(key)
+                if exists is True and isinstance(content, list):
+                    self.storeLocally(generation, locale, content)
+                    return content
+
+            catalogue = self.build(locale)
+            if isinstance(catalogue, Exception):
+                raise catalogue
+            if generation != "":
+                catalogue = asReturnedByRedis(catalogue)
+                RedisConnection().addContentJSON(key, catalogue, True)
+                self.storeLocally(generation, locale, catalogue)
+            return catalogue
+        except Exception as e:
+            loggerError.error("Error in MaterialCatalogue.getCatalogue: " + str(e))
+            return e
+
+    ##################################################
+    def storeLocally(self, generation:str, locale:str, catalogue:list[dict]) -> None:
+        """
+        Keep the catalogue in the process, catalogues of older generations are dropped
+
+        :param generation: The generation the catalogue was built in
+        :type generation: str
+        :param locale: The locale of the catalogue
+        :type locale: str
+        :param catalogue: The catalogue
+        :type catalogue: list[dict]
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            if generation != self.generation:
+                self.generation = generation
+                self.entries = {}
+            self.entries[locale] = catalogue
+
+    ##################################################
+    def invalidate(self) -> None:
+        """
+        Make every catalogue unreachable by changing the generation token
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.changeGeneration()
+        if connection.in_atomic_block:
+            # a catalogue built before the change is committed would not contain it
+            transaction.on_commit(self.changeGeneration)
+
+    ##################################################
+    def changeGeneration(self) -> None:
+        """
+        Set a new generation token and drop the catalogues of this process
+
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            self.generation = ""
+            self.entries = {}
+        self.generationToken.change()
+
+    ##################################################
+    @staticmethod
+    def build(locale:str) -> list[dict]|Exception:
+        """
+        Gather the materials, their copies, colors, types and categories in four queries and assemble the catalogue
+
+        :param locale: The locale the properties are translated into
+        :type locale: str
+        :return: The entries as given by CatalogueEntry, sorted by median price
+        :rtype: list[dict]|Exception
+        """
+        try:
+            EdgeTable = Node.edges.through
+
+            # all materials, the copies of the organizations carry the prices
+            materialNodes = list(Node.objects.filter(nodeType=NodeTypesAM.material))
+            materialPrices = {}
+            systemMaterials = []
+            for node in materialNodes:
+                if node.createdBy == defaultOwner:
+                    if node.active is True:
+                        systemMaterials.append(node)
+                    continue
+                for prop in node.properties.values():
+                    if prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.acquisitionCosts:
+                        materialPrices.setdefault(node.uniqueID, []).append(float(prop[NodePropertyDescription.value]))
+            for uniqueID in materialPrices:
+                materialPrices[uniqueID] = float(numpy.median(materialPrices[uniqueID]))
+
+            # every node that shares the unique ID of a system material, materials without copies are not in use
+            copiesPerUniqueID = {}
+            for node in Node.objects.filter(uniqueID__in={node.uniqueID for node in systemMaterials}):
+                copiesPerUniqueID.setdefault(node.uniqueID, []).append(node)
+            systemMaterials = [node for node in systemMaterials if len(copiesPerUniqueID.get(node.uniqueID, [])) > 1]
+
+            # types and categories for the filters
+            neighborsPerMaterial = {node.nodeID: [] for node in systemMaterials}
+            edges = EdgeTable.objects.filter(from_node_id__in=list(neighborsPerMaterial.keys()), to_node__nodeType__in=[NodeTypesAM.materialType, NodeTypesAM.materialCategory]).values_list("from_node_id", "to_node_id")
+            for fromNodeID, toNodeID in edges:
+                neighborsPerMaterial[fromNodeID].append(toNodeID)
+
+            # colors of the copies of the organizations
+            copyIDs = [materialCopy.nodeID for node in systemMaterials for materialCopy in copiesPerUniqueID[node.uniqueID] if materialCopy.createdBy != defaultOwner]
+            colorsPerCopy = {}
+            for edge in EdgeTable.objects.filter(from_node_id__in=copyIDs, to_node__nodeType=NodeTypesAM.color).select_related("to_node").order_by("id"):
+                colorsPerCopy.setdefault(edge.from_node_id, []).append(edge.to_node)
+
+            catalogue = []
+            for node in systemMaterials:
+                # prepare properties
+                imgPath = mocks.testPicture
+                propertiesForUser = []
+                for prop in node.properties.values():
+                    if prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.imgPath:
+                        imgPath = prop[NodePropertyDescription.value]
+                    elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.acquisitionCosts:
+                        pass # info that the user doesn't need to know
+                    elif prop[NodePropertyDescription.key] == NodePropertiesAMMaterial.printingSpeed:
+                        pass
+                    else:
+                        propertiesForUser.append(dict(prop))
+                manageTranslations.translateProperties(locale, propertiesForUser, ["service",SERVICE_NAME])
+
+                # colors of that material from organisations, the same RAL or HEX value is shown only once
+                colors = []
+                setOfRALOrHex = set()
+                for materialCopy in copiesPerUniqueID[node.uniqueID]:
+                    if materialCopy.createdBy == defaultOwner:
+                        continue
+                    for color in colorsPerCopy.get(materialCopy.nodeID, []):
+                        if color.active is not True:
+                            continue
+                        add = False
+                        for prop in color.properties.values():
+                            if prop[NodePropertyDescription.key] == NodePropertiesAMColor.colorRAL:
+                                add = prop[NodePropertyDescription.value] not in setOfRALOrHex
+                                setOfRALOrHex.add(prop[NodePropertyDescription.value])
+                            elif prop[NodePropertyDescription.key] == NodePropertiesAMColor.colorHEX:
+                                colorArray = prop[NodePropertyDescription.value].split(",")
+                                colorArray.sort() # sort to have always the same order
+                                colorString = ",".join(colorArray)
+                                add = colorString not in setOfRALOrHex
+                                setOfRALOrHex.add(colorString)
+                        if add:
+                            colorDict = color.toDict()
+                            colorDict[NodeDescription.properties] = manageTranslations.translateProperties(locale, [dict(prop) for prop in colorDict[NodeDescription.properties] if prop[NodePropertyDescription.key] != NodePropertiesAMMaterial.imgPath], ["service",SERVICE_NAME])
+                            colors.append(colorDict)
+
+                material = {MaterialDetails.id: node.nodeID, MaterialDetails.title: node.nodeName, MaterialDetails.propList: propertiesForUser, MaterialDetails.imgPath: imgPath,
+                            MaterialDetails.medianPrice: materialPrices.get(node.uniqueID, 0.), MaterialDetails.colors: colors}
+                catalogue.append({CatalogueEntry.material: material, CatalogueEntry.neighbors: neighborsPerMaterial[node.nodeID]})
+            # TODO use translation here for nodeName
+            catalogue.sort(key=lambda entry: entry[CatalogueEntry.material][MaterialDetails.medianPrice])
+            return catalogue
+        except Exception as e:
+            loggerError.error("Error in MaterialCatalogue.build: " + str(e))
+            return e
+
+materialCatalogue = MaterialCatalogue()
@@ -6,10 +6,20 @@ Silvio Weging 2024
 Contains: Signals send by the other apps which relate to the Additive Manufacturing service
 """
 
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
 import Generic_Backend.code_General.utilities.signals as GeneralSignals
 
+from code_SemperKI.modelFiles.nodesModel import Node
+from code_SemperKI.connections.content.postgresql.pgKnowledgeGraph import graphCopiedForNewOwner
+
 from ..service import SERVICE_NUMBER
 from ..connections.postgresql.pgProfilesSKIAM import updateOrgaDetailsSemperKIAM, deleteOrgaDetailsSemperKIAM
+from ..connections.postgresql import pgCapabilities
+from ..modelFiles.verificationModel import Verification
+from ..tasks.capabilityTasks import rebuildCapabilitiesLater
+from .costsCache import costsCache
+from .materialCatalogue import materialCatalogue
 
 ################################################################################################
 
@@ -44,6 +54,54 @@ class AdditiveManufacturingSignalReceivers():
             if service == SERVICE_NUMBER:
                 deleteOrgaDetailsSemperKIAM(orgaID)
 
+    ##################################################
+    @staticmethod
+    def receiverForOrgaUpdated(sender, **kwargs):
+        """
+        If an organization changed its details, cached costs may be outdated
+
+        """
+        costsCache.invalidate()
+
+    ##################################################
+    @staticmethod
+    def receiverForKnowledgeGraphChange(sender, **kwargs):
+        """
+        If a node or an edge of the knowledge graph changed, cached costs and the material catalogue may be outdated 
+        and the capabilities of the organizations that own or use the nodes must be rebuilt once the change is committed
+
+        """
+        if kwargs.get("action", "post_").startswith("post_"): # edges send a signal before and after the change
+            costsCache.invalidate()
+            materialCatalogue.invalidate()
+            node = kwargs["instance"]
+            nodeIDs = [node.nodeID]
+            if kwargs.get("pk_set") is not None:
+                nodeIDs.extend(kwargs["pk_set"])
+            orgaIDs = pgCapabilities.getAffectedOrganizations(nodeIDs, [node.createdBy])
+            if not isinstance(orgaIDs, Exception):
+                rebuildCapabilitiesLater(orgaIDs)
+
+    ##################################################
+    @staticmethod
+    def receiverForGraphCopied(sender, **kwargs):
+        """
+        If the graph was copied for an organization, it has new capabilities and offers new materials
+
+        """
+        costsCache.invalidate()
+        materialCatalogue.invalidate()
+        rebuildCapabilitiesLater([kwargs["createdBy"]])
+
+    ##################################################
+    @staticmethod
+    def receiverForVerificationChange(sender, **kwargs):
+        """
+        If a verification changed, the capabilities of the organization must be rebuilt once the change is committed
+
+        """
+        rebuildCapabilitiesLater([kwargs["instance"].organizationID])
+
     ##################################################
     def __init__(self) -> None:
         """
@@ -52,5 +110,12 @@ class AdditiveManufacturingSignalReceivers():
         """
         GeneralSignals.signalDispatcher.orgaServiceDetails.connect(self.receiverForOrgaServiceSelection, dispatch_uid="101")
         GeneralSignals.signalDispatcher.orgaServiceDeletion.connect(self.receiverForOrgaServiceDeletion, dispatch_uid="102")
+        GeneralSignals.signalDispatcher.orgaUpdated.connect(self.receiverForOrgaUpdated, dispatch_uid="103")
+        post_save.connect(self.receiverForKnowledgeGraphChange, sender=Node, dispatch_uid="104")
+        post_delete.connect(self.receiverForKnowledgeGraphChange, sender=Node, dispatch_uid="105")
+        m2m_changed.connect(self.receiverForKnowledgeGraphChange, sender=Node.edges.through, dispatch_uid="106")
+        graphCopiedForNewOwner.connect(self.receiverForGraphCopied, dispatch_uid="107")
+        post_save.connect(self.receiverForVerificationChange, sender=Verification, dispatch_uid="108")
+        post_delete.connect(self.receiverForVerificationChange, sender=Verification, dispatch_uid="109")
         
 additiveManufacturingSignalReceiver = AdditiveManufacturingSignalReceivers()
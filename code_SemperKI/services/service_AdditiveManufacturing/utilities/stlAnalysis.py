@@ -0,0 +1,187 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Geometry of STL files, calculated while the file is read chunk by chunk
+"""
+import re
+import numpy as np
+
+stlChunkSize = 1024*1024 # bytes read at once, about 20k triangles of a binary file
+binaryHeaderSize = 84 # 80 bytes header and the number of triangles
+binaryTriangle = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3,3)), ("attribute", "<u2")]) # 50 bytes each
+asciiVertex = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+
+####################################################################
+class StreamingSTLAnalyzer():
+    """
+    Accumulates volume, surface area, centroid and bounding box of a binary or ASCII STL file.
+    The file is fed in arbitrary pieces, only the incomplete end of a piece is kept.
+    Volume and centroid use the divergence theorem like numpy-stl's get_mass_properties.
+
+    """
+    ###################################################
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._isBinary = None # decided as soon as the start of the file is known
+        self._trianglesLeftInBinary = 0
+        self._verticesOfIncompleteTriangle = np.empty((0,3))
+        self.numberOfTriangles = 0
+        self.volume = 0.
+        self.surfaceArea = 0.
+        self._firstMoments = np.zeros(3)
+        self.minimum = np.full(3, np.inf)
+        self.maximum = np.full(3, -np.inf)
+
+    ###################################################
+    def feed(self, content:bytes) -> None:
+        """
+        Add the next piece of the file
+
+        :param content: The bytes that follow the ones fed so far
+        :type content: bytes
+        :return: Nothing
+        :rtype: None
+        """
+        self._buffer += content
+        if self._isBinary is None:
+            if len(self._buffer) < 1024 and content != b"":
+                return # too little to tell
+            self._detectFormat()
+        if self._isBinary:
+            self._parseBinary()
+        else:
+            self._parseASCII(final=False)
+
+    ###################################################
+    def _detectFormat(self) -> None:
+        """
+        Binary files may start with 'solid' as well, ASCII files have facets and no zero bytes
+
+        """
+        start = self._buffer[:1024]
+        looksLikeText = start.lstrip().lower().startswith(b"solid") and (b"facet" in start or b"endsolid" in start) and b"\x00" not in start
+        self._isBinary = not looksLikeText
+        if self._isBinary:
+            if len(self._buffer) < binaryHeaderSize:
+                raise ValueError("STL file is too short")
+            self._trianglesLeftInBinary = int(np.frombuffer(self._buffer, "<u4", count=1, offset=80)[0])
+            self._buffer = self._buffer[binaryHeaderSize:]
+
+    ###################################################
+    def _parseBinary(self) -> None:
+        """
+        Take all complete triangles out of the buffer
+
+        """
+        if self._trianglesLeftInBinary == 0:
+            self._buffer = b"" # whatever follows the announced triangles is ignored
+            return
+        numberOfTriangles = min(len(self._buffer) // binaryTriangle.itemsize, self._trianglesLeftInBinary)
+        if numberOfTriangles == 0:
+            return
+        triangles = np.frombuffer(self._buffer, binaryTriangle, count=numberOfTriangles)
+        self._accumulate(triangles["vertices"].astype(np.float64))
+        self._trianglesLeftInBinary -= numberOfTriangles
+        self._buffer = self._buffer[numberOfTriangles*binaryTriangle.itemsize:]
+
+    ###################################################
+    def _parseASCII(self, final:bool) -> None:
+        """
+        Take all complete lines out of the buffer
+
+        """
+        end = len(self._buffer) if final else self._buffer.rfind(b"\n") + 1
+        if end <= 0:
+            return
+        coordinates = asciiVertex.findall(self._buffer, 0, end)
+        self._buffer = self._buffer[end:]
+        if len(coordinates) == 0:
+            return
+        vertices = np.concatenate((self._verticesOfIncompleteTriangle, np.array(coordinates, dtype=np.float64)))
+        completeVertices = len(vertices) - len(vertices) % 3
+        self._verticesOfIncompleteTriangle = vertices[completeVertices:]
+        self._accumulate(vertices[:completeVertices].reshape(-1, 3, 3))
+
+    ###################################################
+    def _accumulate(self, vertices:np.ndarray) -> None:
+        """
+        Add the contribution of some triangles
+
+        """
+        if len(vertices) == 0:
+            return
+        v0, v1, v2 = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+        crossProduct = np.cross(v1 - v0, v2 - v0)
+        sumOfVertices = v0 + v1 + v2
+        # every triangle spans a tetrahedron with the origin
+        self.volume += float(np.dot(crossProduct[:, 0], sumOfVertices[:, 0])) / 6.
+        self._firstMoments += np.einsum("ij,ij->j", crossProduct, v0*v0 + v1*v1 + v2*v2 + v0*v1 + v0*v2 + v1*v2) / 24.
+        self.surfaceArea += float(np.linalg.norm(crossProduct, axis=1).sum()) / 2.
+        self.minimum = np.minimum(self.minimum, vertices.min(axis=(0, 1)))
+        self.maximum = np.maximum(self.maximum, vertices.max(axis=(0, 1)))
+        self.numberOfTriangles += len(vertices)
+
+    ###################################################
+    def finish(self) -> "StreamingSTLAnalyzer":
+        """
+        Parse what is left once the whole file has been fed
+
+        :return: The analyzer itself with all values set
+        :rtype: StreamingSTLAnalyzer
+        """
+        if self._isBinary is None:
+            self._detectFormat()
+        if self._isBinary:
+            self._parseBinary()
+        else:
+            self._parseASCII(final=True)
+        if self.numberOfTriangles == 0:
+            raise ValueError("STL file contains no triangles")
+        return self
+
+    ###################################################
+    @property
+    def centroid(self) -> np.ndarray:
+        """
+        Center of the enclosed volume
+
+        """
+        return self._firstMoments / self.volume if self.volume != 0. else (self.minimum + self.maximum) / 2.
+
+    ###################################################
+    @property
+    def boundingBox(self) -> np.ndarray:
+        """
+        Extent along x, y and z
+
+        """
+        return self.maximum - self.minimum
+
+####################################################################
+def analyzeSTL(readableObject, maxSize:int, chunkSize:int=stlChunkSize) -> StreamingSTLAnalyzer|Exception:
+    """
+    Read an STL file chunk by chunk and calculate its geometry
+
+    :param readableObject: The file with a .read() method
+    :type readableObject: BytesIO | EncryptionAdapter | UploadedFile
+    :param maxSize: How many bytes to read at most
+    :type maxSize: int
+    :param chunkSize: How many bytes to read at once
+    :type chunkSize: int
+    :return: The analyzer with all values or the error
+    :rtype: StreamingSTLAnalyzer|Exception
+    """
+    try:
+        analyzer = StreamingSTLAnalyzer()
+        remaining = maxSize
+        while remaining > 0:
+            chunk = readableObject.read(min(chunkSize, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            analyzer.feed(chunk)
+        return analyzer.finish()
+    except Exception as error:
+        return error
@@ -1325,12 +1325,11 @@ class CONTRACTOR_COMPLETED(State):
     def to_VERIFYING(self, interface: SessionInterface.ProcessManagementSession | DBInterface.ProcessManagementBase, process: ProcessModel.Process | ProcessModel.ProcessInterface) -> \
           VERIFYING: 
         """
-        Starts verification
+        Starts verification, see entryCalls of VERIFYING
         From: CONTRACTOR_COMPLETED
         To: VERIFYING
 
         """
-        interface.verifyProcess(process, interface.getSession() , interface.getUserID())
         return stateDict[ProcessStatusAsString.VERIFYING]
 
     ###################################################
@@ -1378,7 +1377,8 @@ class VERIFYING(State):
         :rtype: None
 
         """
-        pass
+        # the status is already set, so the verification can't start before it
+        interface.verifyProcess(process, interface.getSession() , interface.getUserID())
 
     ###################################################
     def buttons(self, interface, process, client=True, contractor=False, admin=False) -> list:
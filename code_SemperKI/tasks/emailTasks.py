@@ -0,0 +1,101 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Delivery of the e-mails about processes, a burst at a time
+"""
+import logging
+from dataclasses import dataclass
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.mail import get_connection, EmailMultiAlternatives
+from django.utils.html import strip_tags
+
+from Generic_Backend.code_General.connections.mailer import MailingClass
+from Generic_Backend.code_General.connections.postgresql.pgProfiles import ProfileManagementBase
+from Generic_Backend.code_General.definitions import UserNotificationTargets
+
+import code_SemperKI.connections.content.postgresql.pgProcesses as DBProcessesAccess
+import code_SemperKI.utilities.locales as Locales
+
+loggerError = logging.getLogger("errors")
+
+digestWindow = 5. # seconds in which the mails to the same person are collected into one
+
+####################################################################
+@dataclass
+class EMailJob():
+    """
+    An e-mail about a process to a user or to the members of an organization
+
+    """
+    IDOfReceiver:str
+    notification:str
+    subject:list[str]
+    message:list[str]
+    processTitle:str
+
+####################################################################
+def sendEMailsOfBurst(jobs:list[dict]) -> None|Exception:
+    """
+    Build one mail per person and send them through one connection, runs in the task executor.
+    The preferences are gathered once per receiver and notification,
+    every person gets one mail (a digest if there is more than one thing to tell).
+
+    :param jobs: The arguments of the tasks, as given by EMailJob
+    :type jobs: list[dict]
+    :return: Nothing or the error, so that the burst is tried again
+    :rtype: None|Exception
+    """
+    try:
+        preferencesCache = {}
+        jobsPerPerson = OrderedDict()
+        for job in [EMailJob(**arguments) for arguments in jobs]:
+            key = (job.IDOfReceiver, job.notification)
+            if key not in preferencesCache:
+                dictOfPreferences = DBProcessesAccess.gatherUserHashIDsAndNotificationPreference(job.IDOfReceiver, job.notification, UserNotificationTargets.email)
+                if isinstance(dictOfPreferences, Exception):
+                    loggerError.error(f"Error while sending email: {str(dictOfPreferences)}")
+                    dictOfPreferences = {}
+                preferencesCache[key] = dictOfPreferences
+            for hashedID, wantsMail in preferencesCache[key].items():
+                if wantsMail: # person wants to receive an email about this
+                    jobsOfPerson = jobsPerPerson.setdefault(hashedID, [])
+                    if job not in jobsOfPerson: # the same news twice is news once
+                        jobsOfPerson.append(job)
+
+        mailer = MailingClass()
+        sender = settings.EMAIL_HOST_USER if getattr(settings, "EMAIL_HOST_USER", "") else None
+        mails = []
+        for hashedID, jobsOfPerson in jobsPerPerson.items():
+            try:
+                userEMailAddress = ProfileManagementBase.getEMailAddress(hashedID)
+                if userEMailAddress == None:
+                    continue
+                userLocale = ProfileManagementBase.getUserLocale(hashedID=hashedID)
+                userName = ProfileManagementBase.getUserNameViaHash(hashedID)
+                subjects = Locales.manageTranslations.getTranslations(userLocale, [job.subject for job in jobsOfPerson])
+                messages = Locales.manageTranslations.getTranslations(userLocale, [job.message for job in jobsOfPerson])
+                if len(jobsOfPerson) == 1:
+                    subjectOfMail = f"{subjects[0]} '{jobsOfPerson[0].processTitle}'"
+                    content = messages[0]
+                else:
+                    subjectOfMail = Locales.manageTranslations.getTranslation(userLocale, ["email","subjects","digest"])
+                    content = "<br><br>".join(f"{subject} '{job.processTitle}': {message}" for subject, message, job in zip(subjects, messages, jobsOfPerson))
+                htmlContent = mailer.mailingTemplate(userName, userLocale, content)
+                mail = EmailMultiAlternatives(subjectOfMail, strip_tags(htmlContent), sender, [userEMailAddress])
+                mail.attach_alternative(htmlContent, "text/html")
+                mails.append(mail)
+            except Exception as error:
+                loggerError.error(f"Error while sending email to {hashedID}: {str(error)}")
+
+        if len(mails) == 0:
+            return None
+        with get_connection() as smtpConnection: # one session for the whole burst
+            smtpConnection.send_messages(mails)
+        return None
+    except Exception as error:
+        loggerError.error(f"Error while sending emails: {str(error)}")
+        return error
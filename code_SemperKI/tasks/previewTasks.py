@@ -0,0 +1,156 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Rendering of the previews of uploaded files, as tasks of the task executor
+"""
+import logging, hashlib, os, threading, dataclasses
+from dataclasses import dataclass
+from collections import OrderedDict
+from importlib import import_module
+
+from django.conf import settings
+
+from Generic_Backend.code_General.definitions import FileObjectContent
+from Generic_Backend.code_General.utilities.temporaryFolder import temporaryDirectory
+
+import code_SemperKI.connections.content.postgresql.pgProcesses as DBProcessesAccess
+import code_SemperKI.utilities.websocket as websocket
+
+from ..definitions import FileContentsSemperKI, PreviewStatus, TaskTypesSemperKI
+from ..utilities.filePreview import renderPreview, storePreview, getPlaceholderPreview
+from .taskExecutor import taskExecutor
+
+SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+loggerError = logging.getLogger("errors")
+
+previewWorkers = 2 # rendering is CPU heavy, more would slow down the requests
+maxNumberOfRememberedPreviews = 256 # rendered jpgs are some kB each
+
+####################################################################
+@dataclass
+class PreviewJob():
+    """
+    A file of a process whose preview shall be set once it has been rendered
+
+    """
+    fileID:str
+    fileName:str # the extension determines how it's rendered
+    sourceFileID:str # the file whose content is rendered, e.g. the converted model for the original step file
+    locale:str
+
+####################################################################
+_renderedPreviews = OrderedDict() # content hash -> jpg, files with the same content are rendered only once
+_renderedPreviewsLock = threading.Lock()
+
+####################################################################
+def submitPreviews(projectID:str, processID:str, previewJobs:list[PreviewJob], session) -> None:
+    """
+    Render the previews of files that have been uploaded to a process, in the background.
+    They are one task in the database, so a restart doesn't leave them pending.
+
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID, the files must already be part of it
+    :type processID: str
+    :param previewJobs: The files
+    :type previewJobs: list[PreviewJob]
+    :param session: The session of the user who uploaded
+    :type session: Django Session Object
+    :return: Nothing
+    :rtype: None
+    """
+    if len(previewJobs) == 0:
+        return
+    sessionKey = getattr(session, "session_key", None)
+    retVal = taskExecutor.submit(TaskTypesSemperKI.renderPreviews, projectID=projectID, processID=processID, previewJobs=[dataclasses.asdict(job) for job in previewJobs], sessionKey=sessionKey if sessionKey is not None else "")
+    if isinstance(retVal, Exception):
+        loggerError.error(f"Error while submitting previews of process {processID}: {str(retVal)}")
+
+####################################################################
+def renderPreviewOfFile(fileOfProcess:dict|None, fileName:str) -> bytes|Exception:
+    """
+    Fetch a file from the storage and render its preview, or take the one of a file with the same content
+
+    :param fileOfProcess: The entry of the file in the process, None if it's gone
+    :type fileOfProcess: dict|None
+    :param fileName: The name, the extension determines how it's rendered
+    :type fileName: str
+    :return: The preview as jpg or the error
+    :rtype: bytes|Exception
+    """
+    from ..logics.filesLogics import getFileViaPath # that module submits the previews
+    if fileOfProcess is None:
+        return Exception(f"File {fileName} is not part of the process anymore")
+    fileObj = getFileViaPath(fileOfProcess[FileObjectContent.path], fileOfProcess.get(FileObjectContent.remote, False))
+    if fileObj is None:
+        return Exception(f"File {fileName} could not be fetched from the storage")
+    content = fileObj.read()
+    contentHash = hashlib.sha256(content).hexdigest()
+    with _renderedPreviewsLock:
+        if contentHash in _renderedPreviews:
+            _renderedPreviews.move_to_end(contentHash)
+            return _renderedPreviews[contentHash]
+
+    temporaryFileName = contentHash + os.path.splitext(fileName)[1]
+    temporaryFilePath = temporaryDirectory.createTemporaryFile(temporaryFileName, content)
+    try:
+        previewContent = renderPreview(temporaryFilePath)
+    finally:
+        temporaryDirectory.deleteTemporaryFile(temporaryFileName)
+    if not isinstance(previewContent, Exception): # failures aren't remembered, the next upload may work
+        with _renderedPreviewsLock:
+            _renderedPreviews[contentHash] = previewContent
+            while len(_renderedPreviews) > maxNumberOfRememberedPreviews:
+                _renderedPreviews.popitem(last=False)
+    return previewContent
+
+####################################################################
+def renderPreviews(projectID:str, processID:str, previewJobs:list[dict], sessionKey:str) -> None|Exception:
+    """
+    Render the previews of files, upload them and tell the process about it, runs in the task executor
+
+    :param projectID: The project ID
+    :type projectID: str
+    :param processID: The process ID
+    :type processID: str
+    :param previewJobs: The files, as given by PreviewJob
+    :type previewJobs: list[dict]
+    :param sessionKey: The key of the session of the user who uploaded
+    :type sessionKey: str
+    :return: Nothing or the error, so that it is tried again
+    :rtype: None|Exception
+    """
+    try:
+        processObj = DBProcessesAccess.ProcessManagementBase.getProcessObj(projectID, processID)
+        if processObj is None:
+            return None # Process doesn't exist anymore
+        session = SessionStore(session_key=sessionKey if sessionKey != "" else None)
+        previewsOfSources = {}
+        for job in [PreviewJob(**arguments) for arguments in previewJobs]:
+            if job.sourceFileID not in previewsOfSources:
+                previewsOfSources[job.sourceFileID] = renderPreviewOfFile(processObj.files.get(job.sourceFileID), job.fileName)
+            previewContent = previewsOfSources[job.sourceFileID]
+            if isinstance(previewContent, Exception):
+                loggerError.error(f"Error while rendering preview of file {job.fileID}: {str(previewContent)}")
+                imgPath, previewStatus = getPlaceholderPreview(job.locale), PreviewStatus.failed
+            else:
+                imgPath = storePreview(previewContent, projectID + "/" + processID + "/" + job.fileID)
+                if isinstance(imgPath, Exception):
+                    imgPath, previewStatus = getPlaceholderPreview(job.locale), PreviewStatus.failed
+                else:
+                    previewStatus = PreviewStatus.ready
+            retVal = DBProcessesAccess.ProcessManagementBase.updatePreviewOfFile(processID, job.fileID, imgPath, previewStatus)
+            if isinstance(retVal, Exception):
+                raise retVal
+            if retVal is not None:
+                websocket.fireWebsocketEventsForProcess(projectID, processID, session, FileContentsSemperKI.previewStatus, retVal)
+        return None
+    except Exception as error:
+        loggerError.error(f"Error while setting previews of process {processID}: {str(error)}")
+        return error
+
+####################################################################
+taskExecutor.register(TaskTypesSemperKI.renderPreviews, renderPreviews, maxConcurrent=previewWorkers)
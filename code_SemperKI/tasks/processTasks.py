@@ -6,16 +6,15 @@ Silvio Weging 2024
 Contains: Tasks that are needed for almost every process 
             and which shall be run in the background
 """
-import logging, enum
-from time import sleep
+import logging, enum, copy, dataclasses
+from importlib import import_module
 
 from django.conf import settings
+from django.db import transaction
 
-from Generic_Backend.code_General.connections.mailer import MailingClass
 from Generic_Backend.code_General.connections.postgresql.pgProfiles import profileManagement, ProfileManagementBase, ProfileManagementOrganization, Organization
 from Generic_Backend.code_General.definitions import UserNotificationTargets, SessionContent, UserDetails, OrganizationDetails, ProfileClasses, FileObjectContent
 from Generic_Backend.code_General.modelFiles.userModel import UserDescription
-from Generic_Backend.code_General.utilities.asyncTask import runInBackground
 from Generic_Backend.code_General.utilities.customStrEnum import StrEnumExactlyAsDefined
 
 import code_SemperKI.connections.content.postgresql.pgProcesses as DBProcessesAccess
@@ -23,17 +22,21 @@ import code_SemperKI.utilities.websocket as websocket
 import code_SemperKI.utilities.locales as Locales
 import code_SemperKI.handlers.public.files as FileHandler
 
-from ..definitions import ProcessDescription, ProcessUpdates, ProjectDetails, ValidationInformationForFrontend, ProcessDetails, NotificationSettingsUserSemperKI, NotificationSettingsOrgaSemperKI, ValidationSteps
+from ..definitions import ProcessDescription, ProcessUpdates, ProjectDetails, ValidationInformationForFrontend, ProcessDetails, NotificationSettingsUserSemperKI, NotificationSettingsOrgaSemperKI, ValidationSteps, TaskTypesSemperKI
 from ..states.stateDescriptions import ProcessStatusAsString, processStatusAsInt
 from ..modelFiles.processModel import Process
 from ..serviceManager import serviceManager
+from .emailTasks import EMailJob, sendEMailsOfBurst, digestWindow
+from .taskExecutor import taskExecutor
+
+SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
 
 loggerError = logging.getLogger("errors")
 ####################################################################
-@runInBackground
 def sendEMail(IDOfReceiver:str, notification:str, subject:list[str], message:list[str], processTitle:str) -> None:
     """
-    Send an E-Mail asynchronously
+    Send an E-Mail asynchronously, together with the other mails of the same burst.
+    The mail is a task in the database, so it is sent even if the server restarts in the meantime.
 
     :param IDOfReceiver: ID of receiving user/orga
     :type IDOfReceiver: str 
@@ -50,26 +53,16 @@ def sendEMail(IDOfReceiver:str, notification:str, subject:list[str], message:lis
     
     """
     try:
-        dictOfPreferences = DBProcessesAccess.gatherUserHashIDsAndNotificationPreference(IDOfReceiver, notification, UserNotificationTargets.email)
-        for hashedID in dictOfPreferences:
-            if dictOfPreferences[hashedID]: # person wants to receive an email about this
-                userEMailAddress = ProfileManagementBase.getEMailAddress(hashedID)
-                if userEMailAddress == None:
-                    continue
-                userLocale = ProfileManagementBase.getUserLocale(hashedID=hashedID)
-                userName = ProfileManagementBase.getUserNameViaHash(hashedID)
-                subjectOfMessage = Locales.manageTranslations.getTranslation(userLocale, subject)
-                messageItself = Locales.manageTranslations.getTranslation(userLocale, message)
-                mailer = MailingClass()
-                mailer.sendMail(userEMailAddress, f"{subjectOfMessage} '{processTitle}'", mailer.mailingTemplate(userName, userLocale, messageItself) )
+        retVal = taskExecutor.submit(TaskTypesSemperKI.sendEMails, **dataclasses.asdict(EMailJob(IDOfReceiver, notification, subject, message, processTitle)))
+        if isinstance(retVal, Exception):
+            raise retVal
     except Exception as error:
         loggerError.error(f"Error while sending email: {str(error)}")
 
 ####################################################################
-@runInBackground
-def verificationOfProcess(processObj:Process, session): # ProcessInterface not needed, verification is database only
+def verificationOfProcess(processObj:Process, session):
     """
-    Verify a process' integrity
+    Queue the verification of a process, the session is looked up again by its key when the task runs
     
     :param processObj: The process in question
     :type processObj: Process
@@ -78,71 +71,195 @@ def verificationOfProcess(processObj:Process, session): # ProcessInterface not n
     :return: Nothing
     :rtype: None
 
+    """
+    sessionKey = getattr(session, "session_key", None)
+    taskExecutor.submit(TaskTypesSemperKI.verification, processID=processObj.processID, sessionKey=sessionKey if sessionKey is not None else "")
+
+####################################################################
+def isVerificationPending(validationResults:dict) -> bool:
+    """
+    Did a service start tasks during the verification that aren't done yet?
+
+    :param validationResults: The results so far
+    :type validationResults: dict
+    :return: True if a result of the service specific tasks is marked as pending
+    :rtype: bool
+
+    """
+    return any(isinstance(result, dict) and result.get(ValidationInformationForFrontend.pending.value, False) is True
+               for result in validationResults.get(ValidationSteps.serviceSpecificTasks.value, {}).values())
+
+####################################################################
+def verifyProcess(processID:str, sessionKey:str) -> None|Exception: # ProcessInterface not needed, verification is database only
+    """
+    Verify a process' integrity, runs in the task executor.
+    If a service started tasks of its own, the results so far are stored and the verification is finished by finishVerification once they are done.
+    
+    :param processID: The ID of the process in question
+    :type processID: str
+    :param sessionKey: The key of the session of the user who clicked
+    :type sessionKey: str
+    :return: Nothing or the error, so that it is tried again
+    :rtype: None|Exception
+
     """
     try:
-        valid = True
+        processObj = DBProcessesAccess.ProcessManagementBase.getProcessObj("", processID)
+        if processObj is None:
+            return None # Process doesn't exist anymore
+        elif processObj.processStatus != processStatusAsInt(ProcessStatusAsString.VERIFYING):
+            return None # Not needed anymore, e.g. gone back or cancelled while waiting in the queue
+        session = SessionStore(session_key=sessionKey if sessionKey != "" else None)
+        service = serviceManager.getService(processObj.serviceType)
         validationResults = {}
+
         # Check if service was correctly defined
-        if valid and not serviceManager.getService(processObj.serviceType).serviceReady(processObj.serviceDetails)[0]:
-            valid = False
+        if not service.serviceReady(processObj.serviceDetails)[0]:
             validationResults[ValidationSteps.serviceReady] = {ValidationInformationForFrontend.isSuccessful: False, ValidationInformationForFrontend.reason: ""}
         else:
             validationResults[ValidationSteps.serviceReady] = {ValidationInformationForFrontend.isSuccessful: True}
+        reportVerificationProgress(processObj, session, validationResults, ValidationSteps.serviceReady)
 
-        # run service specific tasks
+        # run service specific tasks, they fill in their results themselves
         validationResults[ValidationSteps.serviceSpecificTasks] = {}
-        resultOfServiceTasks = serviceManager.getService(processObj.serviceType).serviceSpecificTasks(session, processObj, validationResults)
-        if isinstance(resultOfServiceTasks, Exception):
-            valid = False
-        for key in resultOfServiceTasks[ValidationSteps.serviceSpecificTasks]:
-            if resultOfServiceTasks[ValidationSteps.serviceSpecificTasks][key][ValidationInformationForFrontend.isSuccessful] is False:
-                valid = False
-                break
-
-        # Check if parameters make sense
-
-        # Check if object(s) is/are printable
-
-        # Check if dimensions fit
-
-        # Check ....
-
-        # But first, check if the status has been changed in the meantime (gone back or cancelled or something)
-        sleep(3)
-        currentProcessObj = DBProcessesAccess.ProcessManagementBase.getProcessObj("", processObj.processID)
-        if currentProcessObj is None:
-            # Process doesn't exist anymore
-            return
-        elif currentProcessObj.processStatus != processStatusAsInt(ProcessStatusAsString.VERIFYING):
-            return # Not needed anymore
-        
-        # save results in database
-        retVal = DBProcessesAccess.ProcessManagementBase.updateProcess("", processObj.processID, ProcessUpdates.verificationResults, validationResults, "SYSTEM")
+        with transaction.atomic():
+            # tasks started by the service run after the commit, so the results so far are stored before they can finish
+            resultOfServiceTasks = service.serviceSpecificTasks(session, processObj, validationResults)
+            pending = not isinstance(resultOfServiceTasks, Exception) and isVerificationPending(validationResults)
+            if pending:
+                retVal = DBProcessesAccess.ProcessManagementBase.updateProcess("", processID, ProcessUpdates.verificationResults, validationResults, "SYSTEM")
+                if isinstance(retVal, Exception):
+                    raise retVal
+        if pending:
+            return None # the service calls continueVerification once its tasks are done, no worker waits for them
+        reportVerificationProgress(processObj, session, validationResults, ValidationSteps.serviceSpecificTasks)
+
+        return completeVerification(processObj, session, validationResults, isinstance(resultOfServiceTasks, Exception))
+    except Exception as error:
+        loggerError.error(f"Error while verifying process: {str(error)}")
+        return error
+
+####################################################################
+def continueVerification(processID:str, sessionKey:str) -> None:
+    """
+    Called by a service when a task it started during the verification is done, finishVerification looks whether it was the last one
+
+    :param processID: The ID of the process in question
+    :type processID: str
+    :param sessionKey: The key of the session of the user who clicked
+    :type sessionKey: str
+    :return: Nothing
+    :rtype: None
+
+    """
+    retVal = taskExecutor.submit(TaskTypesSemperKI.finishVerification, processID=processID, sessionKey=sessionKey)
+    if isinstance(retVal, Exception):
+        loggerError.error(f"Error while continuing the verification: {str(retVal)}")
+
+####################################################################
+def finishVerification(processID:str, sessionKey:str) -> None|Exception:
+    """
+    Collect the results of the tasks the service started and finish the verification if none is pending anymore, runs in the task executor
+
+    :param processID: The ID of the process in question
+    :type processID: str
+    :param sessionKey: The key of the session of the user who clicked
+    :type sessionKey: str
+    :return: Nothing or the error, so that it is tried again
+    :rtype: None|Exception
+
+    """
+    try:
+        processObj = DBProcessesAccess.ProcessManagementBase.getProcessObj("", processID)
+        if processObj is None or processObj.processStatus != processStatusAsInt(ProcessStatusAsString.VERIFYING):
+            return None # Not needed anymore
+        validationResults = processObj.processDetails.get(ProcessDetails.verificationResults, {})
+        if not isVerificationPending(validationResults):
+            return None # e.g. the task of an analysis that wasn't part of the verification
+        session = SessionStore(session_key=sessionKey if sessionKey != "" else None)
+        resultOfServiceTasks = serviceManager.getService(processObj.serviceType).finishServiceSpecificTasks(session, processObj, validationResults)
+        if not isinstance(resultOfServiceTasks, Exception) and isVerificationPending(validationResults):
+            return None # the next task that is done calls again
+        reportVerificationProgress(processObj, session, validationResults, ValidationSteps.serviceSpecificTasks)
+
+        return completeVerification(processObj, session, validationResults, isinstance(resultOfServiceTasks, Exception))
+    except Exception as error:
+        loggerError.error(f"Error while finishing the verification of a process: {str(error)}")
+        return error
+
+####################################################################
+def completeVerification(processObj:Process, session, validationResults:dict, serviceTasksFailed:bool) -> None:
+    """
+    Store the results of a verification, set the new status and tell the client
+
+    :param processObj: The process in question
+    :type processObj: Process
+    :param session: The session of the user who clicked
+    :type session: Django Session Object
+    :param validationResults: The results of all steps
+    :type validationResults: dict
+    :param serviceTasksFailed: Whether the service specific tasks ended with an error
+    :type serviceTasksFailed: bool
+    :return: Nothing
+    :rtype: None
+
+    """
+    processID = processObj.processID
+    valid = validationResults[ValidationSteps.serviceReady][ValidationInformationForFrontend.isSuccessful] and not serviceTasksFailed \
+        and all(result.get(ValidationInformationForFrontend.isSuccessful) is not False for result in validationResults[ValidationSteps.serviceSpecificTasks].values())
+    processTitle = processObj.processDetails[ProcessDetails.title] if ProcessDetails.title in processObj.processDetails else processObj.processID
+    subject = ["email","subjects","statusUpdate"]
+    if valid:
+        message = ["email","content","verificationSuccessful"]
+        newStatus = processStatusAsInt(ProcessStatusAsString.VERIFICATION_COMPLETED)
+    else: # Else: set to failed
+        message = ["email","content","verificationFailed"]
+        newStatus = processStatusAsInt(ProcessStatusAsString.VERIFICATION_FAILED)
+
+    with transaction.atomic():
+        # the row stays locked until the results are in, so a status change in the meantime is either seen here or comes afterwards
+        currentStatus = Process.objects.select_for_update().filter(processID=processID).values_list("processStatus", flat=True).first()
+        if currentStatus is None:
+            return None # Process doesn't exist anymore
+        elif currentStatus != processStatusAsInt(ProcessStatusAsString.VERIFYING):
+            return None # Not needed anymore or finished by someone else
+
+        # save results and status in database
+        retVal = DBProcessesAccess.ProcessManagementBase.updateProcess("", processID, ProcessUpdates.verificationResults, validationResults, "SYSTEM")
         if isinstance(retVal, Exception):
             raise retVal
-        
-        # Get all details and set status in database
-        processTitle = processObj.processDetails[ProcessDetails.title] if ProcessDetails.title in processObj.processDetails else processObj.processID
-        subject = ["email","subjects","statusUpdate"]
-        if valid:
-            message = ["email","content","verificationSuccessful"]
-            retVal = DBProcessesAccess.ProcessManagementBase.updateProcess("", processObj.processID, ProcessUpdates.processStatus, processStatusAsInt(ProcessStatusAsString.VERIFICATION_COMPLETED), "SYSTEM")
-            if isinstance(retVal, Exception):
-                raise retVal
-        else: # Else: set to failed
-            message = ["email","content","verificationFailed"]
-            retVal = DBProcessesAccess.ProcessManagementBase.updateProcess("", processObj.processID, ProcessUpdates.processStatus, processStatusAsInt(ProcessStatusAsString.VERIFICATION_FAILED), "SYSTEM")
-            if isinstance(retVal, Exception):
-                raise retVal
-        # send out mail & Websocket event
-        sendEMail(processObj.client, NotificationSettingsUserSemperKI.verification, subject, message, processTitle)
-        websocket.fireWebsocketEventsForProcess(processObj.project.projectID, processObj.processID, session, ProcessUpdates.processStatus, retVal, NotificationSettingsUserSemperKI.verification, True)
-        
+        retVal = DBProcessesAccess.ProcessManagementBase.updateProcess("", processID, ProcessUpdates.processStatus, newStatus, "SYSTEM")
+        if isinstance(retVal, Exception):
+            raise retVal
+
+    # send out mail & Websocket event
+    sendEMail(processObj.client, NotificationSettingsUserSemperKI.verification, subject, message, processTitle)
+    websocket.fireWebsocketEventsForProcess(processObj.project.projectID, processObj.processID, session, ProcessUpdates.processStatus, retVal, NotificationSettingsUserSemperKI.verification, True)
+    return None
+
+####################################################################
+def reportVerificationProgress(processObj:Process, session, validationResults:dict, step:str) -> None:
+    """
+    Tell the client which step of the verification of a process is done
+
+    :param processObj: The process in question
+    :type processObj: Process
+    :param session: The session of the user who clicked
+    :type session: Django Session Object
+    :param validationResults: The results so far
+    :type validationResults: dict
+    :param step: The step that is done, see ValidationSteps
+    :type step: str
+    :return: Nothing
+    :rtype: None
+
+    """
+    try:
+        websocket.fireWebsocketEventsForProcess(processObj.project.projectID, processObj.processID, session, ProcessUpdates.verificationResults, (copy.deepcopy(validationResults), {"step": step}), NotificationSettingsUserSemperKI.verification, True)
     except Exception as error:
-        loggerError.error(f"Error while verifying process: {str(error)}")
+        loggerError.error(f"Error while reporting the progress of a verification: {str(error)}")
 
 ####################################################################
-@runInBackground
 def sendProcessEMails(processObj:Process, contractorObj:Organization, session):
     """
     Send the e-mails regarding the process on their merry way to the user and the contractor
@@ -175,7 +292,6 @@ def sendProcessEMails(processObj:Process, contractorObj:Organization, session):
 
 
 ######################################################################
-@runInBackground
 def sendLocalFileToRemote(pathOnStorage:str):
     """
     Send a file from local storage to remote storage in the background
@@ -185,8 +301,31 @@ def sendLocalFileToRemote(pathOnStorage:str):
     :return: Nothing
     :rtype: None
     
+    """
+    taskExecutor.submit(TaskTypesSemperKI.sendFileToRemote, pathOnStorage=pathOnStorage)
+
+######################################################################
+def moveLocalFileToRemote(pathOnStorage:str) -> None|Exception:
+    """
+    The transfer itself, runs in the task executor
+
+    :param pathOnStorage: The path on both s3 directories
+    :type pathOnStorage: str
+    :return: Nothing or the error, so that it is tried again
+    :rtype: None|Exception
+    
     """
     try:
-        FileHandler.moveFileToRemote(pathOnStorage, pathOnStorage)
+        retVal = FileHandler.moveFileToRemote(pathOnStorage, pathOnStorage)
+        if isinstance(retVal, Exception):
+            raise retVal
+        return None
     except Exception as error:
-        loggerError.error(f"Error while sending file from local to remote: {str(error)}")
\ No newline at end of file
+        loggerError.error(f"Error while sending file from local to remote: {str(error)}")
+        return error
+
+######################################################################
+taskExecutor.register(TaskTypesSemperKI.verification, verifyProcess, maxConcurrent=4)
+taskExecutor.register(TaskTypesSemperKI.finishVerification, finishVerification, maxConcurrent=1)
+taskExecutor.register(TaskTypesSemperKI.sendFileToRemote, moveLocalFileToRemote, maxConcurrent=2, maxAttempts=5)
+taskExecutor.register(TaskTypesSemperKI.sendEMails, sendEMailsOfBurst, maxConcurrent=1, batched=True, delay=digestWindow) # one SMTP connection per burst
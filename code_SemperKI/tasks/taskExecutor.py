@@ -0,0 +1,424 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Executor for the background tasks, with a queue in the database that survives restarts
+"""
+import logging, threading, time, datetime
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.db import connection, connections, close_old_connections, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from ..modelFiles.taskModel import BackgroundTask, BackgroundTaskStatus
+
+loggerError = logging.getLogger("errors")
+
+taskWorkers = 6 # threads that run tasks, for all task types together
+pollInterval = 1. # seconds after which the dispatcher looks for due tasks without being told
+remoteCheckInterval = 5. # seconds after which a waiter looks again without being told, for tasks that are over on another server
+retryBaseDelay = 2. # seconds until the first retry, doubled for every further one
+defaultStaleAfter = datetime.timedelta(minutes=15) # a task running longer than that belonged to a server that is gone
+keepFinishedTasksFor = datetime.timedelta(days=1) # for the statistics
+cleanUpInterval = 3600. # seconds between removals of old finished tasks
+maxBatchSize = 500 # tasks of a batched type that are handed over at once
+
+####################################################################
+@dataclass
+class TaskType():
+    """
+    A function that can run in the background
+
+    """
+    name:str
+    function:Callable
+    maxConcurrent:int # at the same time in this server
+    maxAttempts:int
+    batched:bool # the function gets the arguments of all due tasks as a list
+    delay:float # seconds between submission and the first attempt
+    cancellable:bool # the function gets the ID of its task, to look at isCancelled
+    staleAfter:datetime.timedelta
+
+####################################################################
+class _TaskExecutor():
+    """
+    Runs the registered functions with a fixed number of threads.
+    Submitted tasks are rows in the database, a dispatcher thread claims the due ones without exceeding the limit of their type.
+    A task that raises or returns an exception is tried again later, until it has used up its attempts.
+    Tasks of a batched type are run together: once the first one is due, it takes all new ones of its type along.
+    A function may return a dict, it is kept as the result of the task.
+    With zero workers, nothing runs until runPending is called, e.g. in tests where other threads can't see the database.
+
+    """
+    ###################################################
+    def __init__(self, workers:int=taskWorkers, retryDelay:float=retryBaseDelay) -> None:
+        self._workers = workers
+        self._retryDelay = retryDelay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task") if workers > 0 else None
+        self._lock = threading.Lock()
+        self._wakeUp = threading.Event()
+        self._taskOver = threading.Condition(self._lock) # notified whenever a run ends or a task is cancelled in this server
+        self._numberOfTasksOver = 0 # so that a waiter notices what happened between its look into the database and the wait
+        self._taskTypes = {}
+        self._running = {} # task type -> number of tasks running in this server
+        self._dispatcher = None
+        self._stopped = False
+        self._lastCleanUp = 0.
+
+    ###################################################
+    def register(self, name:str, function:Callable, maxConcurrent:int=1, maxAttempts:int=3, batched:bool=False, delay:float=0., cancellable:bool=False, staleAfter:datetime.timedelta=defaultStaleAfter) -> None:
+        """
+        Make a function available for submit
+
+        :param name: Name of the task type, stored with every task
+        :type name: str
+        :param function: Gets the arguments of the task as keyword arguments, may return an exception to be retried
+        :type function: Callable
+        :param maxConcurrent: How many of them may run at the same time, a batch counts as one
+        :type maxConcurrent: int
+        :param maxAttempts: How often a task is tried before it is given up
+        :type maxAttempts: int
+        :param batched: If True, the function gets a list with the arguments of many tasks instead
+        :type batched: bool
+        :param delay: How many seconds a task waits before its first attempt, e.g. to collect a burst into one batch
+        :type delay: float
+        :param cancellable: If True, the function gets the ID of its task as keyword argument taskID and should stop once isCancelled says so
+        :type cancellable: bool
+        :param staleAfter: A task that runs longer than that is considered interrupted
+        :type staleAfter: datetime.timedelta
+        :return: Nothing
+        :rtype: None
+        """
+        with self._lock:
+            self._taskTypes[name] = TaskType(name, function, maxConcurrent, maxAttempts, batched, delay, cancellable, staleAfter)
+            self._running.setdefault(name, 0)
+
+    ###################################################
+    def submit(self, taskType:str, **arguments) -> int|Exception:
+        """
+        Queue a task, it runs once the current transaction (if any) has been committed
+
+        :param taskType: Name of a registered task type
+        :type taskType: str
+        :param arguments: Keyword arguments for the function, must be JSON
+        :type arguments: dict
+        :return: The ID of the task or an error
+        :rtype: int|Exception
+        """
+        try:
+            if taskType not in self._taskTypes:
+                raise Exception(f"Task type {taskType} is not registered")
+            task = BackgroundTask.objects.create(taskType=taskType, arguments=arguments, runAfter=timezone.now()+datetime.timedelta(seconds=self._taskTypes[taskType].delay))
+            if connection.in_atomic_block:
+                transaction.on_commit(self._wake)
+            else:
+                self._wake()
+            return task.taskID
+        except Exception as error:
+            loggerError.error(f"Error while submitting task {taskType}: {str(error)}")
+            return error
+
+    ###################################################
+    def start(self) -> None:
+        """
+        Start the dispatcher, it runs what is queued, including what was left from before a restart
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self._executor is None or self._stopped:
+            return
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch, name="taskDispatcher", daemon=True)
+                self._dispatcher.start()
+
+    ###################################################
+    def _wake(self) -> None:
+        """
+        Tell the dispatcher that there is something to do, start it if necessary
+
+        """
+        if self._executor is None or self._stopped:
+            return
+        self.start()
+        self._wakeUp.set()
+
+    ###################################################
+    def _dispatch(self) -> None:
+        """
+        Loop of the dispatcher thread
+
+        """
+        self._requeueStaleTasks() # left over from before a restart
+        while not self._stopped:
+            self._wakeUp.wait(pollInterval)
+            self._wakeUp.clear()
+            if self._stopped:
+                break
+            try:
+                close_old_connections()
+                for tasks in self._claim():
+                    self._executor.submit(self._run, tasks)
+                self._cleanUp()
+            except Exception as error:
+                loggerError.error(f"Error in task dispatcher: {str(error)}")
+        connection.close()
+
+    ###################################################
+    def shutdown(self) -> None:
+        """
+        Stop claiming tasks and wait for the running ones, the queued ones stay for the next start
+
+        :return: Nothing
+        :rtype: None
+        """
+        self._stopped = True
+        self._wakeUp.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    ###################################################
+    def _claim(self, taskTypes:list[str]|None=None) -> list[list[BackgroundTask]]:
+        """
+        Mark as many due tasks as running as there are free slots, other servers skip them
+
+        """
+        with self._lock:
+            freeWorkers = (self._workers if self._workers > 0 else 1) - sum(self._running.values())
+            freeSlots = {name: (taskType, taskType.maxConcurrent - self._running[name]) for name, taskType in self._taskTypes.items() if taskTypes is None or name in taskTypes}
+        claimed = [] # one list of tasks per run
+        now = timezone.now()
+        with transaction.atomic():
+            for name, (taskType, free) in freeSlots.items():
+                free = min(free, freeWorkers - len(claimed))
+                if free <= 0:
+                    continue
+                queuedTasks = BackgroundTask.objects.select_for_update(skip_locked=True).filter(taskType=name, status=BackgroundTaskStatus.queued)
+                if not taskType.batched:
+                    claimed.extend([task] for task in queuedTasks.filter(runAfter__lte=now).order_by("taskID")[:free])
+                elif queuedTasks.filter(runAfter__lte=now).exists():
+                    # the ones that have not been tried yet come along, retries wait for their turn
+                    claimed.append(list(queuedTasks.filter(Q(runAfter__lte=now) | Q(attempts=0)).order_by("taskID")[:maxBatchSize]))
+            claimed = [tasks for tasks in claimed if len(tasks) > 0]
+            if len(claimed) == 0:
+                return claimed
+            BackgroundTask.objects.filter(taskID__in=[task.taskID for tasks in claimed for task in tasks]).update(status=BackgroundTaskStatus.running, startedWhen=now, attempts=F("attempts")+1)
+        with self._lock:
+            for tasks in claimed:
+                for task in tasks:
+                    task.attempts += 1
+                self._running[tasks[0].taskType] += 1
+        return claimed
+
+    ###################################################
+    def _run(self, tasks:list[BackgroundTask]) -> None:
+        """
+        Run one task or one batch and store how it went, in a thread of the pool or in the caller of runPending
+
+        """
+        taskType = self._taskTypes[tasks[0].taskType]
+        try:
+            try:
+                if taskType.batched:
+                    result = taskType.function([task.arguments for task in tasks])
+                elif taskType.cancellable:
+                    result = taskType.function(taskID=tasks[0].taskID, **tasks[0].arguments)
+                else:
+                    result = taskType.function(**tasks[0].arguments)
+            except Exception as error:
+                result = error
+            now = timezone.now()
+            # a task that has been cancelled in the meantime stays cancelled
+            if isinstance(result, Exception):
+                for task in tasks:
+                    if task.attempts >= taskType.maxAttempts:
+                        loggerError.error(f"Task {task.taskID} of type {task.taskType} failed for good: {str(result)}")
+                        BackgroundTask.objects.filter(taskID=task.taskID, status=BackgroundTaskStatus.running).update(status=BackgroundTaskStatus.failed, finishedWhen=now, lastError=str(result))
+                    else:
+                        retryAt = now + datetime.timedelta(seconds=self._retryDelay * 2**(task.attempts-1))
+                        BackgroundTask.objects.filter(taskID=task.taskID, status=BackgroundTaskStatus.running).update(status=BackgroundTaskStatus.queued, runAfter=retryAt, lastError=str(result))
+            else:
+                BackgroundTask.objects.filter(taskID__in=[task.taskID for task in tasks], status=BackgroundTaskStatus.running).update(status=BackgroundTaskStatus.done, finishedWhen=now, result=result if isinstance(result, dict) else {})
+        except Exception as error:
+            loggerError.error(f"Error while finishing tasks {[task.taskID for task in tasks]}: {str(error)}")
+        finally:
+            with self._lock:
+                self._running[taskType.name] -= 1
+                self._numberOfTasksOver += 1
+                self._taskOver.notify_all()
+            if threading.current_thread().name.startswith("task"):
+                connections.close_all()
+                self._wakeUp.set() # a slot is free
+
+    ###################################################
+    def _requeueStaleTasks(self) -> None:
+        """
+        Tasks that have been running for too long were interrupted, let them run again.
+        Those that have used up their attempts are given up, they may be the ones that bring the server down.
+
+        """
+        try:
+            now = timezone.now()
+            with self._lock:
+                taskTypes = list(self._taskTypes.values())
+            for taskType in taskTypes:
+                staleTasks = BackgroundTask.objects.filter(taskType=taskType.name, status=BackgroundTaskStatus.running, startedWhen__lt=now-taskType.staleAfter)
+                numberOfFailed = staleTasks.filter(attempts__gte=taskType.maxAttempts).update(status=BackgroundTaskStatus.failed, finishedWhen=now, lastError="Interrupted on the last attempt")
+                if numberOfFailed > 0:
+                    loggerError.error(f"{numberOfFailed} tasks of type {taskType.name} were interrupted on their last attempt and have been given up")
+                staleTasks.filter(attempts__lt=taskType.maxAttempts).update(status=BackgroundTaskStatus.queued, runAfter=now)
+        except Exception as error:
+            loggerError.error(f"Error while requeueing stale tasks: {str(error)}")
+
+    ###################################################
+    def _cleanUp(self) -> None:
+        """
+        Now and then, remove old finished tasks and requeue interrupted ones
+
+        """
+        if time.monotonic() - self._lastCleanUp < cleanUpInterval:
+            return
+        self._lastCleanUp = time.monotonic()
+        BackgroundTask.objects.filter(status__in=[BackgroundTaskStatus.done, BackgroundTaskStatus.failed], finishedWhen__lt=timezone.now()-keepFinishedTasksFor).delete()
+        self._requeueStaleTasks()
+
+    ###################################################
+    def runPending(self, taskTypes:list[str]|None=None) -> int:
+        """
+        Run all due tasks in the calling thread, one after the other
+
+        :param taskTypes: Only the tasks of these types, all if None
+        :type taskTypes: list[str]|None
+        :return: How many attempts have been made, a batch counts every task in it
+        :rtype: int
+        """
+        self._requeueStaleTasks()
+        numberOfRuns = 0
+        while True:
+            claimed = self._claim(taskTypes)
+            if len(claimed) == 0:
+                return numberOfRuns
+            for tasks in claimed:
+                self._run(tasks)
+                numberOfRuns += len(tasks)
+
+    ###################################################
+    def _waitUntil(self, isOver:Callable[[], bool], timeout:float|None) -> bool:
+        """
+        Look into the database whenever a task in this server is over, and now and then for the other servers
+
+        :param isOver: Looks whether the wait is over
+        :type isOver: Callable[[], bool]
+        :param timeout: How many seconds to wait at most
+        :type timeout: float|None
+        :return: True if isOver said so, False if the time ran out
+        :rtype: bool
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                seen = self._numberOfTasksOver
+            if isOver():
+                return True
+            waitFor = remoteCheckInterval
+            if end is not None:
+                if time.monotonic() >= end:
+                    return False
+                waitFor = min(waitFor, end - time.monotonic())
+            with self._taskOver:
+                self._taskOver.wait_for(lambda: self._numberOfTasksOver != seen, max(waitFor, 0.))
+
+    ###################################################
+    def waitUntilIdle(self, timeout:float|None=None) -> bool:
+        """
+        Block until no task of a registered type is queued or running, for tests and shutdown
+
+        :param timeout: How many seconds to wait at most
+        :type timeout: float|None
+        :return: True if nothing is left, False if the time ran out
+        :rtype: bool
+        """
+        def isIdle() -> bool:
+            if not BackgroundTask.objects.filter(taskType__in=list(self._taskTypes), status__in=[BackgroundTaskStatus.queued, BackgroundTaskStatus.running]).exists():
+                return True
+            self._wake() # e.g. a retry that is due by now
+            return False
+        return self._waitUntil(isIdle, timeout)
+
+    ###################################################
+    def waitForTasks(self, taskIDs:list[int], timeout:float|None=None) -> bool:
+        """
+        Block until the given tasks are over, no matter on which server they run
+
+        :param taskIDs: The IDs of the tasks
+        :type taskIDs: list[int]
+        :param timeout: How many seconds to wait at most
+        :type timeout: float|None
+        :return: True if all of them are over, False if the time ran out
+        :rtype: bool
+        """
+        return self._waitUntil(lambda: not BackgroundTask.objects.filter(taskID__in=taskIDs, status__in=[BackgroundTaskStatus.queued, BackgroundTaskStatus.running]).exists(), timeout)
+
+    ###################################################
+    def cancel(self, taskID:int) -> bool:
+        """
+        Cancel a task. A queued one never runs, the function of a running one should notice via isCancelled.
+
+        :param taskID: The ID of the task
+        :type taskID: int
+        :return: True if the task has been cancelled, False if it is unknown or already over
+        :rtype: bool
+        """
+        cancelled = BackgroundTask.objects.filter(taskID=taskID, status__in=[BackgroundTaskStatus.queued, BackgroundTaskStatus.running]).update(status=BackgroundTaskStatus.cancelled, finishedWhen=timezone.now()) > 0
+        if cancelled:
+            with self._lock:
+                self._numberOfTasksOver += 1
+                self._taskOver.notify_all()
+        return cancelled
+
+    ###################################################
+    def isCancelled(self, taskID:int) -> bool:
+        """
+        For the functions of cancellable task types, to look whether they shall stop
+
+        :param taskID: The ID of the task
+        :type taskID: int
+        :return: True if the task has been cancelled
+        :rtype: bool
+        """
+        return BackgroundTask.objects.filter(taskID=taskID, status=BackgroundTaskStatus.cancelled).exists()
+
+    ###################################################
+    def statistics(self) -> dict:
+        """
+        Depth and latency of the queue per task type, for the admins
+
+        :return: Per task type the number of tasks per status, how long the oldest queued one waits,
+                 the average time from submission to start and the average duration of the last hour; and the threads of this server
+        :rtype: dict
+        """
+        now = timezone.now()
+        outDict = {}
+        with self._lock:
+            for name, taskType in self._taskTypes.items():
+                outDict[name] = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0, "oldestQueuedSeconds": 0., "averageLatencySeconds": None, "averageDurationSeconds": None,
+                                 "maxConcurrent": taskType.maxConcurrent, "runningHere": self._running[name]}
+        statusNames = {status.value: status.name for status in BackgroundTaskStatus}
+        for entry in BackgroundTask.objects.filter(taskType__in=list(outDict)).values("taskType", "status").annotate(number=Count("taskID"), oldest=Min("createdWhen")):
+            outDict[entry["taskType"]][statusNames[entry["status"]]] = entry["number"]
+            if entry["status"] == BackgroundTaskStatus.queued:
+                outDict[entry["taskType"]]["oldestQueuedSeconds"] = (now - entry["oldest"]).total_seconds()
+        for entry in BackgroundTask.objects.filter(taskType__in=list(outDict), finishedWhen__gte=now-datetime.timedelta(hours=1)).values("taskType").annotate(latency=Avg(F("startedWhen")-F("createdWhen")), duration=Avg(F("finishedWhen")-F("startedWhen"))):
+            outDict[entry["taskType"]]["averageLatencySeconds"] = entry["latency"].total_seconds() if entry["latency"] is not None else None
+            outDict[entry["taskType"]]["averageDurationSeconds"] = entry["duration"].total_seconds() if entry["duration"] is not None else None
+        return {"workers": self._workers, "taskTypes": outDict}
+
+####################################################################
+taskExecutor = _TaskExecutor()
@@ -9,18 +9,40 @@ Contains: Tests for various functions and services
 """
 
 
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core import mail
+from django.utils import timezone
 import datetime
-import json, io
+import json, io, time, os, zipfile, tempfile, tracemalloc, threading, dataclasses
 from copy import deepcopy
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 
 from code_SemperKI.modelFiles.dataModel import DataDescription
-from code_SemperKI.states.stateDescriptions import ProcessStatusAsString
+from code_SemperKI.states.stateDescriptions import ProcessStatusAsString, processStatusAsInt
 from code_SemperKI.urls import paths
+from code_SemperKI.modelFiles.nodesModel import Node, defaultOwner
+from code_SemperKI.connections.content.postgresql import pgKnowledgeGraph
+from code_SemperKI.utilities.similarity import PropertyFeatureTable
+from code_SemperKI.connections.content.postgresql import pgProcesses, pgProjectSearch
+from code_SemperKI.logics import processLogics, filesLogics
+from code_SemperKI.tasks import previewTasks, emailTasks, taskExecutor, processTasks
+from code_SemperKI.modelFiles.taskModel import BackgroundTask, BackgroundTaskStatus
+from code_SemperKI.utilities.locales import ManageTranslations, manageTranslations
+from code_SemperKI.utilities.processMembership import processMembership
+from code_SemperKI.utilities.eventFanOut import eventFanOut
+from code_SemperKI.utilities import websocket, redisCaching
 
 
-from Generic_Backend.code_General.definitions import SessionContent, UserDescription, OrganizationDescription, ProfileClasses
-from .definitions import ProjectDescription, ProcessDescription, SessionContentSemperKI, ProcessUpdates
+from Generic_Backend.code_General.definitions import SessionContent, UserDescription, OrganizationDescription, ProfileClasses, FileObjectContent, EventsDescriptionGeneric
+from Generic_Backend.code_General.connections.postgresql.pgProfiles import ProfileManagementBase
+from Generic_Backend.code_General.modelFiles.eventModel import Event
+from .definitions import ProjectDescription, ProcessDescription, ProcessDetails, ProjectOutput, SessionContentSemperKI, ProcessUpdates, FileContentsSemperKI, PreviewStatus, DataType, MessageInterfaceFromFrontend, NotificationSettingsUserSemperKI, NotificationSettingsOrgaSemperKI, TaskTypesSemperKI
 
 # Create your tests here.
 
@@ -108,6 +130,225 @@ class TestProjects(TestCase):
         response = json.loads(client.get("/"+paths["getFlatProjects"][0]).content)
         self.assertIs(response["projects"][0][ProjectDescription.projectID] == projectObj[ProjectDescription.projectID], True, f'{response["projects"][0][ProjectDescription.projectID]} != {projectObj[ProjectDescription.projectID]}')
 
+    #######################################################
+    def test_projectSearch(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        changes = {"projectID": projectObj[ProjectDescription.projectID], "processIDs": [processObj[ProcessDescription.processID]], "changes": { "processDetails": {ProcessDetails.title: "Gearbox housing"}}, "deletions":{} }
+        response = client.patch("/"+paths["updateProcess"][0], json.dumps(changes), content_type="application/json")
+        self.assertIs(response.status_code == 200, True, f"got: {response.status_code}")
+
+        # the index follows the change of the process
+        self.assertIn("Gearbox housing", pgProcesses.Project.objects.get(projectID=projectObj[ProjectDescription.projectID]).searchableData)
+        response = json.loads(client.get("/"+paths["getFlatProjects"][0]+"?search=gearb hous").content)
+        self.assertEqual([project[ProjectDescription.projectID] for project in response["projects"]], [projectObj[ProjectDescription.projectID]])
+        response = json.loads(client.get("/"+paths["getFlatProjects"][0]+"?search=bearing").content)
+        self.assertEqual(response["projects"], [])
+
+        # a contractor finds the project only by what its own processes contain
+        organization = pgProcesses.Organization.objects.first()
+        process = pgProcesses.Process.objects.get(processID=processObj[ProcessDescription.processID])
+        contractorProcess = pgProcesses.Process(processID="searchOfContractor", project=process.project, processDetails={ProcessDetails.title: "Bracket"}, processStatus=process.processStatus, serviceDetails={}, serviceStatus=0, serviceType=process.serviceType, client=process.client, contractor=organization, files={}, messages={}, updatedWhen=timezone.now())
+        contractorProcess.save()
+        searchOfContractor = lambda searchTerm: [project[ProjectDescription.projectID] for project in pgProjectSearch.getProjectsFlatOfClient("someoneElse", organization.hashedID, searchTerm)]
+        self.assertEqual(searchOfContractor("brack"), [projectObj[ProjectDescription.projectID]])
+        self.assertEqual(searchOfContractor("gearbox"), [])
+
+        # saves that don't change the searchable data leave the index alone
+        with self.assertNumQueries(1):
+            contractorProcess.save(update_fields=[ProcessDescription.processStatus])
+        with self.assertNumQueries(2): # the save and the look whether the searchable data changed
+            contractorProcess.save()
+        contractorProcess.delete()
+        self.assertNotIn("Bracket", pgProcesses.Project.objects.get(projectID=projectObj[ProjectDescription.projectID]).searchableData)
+
+        # pagination
+        secondProjectObj, _ = self.createProjectAndProcess(client)
+        response = json.loads(client.get("/"+paths["getFlatProjects"][0]+"?offset=0&limit=1").content)
+        self.assertEqual([project[ProjectDescription.projectID] for project in response["projects"]], [secondProjectObj[ProjectDescription.projectID]])
+        response = json.loads(client.get("/"+paths["getFlatProjects"][0]+"?offset=1&limit=1").content)
+        self.assertEqual([project[ProjectDescription.projectID] for project in response["projects"]], [projectObj[ProjectDescription.projectID]])
+        response = client.get("/"+paths["getFlatProjects"][0]+"?limit=many")
+        self.assertEqual(response.status_code, 400)
+
+    #######################################################
+    def test_projectListingQueries(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        projectID = projectObj[ProjectDescription.projectID]
+        with CaptureQueriesContext(connection) as queriesForOneProcess:
+            projects = pgProcesses.ProcessManagementBase.getProjects(client.session)
+
+        # more processes and projects, dependencies between them
+        processPathSplit = paths["createProcessID"][0].split("/")
+        processPath = processPathSplit[0]+"/"+processPathSplit[1]+"/"+processPathSplit[2]+"/"+projectID+"/"
+        for _ in range(4):
+            client.get("/"+processPath)
+        self.createProjectAndProcess(client)
+        processes = list(pgProcesses.Process.objects.filter(project_id=projectID))
+        for process, nextProcess in zip(processes, processes[1:]):
+            process.dependenciesOut.add(nextProcess)
+            nextProcess.dependenciesIn.add(process)
+
+        with self.assertNumQueries(4): # project, processes with contractors, dependencies in and out
+            project = pgProcesses.ProcessManagementBase.getProject(projectID)
+        self.assertEqual(len(project[SessionContentSemperKI.processes]), 5)
+        self.assertEqual(sum(len(process[ProcessDescription.dependenciesOut]) for process in project[SessionContentSemperKI.processes]), 4)
+        with self.assertNumQueries(4):
+            self.assertEqual(len(pgProcesses.ProcessManagementBase.getProcessesPerPID(projectID)), 5)
+        with self.assertNumQueries(3): # process with project and contractor, dependencies in and out
+            pgProcesses.ProcessManagementBase.getProcess(projectID, processObj[ProcessDescription.processID])
+        with self.assertNumQueries(1):
+            allProjects = pgProcesses.ProcessManagementBase.getAllProjectsFlat()
+        self.assertEqual({project[ProjectOutput.processesCount] for project in allProjects if project[ProjectDescription.projectID] == projectID}, {5})
+        with self.assertNumQueries(len(queriesForOneProcess)):
+            projects = pgProcesses.ProcessManagementBase.getProjects(client.session)
+        self.assertEqual(len(projects), 2)
+        self.assertGreater(projects[0][ProjectDescription.createdWhen], projects[1][ProjectDescription.createdWhen])
+
+    #######################################################
+    def test_processMembership(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        process = pgProcesses.Process.objects.get(processID=processObj[ProcessDescription.processID])
+        userID = process.client
+        newProcesses = [pgProcesses.Process(processID=f"membership{idx}", project=process.project, processDetails={}, processStatus=process.processStatus, serviceDetails={}, serviceStatus=0, serviceType=process.serviceType, client=userID, files={}, messages={}, updatedWhen=timezone.now()) for idx in range(49)]
+        pgProcesses.Process.objects.bulk_create(newProcesses)
+        processIDs = [process.processID] + [newProcess.processID for newProcess in newProcesses]
+
+        processMembership.invalidate()
+        session = client.session
+        with self.assertNumQueries(4): # processes, users, organizations, members of organizations
+            self.assertTrue(processMembership.mayUserSeeProcesses(userID, processIDs, session))
+        with self.assertNumQueries(0): # remembered for the request
+            self.assertTrue(processMembership.mayUserSeeProcesses(userID, processIDs, session))
+        with self.assertNumQueries(0): # from redis
+            self.assertTrue(processMembership.mayUserSeeProcesses(userID, processIDs, client.session))
+        self.assertFalse(processMembership.mayUserSeeProcesses("someoneElse", processIDs))
+
+        # the contractor and its people may see the process once it is set
+        organization = pgProcesses.Organization.objects.first()
+        self.assertFalse(processMembership.mayUserSeeProcesses(organization.hashedID, [process.processID], session))
+        process.contractor = organization
+        process.save()
+        self.assertTrue(processMembership.mayUserSeeProcesses(organization.hashedID, [process.processID], session))
+
+        # an update of 50 processes looks up the members of organizations once
+        def updateTitles(numberOfProcesses:int, title:str) -> CaptureQueriesContext:
+            processMembership.invalidate()
+            changes = {"projectID": projectObj[ProjectDescription.projectID], "processIDs": processIDs[:numberOfProcesses], "changes": {"processDetails": {ProcessDetails.title: title}}, "deletions": {}}
+            with CaptureQueriesContext(connection) as queries:
+                response = client.patch("/"+paths["updateProcess"][0], json.dumps(changes), content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            return queries
+        queriesForOneProcess = len(updateTitles(1, "renamed once"))
+        queriesPerFurtherProcess = len(updateTitles(2, "renamed twice")) - queriesForOneProcess
+        with self.assertNumQueries(queriesForOneProcess + 49 * queriesPerFurtherProcess): # the rights check doesn't grow with the processes
+            queries = updateTitles(50, "renamed")
+        membershipTable = pgProcesses.Organization.users.through._meta.db_table
+        self.assertEqual(len([query for query in queries if membershipTable in query["sql"]]), 1)
+
+    #######################################################
+    def test_generationToken(self):
+        token = redisCaching.GenerationToken("testGeneration", timeToLive=60.)
+        first = token.get()
+        self.assertNotEqual(first, "")
+        with mock.patch.object(redisCaching, "RedisConnection") as redisConnection: # kept in the process
+            self.assertEqual(token.get(), first)
+            redisConnection.assert_not_called()
+        token.change()
+        second = token.get()
+        self.assertNotEqual(second, first)
+        self.assertEqual(redisCaching.GenerationToken("testGeneration").get(), second) # what the other servers see
+
+        # without redis there is no token and nothing is cached, it would never be invalidated
+        unreachable = redisCaching.GenerationToken("testGeneration")
+        with mock.patch.object(redisCaching, "RedisConnection", side_effect=ConnectionError("down")):
+            self.assertEqual(unreachable.get(), "")
+        self.assertEqual(redisCaching.asReturnedByRedis({"costs": [(1., 2.)], 1: None}), {"costs": [[1., 2.]], "1": None})
+
+    #######################################################
+    def test_eventFanOut(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        projectID, processID = projectObj[ProjectDescription.projectID], processObj[ProcessDescription.processID]
+        process = pgProcesses.Process.objects.get(processID=processID)
+        process.contractor = pgProcesses.Organization.objects.first()
+        process.save()
+        orgaSession = self.orgaClient.session
+        orgaUserID = ProfileManagementBase.getUserHashID(session=orgaSession)
+
+        channelLayer = get_channel_layer()
+        channelName = async_to_sync(channelLayer.new_channel)()
+        async_to_sync(channelLayer.group_add)(process.client[:80], channelName)
+
+        eventTable = Event._meta.db_table
+        eventFanOut.runWorker = False
+        try:
+            # the request neither looks up the recipients nor writes events
+            with CaptureQueriesContext(connection) as queries:
+                websocket.fireWebsocketEventsForProcess(projectID, processID, orgaSession, ProcessUpdates.messages, ("first", {}), NotificationSettingsUserSemperKI.newMessage, creatorOfEvent=orgaUserID)
+                websocket.fireWebsocketEventsForProcess(projectID, processID, orgaSession, ProcessUpdates.messages, ("second", {}), NotificationSettingsUserSemperKI.newMessage, creatorOfEvent=orgaUserID)
+                websocket.fireWebsocketEventsForProcess(projectID, processID, orgaSession, ProcessUpdates.processStatus, ("older status", {}), NotificationSettingsUserSemperKI.statusChange, creatorOfEvent=orgaUserID)
+                websocket.fireWebsocketEventsForProcess(projectID, processID, orgaSession, ProcessUpdates.processStatus, ("status", {}), NotificationSettingsUserSemperKI.statusChange, creatorOfEvent=orgaUserID)
+            self.assertFalse(any(eventTable in query["sql"] or pgProcesses.Process._meta.db_table in query["sql"] for query in queries))
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(eventFanOut.flush(), 3) # every message, but only the latest status
+            self.assertEqual(len([query for query in queries if query["sql"].startswith("INSERT") and eventTable in query["sql"]]), 1)
+
+            # what the worker hasn't sent yet goes out when the process ends
+            websocket.fireWebsocketEventsForProcess(projectID, processID, orgaSession, ProcessUpdates.messages, ("third", {}), NotificationSettingsUserSemperKI.newMessage, creatorOfEvent=orgaUserID)
+            eventFanOut.flushAtExit()
+        finally:
+            eventFanOut.runWorker = True
+        self.assertEqual(Event.objects.filter(userHashedID=process.client).count(), 4)
+        self.assertEqual(Event.objects.filter(userHashedID=orgaUserID).count(), 0) # no event for the creator
+
+        received = [async_to_sync(channelLayer.receive)(channelName)["dict"][EventsDescriptionGeneric.eventData] for _ in range(4)]
+        self.assertEqual([(entry[EventsDescriptionGeneric.reason], entry[EventsDescriptionGeneric.content]) for entry in received],
+                         [(ProcessUpdates.messages, "first"), (ProcessUpdates.messages, "second"), (ProcessUpdates.processStatus, "status"), (ProcessUpdates.messages, "third")])
+
+    #######################################################
+    def test_emailQueue(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        process = pgProcesses.Process.objects.get(processID=processObj[ProcessDescription.processID])
+        organization = pgProcesses.Organization.objects.first()
+        subject = ["email","subjects","statusUpdate"]
+        jobSuccessful = emailTasks.EMailJob(process.client, NotificationSettingsUserSemperKI.statusChange, subject, ["email","content","verificationSuccessful"], "Gearbox housing")
+        jobFailed = emailTasks.EMailJob(process.client, NotificationSettingsUserSemperKI.statusChange, subject, ["email","content","verificationFailed"], "Gearbox housing")
+        jobContractor = emailTasks.EMailJob(organization.hashedID, NotificationSettingsOrgaSemperKI.processReceived, ["email","subjects","newProcessForContractor"], ["email","content","newProcessForContractor"], "Gearbox housing")
+
+        # a burst waits for the digest window, then goes out together
+        executor = taskExecutor._TaskExecutor(workers=0)
+        executor.register("syntheticEMails", emailTasks.sendEMailsOfBurst, batched=True, delay=60)
+        for job in [jobSuccessful, jobFailed, jobSuccessful, jobContractor]:
+            executor.submit("syntheticEMails", **dataclasses.asdict(job))
+        mail.outbox = []
+        self.assertEqual(executor.runPending(), 0)
+        BackgroundTask.objects.filter(taskID=BackgroundTask.objects.filter(taskType="syntheticEMails").order_by("taskID").first().taskID).update(runAfter=timezone.now())
+        self.assertEqual(executor.runPending(), 4) # the first one is due and takes the others along
+        self.assertEqual(BackgroundTask.objects.filter(taskType="syntheticEMails", status=BackgroundTaskStatus.done).count(), 4)
+        self.assertEqual(len(mail.outbox), 2) # one for the client, one for the member of the contractor
+        digest = mail.outbox[0]
+        self.assertIn("Gearbox housing", digest.body)
+        self.assertEqual(digest.alternatives[0][0].count("Gearbox housing"), 2) # the repeated job is dropped
+        self.assertTrue(mail.outbox[1].subject.endswith("'Gearbox housing'"))
+
+        # the preferences are gathered once per receiver, not once per job
+        jobs = [dataclasses.asdict(job) for job in [jobSuccessful, jobFailed, jobSuccessful, jobContractor]]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(emailTasks.sendEMailsOfBurst(jobs))
+        with CaptureQueriesContext(connection) as queriesOfOne:
+            self.assertIsNone(emailTasks.sendEMailsOfBurst(jobs[:1]))
+        self.assertLess(len(queries), 3 * len(queriesOfOne))
+
     #######################################################
     def test_updateProject(self):
         client = Client()
@@ -230,6 +471,94 @@ class TestProjects(TestCase):
             contentOfTestFile = localCopyOfTestFile.read()
             self.assertIs(loaded_response_content == contentOfTestFile, True, f'{loaded_response_content} != {contentOfTestFile}')
 
+    ##################################################
+    def test_downloadFilesAsZip(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        # incompressible content, so that the archive is as large as the files together
+        fileSize = 16 * 1024 * 1024
+        contents = {f"model_{idx}.bin": os.urandom(fileSize) for idx in range(3)}
+        uploadBody = {ProjectDescription.projectID: projectObj[ProjectDescription.projectID], ProcessDescription.processID: processObj[ProcessDescription.processID], "origin": "my_origin"}
+        for fileName in contents:
+            uploadBody[fileName] = io.BytesIO(contents[fileName])
+        response = client.post("/"+paths["uploadFiles"][0], uploadBody )
+        self.assertIs(response.status_code == 200, True, f'got Statuscode {response.status_code}')
+        getProcPathSplit = paths["getProcess"][0].split("/")
+        getProcPath = getProcPathSplit[0] + "/" + getProcPathSplit[1] + "/" + getProcPathSplit[2] + "/" + projectObj[ProjectDescription.projectID] + "/" + processObj[ProcessDescription.processID] + "/"
+        fileIDs = list(json.loads(client.get("/"+getProcPath).content)[ProcessDescription.files].keys())
+        self.assertEqual(len(fileIDs), 3)
+
+        zipPathSplit = paths["downloadFilesAsZip"][0].split("/")
+        zipPath = "/".join(zipPathSplit[:4]) + "/" + projectObj[ProjectDescription.projectID] + "/" + processObj[ProcessDescription.processID] + "/"
+        with tempfile.TemporaryFile() as archive:
+            tracemalloc.start()
+            response = client.get("/"+zipPath, {"fileIDs": ",".join(fileIDs)})
+            self.assertIs(response.status_code == 200, True, f'got Statuscode {response.status_code}')
+            for chunk in response.streaming_content:
+                archive.write(chunk)
+            _, peakMemory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # far below a single file, let alone the whole archive
+            self.assertLess(peakMemory, fileSize // 2, f"peak memory: {peakMemory} bytes")
+
+            archive.seek(0)
+            with zipfile.ZipFile(archive) as zf:
+                self.assertEqual(sorted(zf.namelist()), sorted(contents.keys()))
+                for fileName in contents:
+                    self.assertIs(zf.read(fileName) == contents[fileName], True, f"content of {fileName} differs")
+
+        # a file that can't be opened is noticed before anything is sent, the ones already open are closed again
+        closeOfBody = filesLogics.StreamingBody.close
+        with mock.patch.object(filesLogics.StreamingBody, "close", autospec=True, side_effect=closeOfBody) as closed:
+            getFileObject = filesLogics.getFileObject
+            def failingForLastFile(session, projectID, processID, fileID):
+                return (None, False, False) if fileID == fileIDs[-1] else getFileObject(session, projectID, processID, fileID)
+            with mock.patch.object(filesLogics, "getFileObject", failingForLastFile):
+                response = client.get("/"+zipPath, {"fileIDs": ",".join(fileIDs)})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(closed.call_count, 2)
+
+            # an aborted download closes every file, whether it was in the archive yet or not
+            closed.reset_mock()
+            response = client.get("/"+zipPath, {"fileIDs": ",".join(fileIDs)})
+            self.assertEqual(response.status_code, 200)
+            next(iter(response.streaming_content))
+            response.close()
+            self.assertGreaterEqual(len({id(call.args[0]) for call in closed.call_args_list}), 3)
+
+    ##################################################
+    def test_previewsOfUpload(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        projectID, processID = projectObj[ProjectDescription.projectID], processObj[ProcessDescription.processID]
+        renderedFiles = []
+        def countingRenderer(temporaryFilePath:str) -> bytes:
+            renderedFiles.append(temporaryFilePath)
+            return b"jpg"
+        previewTasks._renderedPreviews.clear()
+
+        # the upload only queues the previews, they are a task in the database
+        uploadBody = {ProjectDescription.projectID: projectID, ProcessDescription.processID: processID, "first.stl": self.fileFactory(), "second.stl": self.fileFactory(), "origin": "my_origin"}
+        with self.settings(S3_SECRET_ACCESS_KEY=settings.S3_SECRET_ACCESS_KEY or "placeholder"), mock.patch.object(previewTasks, "renderPreview", countingRenderer), \
+                mock.patch.object(previewTasks, "storePreview", lambda previewContent, storagePath: "https://previews/" + storagePath):
+            response = client.post("/"+paths["uploadFiles"][0], uploadBody )
+            self.assertIs(response.status_code == 200, True, f'got Statuscode {response.status_code}')
+            files = pgProcesses.ProcessManagementBase.getProcessObj(projectID, processID).files
+            self.assertEqual({files[fileID][FileContentsSemperKI.previewStatus] for fileID in files}, {PreviewStatus.pending})
+            self.assertEqual(BackgroundTask.objects.filter(taskType=TaskTypesSemperKI.renderPreviews, status=BackgroundTaskStatus.queued).count(), 1)
+
+            # worker in this thread, others can't see the database of the test
+            self.assertEqual(taskExecutor.taskExecutor.runPending([TaskTypesSemperKI.renderPreviews]), 1)
+
+        files = pgProcesses.ProcessManagementBase.getProcessObj(projectID, processID).files
+        self.assertEqual(len(files), 2)
+        for fileID in files:
+            self.assertEqual(files[fileID][FileContentsSemperKI.previewStatus], PreviewStatus.ready)
+            self.assertEqual(files[fileID][FileObjectContent.imgPath], "https://previews/" + projectID + "/" + processID + "/" + fileID)
+        self.assertEqual(len(renderedFiles), 1) # same content, the rendered preview was reused
+
     ##################################################
     def test_processHistory(self):
         client = Client()
@@ -257,6 +586,34 @@ class TestProjects(TestCase):
 
 
 
+    ##################################################
+    def test_processHistoryPDF(self):
+        client = Client()
+        self.createUser(client)
+        projectObj, processObj = self.createProjectAndProcess(client)
+        processID = processObj[ProcessDescription.processID]
+        process = pgProcesses.Process.objects.get(processID=processID)
+        createdBy = pgProcesses.Data.objects.filter(process=process).first().createdBy
+        numberOfEntries = 10000
+        entries = [pgProcesses.Data(dataID=f"history{idx}", process=process, type=DataType.MESSAGE if idx % 2 == 0 else DataType.STATUS, data={"text": f"message number {idx}"}, details={}, createdBy=createdBy, contentID="", updatedWhen=timezone.now()) for idx in range(numberOfEntries)]
+        pgProcesses.Data.objects.bulk_create(entries, batch_size=1000)
+        del entries
+
+        # the number of queries doesn't depend on the length of the history, and neither does the memory
+        request = SimpleNamespace(session=client.session)
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            response = filesLogics.logicForDownloadProcessHistory(request, processID, "downloadProcessHistory")
+            self.assertEqual(response.status_code, 200)
+            content = b"".join(response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        response.close()
+        self.assertLess(len(queries), 10, [query["sql"] for query in queries])
+        self.assertLess(peak, 10*1024*1024)
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertIn(b"%%EOF", content[-16:])
+
     ##################################################
     def test_stateMachine(self):
         client = Client()
@@ -287,4 +644,409 @@ class TestProjects(TestCase):
         response = json.loads(client.get("/"+getProcPath).content)
         self.assertIs(response[ProcessDescription.processStatus] == 0, True, f'{response[ProcessDescription.processStatus]}')
 
+    #######################################################
+    def test_parallelPricing(self):
+        class SyntheticService():
+            # prices only depend on the contractor, the sleep stands for the round trips to redis and co.
+            def preloadInputsForPricing(self, process, contractors, organizations, transferObject):
+                return {contractor[0]: {"factor": 1.5} for contractor in contractors}
+            def calculatePriceForService(self, process, additionalArguments, transferObject):
+                time.sleep(0.01)
+                contractor = additionalArguments["contractor"]
+                factor = additionalArguments["preloaded"]["factor"] if "preloaded" in additionalArguments else 1.5
+                return {"groupCosts": [(factor*group, factor*group + contractor[1]) for group in contractor[2]]}
+            def getServiceSpecificContractorDetails(self, existingDetails, contractor):
+                existingDetails["groups"] = contractor[2]
+                return existingDetails
+
+        orgaID = pgProcesses.ProcessManagementBase.getAllContractors(1)[0][OrganizationDescription.hashedID]
+        contractors = [(orgaID, idx, [idx % 3, idx]) for idx in range(50)]
+        processObj = SimpleNamespace(serviceDetails={}, processDetails={})
+
+        start = time.perf_counter()
+        sequentialResult = processLogics.parallelLoop(contractors, processObj, SyntheticService(), (0,0), {}, workers=1)
+        sequentialDuration = time.perf_counter() - start
+        start = time.perf_counter()
+        parallelResult = processLogics.parallelLoop(contractors, processObj, SyntheticService(), (0,0), {}, workers=8)
+        parallelDuration = time.perf_counter() - start
+
+        self.assertEqual(len(parallelResult), 50)
+        self.assertNotIn("error", parallelResult[0], f"{parallelResult[0]}")
+        # same results in the same order
+        self.assertEqual(sequentialResult, parallelResult)
+        self.assertLess(parallelDuration, sequentialDuration, f"parallel: {parallelDuration}s, sequential: {sequentialDuration}s")
+
+
+#######################################################
+class TestKnowledgeGraph(TestCase):
+
+    # not part of the tests!
+    #######################################################
+    @staticmethod
+    def createSyntheticGraph(numberOfNodes:int, createdBy:str=defaultOwner) -> list[Node]:
+        """
+        Create a chain of nodes where every node is linked to its predecessor
+
+        """
+        nodes = [Node(nodeID=f"{createdBy}_node_{i}", uniqueID=f"{createdBy}_node_{i}", nodeName=f"node {i}", nodeType="material", context="", properties={}, createdBy=createdBy, clonedFrom="", updatedWhen=timezone.now()) for i in range(numberOfNodes)]
+        Node.objects.bulk_create(nodes, batch_size=pgKnowledgeGraph.bulkBatchSize)
+        EdgeTable = Node.edges.through
+        edges = []
+        for i in range(1, numberOfNodes):
+            edges.append(EdgeTable(from_node_id=nodes[i-1].nodeID, to_node_id=nodes[i].nodeID))
+            edges.append(EdgeTable(from_node_id=nodes[i].nodeID, to_node_id=nodes[i-1].nodeID))
+        EdgeTable.objects.bulk_create(edges, batch_size=pgKnowledgeGraph.bulkBatchSize)
+        return nodes
+
+    # Tests!
+    #######################################################
+    def test_copyGraphForNewOwner(self):
+        numberOfNodes = 100
+        self.createSyntheticGraph(numberOfNodes)
+        # two reads, one insert for the nodes and one for the edges, wrapped in a savepoint since the test itself runs in a transaction
+        # and one insert that queues the rebuild of the capabilities
+        with self.assertNumQueries(7):
+            result = pgKnowledgeGraph.Basics.copyGraphForNewOwner("orga")
+        self.assertIsNone(result, f"{result}")
+        copies = Node.objects.filter(createdBy="orga")
+        self.assertEqual(copies.count(), numberOfNodes)
+        copyOfFirst = copies.get(clonedFrom=f"{defaultOwner}_node_0")
+        self.assertEqual(copyOfFirst.uniqueID, f"{defaultOwner}_node_0")
+        self.assertEqual([node.nodeID for node in copyOfFirst.edges.all()], [f"{defaultOwner}_node_1"])
+        copyOfSecond = copies.get(clonedFrom=f"{defaultOwner}_node_1")
+        self.assertEqual(sorted([node.nodeID for node in copyOfSecond.edges.all()]), [f"{defaultOwner}_node_0", f"{defaultOwner}_node_2"])
+
+    #######################################################
+    def test_getGraph(self):
+        for numberOfNodes in [100, 1000, 10000]:
+            Node.objects.all().delete()
+            self.createSyntheticGraph(numberOfNodes)
+            self.createSyntheticGraph(10, "orga")
+            # one query for the nodes and one for the edge table, regardless of the size
+            with self.assertNumQueries(2):
+                result = pgKnowledgeGraph.Basics.getGraph()
+            self.assertEqual(len(result["nodes"]), numberOfNodes + 10)
+            self.assertEqual(len(result["edges"]), numberOfNodes - 1 + 9, "symmetrical edges should only be returned once")
+
+            with self.assertNumQueries(2):
+                result = pgKnowledgeGraph.Basics.getGraph("orga", ["technology"])
+            self.assertEqual(len(result["nodes"]), 10)
+            self.assertEqual(len(result["edges"]), 9)
+
+            streamedResult = json.loads("".join(pgKnowledgeGraph.Basics.streamGraphAsJSON("orga", ["technology"], forFrontend=True)))
+            self.assertEqual(len(streamedResult["Nodes"]), 10)
+            self.assertEqual(len(streamedResult["Edges"]), 9)
+
+    #######################################################
+    def test_propertyIndex(self):
+        def buildProperties(volume:str, density:float):
+            return [{"name": "Build volume", "key": "buildVolume", "value": volume, "unit": "mm", "type": "text"},
+                    {"name": "Density", "key": "density", "value": density, "unit": "g/cm³", "type": "number"}]
+        printer = pgKnowledgeGraph.Basics.createNode({"nodeName": "printer", "nodeType": "printer", "properties": buildProperties("400x400x400", 1.2)})
+        pgKnowledgeGraph.Basics.createNode({"nodeName": "material", "nodeType": "material", "properties": buildProperties("200x200x200", 7.8)})
+
+        result = pgKnowledgeGraph.Basics.getNodesByTypeAndPropertyAndValue("printer", "buildVolume", "400x400x400")
+        self.assertEqual([entry["nodeID"] for entry in result], [printer.nodeID])
+        self.assertEqual(len(pgKnowledgeGraph.Basics.getNodesByProperty("density")), 2)
+
+        # key and value are found by parts of them, ignoring case, numbers by their text
+        self.assertEqual(len(pgKnowledgeGraph.Basics.getNodesByProperty("VOLUME")), 2)
+        result = pgKnowledgeGraph.Basics.getNodesByTypeAndPropertyAndValue("printer", "buildvolume", "400")
+        self.assertEqual([entry["nodeID"] for entry in result], [printer.nodeID])
+        result = pgKnowledgeGraph.Basics.getNodesByTypeAndPropertyAndValue("printer", "density", "1.2")
+        self.assertEqual([entry["nodeID"] for entry in result], [printer.nodeID])
+        self.assertEqual(pgKnowledgeGraph.Basics.getNodesByTypeAndPropertyAndValue("printer", "density", "400"), [], "key and value must belong to the same property")
+        result = pgKnowledgeGraph.Basics.getNodesByPropertyRange("density", 1., 2.)
+        self.assertEqual([entry["nodeID"] for entry in result], [printer.nodeID])
+        result = pgKnowledgeGraph.Basics.getNodesByPropertyPrefix("buildVolume", "400x")
+        self.assertEqual([entry["nodeID"] for entry in result], [printer.nodeID])
+
+        # the partial matches can use the trigram indices, a table this small is only read without them if that's allowed
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        self.assertIn("nodeProperty_key_trgm_idx", pgKnowledgeGraph.Basics.queryNodesByProperty("volume").explain())
+        self.assertIn("_trgm_idx", pgKnowledgeGraph.Basics.queryNodesByTypeAndPropertyAndValue("printer", "buildVolume", "400x").explain())
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = on")
+
+        # the index follows updates
+        pgKnowledgeGraph.Basics.updateNode(printer.nodeID, {"properties": buildProperties("300x300x300", 5.)})
+        self.assertEqual(pgKnowledgeGraph.Basics.getNodesByPropertyRange("density", 1., 2.), [])
+        self.assertEqual(pgKnowledgeGraph.Basics.getNodesByPropertyPrefix("buildVolume", "400x"), [])
+        self.assertEqual(len(pgKnowledgeGraph.Basics.getNodesByPropertyRange("density", 4., 10.)), 2)
+
+    #######################################################
+    def test_similarityEngine(self):
+        def prop(key:str, value, propType:str):
+            return {"name": key, "key": key, "value": value, "unit": "", "type": propType}
+        reference = {"name": prop("name", "PLA Basic", "text"), "density": prop("density", 1.24, "number"), "colors": prop("colors", "red,blue", "array"), "imgPath": prop("imgPath", "a.png", "text")}
+        candidates = [
+            {"name": prop("name", "PLA Basic", "text"), "density": prop("density", 1.3, "number"), "colors": prop("colors", "blue,red", "array")},
+            {"name": prop("name", "PETG", "text"), "density": prop("density", 1.27, "number"), "colors": prop("colors", "red,blue", "array")},
+            {"name": prop("name", "PLA Basics", "text"), "density": prop("density", "1.24", "text"), "imgPath": prop("imgPath", "b.png", "text")},
+            {"name": prop("name", "ABS", "text"), "density": prop("density", 1.04, "number"), "colors": prop("colors", "red", "array")},
+            {"somethingElse": prop("somethingElse", 1, "number")},
+            {"name": prop("name", "PLA Basic", "text"), "density": prop("density", 1.24, "number"), "colors": prop("colors", "red,blue", "array")},
+        ]
+        table = PropertyFeatureTable([str(i) for i in range(len(candidates))], candidates)
+        scores = table.computeF1Scores(reference)
+        # the vectorized scores must be the same as the ones of the exact check
+        for index, candidate in enumerate(candidates):
+            similar, f1Score, _ = pgKnowledgeGraph.Logic.checkAndUpdateProperties(reference, candidate)
+            self.assertAlmostEqual(scores[index], f1Score, msg=f"candidate {index}")
+            self.assertEqual(scores[index] > 0.8, similar, f"candidate {index}")
+        ranking = table.rank(reference)
+        self.assertEqual([index for index, _ in ranking], [0, 5])
+
+#######################################################
+class TestTranslations(TestCase):
+
+    #######################################################
+    def test_translationTable(self):
+        table = ManageTranslations.flatten({"de-DE": {"service": {"margin": "Marge"}}})
+        self.assertEqual(table[("de-DE", "service", "margin")], "Marge")
+        self.assertEqual(table[("de-DE", "service")], {"margin": "Marge"})
+
+        self.assertEqual(manageTranslations.getTranslation("de-DE", ["service", "ADDITIVE_MANUFACTURING", "margin"]), "Marge")
+        self.assertEqual(manageTranslations.getTranslations("en-US", [["service", "ADDITIVE_MANUFACTURING", "margin"], ["service", "doesNotExist"]]), ["Margin", "ERROR"])
+        properties = [{"key": "margin", "name": ""}, {"key": "powerCosts", "name": ""}]
+        manageTranslations.translateProperties("de-DE", properties, ["service", "ADDITIVE_MANUFACTURING"])
+        self.assertEqual([prop["name"] for prop in properties], ["Marge", "Stromkosten"])
+
+        # once invalidated, the table is loaded a single time and used afterwards
+        numberOfLoads = manageTranslations.numberOfLoads
+        manageTranslations.invalidate()
+        manageTranslations.getTranslation("de-DE", ["service", "ADDITIVE_MANUFACTURING", "margin"])
+        self.assertEqual(manageTranslations.numberOfLoads, numberOfLoads + 1)
+        manageTranslations.getTranslation("de-DE", ["service", "ADDITIVE_MANUFACTURING", "margin"])
+        self.assertEqual(manageTranslations.numberOfLoads, numberOfLoads + 1)
+
+#######################################################
+class TestProcessUpdates(TransactionTestCase):
+    """
+    Threads have their own connections and only see what is committed, hence TransactionTestCase
+
+    """
+
+    #######################################################
+    @staticmethod
+    def createProcess() -> str:
+        project = pgProcesses.Project.objects.create(projectID="concurrencyProject", projectStatus=0, client="concurrencyClient", projectDetails={"title": "concurrency"}, updatedWhen=timezone.now())
+        pgProcesses.Process.objects.create(processID="concurrencyProcess", project=project, processDetails={}, processStatus=0, serviceDetails={}, serviceStatus=0, serviceType=pgProcesses.serviceManager.getNone(), client="concurrencyClient", files={}, messages={}, updatedWhen=timezone.now())
+        return "concurrencyProcess"
+
+    #######################################################
+    def runConcurrently(self, numberOfThreads:int, function) -> list:
+        errors = []
+        def worker(index:int):
+            try:
+                result = function(index)
+                if isinstance(result, Exception):
+                    errors.append(result)
+            finally:
+                connection.close()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(numberOfThreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    #######################################################
+    def test_concurrentPartialUpdates(self):
+        processID = self.createProcess()
+        numberOfThreads = 10
+        def changeOneKeyAndWriteMessage(index:int):
+            result = pgProcesses.ProcessManagementBase.updateProcess("concurrencyProject", processID, ProcessUpdates.processDetails, {f"key{index}": index}, "concurrencyClient")
+            if isinstance(result, Exception):
+                return result
+            message = {MessageInterfaceFromFrontend.origin: "chat", MessageInterfaceFromFrontend.text: f"message {index}", MessageInterfaceFromFrontend.userName: "client", MessageInterfaceFromFrontend.date: ""}
+            return pgProcesses.ProcessManagementBase.updateProcess("concurrencyProject", processID, ProcessUpdates.messages, message, "concurrencyClient")
+        errors = self.runConcurrently(numberOfThreads, changeOneKeyAndWriteMessage)
+        self.assertEqual(errors, [])
+
+        process = pgProcesses.Process.objects.get(processID=processID)
+        self.assertEqual({key: value for key, value in process.processDetails.items() if key.startswith("key")}, {f"key{index}": index for index in range(numberOfThreads)})
+        self.assertEqual(sorted(message[MessageInterfaceFromFrontend.text] for message in process.messages["chat"]), sorted(f"message {index}" for index in range(numberOfThreads)))
+        self.assertEqual(pgProcesses.Data.objects.filter(process_id=processID).count(), 2*numberOfThreads)
+
+    #######################################################
+    def test_concurrentBatches(self):
+        processID = self.createProcess()
+        numberOfThreads = 10
+        def changeSeveralThings(index:int):
+            changes = {ProcessUpdates.processDetails: {f"key{index}": index}, ProcessUpdates.additionalInput: {"from": index}, ProcessUpdates.serviceStatus: index}
+            return pgProcesses.ProcessManagementBase.updateProcessBatch("concurrencyProject", processID, changes, "concurrencyClient")
+        errors = self.runConcurrently(numberOfThreads, changeSeveralThings)
+        self.assertEqual(errors, [])
+
+        # every batch happened as a whole, one after the other
+        process = pgProcesses.Process.objects.get(processID=processID)
+        self.assertEqual({key: value for key, value in process.processDetails.items() if key.startswith("key")}, {f"key{index}": index for index in range(numberOfThreads)})
+        self.assertEqual(process.processDetails[ProcessDetails.additionalInput]["from"], process.serviceStatus)
+
+#######################################################
+class TestBackgroundTasks(TransactionTestCase):
+    """
+    The workers of the executor only see committed tasks, hence TransactionTestCase
+
+    """
+
+    #######################################################
+    def test_burstOfTasks(self):
+        numberOfTasks = 60
+        lock = threading.Lock()
+        state = {"running": 0, "mostAtOnce": 0, "threads": set(), "attempts": {}}
+        def synthetic(index:int):
+            with lock:
+                state["running"] += 1
+                state["mostAtOnce"] = max(state["mostAtOnce"], state["running"])
+                state["threads"].add(threading.current_thread().name)
+                state["attempts"][index] = state["attempts"].get(index, 0) + 1
+                firstAttempt = state["attempts"][index] == 1
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            if index % 10 == 0 and firstAttempt:
+                return Exception("fails once") # shall be retried
+            return None
+
+        executor = taskExecutor._TaskExecutor(workers=3, retryDelay=0.05)
+        executor.register("syntheticBurst", synthetic, maxConcurrent=2)
+        threadsBefore = threading.active_count()
+        for index in range(numberOfTasks):
+            self.assertIsInstance(executor.submit("syntheticBurst", index=index), int)
+        self.assertLessEqual(threading.active_count(), threadsBefore + 4) # three workers and the dispatcher at most
+        self.assertTrue(executor.waitUntilIdle(30))
+        statistics = executor.statistics()["taskTypes"]["syntheticBurst"]
+        executor.shutdown()
+
+        self.assertLessEqual(state["mostAtOnce"], 2)
+        self.assertLessEqual(len(state["threads"]), 3)
+        self.assertEqual(sorted(state["attempts"]), list(range(numberOfTasks))) # none lost
+        self.assertEqual(sum(state["attempts"].values()), numberOfTasks + numberOfTasks // 10)
+        self.assertEqual((statistics["done"], statistics["queued"], statistics["failed"]), (numberOfTasks, 0, 0))
+        self.assertIsNotNone(statistics["averageLatencySeconds"])
+
+    #######################################################
+    def test_waitingForTasks(self):
+        executor = taskExecutor._TaskExecutor(workers=1)
+        executor.register("syntheticWait", lambda: time.sleep(0.1))
+        try:
+            # the waiter is told when the task is over instead of looking again after a while
+            taskID = executor.submit("syntheticWait")
+            start = time.monotonic()
+            self.assertTrue(executor.waitForTasks([taskID], 30))
+            self.assertLess(time.monotonic() - start, taskExecutor.remoteCheckInterval / 2)
+            self.assertTrue(executor.waitUntilIdle(30))
+
+            # one running on another server is looked at again, at the latest when the time is up
+            remoteTask = BackgroundTask.objects.create(taskType="syntheticWait", runAfter=timezone.now(), status=BackgroundTaskStatus.running, attempts=1, startedWhen=timezone.now())
+            start = time.monotonic()
+            self.assertFalse(executor.waitForTasks([remoteTask.taskID], 0.2))
+            self.assertLess(time.monotonic() - start, taskExecutor.remoteCheckInterval / 2)
+            waited = []
+            def waitInThread():
+                waited.append(executor.waitForTasks([remoteTask.taskID], 30))
+                connection.close()
+            waiter = threading.Thread(target=waitInThread)
+            waiter.start()
+            time.sleep(0.1)
+            start = time.monotonic()
+            self.assertTrue(executor.cancel(remoteTask.taskID))
+            waiter.join()
+            self.assertLess(time.monotonic() - start, taskExecutor.remoteCheckInterval / 2)
+            self.assertEqual(waited, [True])
+        finally:
+            executor.shutdown()
+
+    #######################################################
+    def test_tasksSurviveRestart(self):
+        done = []
+        # what an earlier server left behind: one queued and one interrupted while running
+        BackgroundTask.objects.create(taskType="syntheticRestart", arguments={"index": 0}, runAfter=timezone.now())
+        BackgroundTask.objects.create(taskType="syntheticRestart", arguments={"index": 1}, runAfter=timezone.now(), status=BackgroundTaskStatus.running, attempts=1, startedWhen=timezone.now()-datetime.timedelta(hours=1))
+        BackgroundTask.objects.create(taskType="syntheticRestart", arguments={"index": 2}, runAfter=timezone.now(), status=BackgroundTaskStatus.running, attempts=1, startedWhen=timezone.now()) # still running elsewhere
+        BackgroundTask.objects.create(taskType="syntheticRestart", arguments={"index": 3}, runAfter=timezone.now(), status=BackgroundTaskStatus.running, attempts=2, startedWhen=timezone.now()-datetime.timedelta(hours=1)) # took the server down twice
+
+        executor = taskExecutor._TaskExecutor(workers=0)
+        executor.register("syntheticRestart", lambda index: done.append(index), maxAttempts=2)
+        self.assertEqual(executor.runPending(), 2)
+        self.assertEqual(sorted(done), [0, 1])
+        self.assertEqual(BackgroundTask.objects.filter(taskType="syntheticRestart", status=BackgroundTaskStatus.done).count(), 2)
+        self.assertEqual(BackgroundTask.objects.get(arguments__index=3).status, BackgroundTaskStatus.failed)
+
+        # the statistics only read, they don't start anything
+        idleExecutor = taskExecutor._TaskExecutor(workers=1)
+        idleExecutor.register("syntheticRestart", lambda index: done.append(index))
+        BackgroundTask.objects.create(taskType="syntheticRestart", arguments={"index": 4}, runAfter=timezone.now())
+        self.assertEqual(idleExecutor.statistics()["taskTypes"]["syntheticRestart"]["queued"], 1)
+        self.assertIsNone(idleExecutor._dispatcher)
+        idleExecutor.shutdown()
+
+        # an error on the last attempt is kept for the admins
+        executor.register("syntheticFailure", lambda: Exception("broken"), maxAttempts=1)
+        executor.submit("syntheticFailure")
+        executor.runPending()
+        failedTask = BackgroundTask.objects.get(taskType="syntheticFailure")
+        self.assertEqual((failedTask.status, failedTask.lastError), (BackgroundTaskStatus.failed, "broken"))
+
+    #######################################################
+    def test_verificationOfManyProcesses(self):
+        numberOfProcesses = 20
+        workOfService = 0.2 # seconds, stands for e.g. the FEM analysis
+        class SyntheticService():
+            def serviceReady(self, existingContent):
+                return (existingContent.get("ready", False), [])
+            def serviceSpecificTasks(self, session, processObj, validationResults):
+                time.sleep(workOfService)
+                validationResults["serviceSpecificTasks"]["synthetic"] = {"isSuccessful": True}
+                return validationResults
+        syntheticServiceNumber = 9999
+        pgProcesses.serviceManager.register("synthetic", syntheticServiceNumber, SyntheticService(), "")
+
+        # the user who clicked gets the progress over the websocket
+        client = Client()
+        TestProjects.createUser(client)
+        userID = ProfileManagementBase.getUserHashID(session=client.session)
+        channelLayer = get_channel_layer()
+        channelName = async_to_sync(channelLayer.new_channel)()
+        async_to_sync(channelLayer.group_add)(userID[:80], channelName)
+
+        verifying = processStatusAsInt(ProcessStatusAsString.VERIFYING)
+        project = pgProcesses.Project.objects.create(projectID="verificationProject", projectStatus=0, client=userID, projectDetails={"title": "verification"}, updatedWhen=timezone.now())
+        processIDs = [f"verificationProcess{index}" for index in range(numberOfProcesses)]
+        for index, processID in enumerate(processIDs):
+            pgProcesses.Process.objects.create(processID=processID, project=project, processDetails={ProcessDetails.title: processID}, processStatus=verifying, serviceDetails={"ready": index % 2 == 0},
+                                               serviceStatus=0, serviceType=syntheticServiceNumber, client=userID, files={}, messages={}, updatedWhen=timezone.now())
+
+        executor = taskExecutor._TaskExecutor(workers=4)
+        executor.register("syntheticVerification", processTasks.verifyProcess, maxConcurrent=4)
+        eventFanOut.runWorker = False
+        try:
+            start = time.perf_counter()
+            for processID in processIDs:
+                executor.submit("syntheticVerification", processID=processID, sessionKey=client.session.session_key)
+            self.assertTrue(executor.waitUntilIdle(30))
+            duration = time.perf_counter() - start
+            numberOfEvents = eventFanOut.flush()
+        finally:
+            eventFanOut.runWorker = True
+            executor.shutdown()
+            pgProcesses.serviceManager._services.pop(syntheticServiceNumber)
+
+        # with a fixed sleep of 3s, one after the other, it took at least a minute
+        self.assertLess(duration, numberOfProcesses * workOfService / 2)
+        statusOfProcesses = dict(pgProcesses.Process.objects.filter(processID__in=processIDs).values_list("processID", "processStatus"))
+        for index, processID in enumerate(processIDs):
+            expected = ProcessStatusAsString.VERIFICATION_COMPLETED if index % 2 == 0 else ProcessStatusAsString.VERIFICATION_FAILED
+            self.assertEqual(statusOfProcesses[processID], processStatusAsInt(expected))
 
+        # every step of every process arrives, none is merged with another, followed by the new status
+        self.assertEqual(numberOfEvents, 3 * numberOfProcesses)
+        received = [async_to_sync(channelLayer.receive)(channelName)["dict"][EventsDescriptionGeneric.eventData] for _ in range(numberOfEvents)]
+        progress = [(entry[EventsDescriptionGeneric.secondaryID], entry[EventsDescriptionGeneric.additionalInformation]["step"]) for entry in received if entry[EventsDescriptionGeneric.reason] == ProcessUpdates.verificationResults]
+        self.assertEqual(sorted(progress), sorted((processID, step) for processID in processIDs for step in ["serviceReady", "serviceSpecificTasks"]))
+        for processID in processIDs:
+            reasons = [entry[EventsDescriptionGeneric.reason] for entry in received if entry[EventsDescriptionGeneric.secondaryID] == processID]
+            self.assertEqual(reasons, [ProcessUpdates.verificationResults, ProcessUpdates.verificationResults, ProcessUpdates.processStatus])
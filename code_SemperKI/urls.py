@@ -72,6 +72,7 @@ newPaths= {
 
     "getAllProjectsFlatAsAdmin": ("public/admin/getAllProjectsFlatAsAdmin/",admin.getAllProjectsFlatAsAdmin),
     "getSpecificProjectAsAdmin": ("public/admin/getSpecificProjectAsAdmin/<str:projectID>/",admin.getSpecificProjectAsAdmin),
+    "getBackgroundTasksAsAdmin": ("public/admin/getBackgroundTasksAsAdmin/",admin.getBackgroundTasksAsAdmin),
 
     "getNode": ("private/nodes/get/<str:nodeID>/", knowledgeGraphDB.getNode),
     "getNodesByType": ("private/nodes/get/by-type/<str:nodeType>/", knowledgeGraphDB.getNodesByType),
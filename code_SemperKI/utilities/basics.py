@@ -21,6 +21,7 @@ from rest_framework import status
 from Generic_Backend.code_General.definitions import SessionContent
 from Generic_Backend.code_General.connections.postgresql.pgProfiles import ProfileManagementBase, profileManagement
 import code_SemperKI.connections.content.postgresql.pgProcesses as PGProcesses
+from code_SemperKI.utilities.processMembership import processMembership
 
 #######################################################
 def manualCheckIfUserMaySeeProject(session, userID:str, projectID:str) -> bool:
@@ -56,14 +57,25 @@ def manualCheckIfUserMaySeeProcess(session, userID:str, processID:str) -> bool:
     :return: True if the user belongs to the rightful, false if not
     :rtype: Bool
 
+    """
+    return manualCheckIfUserMaySeeProcesses(session, userID, [processID])
+
+#######################################################
+def manualCheckIfUserMaySeeProcesses(session, userID:str, processIDs:list[str]) -> bool:
+    """
+    Check at once if the user may see all of the processes, the users of the processes are cached
+
+    :param userID: The hashID of the user
+    :type userID: str
+    :param processIDs: The processIDs of the processes in question
+    :type processIDs: list[str]
+    :return: True if the user belongs to the rightful of every process, false if not
+    :rtype: Bool
+
     """
     if session[SessionContent.usertype] == "admin":
         return True
-    users = PGProcesses.ProcessManagementBase.getAllUsersOfProcess(processID)
-    if userID in users:
-        return True
-    
-    return False
+    return processMembership.mayUserSeeProcesses(userID, processIDs, session)
 
 
 #################### DECORATOR ###################################
@@ -0,0 +1,189 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Fan-out of process events to the event queue and the websockets of all affected users, away from the request
+"""
+
+import logging, threading, time, atexit
+from dataclasses import dataclass
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection
+
+from Generic_Backend.code_General.definitions import EventsDescriptionGeneric
+from Generic_Backend.code_General.modelFiles.eventModel import Event
+from Generic_Backend.code_General.utilities.crypto import generateURLFriendlyRandomString
+
+from ..connections.content.postgresql import pgProcesses
+from ..definitions import ProcessUpdates
+
+loggerError = logging.getLogger("errors")
+
+coalescedEvents = (ProcessUpdates.processStatus, ProcessUpdates.serviceStatus) # only the latest state counts, every other event is delivered
+
+##################################################
+@dataclass
+class PendingProcessEvent():
+    """
+    An event about a process that waits to be fanned out
+
+    """
+    projectID:str
+    processID:str
+    event:str
+    eventContent:tuple
+    notification:str
+    clientOnly:bool
+    creatorOfEvent:str
+    skipUserID:str # the user that caused it, gets no notification about its own message or status change
+
+##################################################
+class EventFanOut():
+    """
+    Collects the events of a burst, resolves the recipients once per process, merges status changes
+    that overwrite each other, writes all event entries with one insert and sends them over the channel layer.
+    A single worker thread does this, the request only appends to a list.
+
+    """
+
+    ##################################################
+    def __init__(self, coalesceWindow:float=0.05) -> None:
+        """
+        Nothing pending, the worker starts with the first event
+
+        :param coalesceWindow: How long the worker waits for further events of a burst, in seconds
+        :type coalesceWindow: float
+        :return: Nothing
+        :rtype: None
+        """
+        self.coalesceWindow = coalesceWindow
+        self.condition = threading.Condition()
+        self.pending = []
+        self.worker = None
+        self.runWorker = True # if False, pending events are only sent by calling flush
+        self.flushLock = threading.Lock() # one batch after the other, so the order stays intact
+        atexit.register(self.flushAtExit) # the worker is a daemon and would take the pending events with it
+
+    ##################################################
+    def add(self, pendingEvent:PendingProcessEvent) -> None:
+        """
+        Queue an event, returns at once
+
+        :param pendingEvent: The event
+        :type pendingEvent: PendingProcessEvent
+        :return: Nothing
+        :rtype: None
+        """
+        with self.condition:
+            self.pending.append(pendingEvent)
+            if self.runWorker and (self.worker is None or not self.worker.is_alive()):
+                self.worker = threading.Thread(target=self.work, name="processEventFanOut", daemon=True)
+                self.worker.start()
+            self.condition.notify()
+
+    ##################################################
+    def work(self) -> None:
+        """
+        Loop of the worker thread
+
+        :return: Nothing
+        :rtype: None
+        """
+        while True:
+            with self.condition:
+                while len(self.pending) == 0:
+                    self.condition.wait()
+            time.sleep(self.coalesceWindow) # let the rest of the burst arrive
+            try:
+                self.flush()
+            except Exception as e:
+                loggerError.error("Error in EventFanOut.work: " + str(e))
+            finally:
+                connection.close() # the connection of this thread, keeps none open between bursts
+
+    ##################################################
+    def flushAtExit(self) -> None:
+        """
+        Send what the worker hasn't sent yet before the process ends
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.runWorker = False
+        try:
+            self.flush()
+        except Exception as e:
+            loggerError.error("Error in EventFanOut.flushAtExit: " + str(e))
+
+    ##################################################
+    @staticmethod
+    def coalesce(batch:list[PendingProcessEvent]) -> OrderedDict:
+        """
+        Resolve the recipients of the events and keep only the latest status change of the same kind per process and user.
+        The recipients are gathered once for every process, notification and creator in the batch.
+
+        :param batch: The events in the order they happened
+        :type batch: list[PendingProcessEvent]
+        :return: (userID, processID, event, index) -> values for the event entry, the index is None for merged status changes
+        :rtype: OrderedDict
+        """
+        recipientsCache = {}
+        outDict = OrderedDict()
+        for index, pendingEvent in enumerate(batch):
+            cacheKey = (pendingEvent.processID, pendingEvent.notification, pendingEvent.clientOnly, pendingEvent.creatorOfEvent)
+            if cacheKey not in recipientsCache:
+                try:
+                    recipientsCache[cacheKey] = pgProcesses.ProcessManagementBase.getRecipientsOfProcessEvent(*cacheKey)
+                except Exception as e:
+                    loggerError.error("Error in EventFanOut.coalesce: " + str(e))
+                    recipientsCache[cacheKey] = {}
+            for userID, triggerEvent in recipientsCache[cacheKey].items():
+                if userID == pendingEvent.skipUserID:
+                    continue
+                key = (userID, pendingEvent.processID, pendingEvent.event, None if pendingEvent.event in coalescedEvents else index)
+                outDict.pop(key, None) # a newer status replaces the older and takes its place at the end
+                outDict[key] = {
+                    EventsDescriptionGeneric.triggerEvent: triggerEvent,
+                    EventsDescriptionGeneric.eventType: "processEvent",
+                    EventsDescriptionGeneric.eventData: {
+                        EventsDescriptionGeneric.primaryID: pendingEvent.projectID,
+                        EventsDescriptionGeneric.secondaryID: pendingEvent.processID,
+                        EventsDescriptionGeneric.reason: pendingEvent.event,
+                        EventsDescriptionGeneric.content: pendingEvent.eventContent[0],
+                        EventsDescriptionGeneric.additionalInformation: pendingEvent.eventContent[1]
+                    }
+                }
+        return outDict
+
+    ##################################################
+    def flush(self) -> int:
+        """
+        Send everything that is pending now
+
+        :return: The number of events sent
+        :rtype: int
+        """
+        with self.flushLock:
+            with self.condition:
+                batch, self.pending = self.pending, []
+            if len(batch) == 0:
+                return 0
+
+            coalesced = self.coalesce(batch)
+            events = [Event(eventID=generateURLFriendlyRandomString(), userHashedID=key[0], eventType=values[EventsDescriptionGeneric.eventType], eventData=values[EventsDescriptionGeneric.eventData], triggerEvent=values[EventsDescriptionGeneric.triggerEvent])
+                      for key, values in coalesced.items()]
+            Event.objects.bulk_create(events)
+
+            messages = [(event.userHashedID[:80], {"type": "sendMessageJSON", "dict": event.toDict()}) for event in events]
+            channelLayer = get_channel_layer()
+            async def sendAll():
+                for group, message in messages: # in order, per user this is the order of the events
+                    await channelLayer.group_send(group, message)
+            async_to_sync(sendAll)()
+            return len(events)
+
+eventFanOut = EventFanOut()
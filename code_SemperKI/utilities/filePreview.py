@@ -6,7 +6,7 @@ Silvio Weging 2025
 Contains: Functions to create, store and retrieve preview jpgs to uploaded files
 """
 import logging, os
-from multiprocessing import Process as MPProcess, Queue as MPQueue
+from io import BytesIO
 
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.conf import settings
@@ -18,23 +18,68 @@ from Generic_Backend.code_General.utilities.temporaryFolder import temporaryDire
 from .basics import testPicture, previewNotAvailable, previewNotAvailableGER
 
 loggerError = logging.getLogger("errors")
+
+##################################################
+def getPlaceholderPreview(locale:str) -> str:
+    """
+    The image that is shown as long as there's no preview
+
+    :param locale: The locale of the user
+    :type locale: str
+    :return: URL of the image
+    :rtype: str
+    """
+    if locale == "de-DE":
+        return previewNotAvailableGER
+    else:
+        return previewNotAvailable
+
 ##################################################
 try:
     from preview_generator.manager import PreviewManager
 
     ##################################################
-    # def createPreviewInSeparateTask(temporaryFilePath:str, tempDir:str, resultQueue:MPQueue) -> None:
-    #     """
-    #     Create a preview of a file in a separate task
-        
-    #     """
-    #     try:
-    #         manager = PreviewManager(tempDir+"/previews", create_folder= True)
-    #         result = manager.get_jpeg_preview(temporaryFilePath)
-    #         resultQueue.put(result)
-    #     except Exception as error:
-    #         loggerError.error(f"Error while creating preview in separate task: {str(error)}")
-    #         resultQueue.put(error)
+    def renderPreview(temporaryFilePath:str) -> bytes|Exception:
+        """
+        Render the preview of a file that has been saved in the temporary folder
+
+        :param temporaryFilePath: Where the file is, the extension determines how it's rendered
+        :type temporaryFilePath: str
+        :return: The preview as jpg or the error
+        :rtype: bytes|Exception
+        """
+        try:
+            manager = PreviewManager(temporaryDirectory.getTemporaryFolderPath()+"/previews", create_folder= True)
+            pathToPreviewImage = manager.get_jpeg_preview(temporaryFilePath)
+            if isinstance(pathToPreviewImage, Exception):
+                raise pathToPreviewImage
+            with open(pathToPreviewImage, 'rb') as f:
+                previewContent = f.read()
+            os.remove(pathToPreviewImage)
+            return previewContent
+        except Exception as error:
+            return error
+
+    ##################################################
+    def storePreview(previewContent:bytes, storagePath:str) -> str|Exception:
+        """
+        Upload a rendered preview next to the file it belongs to
+
+        :param previewContent: The preview as jpg
+        :type previewContent: bytes
+        :param storagePath: The path of the file in the storage
+        :type storagePath: str
+        :return: The public URL of the preview
+        :rtype: str|Exception
+        """
+        try:
+            basePath = storagePath+"_preview"+".jpg"
+            remotePath = "public/previews/" + basePath
+            manageStaticsS3.uploadFile(remotePath, BytesIO(previewContent), True)
+            return settings.S3_STATIC_URL + "previews/" + basePath
+        except Exception as error:
+            loggerError.error(f"Error while storing preview: {str(error)}")
+            return error
 
     ##################################################
     def createAndStorePreview(file:InMemoryUploadedFile, fileName:str, locale:str, storagePath:str) -> str|Exception:
@@ -43,39 +88,15 @@ try:
         
         """
         try:
-            outPath = ""
             temporaryFileName = temporaryDirectory.createTemporaryFile(fileName, file.read())
             file.seek(0)
-            #fileNameRoot, extension= os.path.splitext(file.name)
-            basePath = storagePath+"_preview"+".jpg"
-            remotePath = "public/previews/" + basePath
-            outPath = settings.S3_STATIC_URL + "previews/" + basePath
-            try:
-                pathToPreviewImage = ""
-                #resultQueue = MPQueue()
-                #previewTask = MPProcess(target=createPreviewInSeparateTask, args=(temporaryFileName, tempDir, resultQueue))
-                # TODO send this to another task since this can fail
-                manager = PreviewManager(temporaryDirectory.getTemporaryFolderPath()+"/previews", create_folder= True)
-                pathToPreviewImage = manager.get_jpeg_preview(temporaryFileName)
-                #previewTask.start()
-                #previewTask.join(60)
-                #previewTask.close()
-                #if not resultQueue.empty():
-                    #path_to_preview_image = resultQueue.get()
-                if isinstance(pathToPreviewImage, Exception):
-                    raise pathToPreviewImage
-                f = open(pathToPreviewImage, 'rb')
-                manageStaticsS3.uploadFile(remotePath, f, True)
-                f.close()
-                temporaryDirectory.deleteTemporaryFile(fileName)
-                os.remove(pathToPreviewImage)
-                #else:
-                    #raise Exception("Preview creation took too long")
-            except Exception as _:
-                if locale == "de-DE":
-                    outPath = previewNotAvailableGER
-                else:
-                    outPath = previewNotAvailable
+            previewContent = renderPreview(temporaryFileName)
+            temporaryDirectory.deleteTemporaryFile(fileName)
+            if isinstance(previewContent, Exception):
+                return getPlaceholderPreview(locale)
+            outPath = storePreview(previewContent, storagePath)
+            if isinstance(outPath, Exception):
+                return getPlaceholderPreview(locale)
             return outPath
         except Exception as error:
             loggerError.error(f"Error while creating preview: {str(error)}")
@@ -98,19 +119,30 @@ try:
 except ImportError:
     # implement the same functions but as dummies that don't do anything
     ##################################################
+    def renderPreview(temporaryFilePath:str) -> bytes|Exception:
+        """
+        Render the preview of a file that has been saved in the temporary folder
+        
+        """
+        return Exception("preview_generator is not installed")
+    ##################################################
+    def storePreview(previewContent:bytes, storagePath:str) -> str|Exception:
+        """
+        Upload a rendered preview next to the file it belongs to
+        
+        """
+        return Exception("preview_generator is not installed")
+    ##################################################
     def createAndStorePreview(file:InMemoryUploadedFile, fileName:str, locale:str, storagePath:str) -> str|Exception:
         """
         Create a preview of a file and store it in a given path
         
         """
-        if locale == "de-DE":
-            return previewNotAvailableGER
-        else:
-            return previewNotAvailable
+        return getPlaceholderPreview(locale)
     ##################################################
     def deletePreviewFile(path:str) -> None:
         """
         Deletes a preview file from the storage
         
         """
-        return
\ No newline at end of file
+        return
@@ -5,35 +5,45 @@ Silvio Weging 2024
 
 Contains: Class for managing the locales-file
 """
-import logging, json
+import logging, json, threading, time
 from django.conf import settings
 
 from Generic_Backend.code_General.connections.redis import RedisConnection
+from Generic_Backend.code_General.utilities.crypto import generateURLFriendlyRandomString
 
 loggerError = logging.getLogger("errors")
 
+translationsVersionCheckInterval = 10. # seconds in which the in-process table is used without asking redis for the version
+
 ##################################################################
 class ManageTranslations():
     """
     Manages the translations of certain keys saved into the translations.json
-    
+    The document lives in redis, every process keeps a flattened copy that is replaced once the version in redis changes.
+
     """
 
-    
+
     #######################################################
     def __init__(self, filePathAndName) -> None:
         """
-        Retrieve translations from file and save it into redis 
+        Retrieve translations from file and save it into redis
 
         :param filePathAndName: the very same
         :type filePathAndName: str
         :return: Nothing
         :rtype: None
-        
+
         """
 
         self.filePathAndName = filePathAndName
+        self.versionKey = filePathAndName + "_version"
         self.redisCon = RedisConnection()
+        self._lock = threading.Lock()
+        self._table = {} # (locale, key, key, ...) -> translation
+        self._version = ""
+        self._checkedWhen = 0.
+        self.numberOfLoads = 0
         self.retrieveContentFromRedis(initial=True)
 
     #######################################################
@@ -50,11 +60,78 @@ class ManageTranslations():
             with open(str(settings.BASE_DIR) + self.filePathAndName) as translationsFile:
                 translationsFileContent = json.loads(translationsFile.read())
                 self.redisCon.addContentJSON(self.filePathAndName, translationsFileContent, True)
+                # the file may have changed, every process has to load it again
+                self.redisCon.addContent(self.versionKey, generateURLFriendlyRandomString())
                 return translationsFileContent
         else:
             return translations
 
+    #######################################################
+    @staticmethod
+    def flatten(translations:dict) -> dict[tuple,object]:
+        """
+        Every level of the document, addressed by the path to it
 
+        :param translations: The document as in translations.json
+        :type translations: dict
+        :return: The path as tuple (locale first) and what lies there
+        :rtype: dict[tuple,object]
+        """
+        table = {}
+        pathsToVisit = [((), translations)]
+        while len(pathsToVisit) > 0:
+            path, content = pathsToVisit.pop()
+            if path != ():
+                table[path] = content
+            if isinstance(content, dict):
+                for key, subContent in content.items():
+                    pathsToVisit.append((path + (key,), subContent))
+        return table
+
+    #######################################################
+    def getVersion(self) -> str:
+        """
+        The version of the document in redis
+
+        :return: The version, empty if there is none
+        :rtype: str
+        """
+        version, exists = self.redisCon.retrieveContent(self.versionKey)
+        if exists is False or not version:
+            return ""
+        return version if isinstance(version, str) else version.decode()
+
+    #######################################################
+    def _refreshIfOutdated(self) -> None:
+        """
+        Ask redis for the version at most every translationsVersionCheckInterval seconds and reload the table if it changed
+
+        """
+        now = time.monotonic()
+        if now - self._checkedWhen < translationsVersionCheckInterval and len(self._table) > 0:
+            return
+        with self._lock:
+            if now - self._checkedWhen < translationsVersionCheckInterval and len(self._table) > 0:
+                return # another thread was faster
+            version = self.getVersion()
+            if version != self._version or version == "" or len(self._table) == 0:
+                # the version is read before the document, so a newer document gets loaded again next time at most
+                self._table = self.flatten(self.retrieveContentFromRedis())
+                self._version = version
+                self.numberOfLoads += 1
+            self._checkedWhen = now
+
+    #######################################################
+    def invalidate(self) -> None:
+        """
+        Make this process look into redis on the next translation
+
+        :return: Nothing
+        :rtype: None
+        """
+        with self._lock:
+            self._checkedWhen = 0.
+            self._version = ""
 
     #######################################################
     def getTranslation(self, locale:str, keyArr:list[str]) -> str:
@@ -70,14 +147,60 @@ class ManageTranslations():
         """
 
         try:
-            translationObj = self.retrieveContentFromRedis()
-            path = translationObj[locale]
-            for key in keyArr: # got through the levels
-                path = path[key]
-            return path
+            self._refreshIfOutdated()
+            return self._table[(locale, *keyArr)]
         except Exception as error:
             loggerError.error(f"getTranslation: {str(error)}")
             return "ERROR"
 
+    #######################################################
+    def getTranslations(self, locale:str, keyArrs:list[list[str]]) -> list[str]:
+        """
+        Get the translations for many lists of keys at once, redis is asked at most once
+
+        :param locale: The locale string retrieved from either the profile or the session
+        :type locale: str
+        :param keyArrs: paths to take inside the json
+        :type keyArrs: list[list[str]]
+        :return: The correct words/sentences in the same order, ERROR where there is none
+        :rtype: list[str]
+        """
+        try:
+            self._refreshIfOutdated()
+        except Exception as error:
+            loggerError.error(f"getTranslations: {str(error)}")
+        table = self._table
+        outList = []
+        for keyArr in keyArrs:
+            translation = table.get((locale, *keyArr))
+            if translation is None:
+                loggerError.error(f"getTranslations: no translation for {locale} {keyArr}")
+                translation = "ERROR"
+            outList.append(translation)
+        return outList
+
+    #######################################################
+    def translateProperties(self, locale:str, properties:list[dict], keyPrefix:list[str], keyField:str="key", nameField:str="name") -> list[dict]:
+        """
+        Set the name of every property of a node to the translation of its key
+
+        :param locale: The locale string retrieved from either the profile or the session
+        :type locale: str
+        :param properties: The properties of a node, changed in place
+        :type properties: list[dict]
+        :param keyPrefix: Path inside the json that comes before the key of the property, e.g. service, ADDITIVE_MANUFACTURING
+        :type keyPrefix: list[str]
+        :param keyField: Where the key lies in a property
+        :type keyField: str
+        :param nameField: Where the translation goes
+        :type nameField: str
+        :return: The same properties
+        :rtype: list[dict]
+        """
+        translations = self.getTranslations(locale, [keyPrefix + [prop[keyField]] for prop in properties])
+        for prop, translation in zip(properties, translations):
+            prop[nameField] = translation
+        return properties
+
 ##################################################################
-manageTranslations = ManageTranslations("/code_SemperKI/translations.json")
\ No newline at end of file
+manageTranslations = ManageTranslations("/code_SemperKI/translations.json")
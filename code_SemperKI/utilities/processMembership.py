@@ -0,0 +1,228 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Cache of the users that may see a process, for the rights checks of every guarded request
+"""
+
+import logging, threading, weakref
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from Generic_Backend.code_General.modelFiles.userModel import User
+from Generic_Backend.code_General.modelFiles.organizationModel import Organization
+
+from ..modelFiles.processModel import Process
+from .redisCaching import GenerationToken
+
+loggerError = logging.getLogger("errors")
+
+##################################################
+processMembershipGenerationKey = "processMembershipGeneration" # redis key of the token that is part of every key, changed if the members of an organization change
+processMembershipKeyPrefix = "processMembers_"
+processMembershipTimeToLive = 86400 # seconds an entry is kept in redis, a new generation makes it unreachable earlier
+
+##################################################
+def getMembersOfClients(hashedIDs:set[str]) -> dict[str,set[str]]:
+    """
+    The hashed IDs that act for a user or an organization: the user itself, or the organization and all its members.
+    Three queries, regardless of the number of IDs.
+
+    :param hashedIDs: Hashed IDs of users and organizations
+    :type hashedIDs: set[str]
+    :return: The members per ID, IDs that are neither user nor organization have no members
+    :rtype: dict[str,set[str]]
+    """
+    hashedIDs = set(hashedIDs)
+    if len(hashedIDs) == 0:
+        return {}
+    outDict = {hashedID: set() for hashedID in hashedIDs}
+    for hashedID in User.objects.filter(hashedID__in=hashedIDs).values_list("hashedID", flat=True):
+        outDict[hashedID].add(hashedID)
+    for hashedID in Organization.objects.filter(hashedID__in=hashedIDs).values_list("hashedID", flat=True):
+        outDict[hashedID].add(hashedID)
+    for orgaID, userID in Organization.users.through.objects.filter(organization__hashedID__in=hashedIDs).values_list("organization__hashedID", "user__hashedID"):
+        outDict[orgaID].add(userID)
+    return outDict
+
+##################################################
+class ProcessMembership():
+    """
+    Who may see which process: the client (and its members if it is an organization) and the members of the contractor.
+    The sets live in redis and, for the duration of a request, with the session of that request.
+    Redis is used via the cache of Django, so that the sets of many processes are read with one MGET and written with one pipeline.
+
+    """
+
+    ##################################################
+    def __init__(self) -> None:
+        """
+        Empty memo
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.lock = threading.Lock()
+        self.memoPerSession = weakref.WeakKeyDictionary() # session object of a request -> processID -> set of hashed IDs
+        self.generation = GenerationToken(processMembershipGenerationKey)
+
+    ##################################################
+    def getMemo(self, session) -> dict|None:
+        """
+        The memo of the request the session belongs to
+
+        :param session: The session of the request, may be None
+        :type session: SessionStore|None
+        :return: The memo, None if the session can't hold one
+        :rtype: dict|None
+        """
+        if session is None:
+            return None
+        try:
+            with self.lock:
+                return self.memoPerSession.setdefault(session, {})
+        except TypeError: # e.g. a plain dict
+            return None
+
+    ##################################################
+    @staticmethod
+    def build(processIDs:list[str]|set[str]) -> dict[str,set[str]]:
+        """
+        Gather the users of many processes with four queries
+
+        :param processIDs: The IDs of the processes
+        :type processIDs: list[str]|set[str]
+        :return: The hashed IDs per process, processes that don't exist are missing
+        :rtype: dict[str,set[str]]
+        """
+        processes = list(Process.objects.filter(processID__in=set(processIDs)).values_list("processID", "client", "contractor__hashedID"))
+        membersOfClients = getMembersOfClients({client for _, client, _ in processes} | {contractor for _, _, contractor in processes if contractor is not None})
+        outDict = {}
+        for processID, client, contractor in processes:
+            users = set(membersOfClients.get(client, set()))
+            if contractor is not None:
+                users |= membersOfClients[contractor] | {contractor}
+            outDict[processID] = users
+        return outDict
+
+    ##################################################
+    def getUsersOfProcesses(self, processIDs:list[str], session=None) -> dict[str,set[str]]:
+        """
+        Get the users of many processes from the memo of the request, from redis, or from the database, each in one go
+
+        :param processIDs: The IDs of the processes
+        :type processIDs: list[str]
+        :param session: The session of the current request, to remember the result until the request is done
+        :type session: SessionStore|None
+        :return: The hashed IDs per process, empty for processes that don't exist
+        :rtype: dict[str,set[str]]
+        """
+        outDict = {}
+        memo = self.getMemo(session)
+        missing = [processID for processID in dict.fromkeys(processIDs) if memo is None or processID not in memo]
+        if memo is not None:
+            outDict.update({processID: memo[processID] for processID in processIDs if processID in memo})
+        if len(missing) == 0:
+            return outDict
+
+        generation = self.generation.get()
+        keyPrefix = processMembershipKeyPrefix + generation + "_"
+        if generation != "":
+            try:
+                fromRedis = cache.get_many([keyPrefix + processID for processID in missing])
+                notInRedis = []
+                for processID in missing:
+                    content = fromRedis.get(keyPrefix + processID)
+                    if isinstance(content, list):
+                        outDict[processID] = set(content)
+                    else:
+                        notInRedis.append(processID)
+                missing = notInRedis
+            except Exception as e:
+                loggerError.error("Error in ProcessMembership.getUsersOfProcesses: " + str(e))
+
+        if len(missing) > 0:
+            fromDB = self.build(missing)
+            outDict.update(fromDB)
+            if generation != "" and len(fromDB) > 0:
+                try:
+                    cache.set_many({keyPrefix + processID: sorted(users) for processID, users in fromDB.items()}, timeout=processMembershipTimeToLive)
+                except Exception as e:
+                    loggerError.error("Error in ProcessMembership.getUsersOfProcesses: " + str(e))
+
+        if memo is not None:
+            memo.update(outDict)
+        for processID in processIDs:
+            outDict.setdefault(processID, set()) # not remembered, the process may be created later on
+        return outDict
+
+    ##################################################
+    def mayUserSeeProcesses(self, userID:str, processIDs:list[str], session=None) -> bool:
+        """
+        Check at once if a user may see all of the given processes
+
+        :param userID: The hashed ID of the user
+        :type userID: str
+        :param processIDs: The IDs of the processes
+        :type processIDs: list[str]
+        :param session: The session of the current request
+        :type session: SessionStore|None
+        :return: True if the user may see every one of them
+        :rtype: bool
+        """
+        usersPerProcess = self.getUsersOfProcesses(processIDs, session)
+        return all(userID in usersPerProcess.get(processID, set()) for processID in processIDs)
+
+    ##################################################
+    def invalidateProcess(self, processID:str) -> None:
+        """
+        Forget the users of one process, e.g. because its client or contractor changed
+
+        :param processID: The ID of the process
+        :type processID: str
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            for memo in self.memoPerSession.values():
+                memo.pop(processID, None)
+        def deleteKey():
+            try:
+                generation = self.generation.get()
+                if generation != "":
+                    cache.delete(processMembershipKeyPrefix + generation + "_" + processID)
+            except Exception as e:
+                loggerError.error("Error in ProcessMembership.invalidateProcess: " + str(e))
+        deleteKey()
+        if connection.in_atomic_block:
+            # a check before the commit would store the old users again
+            transaction.on_commit(deleteKey)
+
+    ##################################################
+    def invalidate(self) -> None:
+        """
+        Forget the users of all processes, e.g. because the members of an organization changed
+
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            for memo in self.memoPerSession.values():
+                memo.clear()
+        self.changeGeneration()
+        if connection.in_atomic_block:
+            transaction.on_commit(self.changeGeneration)
+
+    ##################################################
+    def changeGeneration(self) -> None:
+        """
+        Set a new generation token
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.generation.change()
+
+processMembership = ProcessMembership()
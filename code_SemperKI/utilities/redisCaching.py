@@ -0,0 +1,99 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Building blocks of the caches whose entries live in redis and in-process
+"""
+
+import json, logging, threading, time
+
+from Generic_Backend.code_General.connections.redis import RedisConnection
+from Generic_Backend.code_General.utilities.crypto import generateURLFriendlyRandomString
+
+loggerError = logging.getLogger("errors")
+
+##################################################
+generationTokenTimeToLive = 2. # seconds a token is used without asking redis, other servers see a new one at most that late
+
+##################################################
+class GenerationToken():
+    """
+    A random token in redis that is part of every key of a cache, a new token makes all entries unreachable at once.
+    It is kept in-process for a short time, so that not every lookup asks redis.
+    The token is empty if redis can't be reached. A cache must not keep anything then, it wouldn't learn about changes elsewhere.
+
+    """
+
+    ##################################################
+    def __init__(self, redisKey:str, timeToLive:float=generationTokenTimeToLive) -> None:
+        """
+        Nothing known yet, the first get asks redis
+
+        :param redisKey: The key of the token in redis
+        :type redisKey: str
+        :param timeToLive: Seconds the token is used without asking redis again
+        :type timeToLive: float
+        :return: Nothing
+        :rtype: None
+        """
+        self.redisKey = redisKey
+        self.timeToLive = timeToLive
+        self.lock = threading.Lock()
+        self.token = ""
+        self.validUntil = 0.
+
+    ##################################################
+    def get(self) -> str:
+        """
+        Get the current token, from the process if it was fetched recently, else from redis. Creates one if there is none.
+
+        :return: The token, empty if redis is not reachable
+        :rtype: str
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now < self.validUntil: # an unreachable redis isn't asked again right away either
+                return self.token
+        try:
+            redisConn = RedisConnection()
+            token, exists = redisConn.retrieveContent(self.redisKey)
+            if exists is False or not token:
+                token = generateURLFriendlyRandomString()
+                redisConn.addContent(self.redisKey, token)
+            token = token if isinstance(token, str) else token.decode()
+        except Exception as e:
+            loggerError.error(f"Error in GenerationToken.get of {self.redisKey}: {str(e)}")
+            token = ""
+        with self.lock:
+            self.token, self.validUntil = token, now + self.timeToLive
+        return token
+
+    ##################################################
+    def change(self) -> None:
+        """
+        Set a new token, this process uses it at once
+
+        :return: Nothing
+        :rtype: None
+        """
+        token = generateURLFriendlyRandomString()
+        try:
+            RedisConnection().addContent(self.redisKey, token)
+        except Exception as e:
+            loggerError.error(f"Error in GenerationToken.change of {self.redisKey}: {str(e)}")
+            token = ""
+        with self.lock:
+            self.token, self.validUntil = token, time.monotonic() + self.timeToLive
+
+##################################################
+def asReturnedByRedis(content:dict|list) -> dict|list:
+    """
+    What comes back from redis is JSON, an entry that is kept in-process as well must look the same
+
+    :param content: JSON serializable content
+    :type content: dict|list
+    :return: A copy with tuples turned into lists and the keys into strings
+    :rtype: dict|list
+    """
+    return json.loads(json.dumps(content))
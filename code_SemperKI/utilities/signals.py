@@ -7,10 +7,17 @@ Contains: Signals that can be sent to other apps
 """
 
 import django.dispatch
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from Generic_Backend.code_General.modelFiles.organizationModel import Organization
+
 import Generic_Backend.code_General.utilities.signals as GeneralSignals
 from ..handlers.public.project import saveProjects, saveProjectsViaWebsocket
 from ..connections.content.postgresql.pgProfilesSKI import orgaCreatedSemperKI, userCreatedSemperKI, userUpdatedSemperKI, orgaUpdatedSemperKI
 from ..connections.content.postgresql.pgKnowledgeGraph import Basics
+from ..connections.content.postgresql import pgProjectSearch
+from ..modelFiles.projectModel import Project
+from ..modelFiles.processModel import Process
+from .processMembership import processMembership
 
 ################################################################################################
 
@@ -107,6 +114,7 @@ class SemperKISignalReceivers():
         If an organization is deleted, delete all nodes
         """
         Basics.deleteAllNodesFromOrganization(orgaID=kwargs["orgaID"])
+        processMembership.invalidate()
     
     ###########################################################
     @staticmethod
@@ -115,7 +123,50 @@ class SemperKISignalReceivers():
         If a user is deleted, do something
         """
         userID = kwargs["userID"]
-        pass
+        processMembership.invalidate()
+
+    ###########################################################
+    @staticmethod
+    def receiverForProcessChange(sender, **kwargs):
+        """
+        If a process was saved, its searchable data may have changed 
+        and, if the client or the contractor may have changed, the cached users of the process are outdated
+
+        """
+        updateFields = kwargs.get("update_fields")
+        if updateFields is None or not pgProjectSearch.searchableFields.isdisjoint(updateFields):
+            pgProjectSearch.updateSearchIndexOfProcess(kwargs["instance"])
+        if updateFields is None or "client" in updateFields or "contractor" in updateFields:
+            processMembership.invalidateProcess(kwargs["instance"].processID)
+
+    ###########################################################
+    @staticmethod
+    def receiverForProcessDeleted(sender, **kwargs):
+        """
+        If a process was deleted, its searchable data leaves the index of the project and nobody can see it anymore
+
+        """
+        pgProjectSearch.rebuildSearchIndexOfProjects([kwargs["instance"].project_id], processIDs=[])
+        processMembership.invalidateProcess(kwargs["instance"].processID)
+
+    ###########################################################
+    @staticmethod
+    def receiverForProjectChange(sender, **kwargs):
+        """
+        If a project was saved, its title may have changed and save() wrote the search index as it was loaded
+
+        """
+        pgProjectSearch.rebuildSearchIndexOfProjects([kwargs["instance"].projectID])
+
+    ###########################################################
+    @staticmethod
+    def receiverForOrganizationMembersChange(sender, **kwargs):
+        """
+        If people joined or left an organization, they may see other processes now
+
+        """
+        if kwargs["action"].startswith("post_"):
+            processMembership.invalidate()
 
     ###########################################################
     def __init__(self) -> None:
@@ -133,6 +184,10 @@ class SemperKISignalReceivers():
         GeneralSignals.signalDispatcher.orgaUpdated.connect(self.receiverForOrgaUpdated, dispatch_uid="8")
         GeneralSignals.signalDispatcher.userDeleted.connect(self.receiverForUserDeleted, dispatch_uid="9")
         GeneralSignals.signalDispatcher.orgaDeleted.connect(self.receiverForOrgaDeleted, dispatch_uid="10")
+        post_save.connect(self.receiverForProcessChange, sender=Process, dispatch_uid="11")
+        post_delete.connect(self.receiverForProcessDeleted, sender=Process, dispatch_uid="12")
+        post_save.connect(self.receiverForProjectChange, sender=Project, dispatch_uid="13")
+        m2m_changed.connect(self.receiverForOrganizationMembersChange, sender=Organization.users.through, dispatch_uid="14")
 
 semperKISignalReceiver = SemperKISignalReceivers()
     
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Vectorized comparison of node properties for the similarity check of the knowledge graph
+"""
+
+import logging, threading
+from collections import Counter
+
+import numpy as np
+
+from ..modelFiles.nodesModel import NodeProperties, NodePropertyDescription, NodePropertiesTypesOfEntries
+
+loggerError = logging.getLogger("errors")
+##################################################################
+
+numberEpsilon = 0.1 # numbers closer than this are similar
+textThreshold = 0.8 # texts with a SequenceMatcher.quick_ratio below this are different
+f1Threshold = 0.8 # nodes with an F1 score above this are similar
+ignoredPropertyKeys = [NodeProperties.imgPath]
+
+##################################################################
+class PropertyColumn():
+    """
+    Features of one property key for all nodes of a table
+
+    """
+
+    #######################################################
+    def __init__(self, key:str, listOfProperties:list[dict]) -> None:
+        """
+        Extract the type and the prepared value of the property for every node
+
+        :param key: The key of the property
+        :type key: str
+        :param listOfProperties: The properties of every node
+        :type listOfProperties: list[dict]
+        :return: Nothing
+        :rtype: None
+
+        """
+        numberOfNodes = len(listOfProperties)
+        self.present = np.zeros(numberOfNodes, dtype=bool)
+        self.types = np.full(numberOfNodes, "", dtype=object)
+        self.numbers = np.full(numberOfNodes, np.nan)
+        self.isString = np.zeros(numberOfNodes, dtype=bool)
+        self.strings = [""] * numberOfNodes
+        self.histograms = None
+        self.lengths = None
+        self.vocabulary = None
+        self.arrays = None
+
+        for index, properties in enumerate(listOfProperties):
+            prop = properties.get(key)
+            if not isinstance(prop, dict) or NodePropertyDescription.type not in prop or NodePropertyDescription.value not in prop:
+                continue
+            self.present[index] = True
+            self.types[index] = str(prop[NodePropertyDescription.type])
+            value = prop[NodePropertyDescription.value]
+            if isinstance(value, str):
+                self.isString[index] = True
+                self.strings[index] = value
+            if prop[NodePropertyDescription.type] == NodePropertiesTypesOfEntries.number:
+                try:
+                    self.numbers[index] = float(value)
+                except (TypeError, ValueError):
+                    pass
+
+    #######################################################
+    def getHistograms(self) -> tuple[np.ndarray, np.ndarray, dict]:
+        """
+        Character counts of every string value (unigram signature), built on first use.
+        The intersection of two signatures is exactly the number of matches that SequenceMatcher.quick_ratio uses.
+
+        :return: Matrix of counts (nodes x characters), length of every string and the column of every character
+        :rtype: tuple[np.ndarray, np.ndarray, dict]
+
+        """
+        if self.histograms is None:
+            counters = [Counter(value) for value in self.strings]
+            vocabulary = {}
+            for counter in counters:
+                for character in counter:
+                    if character not in vocabulary:
+                        vocabulary[character] = len(vocabulary)
+            histograms = np.zeros((len(counters), max(len(vocabulary), 1)), dtype=np.int64)
+            for row, counter in enumerate(counters):
+                for character, count in counter.items():
+                    histograms[row, vocabulary[character]] = count
+            self.vocabulary = vocabulary
+            self.lengths = np.array([len(value) for value in self.strings], dtype=np.int64)
+            self.histograms = histograms
+        return self.histograms, self.lengths, self.vocabulary
+
+    #######################################################
+    def getArrays(self) -> list[tuple[int, frozenset]]:
+        """
+        Length and set of entries of every comma separated value, built on first use
+
+        :return: (length, set of entries) for every node
+        :rtype: list[tuple[int, frozenset]]
+
+        """
+        if self.arrays is None:
+            self.arrays = []
+            for value in self.strings:
+                entries = value.split(",")
+                self.arrays.append((len(entries), frozenset(entries)))
+        return self.arrays
+
+##################################################################
+class PropertyFeatureTable():
+    """
+    Column-wise features of the properties of many nodes, used to compare one node against all of them in one pass
+
+    """
+
+    #######################################################
+    def __init__(self, nodeIDs:list[str], listOfProperties:list[dict]) -> None:
+        """
+        Columns are only built for keys that are actually compared
+
+        :param nodeIDs: The IDs of the nodes
+        :type nodeIDs: list[str]
+        :param listOfProperties: The properties of the nodes in the same order
+        :type listOfProperties: list[dict]
+        :return: Nothing
+        :rtype: None
+
+        """
+        self.nodeIDs = nodeIDs
+        self.listOfProperties = listOfProperties
+        self.columns = {}
+
+    #######################################################
+    def getColumn(self, key:str) -> PropertyColumn:
+        """
+        Get (and create if necessary) the column of a property key
+
+        :param key: The key of the property
+        :type key: str
+        :return: The column
+        :rtype: PropertyColumn
+
+        """
+        if key not in self.columns:
+            self.columns[key] = PropertyColumn(key, self.listOfProperties)
+        return self.columns[key]
+
+    #######################################################
+    def computeF1Scores(self, properties:dict) -> np.ndarray:
+        """
+        Compare the properties against every node of the table.
+        Follows the rules of Logic.checkIfPropertyIsSimilar and the F1 score of Logic.checkAndUpdateProperties.
+
+        :param properties: The properties of the node that is compared
+        :type properties: dict
+        :return: F1 score for every node of the table, 0 if nothing similar was found
+        :rtype: np.ndarray
+
+        """
+        numberOfNodes = len(self.nodeIDs)
+        similar = np.zeros(numberOfNodes, dtype=np.int64)
+        compared = np.zeros(numberOfNodes, dtype=np.int64)
+        if numberOfNodes == 0:
+            return np.zeros(0)
+
+        for key, prop in properties.items():
+            if key in ignoredPropertyKeys or not isinstance(prop, dict):
+                continue
+            if NodePropertyDescription.type not in prop or NodePropertyDescription.value not in prop:
+                continue
+            column = self.getColumn(key)
+            propType = str(prop[NodePropertyDescription.type])
+            value = prop[NodePropertyDescription.value]
+            sameType = column.present & (column.types == propType)
+            # a different type always counts as a difference
+            compared += column.present & ~sameType
+
+            if propType == NodePropertiesTypesOfEntries.number:
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    continue
+                comparable = sameType & ~np.isnan(column.numbers)
+                with np.errstate(invalid="ignore"):
+                    isSimilar = comparable & ~(np.abs(column.numbers - number) > numberEpsilon)
+            elif propType == NodePropertiesTypesOfEntries.text or propType == NodePropertiesTypesOfEntries.string:
+                if not isinstance(value, str):
+                    continue
+                comparable = sameType & column.isString
+                histograms, lengths, vocabulary = column.getHistograms()
+                signature = np.zeros(histograms.shape[1], dtype=np.int64)
+                for character, count in Counter(value).items():
+                    if character in vocabulary:
+                        signature[vocabulary[character]] = count
+                matches = np.minimum(histograms, signature).sum(axis=1)
+                totalLength = lengths + len(value)
+                ratio = np.where(totalLength > 0, 2.0 * matches / np.maximum(totalLength, 1), 1.0)
+                isSimilar = comparable & (ratio >= textThreshold)
+            elif propType == NodePropertiesTypesOfEntries.array:
+                if not isinstance(value, str):
+                    continue
+                comparable = sameType & column.isString
+                entries = value.split(",")
+                entriesAsSet = frozenset(entries)
+                arrays = column.getArrays()
+                isSimilar = np.zeros(numberOfNodes, dtype=bool)
+                for index in np.flatnonzero(comparable):
+                    length, otherEntries = arrays[index]
+                    isSimilar[index] = length == len(entries) and entriesAsSet <= otherEntries
+            else:
+                comparable = sameType
+                isSimilar = sameType
+            compared += comparable
+            similar += isSimilar
+
+        return np.where(similar > 0, similar / np.maximum(compared, 1), 0.)
+
+    #######################################################
+    def rank(self, properties:dict, threshold:float=f1Threshold) -> list[tuple[int, float]]:
+        """
+        Return the indices of all nodes with an F1 score above the threshold, best first
+
+        :param properties: The properties of the node that is compared
+        :type properties: dict
+        :param threshold: Minimal F1 score
+        :type threshold: float
+        :return: List of (index, score)
+        :rtype: list[tuple[int, float]]
+
+        """
+        scores = self.computeF1Scores(properties)
+        candidates = np.flatnonzero(scores > threshold)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(index), float(scores[index])) for index in order]
+
+##################################################################
+class SimilarityEngine():
+    """
+    Keeps the feature tables of the system nodes per node type, so that they are only rebuilt if a node of that type changed
+
+    """
+
+    #######################################################
+    def __init__(self) -> None:
+        """
+        Empty cache
+
+        :return: Nothing
+        :rtype: None
+
+        """
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    #######################################################
+    def getTable(self, nodeType:str, version:tuple, loadNodes) -> PropertyFeatureTable:
+        """
+        Get the table of a node type, load it if the cached one is outdated
+
+        :param nodeType: The type of the nodes
+        :type nodeType: str
+        :param version: Anything that changes if a node of that type changed (e.g. count and last update)
+        :type version: tuple
+        :param loadNodes: Function returning a list of (nodeID, properties) of the nodes of that type
+        :type loadNodes: Callable
+        :return: The feature table
+        :rtype: PropertyFeatureTable
+
+        """
+        with self.lock:
+            cached = self.tables.get(nodeType)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        nodes = loadNodes()
+        table = PropertyFeatureTable([entry[0] for entry in nodes], [entry[1] for entry in nodes])
+        with self.lock:
+            self.tables[nodeType] = (version, table)
+        return table
+
+    #######################################################
+    def invalidate(self, nodeType:str|None=None) -> None:
+        """
+        Drop the cached table of a node type or all of them
+
+        :param nodeType: The type of the nodes, None for all
+        :type nodeType: str | None
+        :return: Nothing
+        :rtype: None
+
+        """
+        with self.lock:
+            if nodeType is None:
+                self.tables = {}
+            else:
+                self.tables.pop(nodeType, None)
+
+similarityEngine = SimilarityEngine()
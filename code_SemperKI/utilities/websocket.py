@@ -7,19 +7,15 @@ Contains: handlers for websockets
 """
 import logging
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-
 from Generic_Backend.code_General.definitions import *
 #from Generic_Backend.code_General.utilities import rights
 from Generic_Backend.code_General.utilities.basics import manualCheckifLoggedIn
 #from Generic_Backend.code_General.connections.postgresql import pgProfiles
-from Generic_Backend.code_General.connections.postgresql import pgEvents
 
-from code_SemperKI.connections.content.postgresql import pgProcesses
 from code_SemperKI.definitions import *
 #import code_SemperKI.handlers.public.process as ProcessFunctions
 from code_SemperKI.utilities.basics import *
+from code_SemperKI.utilities.eventFanOut import eventFanOut, PendingProcessEvent
 
 
 
@@ -53,16 +49,10 @@ def fireWebsocketEventsForProcess(projectID:str, processID:str, session, event,
     """
 
     if manualCheckifLoggedIn(session):
-        dictForEvents = pgProcesses.ProcessManagementBase.getInfoAboutProjectForWebsocket(projectID, processID, event, eventContent, notification, clientOnly, creatorOfEvent)
-        channelLayer = get_channel_layer()
-        for userID, values in dictForEvents.items(): # user/orga that is associated with that process
-            if (notification == NotificationSettingsUserSemperKI.newMessage or notification == NotificationSettingsUserSemperKI.statusChange) and userID == ProfileManagementBase.getUserHashID(session=session):
-                continue # If you wrote a message or forwared the process, you shouldn't get a notification for yourself
-            # create an entry in the event queue for that user
-            createdEvent = pgEvents.createEventEntry(userHashedID=userID, eventType=values[EventsDescriptionGeneric.eventType], eventData=values[EventsDescriptionGeneric.eventData], triggerEvent=values[EventsDescriptionGeneric.triggerEvent]) 
-            async_to_sync(channelLayer.group_send)(userID[:80], {
-                "type": "sendMessageJSON",
-                "dict": createdEvent, # message, formatted for frontend
-            })
+        skipUserID = ""
+        if notification == NotificationSettingsUserSemperKI.newMessage or notification == NotificationSettingsUserSemperKI.statusChange:
+            skipUserID = ProfileManagementBase.getUserHashID(session=session) # If you wrote a message or forwared the process, you shouldn't get a notification for yourself
+        # the event entries and websocket messages are created by the fan-out, not here
+        eventFanOut.add(PendingProcessEvent(projectID, processID, event, eventContent, notification, clientOnly, creatorOfEvent, skipUserID))
     # not logged in therefore no websockets to fire
                         
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Benchmark for the filter of contractors with the capability index
+"""
+
+import time
+from types import SimpleNamespace
+from logging import getLogger
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from code_SemperKI.modelFiles.nodesModel import Node, NodeDescription, defaultOwner
+from code_SemperKI.definitions import ContractorParsingForFrontend
+from code_SemperKI.connections.content.postgresql import pgKnowledgeGraph
+from code_SemperKI.services.service_AdditiveManufacturing.definitions import NodeTypesAM, ServiceDetails, MaterialDetails
+from code_SemperKI.services.service_AdditiveManufacturing.connections.postgresql import pgCapabilities
+from code_SemperKI.services.service_AdditiveManufacturing.connections.filterViaSparql import FilterAM
+from code_SemperKI.services.service_AdditiveManufacturing.modelFiles.verificationModel import Verification, VerificationStatus
+
+logging = getLogger("django_debug")
+
+####################################################################################
+class Command(BaseCommand):
+    """
+    Creates synthetic organizations with copies of materials, colors and post-processings and linked printers,
+    builds the capability index and measures the filter for contractors.
+    Everything happens inside a transaction that is rolled back in the end, so the database stays untouched.
+
+    """
+    help = 'benchmarks the filter for contractors'
+
+    ##############################################
+    def add_arguments(self, parser):
+        """
+        :param self: Command object
+        :type self: Command
+        :param parser: parser object
+        :type parser: ArgumentParser
+        :return: None
+        :rtype: None
+        """
+        parser.add_argument('--organizations', type=int, help='the number of synthetic organizations', default=200)
+        parser.add_argument('--materials', type=int, help='the number of materials of every organization', default=10)
+        parser.add_argument('--printers', type=int, help='the number of printers of every organization', default=5)
+
+    ##############################################
+    def handle(self, *args, **options):
+        """
+        :param self: Command object
+        :type self: Command
+        :param args: arguments
+        :type args: list
+        :param options: options
+        :type options: dict
+        :return: None
+        :rtype: None
+        """
+        numberOfOrganizations = options["organizations"]
+        materialsPerOrganization = options["materials"]
+        printersPerOrganization = options["printers"]
+        EdgeTable = Node.edges.through
+        with transaction.atomic():
+            now = timezone.now()
+            def newNode(nodeID:str, uniqueID:str, nodeType:str, createdBy:str) -> Node:
+                return Node(nodeID=nodeID, uniqueID=uniqueID, nodeName=nodeID, nodeType=nodeType, context="", properties={}, createdBy=createdBy, clonedFrom="", updatedWhen=now)
+
+            nodes = []
+            edges = []
+            verifications = []
+            for i in range(2 * materialsPerOrganization):
+                nodes.append(newNode(f"benchmark_material_{i}", f"benchmark_material_{i}", NodeTypesAM.material, defaultOwner))
+            for i in range(8):
+                nodes.append(newNode(f"benchmark_color_{i}", f"benchmark_color_{i}", NodeTypesAM.color, defaultOwner))
+            for i in range(6):
+                nodes.append(newNode(f"benchmark_postProcessing_{i}", f"benchmark_postProcessing_{i}", NodeTypesAM.additionalRequirement, defaultOwner))
+            for orga in range(numberOfOrganizations):
+                orgaID = f"benchmark_orga_{orga}"
+                printerIDs = []
+                for i in range(printersPerOrganization):
+                    printerIDs.append(f"{orgaID}_printer_{i}")
+                    nodes.append(newNode(printerIDs[-1], printerIDs[-1], NodeTypesAM.printer, orgaID))
+                colorIDs = []
+                for i in range(2):
+                    colorIDs.append(f"{orgaID}_color_{i}")
+                    nodes.append(newNode(colorIDs[-1], f"benchmark_color_{(orga + i) % 8}", NodeTypesAM.color, orgaID))
+                for i in range(2):
+                    nodes.append(newNode(f"{orgaID}_postProcessing_{i}", f"benchmark_postProcessing_{(orga + i) % 6}", NodeTypesAM.additionalRequirement, orgaID))
+                for i in range(materialsPerOrganization):
+                    materialID = f"{orgaID}_material_{i}"
+                    uniqueID = f"benchmark_material_{(orga + i) % (2 * materialsPerOrganization)}"
+                    nodes.append(newNode(materialID, uniqueID, NodeTypesAM.material, orgaID))
+                    for neighborID in printerIDs + colorIDs:
+                        edges.append(EdgeTable(from_node_id=materialID, to_node_id=neighborID))
+                        edges.append(EdgeTable(from_node_id=neighborID, to_node_id=materialID))
+                    if orga % 3 == 0:
+                        verifications.append(Verification(organizationID=orgaID, printerID=printerIDs[0], materialID=uniqueID, status=VerificationStatus.verified, details={}))
+            Node.objects.bulk_create(nodes, batch_size=pgKnowledgeGraph.bulkBatchSize)
+            EdgeTable.objects.bulk_create(edges, batch_size=pgKnowledgeGraph.bulkBatchSize)
+            Verification.objects.bulk_create(verifications, batch_size=pgKnowledgeGraph.bulkBatchSize)
+            print(f"{numberOfOrganizations} organizations with {len(nodes)} nodes and {len(edges)//2} edges")
+
+            start = time.perf_counter()
+            result = pgCapabilities.rebuildAllCapabilities()
+            print(f"full rebuild: {result if isinstance(result, Exception) else pgCapabilities.ContractorCapability.objects.count()} rows in {(time.perf_counter() - start)*1000:.1f}ms")
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{pgCapabilities.ContractorCapability._meta.db_table}"')
+
+            start = time.perf_counter()
+            pgCapabilities.rebuildCapabilitiesOfOrganizations(["benchmark_orga_0"])
+            print(f"incremental rebuild of one organization: {(time.perf_counter() - start)*1000:.1f}ms")
+
+            group = {
+                ServiceDetails.material: {MaterialDetails.id: "benchmark_material_0"},
+                ServiceDetails.color: {NodeDescription.uniqueID: "benchmark_color_0"},
+                ServiceDetails.postProcessings: {"benchmark_postProcessing_0": {}},
+                ServiceDetails.calculations: {}
+            }
+            processObj = SimpleNamespace(serviceDetails={ServiceDetails.groups: [group, group]})
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = FilterAM().getFilteredContractors(processObj)
+                duration = time.perf_counter() - start
+            if isinstance(result, Exception):
+                print(f"getFilteredContractors failed: {result}")
+            else:
+                print(f"getFilteredContractors: {len(result[ContractorParsingForFrontend.contractors])} contractors for 2 groups with {len(queries.captured_queries)} queries in {duration*1000:.1f}ms")
+            transaction.set_rollback(True)
@@ -0,0 +1,78 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Benchmark for cloning the knowledge graph for a new owner
+"""
+
+import time
+from logging import getLogger
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from code_SemperKI.modelFiles.nodesModel import Node, defaultOwner
+from code_SemperKI.connections.content.postgresql import pgKnowledgeGraph
+
+logging = getLogger("django_debug")
+
+####################################################################################
+class Command(BaseCommand):
+    """
+    Creates a synthetic graph, clones it for a new owner and prints the time and the number of queries needed.
+    Everything happens inside a transaction that is rolled back in the end, so the database stays untouched.
+
+    """
+    help = 'benchmarks copyGraphForNewOwner on a synthetic graph'
+
+    ##############################################
+    def add_arguments(self, parser):
+        """
+        :param self: Command object
+        :type self: Command
+        :param parser: parser object
+        :type parser: ArgumentParser
+        :return: None
+        :rtype: None
+        """
+        parser.add_argument('--nodes', type=int, help='the number of nodes in the synthetic graph', default=10000)
+        parser.add_argument('--maxQueries', type=int, help='fail if the clone needs more queries than this', default=50)
+
+    ##############################################
+    def handle(self, *args, **options):
+        """
+        :param self: Command object
+        :type self: Command
+        :param args: arguments
+        :type args: list
+        :param options: options
+        :type options: dict
+        :return: None
+        :rtype: None
+        """
+        numberOfNodes = options["nodes"]
+        with transaction.atomic():
+            # chain of nodes, every node is linked to its predecessor
+            nodes = [Node(nodeID=f"benchmark_{i}", uniqueID=f"benchmark_{i}", nodeName=f"node {i}", nodeType="material", context="", properties={}, createdBy=defaultOwner, clonedFrom="", updatedWhen=timezone.now()) for i in range(numberOfNodes)]
+            Node.objects.bulk_create(nodes, batch_size=pgKnowledgeGraph.bulkBatchSize)
+            EdgeTable = Node.edges.through
+            edges = []
+            for i in range(1, numberOfNodes):
+                edges.append(EdgeTable(from_node_id=nodes[i-1].nodeID, to_node_id=nodes[i].nodeID))
+                edges.append(EdgeTable(from_node_id=nodes[i].nodeID, to_node_id=nodes[i-1].nodeID))
+            EdgeTable.objects.bulk_create(edges, batch_size=pgKnowledgeGraph.bulkBatchSize)
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = pgKnowledgeGraph.Basics.copyGraphForNewOwner("benchmarkOwner")
+                duration = time.perf_counter() - start
+            if isinstance(result, Exception):
+                print(f"Cloning failed: {result}")
+            else:
+                print(f"Cloned {numberOfNodes} nodes and {len(edges)} edge entries in {duration:.3f}s with {len(queries)} queries")
+                if len(queries) > options["maxQueries"]:
+                    print(f"Too many queries: {len(queries)} > {options['maxQueries']}")
+            transaction.set_rollback(True)
@@ -0,0 +1,128 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Benchmark for the project listing and search of the dashboard
+"""
+
+import time
+from logging import getLogger
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from Generic_Backend.code_General.definitions import FileObjectContent
+
+from code_SemperKI.definitions import ProcessDetails, ProjectDetails, ProjectOutput
+from code_SemperKI.modelFiles.projectModel import Project
+from code_SemperKI.modelFiles.processModel import Process
+from code_SemperKI.connections.content.postgresql import pgProjectSearch
+from code_SemperKI.services.service_AdditiveManufacturing.service import SERVICE_NUMBER
+from code_SemperKI.services.service_AdditiveManufacturing.definitions import ServiceDetails, MaterialDetails
+
+logging = getLogger("django_debug")
+
+####################################################################################
+class Command(BaseCommand):
+    """
+    Creates synthetic projects with processes for one client, lists them as before (searchable data gathered for every project on every call)
+    and with the search index, and prints the query plan of a search.
+    Everything happens inside a transaction that is rolled back in the end, so the database stays untouched.
+
+    """
+    help = 'benchmarks the project listing and search of the dashboard'
+
+    ##############################################
+    def add_arguments(self, parser):
+        """
+        :param self: Command object
+        :type self: Command
+        :param parser: parser object
+        :type parser: ArgumentParser
+        :return: None
+        :rtype: None
+        """
+        parser.add_argument('--projects', type=int, help='the number of synthetic projects', default=2000)
+        parser.add_argument('--processes', type=int, help='the number of processes per project', default=3)
+        parser.add_argument('--pagesize', type=int, help='how many projects one page of the dashboard shows', default=50)
+
+    ##############################################
+    def handle(self, *args, **options):
+        """
+        :param self: Command object
+        :type self: Command
+        :param args: arguments
+        :type args: list
+        :param options: options
+        :type options: dict
+        :return: None
+        :rtype: None
+        """
+        numberOfProjects = options["projects"]
+        numberOfProcesses = options["processes"]
+        pageSize = options["pagesize"]
+        clientID = "benchmarkClient"
+        with transaction.atomic():
+            projects = []
+            processes = []
+            for i in range(numberOfProjects):
+                projects.append(Project(projectID=f"benchmark_project_{i}", projectStatus=0, client=clientID, projectDetails={ProjectDetails.title: f"Project {i}"}, updatedWhen=timezone.now()))
+                for j in range(numberOfProcesses):
+                    files = {f"file_{i}_{j}": {FileObjectContent.fileName: f"bracket_{i}_{j}.stl"}}
+                    serviceDetails = {ServiceDetails.groups: [{ServiceDetails.material: {MaterialDetails.title: f"PLA {i % 20}"}}]}
+                    processes.append(Process(processID=f"benchmark_process_{i}_{j}", project_id=f"benchmark_project_{i}", processDetails={ProcessDetails.title: f"Gear housing {i} {j}"}, processStatus=0,
+                                             serviceDetails=serviceDetails, serviceStatus=0, serviceType=SERVICE_NUMBER, client=clientID, files=files, messages={}, updatedWhen=timezone.now()))
+            # bulk_create sends no signals, so the index is built by hand
+            Project.objects.bulk_create(projects, batch_size=1000)
+            Process.objects.bulk_create(processes, batch_size=1000)
+            start = time.perf_counter()
+            pgProjectSearch.rebuildSearchIndexOfProjects([project.projectID for project in projects])
+            print(f"building the search index: {(time.perf_counter() - start)*1000:.1f}ms")
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{Project._meta.db_table}"')
+                cursor.execute(f'ANALYZE "{Process._meta.db_table}"')
+
+            # what getProjectsFlat did before: the processes of every project fetched and parsed on every call
+            def listAsBefore() -> list[dict]:
+                output = []
+                for project in Project.objects.filter(client=clientID):
+                    currentProject = project.toDict()
+                    processesOfProject = project.processes.all()
+                    currentProject[ProjectOutput.processIDs] = list(processesOfProject.values_list("processID", flat=True))
+                    currentProject[ProjectOutput.owner] = True
+                    searchableData = []
+                    processCount = 0
+                    for process in processesOfProject:
+                        if process.client == clientID:
+                            processCount += 1
+                        searchableData.extend(pgProjectSearch.getSearchableDataOfProcess(process.processDetails, process.files, process.serviceType, process.serviceDetails))
+                    currentProject[ProjectOutput.searchableData] = searchableData
+                    currentProject[ProjectOutput.processesCount] = processCount
+                    output.append(currentProject)
+                return output
+
+            calls = {
+                "all projects as before": listAsBefore,
+                "all projects": lambda: pgProjectSearch.getProjectsFlatOfClient(clientID),
+                "first page": lambda: pgProjectSearch.getProjectsFlatOfClient(clientID, limit=pageSize),
+                "last page": lambda: pgProjectSearch.getProjectsFlatOfClient(clientID, offset=max(numberOfProjects-pageSize, 0), limit=pageSize),
+                "search 'bracket_1'": lambda: pgProjectSearch.getProjectsFlatOfClient(clientID, searchTerm="bracket_1", limit=pageSize),
+                "search 'gear pla 7'": lambda: pgProjectSearch.getProjectsFlatOfClient(clientID, searchTerm="gear pla 7", limit=pageSize),
+            }
+            for name, call in calls.items():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    result = call()
+                    duration = time.perf_counter() - start
+                if isinstance(result, Exception):
+                    raise result
+                print(f"{name}: {len(result)} projects in {duration*1000:.1f}ms with {len(queries)} queries")
+
+            plan = Project.objects.filter(client=clientID, searchVector=pgProjectSearch.getSearchQuery("bracket_1")).explain()
+            print(f"###############################\nsearch\n###############################\n{plan}")
+            if "project_search_gin_idx" not in plan:
+                print("The search index was not used, the planner may prefer a scan for so few projects")
+            transaction.set_rollback(True)
@@ -0,0 +1,97 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Benchmark for property searches in the knowledge graph
+"""
+
+import time
+from logging import getLogger
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from code_SemperKI.modelFiles.nodesModel import Node, NodeProperty, NodePropertyDescription, NodePropertiesTypesOfEntries, defaultOwner
+from code_SemperKI.connections.content.postgresql import pgKnowledgeGraph
+
+logging = getLogger("django_debug")
+
+####################################################################################
+class Command(BaseCommand):
+    """
+    Creates synthetic nodes with properties, prints the query plans of the searches by key, value, range and prefix and the time they need.
+    Everything happens inside a transaction that is rolled back in the end, so the database stays untouched.
+
+    """
+    help = 'benchmarks the property index of the knowledge graph'
+
+    ##############################################
+    def add_arguments(self, parser):
+        """
+        :param self: Command object
+        :type self: Command
+        :param parser: parser object
+        :type parser: ArgumentParser
+        :return: None
+        :rtype: None
+        """
+        parser.add_argument('--nodes', type=int, help='the number of synthetic nodes', default=100000)
+
+    ##############################################
+    def handle(self, *args, **options):
+        """
+        :param self: Command object
+        :type self: Command
+        :param args: arguments
+        :type args: list
+        :param options: options
+        :type options: dict
+        :return: None
+        :rtype: None
+        """
+        numberOfNodes = options["nodes"]
+        with transaction.atomic():
+            nodes = []
+            for i in range(numberOfNodes):
+                properties = {
+                    "buildVolume": {NodePropertyDescription.name: "Build volume", NodePropertyDescription.key: "buildVolume", NodePropertyDescription.value: f"{100 + i % 400}x400x400", NodePropertyDescription.unit: "mm", NodePropertyDescription.type: NodePropertiesTypesOfEntries.text},
+                    "density": {NodePropertyDescription.name: "Density", NodePropertyDescription.key: "density", NodePropertyDescription.value: (i % 1000) / 100., NodePropertyDescription.unit: "g/cm³", NodePropertyDescription.type: NodePropertiesTypesOfEntries.number},
+                }
+                if i % 1000 == 0: # a rare key, so that searching for it is selective
+                    properties["certificateISO"] = {NodePropertyDescription.name: "Certificate", NodePropertyDescription.key: "certificateISO", NodePropertyDescription.value: f"ISO {9000 + i // 1000}", NodePropertyDescription.unit: "", NodePropertyDescription.type: NodePropertiesTypesOfEntries.text}
+                nodes.append(Node(nodeID=f"benchmark_{i}", uniqueID=f"benchmark_{i}", nodeName=f"node {i}", nodeType="printer" if i % 2 == 0 else "material", context="", properties=properties, createdBy=defaultOwner, clonedFrom="", updatedWhen=timezone.now()))
+            Node.objects.bulk_create(nodes, batch_size=pgKnowledgeGraph.bulkBatchSize)
+            pgKnowledgeGraph.Basics.updatePropertyIndex(nodes, isNew=True)
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{NodeProperty._meta.db_table}"')
+                cursor.execute(f'ANALYZE "{Node._meta.db_table}"')
+
+            # the same querysets that the searches evaluate
+            queries = {
+                "key contains (getNodesByProperty)": pgKnowledgeGraph.Basics.queryNodesByProperty("certificate"),
+                "type and key contains (getNodesByTypeAndProperty)": pgKnowledgeGraph.Basics.queryNodesByProperty("certificate", "printer"),
+                "key and value contain (getNodesByTypeAndPropertyAndValue)": pgKnowledgeGraph.Basics.queryNodesByTypeAndPropertyAndValue("printer", "buildVolume", "250x400x400"),
+                "neighbors with key (getSpecificNeighborsByProperty)": pgKnowledgeGraph.Basics.queryNeighborsByProperty(nodes[0], "certificate"),
+                "numeric range (getNodesByPropertyRange)": pgKnowledgeGraph.Basics.queryNodesByPropertyRange("density", 2.5, 2.6),
+                "prefix (getNodesByPropertyPrefix)": pgKnowledgeGraph.Basics.queryNodesByPropertyPrefix("buildVolume", "12", "material"),
+            }
+            for name, query in queries.items():
+                plan = query.explain()
+                print(f"###############################\n{name}\n###############################\n{plan}")
+                if "Index" not in plan:
+                    print(f"No index used for {name}!")
+
+            calls = {
+                "getNodesByProperty": lambda: pgKnowledgeGraph.Basics.getNodesByProperty("certificate"),
+                "getNodesByTypeAndPropertyAndValue": lambda: pgKnowledgeGraph.Basics.getNodesByTypeAndPropertyAndValue("printer", "buildVolume", "250x400x400"),
+                "getNodesByPropertyRange": lambda: pgKnowledgeGraph.Basics.getNodesByPropertyRange("density", 2.5, 2.6),
+                "getNodesByPropertyPrefix": lambda: pgKnowledgeGraph.Basics.getNodesByPropertyPrefix("buildVolume", "12", "material"),
+            }
+            for name, call in calls.items():
+                start = time.perf_counter()
+                result = call()
+                duration = time.perf_counter() - start
+                print(f"{name}: {len(result) if isinstance(result, list) else result} nodes in {duration*1000:.1f}ms")
+            transaction.set_rollback(True)
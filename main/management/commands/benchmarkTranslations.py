@@ -0,0 +1,107 @@
+"""
+Part of Semper-KI software
+
+Silvio Weging 2025
+
+Contains: Benchmark for the translation of the material catalogue
+"""
+
+import time
+from logging import getLogger
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from code_SemperKI.modelFiles.nodesModel import Node, NodePropertyDescription, NodePropertiesTypesOfEntries, defaultOwner
+from code_SemperKI.connections.content.postgresql import pgKnowledgeGraph
+from code_SemperKI.utilities.locales import manageTranslations
+from code_SemperKI.services.service_AdditiveManufacturing.definitions import NodeTypesAM, NodePropertiesAMMaterial, NodePropertiesAMColor
+from code_SemperKI.services.service_AdditiveManufacturing.utilities.materialCatalogue import MaterialCatalogue
+
+logging = getLogger("django_debug")
+
+####################################################################################
+class Command(BaseCommand):
+    """
+    Creates synthetic materials with colors and builds the material catalogue once with the translations fetched from redis for every property (as before)
+    and once with the table kept in the process.
+    Everything happens inside a transaction that is rolled back in the end, so the database stays untouched.
+
+    """
+    help = 'benchmarks the translation of the material catalogue'
+
+    ##############################################
+    def add_arguments(self, parser):
+        """
+        :param self: Command object
+        :type self: Command
+        :param parser: parser object
+        :type parser: ArgumentParser
+        :return: None
+        :rtype: None
+        """
+        parser.add_argument('--materials', type=int, help='the number of synthetic materials', default=200)
+        parser.add_argument('--repetitions', type=int, help='how often the catalogue is built', default=5)
+        parser.add_argument('--locale', type=str, help='the locale to translate into', default="de-DE")
+
+    ##############################################
+    def handle(self, *args, **options):
+        """
+        :param self: Command object
+        :type self: Command
+        :param args: arguments
+        :type args: list
+        :param options: options
+        :type options: dict
+        :return: None
+        :rtype: None
+        """
+        numberOfMaterials = options["materials"]
+        repetitions = options["repetitions"]
+        locale = options["locale"]
+        with transaction.atomic():
+            nodes = []
+            edges = []
+            EdgeTable = Node.edges.through
+            for i in range(numberOfMaterials):
+                properties = {}
+                for key in [NodePropertiesAMMaterial.foodSafe, NodePropertiesAMMaterial.heatResistant, NodePropertiesAMMaterial.flexible, NodePropertiesAMMaterial.smooth,
+                            NodePropertiesAMMaterial.eModul, NodePropertiesAMMaterial.poissonRatio, NodePropertiesAMMaterial.density, NodePropertiesAMMaterial.ultimateTensileStrength,
+                            NodePropertiesAMMaterial.tensileModulus, NodePropertiesAMMaterial.elongationAtBreak, NodePropertiesAMMaterial.flexuralStrength, NodePropertiesAMMaterial.acquisitionCosts]:
+                    properties[key] = {NodePropertyDescription.name: key, NodePropertyDescription.key: key, NodePropertyDescription.value: 1. + i % 10, NodePropertyDescription.unit: "", NodePropertyDescription.type: NodePropertiesTypesOfEntries.number}
+                colorProperties = {NodePropertiesAMColor.colorRAL: {NodePropertyDescription.name: NodePropertiesAMColor.colorRAL, NodePropertyDescription.key: NodePropertiesAMColor.colorRAL, NodePropertyDescription.value: f"RAL {9000 + i}", NodePropertyDescription.unit: "", NodePropertyDescription.type: NodePropertiesTypesOfEntries.text}}
+                nodes.append(Node(nodeID=f"benchmark_material_{i}", uniqueID=f"benchmark_material_{i}", nodeName=f"material {i}", nodeType=NodeTypesAM.material, context="", properties=properties, createdBy=defaultOwner, clonedFrom="", updatedWhen=timezone.now()))
+                nodes.append(Node(nodeID=f"benchmark_orga_material_{i}", uniqueID=f"benchmark_material_{i}", nodeName=f"material {i}", nodeType=NodeTypesAM.material, context="", properties=properties, createdBy="benchmarkOrga", clonedFrom=f"benchmark_material_{i}", updatedWhen=timezone.now()))
+                nodes.append(Node(nodeID=f"benchmark_orga_color_{i}", uniqueID=f"benchmark_color_{i}", nodeName=f"color {i}", nodeType=NodeTypesAM.color, context="", properties=colorProperties, createdBy="benchmarkOrga", clonedFrom="", updatedWhen=timezone.now()))
+                edges.append(EdgeTable(from_node_id=f"benchmark_orga_material_{i}", to_node_id=f"benchmark_orga_color_{i}"))
+                edges.append(EdgeTable(from_node_id=f"benchmark_orga_color_{i}", to_node_id=f"benchmark_orga_material_{i}"))
+            Node.objects.bulk_create(nodes, batch_size=pgKnowledgeGraph.bulkBatchSize)
+            EdgeTable.objects.bulk_create(edges, batch_size=pgKnowledgeGraph.bulkBatchSize)
+
+            # what getTranslation did before: fetch and parse the whole document for every single key
+            def getTranslationsFromRedis(locale:str, keyArrs:list[list[str]]) -> list[str]:
+                outList = []
+                for keyArr in keyArrs:
+                    path = manageTranslations.retrieveContentFromRedis()[locale]
+                    for key in keyArr:
+                        path = path[key]
+                    outList.append(path)
+                return outList
+
+            durations = {}
+            for name in ["redis per property", "in-process table"]:
+                if name == "redis per property":
+                    manageTranslations.getTranslations = getTranslationsFromRedis
+                numberOfLoadsBefore = manageTranslations.numberOfLoads
+                start = time.perf_counter()
+                for _ in range(repetitions):
+                    result = MaterialCatalogue.build(locale)
+                    if isinstance(result, Exception):
+                        raise result
+                durations[name] = (time.perf_counter() - start) / repetitions
+                if name == "redis per property":
+                    del manageTranslations.getTranslations # back to the method of the class
+                print(f"{name}: {len(result)} materials in {durations[name]*1000:.1f}ms per call, {manageTranslations.numberOfLoads - numberOfLoadsBefore} loads of the table")
+            print(f"speedup: {durations['redis per property'] / durations['in-process table']:.1f}x")
+            transaction.set_rollback(True)